@@ -0,0 +1,160 @@
+"""Revenue and occupancy reports over the HOTEL_DAILY / HOTEL_MONTHLY rollups.
+
+Both rollups (db_setup migration 8) are kept current by triggers on every
+booking, payment and rent change, so a report never reads BOOKING or
+PAYMENTS. Per-hotel totals come from one HOTEL_MONTHLY row per hotel and
+whole month in the range plus HOTEL_DAILY rows for the partial months at
+either end; the daily series is HOTEL_DAILY summed per day. The rows are
+aggregated with NumPy (np.bincount over a dense hotel index and over the
+day offset). HotelDBManager.rebuild_hotel_daily() recomputes the rollups
+after bulk loads; check_hotel_daily() reports drift.
+
+Metrics:
+    nights_sold    room-nights booked in the range
+    room_revenue   nights sold x the hotel's rent
+    occupancy      nights sold / (rooms x days); None for hotels without ROOM_INVENTORY
+    adr            average daily rate: room revenue / nights sold
+    revpar         room revenue / (rooms x days)
+    payments       money received in the range against bookings, by payment date
+    outstanding    billed (rent x nights) minus paid, for stays checking in within the range
+"""
+import sqlite3
+from datetime import date, timedelta
+
+import numpy as np
+
+MAX_REPORT_DAYS = 5 * 366
+
+# Positions in HotelDBManager.get_hotel_totals() rows (HOTEL_TOTAL_COLUMNS)...
+HOTEL, NIGHTS, REVENUE, PAYMENTS, ARRIVALS, BILLED, BILLED_PAID = range(7)
+# ...and in get_daily_totals() rows (DAILY_TOTAL_COLUMNS).
+DAY, DAY_NIGHTS, DAY_REVENUE, DAY_PAYMENTS, DAY_INVENTORIED_NIGHTS = range(5)
+
+
+def parse_range(start, end):
+    """Validates an inclusive ISO date range and returns it as (date, date).
+
+    Raises ValueError for malformed dates, end before start, or a range longer
+    than MAX_REPORT_DAYS.
+    """
+    try:
+        start, end = date.fromisoformat(str(start)), date.fromisoformat(str(end))
+    except ValueError:
+        raise ValueError("Dates must be in YYYY-MM-DD format.")
+    if end < start:
+        raise ValueError("The end date must not be before the start date.")
+    if (end - start).days + 1 > MAX_REPORT_DAYS:
+        raise ValueError(f"Reports can cover at most {MAX_REPORT_DAYS} days.")
+    return start, end
+
+
+def split_months(start, end):
+    """Splits start..end into whole calendar months and the partial days around them.
+
+    Returns ((first_month, last_month) or None, [(first_day, last_day), ...])
+    with months as 'YYYY-MM' and days as ISO dates.
+    """
+    first_full = start if start.day == 1 else (start.replace(day=1) + timedelta(days=32)).replace(day=1)
+    after_full = (end + timedelta(days=1)).replace(day=1)
+    if first_full >= after_full:
+        return None, [(start.isoformat(), end.isoformat())]
+    edges = []
+    if start < first_full:
+        edges.append((start.isoformat(), (first_full - timedelta(days=1)).isoformat()))
+    if after_full <= end:
+        edges.append((after_full.isoformat(), end.isoformat()))
+    return (first_full.isoformat()[:7], (after_full - timedelta(days=1)).isoformat()[:7]), edges
+
+
+def _ratio(numerator, denominator):
+    """Element-wise numerator / denominator, NaN where the denominator is 0."""
+    numerator, denominator = np.asarray(numerator, dtype=np.float64), np.asarray(denominator, dtype=np.float64)
+    out = np.full(np.broadcast(numerator, denominator).shape, np.nan)
+    np.divide(numerator, denominator, out=out, where=denominator > 0)
+    return out
+
+
+def _number(value, digits=2):
+    """A NumPy scalar as a rounded Python float, or None for NaN."""
+    value = float(value)
+    return None if np.isnan(value) else round(value, digits)
+
+
+def revenue_report(db, start, end, hotl_id=None):
+    """Builds the revenue/occupancy report for start..end (inclusive ISO dates).
+
+    Returns a dict with 'start', 'end', 'days', 'totals' (one dict of the
+    metrics above), 'hotels' (one dict per hotel with activity or inventory,
+    highest revenue first) and 'daily' (one dict per day). `hotl_id` limits
+    the report to one hotel. Raises ValueError for a bad range and
+    sqlite3.DatabaseError when the rollup cannot be read.
+    """
+    start, end = parse_range(start, end)
+    days = (end - start).days + 1
+    months, edges = split_months(start, end)
+    parts = [db.get_hotel_totals(*months, hotl_id=hotl_id, monthly=True)] if months else []
+    parts += [db.get_hotel_totals(first, last, hotl_id=hotl_id) for first, last in edges]
+    daily_rows = db.get_daily_totals(start.isoformat(), end.isoformat(), hotl_id)
+    if daily_rows is False or any(part is False for part in parts):
+        raise sqlite3.DatabaseError("The HOTEL_DAILY/HOTEL_MONTHLY rollups could not be read")
+
+    hotels = {row['hotl_id']: row['hotl_name'] for row in db.get_catalogue().hotels
+              if hotl_id is None or row['hotl_id'] == hotl_id}
+    room_counts = db.get_room_counts()
+    hotel_ids = np.array(sorted(hotels), dtype=np.int64)
+    rooms = np.array([room_counts.get(int(h), 0) for h in hotel_ids], dtype=np.float64)
+
+    data = np.array([row for part in parts for row in part], dtype=np.float64).reshape(-1, BILLED_PAID + 1)
+    # Dense hotel index per row; rows for hotels missing from the (cached) catalogue are dropped.
+    index = np.searchsorted(hotel_ids, data[:, HOTEL].astype(np.int64))
+    known = index < len(hotel_ids)
+    known[known] = hotel_ids[index[known]] == data[known, HOTEL]
+    data, index = data[known], index[known]
+
+    def per_hotel(column):
+        return np.bincount(index, weights=data[:, column], minlength=len(hotel_ids))
+
+    nights, revenue = per_hotel(NIGHTS), per_hotel(REVENUE)
+    payments, arrivals = per_hotel(PAYMENTS), per_hotel(ARRIVALS)
+    outstanding = per_hotel(BILLED) - per_hotel(BILLED_PAID)
+    available = rooms * days
+
+    # Occupancy only counts hotels whose room inventory is known.
+    has_rooms = rooms > 0
+    totals = {
+        'nights_sold': int(nights.sum()),
+        'room_revenue': _number(revenue.sum()),
+        'payments': _number(payments.sum()),
+        'arrivals': int(arrivals.sum()),
+        'outstanding': _number(outstanding.sum()),
+        'adr': _number(_ratio(revenue.sum(), nights.sum())),
+        'occupancy': _number(_ratio(nights[has_rooms].sum(), available.sum()), 4),
+        'revpar': _number(_ratio(revenue[has_rooms].sum(), available.sum())),
+    }
+
+    adr, occupancy, revpar = _ratio(revenue, nights), _ratio(nights, available), _ratio(revenue, available)
+    active = (nights > 0) | (payments != 0) | (arrivals > 0) | has_rooms
+    hotel_rows = [{
+        'hotl_id': int(hotel_ids[i]), 'hotl_name': hotels[int(hotel_ids[i])], 'rooms': int(rooms[i]),
+        'nights_sold': int(nights[i]), 'room_revenue': _number(revenue[i]), 'payments': _number(payments[i]),
+        'arrivals': int(arrivals[i]), 'outstanding': _number(outstanding[i]), 'adr': _number(adr[i]),
+        'occupancy': _number(occupancy[i], 4), 'revpar': _number(revpar[i]),
+    } for i in np.flatnonzero(active)]
+    hotel_rows.sort(key=lambda row: (-row['room_revenue'], row['hotl_id']))
+
+    series = np.array(daily_rows, dtype=np.float64).reshape(-1, DAY_INVENTORIED_NIGHTS + 1)
+    day = series[:, DAY].astype(np.intp)
+
+    def per_day(column):
+        return np.bincount(day, weights=series[:, column], minlength=days)
+
+    daily_nights, daily_revenue, daily_payments = per_day(DAY_NIGHTS), per_day(DAY_REVENUE), per_day(DAY_PAYMENTS)
+    daily_occupancy = _ratio(per_day(DAY_INVENTORIED_NIGHTS), rooms.sum())
+    daily = [{
+        'date': (start + timedelta(days=i)).isoformat(), 'nights_sold': int(daily_nights[i]),
+        'room_revenue': _number(daily_revenue[i]), 'payments': _number(daily_payments[i]),
+        'occupancy': _number(daily_occupancy[i], 4),
+    } for i in range(days)]
+
+    return {'start': start.isoformat(), 'end': end.isoformat(), 'days': days, 'hotl_id': hotl_id,
+            'totals': totals, 'hotels': hotel_rows, 'daily': daily}
@@ -0,0 +1,194 @@
+"""JSON API (v1) helpers: resource definitions, encoding, sparse fieldsets and payload validation.
+
+The routes live in app.py under /api/v1. Every resource supports:
+    GET    /api/v1/<resource>         one keyset page (?after=&limit=&sort=&fields=)
+    GET    /api/v1/<resource>/<id>    one row (?fields=)
+                                      bookings also take ?history=1 to include archived stays
+    POST   /api/v1/<resource>         create an array of items in one transaction
+    PATCH  /api/v1/<resource>         partial updates (an array of items with their id) in one transaction
+and, read-only and open without a login (the booking form quotes for guests):
+    GET    /api/v1/quotes             stay prices at every hotel (?check_in=&check_out=&room_type=&hotl_id=)
+GET responses carry an ETag built from the TABLE_VERSION counters of the
+tables they read, so If-None-Match is answered with a 304 before any row is
+loaded. Responses are encoded with orjson when it is installed (optional;
+several times faster on row lists), else compactly with the json module.
+
+Settings (environment variables):
+    HOTEL_QUOTE_RATE   quote requests allowed per client IP per minute (default 120)
+"""
+import json
+import os
+from collections import namedtuple
+from datetime import date
+
+from db_manager import ROOM_TYPES
+
+try:
+    import orjson
+except ImportError:  # optional dependency
+    orjson = None
+
+API_VERSION = 'v1'
+MAX_BATCH_ITEMS = 500
+QUOTE_RATE = int(os.environ.get('HOTEL_QUOTE_RATE', 120))
+
+
+class ApiError(Exception):
+    """An error answered as {"error": message, ...details} with `status`."""
+
+    def __init__(self, status, message, **details):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+        self.details = details
+
+
+# --- Resources ---
+# module: PERMISSION module the role needs; tables: TABLE_VERSION rows its reads depend on;
+# table: what batch updates write; fields: readable columns; create/update: {field: (type, required)}.
+Resource = namedtuple('Resource', 'module tables table id_field fields create update')
+
+_HOTEL_FIELDS = {'hotl_name': (str, True), 'hotl_type': (str, True), 'hotl_desc': (str, False),
+                 'hotl_rent': (float, True), 'hotl_manager_id': (int, True)}
+_CUSTOMER_FIELDS = {'cus_name': (str, True), 'cus_mobile': (str, False), 'cus_email': (str, True),
+                    'cus_add': (str, False)}
+_PAYMENT_FIELDS = {'pay_cus_id': (int, True), 'pay_amt': (float, True), 'pay_date': (date, True),
+                   'pay_desc': (str, False), 'pay_book_id': (int, False)}
+
+
+def _optional(fields):
+    return {name: (kind, False) for name, (kind, _) in fields.items()}
+
+
+RESOURCES = {
+    'hotels': Resource(
+        'Hotels', ('HOTEL',), 'HOTEL', 'hotl_id',
+        ('hotl_id', 'hotl_name', 'hotl_type', 'hotl_desc', 'hotl_rent', 'hotl_manager_id'),
+        _HOTEL_FIELDS, dict(hotl_id=(int, True), **_optional(_HOTEL_FIELDS))),
+    'customers': Resource(
+        'Customers', ('CUSTOMER',), 'CUSTOMER', 'cus_id',
+        ('cus_id', 'cus_name', 'cus_mobile', 'cus_email', 'cus_add'),
+        _CUSTOMER_FIELDS, dict(cus_id=(int, True), **_optional(_CUSTOMER_FIELDS))),
+    'bookings': Resource(
+        'Bookings', ('BOOKING',), 'BOOKING', 'book_id',
+        ('book_id', 'book_cus_id', 'book_hotel_id', 'book_type', 'book_desc', 'book_check_in', 'book_check_out',
+         'archived_year'),
+        {'book_hotel_id': (int, True), 'book_type': (str, True), 'book_check_in': (date, True),
+         'book_check_out': (date, True), 'book_desc': (str, False), 'book_cus_id': (int, False),
+         'cus_email': (str, False), 'cus_name': (str, False), 'cus_mobile': (str, False), 'cus_add': (str, False),
+         'deposit': (float, False), 'pay_date': (date, False)},
+        {'book_id': (int, True), 'book_hotel_id': (int, False), 'book_type': (str, False),
+         'book_desc': (str, False)}),
+    'payments': Resource(
+        'Payments', ('PAYMENTS', 'CUSTOMER'), 'PAYMENTS', 'pay_id',
+        ('pay_id', 'pay_cus_id', 'pay_amt', 'pay_date', 'pay_desc', 'pay_book_id', 'Customer_Name'),
+        _PAYMENT_FIELDS, dict(pay_id=(int, True), **_optional(_PAYMENT_FIELDS))),
+}
+
+# GET /api/v1/quotes prices stays from the rate calendar (quotes.py); read-only, not a table and
+# public (module None), rate-limited per IP instead.
+QUOTES = Resource(None, ('HOTEL', 'RATE'), None, 'hotl_id', ('hotl_id', 'total', 'average'), None, None)
+
+# Resources whose reads can include the archive files (?history=1); see archive.py.
+HISTORY_RESOURCES = ('bookings',)
+
+
+# --- Encoding ---
+def dumps(data):
+    """Compact JSON bytes for `data` (orjson when available)."""
+    if orjson is not None:
+        return orjson.dumps(data)
+    return json.dumps(data, separators=(',', ':'), ensure_ascii=False).encode('utf-8')
+
+
+def loads(raw):
+    """Parses a request body. Raises ApiError(400) for malformed JSON."""
+    try:
+        return orjson.loads(raw) if orjson is not None else json.loads(raw)
+    except ValueError:
+        raise ApiError(400, "Request body is not valid JSON.")
+
+
+# --- Sparse Fieldsets ---
+def parse_fields(text, resource):
+    """The ?fields= list as a tuple of column names (all readable fields when empty)."""
+    if not text:
+        return resource.fields
+    fields = tuple(dict.fromkeys(name.strip() for name in text.split(',') if name.strip()))
+    unknown = [name for name in fields if name not in resource.fields]
+    if unknown:
+        raise ApiError(400, f"Unknown field(s): {', '.join(unknown)}", allowed=list(resource.fields))
+    return fields
+
+
+def project(row, fields):
+    """One row (sqlite3.Row or dict) as a dict of just `fields`."""
+    return {name: row[name] for name in fields}
+
+
+# --- Payload Validation ---
+def _coerce(value, kind):
+    if value is None:
+        return None
+    if kind is int and isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if kind is float and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return float(value)
+    if kind is str and isinstance(value, str):
+        return value
+    if kind is date and isinstance(value, str):
+        date.fromisoformat(value)  # ValueError for malformed dates
+        return value
+    raise ValueError(f"expected {'an ISO date' if kind is date else kind.__name__}")
+
+
+def validate_items(payload, spec, extra_check=None):
+    """Checks a batch body (an array of objects) against `spec` ({field: (type, required)}).
+
+    Returns the items as clean dicts. Raises ApiError(413) for oversized
+    batches and ApiError(422) listing every invalid item otherwise.
+    """
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list) or not payload:
+        raise ApiError(422, "Expected a non-empty array of objects.")
+    if len(payload) > MAX_BATCH_ITEMS:
+        raise ApiError(413, f"At most {MAX_BATCH_ITEMS} items per request.")
+
+    items, errors = [], []
+    for index, raw in enumerate(payload):
+        if not isinstance(raw, dict):
+            errors.append({'index': index, 'error': "expected an object"})
+            continue
+        problems = [f"unknown field {name!r}" for name in raw if name not in spec]
+        problems += [f"{name} is required" for name, (_, required) in spec.items()
+                     if required and raw.get(name) is None]
+        item = {}
+        for name, value in raw.items():
+            if name in spec:
+                try:
+                    item[name] = _coerce(value, spec[name][0])
+                except ValueError as e:
+                    problems.append(f"{name}: {e}")
+        if not problems and extra_check:
+            problems += extra_check(item)
+        if problems:
+            errors.append({'index': index, 'error': '; '.join(problems)})
+        items.append(item)
+    if errors:
+        raise ApiError(422, "Invalid items; nothing was written.", items=errors)
+    return items
+
+
+def check_booking(item):
+    """Booking rules on top of the field types, for creates and updates."""
+    if 'book_type' in item and item['book_type'] not in ROOM_TYPES:
+        return [f"book_type must be one of {', '.join(ROOM_TYPES)}"]
+    return []
+
+
+def check_new_booking(item):
+    problems = check_booking(item)
+    if item.get('book_cus_id') is None and not item.get('cus_email'):
+        problems.append("book_cus_id or cus_email is required")
+    return problems
@@ -1,331 +1,961 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session 
-from db_manager import HotelDBManager
-from db_setup import setup_database
-import os
-from datetime import date 
-from functools import wraps 
-
-app = Flask(__name__)
-app.secret_key = 'your_super_secret_project_key'
-db = HotelDBManager() 
-
-# --- Setup Check ---
-if not os.path.exists(db.db_name):
-    print("Database file not found. Running setup...")
-    setup_database()
-
-# --- Access Control Decorator ---
-def login_required(f):
-    """Decorator to protect routes from unauthenticated access."""
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'logged_in' not in session:
-            flash('Access Denied. Please log in to view this page.', 'error')
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorated_function
-
-# --- Main/Base Routes ---
-
-@app.route('/')
-def index():
-    hotels = db.get_all_hotels()
-    return render_template('index.html', hotels=hotels)
-
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    if request.method == 'POST':
-        username = request.form['username']
-        password = request.form['password']
-        
-        user = db.authenticate_user(username, password)
-        
-        if user:
-            session['logged_in'] = True
-            session['user_role'] = user['role_name']
-            session['username'] = username
-            
-            flash(f"Login successful. Welcome, {user['role_name']}.", 'success')
-            return redirect(url_for('hotels')) 
-        else:
-            error = 'Invalid Credentials.'
-            return render_template('login.html', error=error)
-            
-    return render_template('login.html')
-
-@app.route('/logout')
-def logout():
-    """Logs out the user by clearing the session."""
-    session.pop('logged_in', None)
-    session.pop('user_role', None)
-    session.pop('username', None)
-    flash("You have been logged out.", 'success')
-    return redirect(url_for('index'))
-
-# --- Management/Read Routes ---
-
-@app.route('/hotels')
-@login_required 
-def hotels():
-    hotels_list = db.get_all_hotels()
-    return render_template('hotels.html', hotels=hotels_list)
-
-@app.route('/bookings')
-@login_required 
-def bookings():
-    """Renders the booking summary report using the SQL VIEW."""
-    booking_details = db.get_booking_summary_report()
-    return render_template('bookings.html', bookings=booking_details)
-
-@app.route('/customers')
-@login_required 
-def customers():
-    """Renders the list of customers."""
-    customers_list = db.get_all_customers()
-    return render_template('customers.html', customers=customers_list) 
-
-@app.route('/payments')
-@login_required 
-def payments():
-    """Renders the list of payments."""
-    payments_list = db.get_all_payments_detailed()
-    return render_template('payments.html', payments=payments_list)
-
-# --- Hotel CRUD Routes ---
-
-@app.route('/add_hotel', methods=['GET', 'POST'])
-@login_required 
-def add_hotel():
-    if request.method == 'POST':
-        try:
-            name = request.form['name']
-            type = request.form['type']
-            desc = request.form['desc']
-            rent = float(request.form['rent'])
-            manager_id = 1 
-            
-            if db.add_hotel(name, type, desc, rent, manager_id):
-                flash('Hotel added successfully!', 'success')
-                return redirect(url_for('hotels'))
-            else:
-                flash('Error adding hotel. Check if manager ID exists.', 'error')
-        except ValueError:
-            flash('Invalid input for rent.', 'error')
-    
-    return render_template('add_hotel.html')
-
-@app.route('/edit_hotel/<int:hotl_id>', methods=['GET', 'POST'])
-@login_required 
-def edit_hotel(hotl_id):
-    hotel = db.get_hotel_by_id(hotl_id)
-    if not hotel:
-        flash('Hotel not found.', 'error')
-        return redirect(url_for('hotels'))
-
-    if request.method == 'POST':
-        try:
-            name = request.form['hotl_name']
-            type = request.form['hotl_type']
-            desc = request.form['hotl_desc']
-            rent = float(request.form['hotl_rent'])
-            manager_id = int(request.form['hotl_manager_id'])
-            
-            if db.update_hotel(hotl_id, name, type, desc, rent, manager_id):
-                flash(f'Hotel {name} updated successfully!', 'success')
-                return redirect(url_for('hotels'))
-            else:
-                flash('Error updating hotel. Check input fields.', 'error')
-        except Exception:
-            flash('Update failed. Ensure all fields are valid.', 'error')
-            
-    return render_template('edit_hotel.html', hotel=hotel)
-
-@app.route('/delete_hotel/<int:hotl_id>')
-@login_required 
-def delete_hotel(hotl_id):
-    if db.delete_hotel(hotl_id):
-        flash(f'Hotel ID {hotl_id} deleted successfully.', 'success')
-    else:
-        flash(f'Error deleting Hotel ID {hotl_id}. It may have active bookings/dependencies.', 'error')
-    
-    return redirect(url_for('hotels'))
-
-# --- Booking CRUD Routes ---
-
-@app.route('/add_booking', methods=['GET', 'POST'])
-def add_booking():
-    hotels_list = db.get_all_hotels()
-    
-    if request.method == 'POST':
-        try:
-            # STEP 1: Get data including customer details and payment
-            customer_email = request.form['customer_email'] 
-            customer_name = request.form['customer_name'] 
-            customer_mobile = request.form['customer_mobile']
-            customer_address = request.form['customer_address']
-            hotl_id = int(request.form['hotl_id'])
-            book_type = request.form['book_type']
-            desc = request.form['book_desc']
-            check_in = request.form['check_in_date']
-            check_out = request.form['check_out_date']
-            initial_payment = float(request.form.get('initial_payment') or 0) 
-            
-            # STEP 2: Find the Customer ID
-            cus_id = db.get_customer_id_by_email(customer_email)
-            
-            # --- FIX: If customer not found, create a full new record ---
-            if cus_id is None:
-                # Use the new method to create a complete customer record
-                success = db.create_customer_full(
-                    customer_name, customer_mobile, customer_email, None, customer_address
-                ) 
-                
-                if success:
-                    # Retrieve the newly created ID for booking
-                    cus_id = db.get_customer_id_by_email(customer_email) 
-                    flash(f'New customer "{customer_name}" registered successfully.', 'info')
-                else:
-                    flash('Error registering new customer.', 'error')
-                    return render_template('add_booking.html', hotels=hotels_list)
-            # -------------------------------------------------------------
-
-            # STEP 3 & 4: Create Booking and Payment
-            if db.add_booking(cus_id, hotl_id, book_type, desc, check_in, check_out):
-                
-                if initial_payment > 0:
-                    today = date.today().isoformat()
-                    pay_desc = f"Deposit for booking at {hotl_id}"
-                    db.add_payment(cus_id, initial_payment, today, pay_desc)
-                    flash('Booking created successfully! Initial payment recorded.', 'success')
-                else:
-                    flash('Booking created successfully!', 'success')
-                
-                return redirect(url_for('index'))
-            else:
-                flash('Error creating booking. Check hotel details.', 'error')
-                
-        except ValueError:
-             flash('Invalid input: Hotel ID or Payment must be valid numbers.', 'error')
-        except Exception as e:
-             print(f"Booking Submission Error: {e}")
-             flash('An unexpected error occurred during submission.', 'error')
-             
-    return render_template('add_booking.html', hotels=hotels_list)
-
-@app.route('/edit_booking/<int:book_id>', methods=['GET', 'POST'])
-@login_required 
-def edit_booking(book_id):
-    booking = db.get_booking_by_id_detailed(book_id)
-    if not booking:
-        flash('Booking not found.', 'error')
-        return redirect(url_for('bookings'))
-
-    if request.method == 'POST':
-        hotl_id = request.form['book_hotel_id']
-        book_type = request.form['book_type']
-        desc = request.form['book_desc']
-        
-        if db.update_booking(book_id, hotl_id, book_type, desc):
-            flash(f'Booking {book_id} updated successfully!', 'success')
-            return redirect(url_for('bookings'))
-        else:
-            flash('Error updating booking.', 'error')
-
-    return render_template('edit_booking.html', booking=booking)
-
-
-# --- Customer CRUD Routes ---
-
-@app.route('/delete_customer/<int:cus_id>')
-@login_required 
-def delete_customer(cus_id):
-    if db.delete_customer(cus_id):
-        flash(f'Customer ID {cus_id} deleted successfully.', 'success')
-    else:
-        flash(f'Error: Customer ID {cus_id} could not be deleted. Check for active bookings/payments.', 'error')
-    
-    return redirect(url_for('customers'))
-
-@app.route('/edit_customer/<int:cus_id>', methods=['GET', 'POST'])
-@login_required 
-def edit_customer(cus_id):
-    customer = db.get_customer_by_id(cus_id)
-    if not customer:
-        flash('Customer not found.', 'error')
-        return redirect(url_for('customers'))
-
-    if request.method == 'POST':
-        name = request.form['cus_name']
-        mobile = request.form['cus_mobile']
-        email = request.form['cus_email']
-        address = request.form['cus_add']
-        
-        if db.update_customer(cus_id, name, mobile, email, address):
-            flash(f'Customer {name} updated successfully!', 'success')
-            return redirect(url_for('customers'))
-        else:
-            flash('Error updating customer.', 'error')
-            
-    return render_template('edit_customer.html', customer=customer)
-
-
-# --- Payment CRUD Routes ---
-
-@app.route('/delete_payment/<int:pay_id>')
-@login_required 
-def delete_payment(pay_id):
-    if db.delete_payment(pay_id):
-        flash(f'Payment ID {pay_id} deleted successfully.', 'success')
-    else:
-        flash(f'Error deleting Payment ID {pay_id}.', 'error')
-    
-    return redirect(url_for('payments')) 
-
-@app.route('/add_payment', methods=['GET', 'POST'])
-@login_required 
-def add_payment():
-    if request.method == 'POST':
-        try:
-            cus_id = int(request.form['cus_id'])
-            amount = float(request.form['pay_amt'])
-            date_str = request.form['pay_date']
-            desc = request.form['pay_desc']
-            
-            if db.add_payment(cus_id, amount, date_str, desc):
-                flash('Payment recorded successfully!', 'success')
-                return redirect(url_for('payments'))
-            else:
-                flash('Error recording payment. Check Customer ID.', 'error')
-        except Exception:
-            flash('Invalid input.', 'error')
-
-    return render_template('add_payment.html', today=date.today().isoformat())
-
-@app.route('/edit_payment/<int:pay_id>', methods=['GET', 'POST'])
-@login_required 
-def edit_payment(pay_id):
-    payment = db.get_payment_by_id(pay_id)
-    if not payment:
-        flash('Payment not found.', 'error')
-        return redirect(url_for('payments'))
-
-    if request.method == 'POST':
-        try:
-            cus_id = int(request.form['pay_cus_id'])
-            amount = float(request.form['pay_amt'])
-            date_str = request.form['pay_date']
-            desc = request.form['pay_desc']
-            
-            if db.update_payment(pay_id, cus_id, amount, date_str, desc):
-                flash(f'Payment {pay_id} updated successfully!', 'success')
-                return redirect(url_for('payments'))
-            else:
-                flash('Error updating payment. Check Customer ID.', 'error')
-        except Exception:
-            flash('Invalid input.', 'error')
-
-    return render_template('edit_payment.html', payment=payment)
-
-
-if __name__ == '__main__':
+from flask import Flask, render_template, request, redirect, url_for, flash, session, Response, stream_with_context, jsonify, make_response, g
+from db_manager import HotelDBManager, DEFAULT_PAGE_SIZE, PRIMARY, ROOM_TYPES, WEEKDAYS, BatchError, RoomUnavailableError, parse_stay, permission_bit, weekday_names
+from instrumentation import metrics
+from auth import Authenticator, AuthBusyError, LoginThrottle, ThrottledError
+from fragments import FragmentCache
+from group_commit import GROUP_COMMIT
+from markupsafe import Markup
+from replica import REPLICAS
+import api
+import csv
+import hashlib
+import io
+import os
+import sqlite3
+import threading
+import time
+from datetime import date, timedelta
+from functools import partial, wraps 
+
+app = Flask(__name__)
+app.secret_key = 'your_super_secret_project_key'
+db = HotelDBManager(os.environ.get('HOTEL_DB', 'hotel_booking.db'), group_commit=GROUP_COMMIT, replicas=REPLICAS)
+authenticator = Authenticator(db)
+fragments = FragmentCache()
+quote_throttle = LoginThrottle(ip_attempts=api.QUOTE_RATE, ip_window=60)
+_quotes = None
+
+def quote_engine():
+    """The process's QuoteEngine (quotes.py), created by the first quote so NumPy loads only then."""
+    global _quotes
+    if _quotes is None or _quotes.db is not db:
+        from quotes import QuoteEngine
+        _quotes = QuoteEngine(db)
+    return _quotes
+
+# --- Startup ---
+# Importing this module does no I/O. The schema is created or migrated by
+# create_app() / `python db_setup.py init`, or else by the first request.
+_db_ready = False
+_db_ready_lock = threading.Lock()
+
+class DatabaseNotReadyError(RuntimeError):
+    """init_database() could not create or migrate the database (the reason is in its output)."""
+
+def init_db():
+    """Creates or migrates the database, once per process.
+
+    Raises DatabaseNotReadyError when that fails; the next call tries again.
+    """
+    global _db_ready
+    with _db_ready_lock:
+        if not _db_ready:
+            from db_setup import init_database
+            if init_database(db.db_name) is None:
+                raise DatabaseNotReadyError(f"Database '{db.db_name}' could not be created or migrated.")
+            _db_ready = True
+
+def create_app(db_name=None, preload=True):
+    """App factory: points the app at `db_name`, prepares the schema and warms it up.
+
+    With preload, every template is compiled and the hotel catalogue loaded,
+    then pooled connections are closed so workers forked from this process
+    (e.g. gunicorn --preload 'app:create_app()') start warm without sharing
+    SQLite handles. Raises DatabaseNotReadyError if the schema cannot be
+    created or migrated.
+    """
+    global db, _db_ready
+    if db_name and db_name != db.db_name:
+        db.close()
+        db = HotelDBManager(db_name, group_commit=GROUP_COMMIT, replicas=REPLICAS)
+        authenticator.db = db
+        _db_ready = False
+    init_db()
+    if preload:
+        for name in app.jinja_env.list_templates(filter_func=lambda name: name.endswith('.html')):
+            app.jinja_env.get_template(name)
+        db.get_catalogue()
+        db.close()
+    return app
+
+@app.before_request
+def ensure_db():
+    if not _db_ready:
+        try:
+            init_db()
+        except DatabaseNotReadyError as e:
+            response = make_response(str(e), 503)
+            response.headers['Retry-After'] = '30'
+            return response
+
+# --- Instrumentation ---
+metrics.add_collector('hotel_db_pool', "Connection pool counters.", lambda: db.pool_stats())
+metrics.add_collector('hotel_catalogue_cache', "Hotel catalogue cache counters.", lambda: db.catalogue_cache_stats())
+metrics.add_collector('hotel_group_commit', "Group-commit writer counters and queue depth.",
+                      lambda: db.group_commit_stats())
+metrics.add_collector('hotel_fragment_cache', "Rendered table-row cache counters, size and hit rate.",
+                      fragments.stats)
+metrics.add_collector('hotel_replicas', "Read-replica routing, refresh counters and snapshot age.",
+                      lambda: db.replica_stats())
+metrics.add_collector('hotel_auth', "Login verification counters and in-flight checks.", authenticator.stats)
+metrics.add_collector('hotel_quote_cache', "Quote engine price-block cache counters and size.",
+                      lambda: _quotes.stats() if _quotes is not None else {})
+
+@app.before_request
+def start_request_metrics():
+    g.metrics_token = metrics.start_request()
+
+@app.after_request
+def record_request_metrics(response):
+    token = g.pop('metrics_token', None)
+    if token is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        stats = metrics.finish_request(token, route, request.method, response.status_code)
+        if stats is not None:
+            response.headers['X-Query-Count'] = str(stats.queries)
+            if stats.writes and 'logged_in' in session:
+                # Replica-routed reads of this session now need a snapshot taken after this write.
+                session['last_write_at'] = time.time()
+    return response
+
+@app.teardown_request
+def discard_request_metrics(error=None):
+    """Records requests that raised before after_request could run."""
+    token = g.pop('metrics_token', None)
+    if token is not None:
+        route = request.url_rule.rule if request.url_rule else 'unmatched'
+        metrics.finish_request(token, route, request.method, 500)
+
+@app.route('/metrics')
+def metrics_endpoint():
+    """Prometheus scrape endpoint: query/route latency histograms and pool/cache gauges."""
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
+
+def read_since():
+    """since= for replica-routed reads: the session's last write, so users always see their own changes."""
+    return session.get('last_write_at')
+
+# --- Access Control Decorator ---
+def login_required(f):
+    """Decorator to protect routes from unauthenticated access."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'logged_in' not in session:
+            flash('Access Denied. Please log in to view this page.', 'error')
+            return redirect(url_for('login'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+# Landing page for each permission module, in the order tried after login.
+MODULE_PAGES = {'Hotels': 'hotels', 'Bookings': 'bookings', 'Customers': 'customers', 'Payments': 'payments',
+                'Reports': 'reports'}
+EXPORT_MODULES = {'hotels': 'Hotels', 'bookings': 'Bookings', 'customers': 'Customers', 'payments': 'Payments',
+                  'balances': 'Payments'}
+
+def session_permissions():
+    """The logged-in role's permission bitmask, kept in the session.
+
+    It is recompiled only when the PERMISSION data version moves; checking the
+    version costs a database read at most once per permissions_ttl per process.
+    """
+    if 'logged_in' not in session:
+        return 0
+    snapshot = db.get_permissions()
+    if session.get('perm_version') != snapshot.version:
+        session['perm_mask'] = snapshot.masks.get(session.get('user_role'), 0)
+        session['perm_version'] = snapshot.version
+    return session['perm_mask']
+
+def has_permission(module):
+    bit = permission_bit(module)
+    return session_permissions() & bit == bit
+
+def permission_required(module):
+    """Decorator: the user must be logged in and their role must grant `module` (see PERMISSION_MODULES)."""
+    bit = permission_bit(module)
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            if 'logged_in' not in session:
+                flash('Access Denied. Please log in to view this page.', 'error')
+                return redirect(url_for('login'))
+            if session_permissions() & bit != bit:
+                flash(f'Access Denied. Your role does not have {module} permission.', 'error')
+                return redirect(url_for('index'))
+            return f(*args, **kwargs)
+        return decorated_function
+    return decorator
+
+@app.context_processor
+def permission_helpers():
+    return {'can': has_permission}
+
+# --- Pagination Helpers ---
+def fetch_page(fetch, default_sort, sorts, descending=False):
+    """Loads one keyset page using ?after=&limit=&sort=&order= from the query string.
+
+    Returns (rows, paging) where paging is handed to the template's pager.
+    A malformed cursor or sort falls back to the first page.
+    """
+    order = request.args.get('order')
+    args = {
+        'after': request.args.get('after') or None,
+        'limit': request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+        'sort': request.args.get('sort', default_sort),
+        'descending': descending if order is None else order == 'desc',
+    }
+    try:
+        rows = fetch(**args)
+    except ValueError:
+        flash('Invalid page request. Showing the first page.', 'error')
+        args.update(after=None, sort=default_sort, descending=descending)
+        rows = fetch(**args)
+        fell_back = True
+    else:
+        fell_back = False
+
+    paging = {
+        'next_cursor': getattr(rows, 'next_cursor', None),
+        'is_first': args['after'] is None,
+        'limit': args['limit'],
+        'sort': args['sort'],
+        'order': 'desc' if args['descending'] else 'asc',
+        'sorts': sorts,
+        'fell_back': fell_back,
+    }
+    return rows or [], paging
+
+PAGE_ARGS = ('after', 'limit', 'sort', 'order')
+
+def table_rows(rows_template, tables, fetch, default_sort, sorts, descending=False, routed=False):
+    """fetch_page() with the rows already rendered: (rows_html, paging).
+
+    The <tr> rows of `rows_template` come from the fragment cache while the
+    TABLE_VERSION counters of `tables` are unchanged, so a hit runs neither
+    the page query nor the row template. With routed=True `fetch` takes a
+    `pool`: the versions and the rows are both read from the one pool that
+    read_pool(read_since()) picks, so a replica's rows are stored under that
+    replica's versions.
+    """
+    pool = None
+    if routed:
+        pool = db.read_pool(read_since())
+        fetch = partial(fetch, pool=pool)
+    versions = db.get_table_versions(tables, pool=pool)
+    key = (rows_template, tuple(sorted(versions.items())), tuple(request.args.get(name) for name in PAGE_ARGS))
+    cached = fragments.get(key)
+    if cached is not None:
+        return cached
+    rows, paging = fetch_page(fetch, default_sort, sorts, descending)
+    rows_html = Markup(render_template(rows_template, rows=rows))
+    if not paging['fell_back']:  # a malformed request must flash its error again next time
+        fragments.put(key, rows_html, paging)
+    return rows_html, paging
+
+# --- Conditional GET Helpers ---
+def catalogue_page(scope, render):
+    """Serves a page built from the hotel catalogue with ETag/Last-Modified headers.
+
+    The ETag covers the HOTEL data version, the page (`scope` plus query string)
+    and who is logged in, since the nav bar differs per user. Matching
+    If-None-Match / If-Modified-Since requests get a 304 without touching the
+    template. Pages with pending flash messages are always rendered.
+    """
+    snapshot = db.get_catalogue()
+    key = (f"{scope}|{request.query_string.decode()}|{snapshot.version}|{session.get('username', '')}"
+           f"|{session_permissions()}")
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+
+    if '_flashes' not in session:
+        if request.if_none_match:
+            not_modified = request.if_none_match.contains(etag)
+        else:
+            not_modified = request.if_modified_since is not None and snapshot.changed_at <= request.if_modified_since
+        if not_modified:
+            response = Response(status=304)
+            response.set_etag(etag)
+            response.last_modified = snapshot.changed_at
+            response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+
+    response = make_response(render())
+    response.set_etag(etag)
+    response.last_modified = snapshot.changed_at
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+# --- Main/Base Routes ---
+
+@app.route('/')
+def index():
+    return catalogue_page('index', lambda: render_template('index.html', hotels=db.get_all_hotels()))
+
+@app.route('/login', methods=['GET', 'POST'])
+def login():
+    if request.method == 'POST':
+        username = request.form['username']
+        password = request.form['password']
+        
+        try:
+            user = authenticator.verify(username, password, request.remote_addr)
+        except ThrottledError as e:
+            response = make_response(render_template('login.html', error=str(e)), 429)
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        except AuthBusyError as e:
+            response = make_response(render_template('login.html', error=str(e)), 503)
+            response.headers['Retry-After'] = str(e.retry_after)
+            return response
+        
+        if user:
+            session['logged_in'] = True
+            session['user_role'] = user['role_name']
+            session['username'] = username
+            session.pop('perm_version', None)
+            
+            flash(f"Login successful. Welcome, {user['role_name']}.", 'success')
+            for module, page in MODULE_PAGES.items():
+                if has_permission(module):
+                    return redirect(url_for(page))
+            return redirect(url_for('index'))
+        else:
+            error = 'Invalid Credentials.'
+            return render_template('login.html', error=error)
+            
+    return render_template('login.html')
+
+@app.route('/logout')
+def logout():
+    """Logs out the user by clearing the session."""
+    session.pop('logged_in', None)
+    session.pop('user_role', None)
+    session.pop('username', None)
+    session.pop('perm_mask', None)
+    session.pop('perm_version', None)
+    session.pop('last_write_at', None)
+    flash("You have been logged out.", 'success')
+    return redirect(url_for('index'))
+
+# --- Management/Read Routes ---
+
+@app.route('/hotels')
+@permission_required('Hotels')
+def hotels():
+    def render():
+        rows_html, paging = table_rows('hotel_rows.html', ('HOTEL',), db.get_all_hotels, 'hotl_id', db.HOTEL_SORTS)
+        return render_template('hotels.html', rows_html=rows_html, paging=paging, export_name='hotels')
+    return catalogue_page('hotels', render)
+
+@app.route('/bookings')
+@permission_required('Bookings')
+def bookings():
+    """Renders the booking summary report from the BOOKING_SUMMARY table."""
+    rows_html, paging = table_rows('booking_rows.html', ('BOOKING', 'CUSTOMER', 'HOTEL', 'PAYMENTS'),
+                                   db.get_booking_summary_report, 'book_id', db.BOOKING_SORTS, routed=True)
+    return render_template('bookings.html', rows_html=rows_html, paging=paging, export_name='bookings')
+
+@app.route('/customers')
+@permission_required('Customers')
+def customers():
+    """Renders the list of customers."""
+    rows_html, paging = table_rows('customer_rows.html', ('CUSTOMER',), db.get_all_customers, 'cus_id',
+                                   db.CUSTOMER_SORTS)
+    return render_template('customers.html', rows_html=rows_html, paging=paging, export_name='customers')
+
+@app.route('/payments')
+@permission_required('Payments')
+def payments():
+    """Renders the list of payments."""
+    rows_html, paging = table_rows('payment_rows.html', ('PAYMENTS', 'CUSTOMER'),
+                                   db.get_all_payments_detailed, 'pay_date', db.PAYMENT_SORTS, descending=True,
+                                   routed=True)
+    return render_template('payments.html', rows_html=rows_html, paging=paging, export_name='payments')
+
+@app.route('/balances')
+@permission_required('Payments')
+def balances():
+    """Customers who owe money, from the trigger-maintained CUSTOMER_LEDGER."""
+    rows_html, paging = table_rows('balance_rows.html', ('BOOKING', 'PAYMENTS', 'HOTEL', 'CUSTOMER'),
+                                   db.get_outstanding_balances, 'cl_balance', db.OUTSTANDING_SORTS, descending=True)
+    return render_template('balances.html', rows_html=rows_html, paging=paging, export_name='balances')
+
+@app.route('/export/<name>.csv')
+@login_required 
+def export_csv(name):
+    """Streams a full table export as CSV without loading it into memory."""
+    if name not in db.EXPORT_QUERIES:
+        flash(f'Unknown export "{name}".', 'error')
+        return redirect(url_for('index'))
+    if not has_permission(EXPORT_MODULES[name]):
+        flash(f'Access Denied. Your role does not have {EXPORT_MODULES[name]} permission.', 'error')
+        return redirect(url_for('index'))
+
+    rows = db.iter_export(name, since=read_since())
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        header_written = False
+        for row in rows:
+            if not header_written:
+                writer.writerow(row.keys())
+                header_written = True
+            writer.writerow(tuple(row))
+            if buffer.tell() >= 64 * 1024:
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+        yield buffer.getvalue()
+
+    return Response(
+        stream_with_context(generate()),
+        mimetype='text/csv',
+        headers={'Content-Disposition': f'attachment; filename={name}.csv'},
+    )
+
+# --- Hotel CRUD Routes ---
+
+@app.route('/add_hotel', methods=['GET', 'POST'])
+@permission_required('Hotels')
+def add_hotel():
+    if request.method == 'POST':
+        try:
+            name = request.form['name']
+            type = request.form['type']
+            desc = request.form['desc']
+            rent = float(request.form['rent'])
+            manager_id = 1 
+            
+            if db.add_hotel(name, type, desc, rent, manager_id):
+                flash('Hotel added successfully!', 'success')
+                return redirect(url_for('hotels'))
+            else:
+                flash('Error adding hotel. Check if manager ID exists.', 'error')
+        except ValueError:
+            flash('Invalid input for rent.', 'error')
+    
+    return render_template('add_hotel.html')
+
+@app.route('/edit_hotel/<int:hotl_id>', methods=['GET', 'POST'])
+@permission_required('Hotels')
+def edit_hotel(hotl_id):
+    hotel = db.get_hotel_by_id(hotl_id)
+    if not hotel:
+        flash('Hotel not found.', 'error')
+        return redirect(url_for('hotels'))
+
+    if request.method == 'POST':
+        try:
+            name = request.form['hotl_name']
+            type = request.form['hotl_type']
+            desc = request.form['hotl_desc']
+            rent = float(request.form['hotl_rent'])
+            manager_id = int(request.form['hotl_manager_id'])
+            
+            if db.update_hotel(hotl_id, name, type, desc, rent, manager_id):
+                flash(f'Hotel {name} updated successfully!', 'success')
+                return redirect(url_for('hotels'))
+            else:
+                flash('Error updating hotel. Check input fields.', 'error')
+        except Exception:
+            flash('Update failed. Ensure all fields are valid.', 'error')
+            
+    return render_template('edit_hotel.html', hotel=hotel, room_types=ROOM_TYPES,
+                           inventory=db.get_room_inventory(hotl_id), weekdays=WEEKDAYS,
+                           rates=[dict(rate, nights=weekday_names(rate['rate_weekdays'])) for rate in db.get_rates(hotl_id) or []])
+
+@app.route('/edit_hotel/<int:hotl_id>/inventory', methods=['POST'])
+@permission_required('Hotels')
+def edit_hotel_inventory(hotl_id):
+    """Sets the room count per room type; a blank field removes that limit.
+
+    Every field is validated before anything is written, and all of them are
+    saved in one commit, so the form never saves partially.
+    """
+    counts = {}
+    try:
+        for room_type in ROOM_TYPES:
+            value = request.form.get(f'rooms_{room_type}', '').strip()
+            counts[room_type] = int(value) if value else None
+            if counts[room_type] is not None and counts[room_type] < 0:
+                raise ValueError
+    except ValueError:
+        flash('Room counts must be whole numbers (0 or more).', 'error')
+        return redirect(url_for('edit_hotel', hotl_id=hotl_id))
+    if db.set_room_inventories(hotl_id, counts):
+        flash('Room inventory updated.', 'success')
+    else:
+        flash('Error updating room inventory. Nothing was saved.', 'error')
+    return redirect(url_for('edit_hotel', hotl_id=hotl_id))
+
+@app.route('/edit_hotel/<int:hotl_id>/rates', methods=['POST'])
+@permission_required('Hotels')
+def add_hotel_rate(hotl_id):
+    """Adds a nightly rate; blank dates are open-ended and a blank room type covers every type."""
+    weekdays = sum(1 << day for day in range(len(WEEKDAYS)) if request.form.get(f'weekday_{day}'))
+    try:
+        rate_id = db.add_rate(hotl_id, request.form.get('rate_price'),
+                              room_type=request.form.get('rate_room_type') or None,
+                              start=request.form.get('rate_start') or None, end=request.form.get('rate_end') or None,
+                              weekdays=weekdays, priority=request.form.get('rate_priority') or 0,
+                              desc=request.form.get('rate_desc') or None)
+    except ValueError as e:
+        flash(str(e), 'error')
+    else:
+        if rate_id:
+            flash('Rate added.', 'success')
+        else:
+            flash('Error adding rate.', 'error')
+    return redirect(url_for('edit_hotel', hotl_id=hotl_id))
+
+@app.route('/edit_hotel/<int:hotl_id>/rates/<int:rate_id>/delete')
+@permission_required('Hotels')
+def delete_hotel_rate(hotl_id, rate_id):
+    if db.delete_rate(rate_id):
+        flash(f'Rate ID {rate_id} deleted.', 'success')
+    else:
+        flash(f'Error deleting Rate ID {rate_id}.', 'error')
+    return redirect(url_for('edit_hotel', hotl_id=hotl_id))
+
+@app.route('/delete_hotel/<int:hotl_id>')
+@permission_required('Hotels')
+def delete_hotel(hotl_id):
+    if db.delete_hotel(hotl_id):
+        flash(f'Hotel ID {hotl_id} deleted successfully.', 'success')
+    else:
+        flash(f'Error deleting Hotel ID {hotl_id}. It may have active bookings/dependencies.', 'error')
+    
+    return redirect(url_for('hotels'))
+
+# --- Search Routes ---
+SEARCH_MODULES = {'customers': 'Customers', 'hotels': 'Hotels', 'bookings': 'Bookings'}
+LOOKUP_LIMIT = 8
+
+@app.route('/search')
+@login_required
+def search():
+    """Full-text search over the scopes the user's role may see (?q=, optional ?scope=)."""
+    query = request.args.get('q', '').strip()
+    scopes = [scope for scope, module in SEARCH_MODULES.items() if has_permission(module)]
+    if request.args.get('scope') in scopes:
+        scopes = [request.args['scope']]
+    results = db.search(query, scopes, limit=request.args.get('limit', 20, type=int)) if query else {}
+    return render_template('search.html', query=query, scopes=scopes, results=results)
+
+@app.route('/search/customers.json')
+@login_required
+def customer_lookup():
+    """JSON for as-you-type customer lookup on the booking form (?q=, at least 2 characters)."""
+    if not (has_permission('Customers') or has_permission('Bookings')):
+        return jsonify(error='Your role cannot look up customers.'), 403
+    query = request.args.get('q', '')
+    rows = db.search(query, ['customers'], limit=LOOKUP_LIMIT)['customers']
+    response = jsonify(query=query, customers=[dict(row) for row in rows])
+    response.headers['Cache-Control'] = 'private, max-age=30'
+    return response
+
+# --- Report Routes ---
+REPORT_DEFAULT_DAYS = 30
+
+def report_args():
+    """(start, end, hotl_id) from the query string; the last REPORT_DEFAULT_DAYS days by default."""
+    end = request.args.get('end') or date.today().isoformat()
+    start = request.args.get('start')
+    if not start:
+        try:
+            start = (date.fromisoformat(end) - timedelta(days=REPORT_DEFAULT_DAYS - 1)).isoformat()
+        except ValueError:
+            start = end
+    return start, end, request.args.get('hotl_id', type=int)
+
+@app.route('/reports')
+@permission_required('Reports')
+def reports():
+    """Revenue/occupancy report from the daily rollups (?start=&end= ISO dates, optional &hotl_id=)."""
+    import analytics  # NumPy is only loaded once someone opens a report
+    start, end, hotl_id = report_args()
+    try:
+        report = analytics.revenue_report(db, start, end, hotl_id)
+    except ValueError as e:
+        flash(str(e), 'error')
+        report = None
+    return render_template('reports.html', report=report, start=start, end=end, hotl_id=hotl_id,
+                           hotels=db.get_all_hotels())
+
+@app.route('/reports.json')
+@permission_required('Reports')
+def reports_json():
+    """The /reports data as JSON."""
+    import analytics
+    try:
+        report = analytics.revenue_report(db, *report_args())
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(report)
+
+# --- JSON API (v1) ---
+# HotelDBManager methods behind each resource in api.RESOURCES.
+API_LISTS = {'hotels': 'get_all_hotels', 'customers': 'get_all_customers', 'bookings': 'get_bookings',
+             'payments': 'get_all_payments_detailed'}
+# Extra arguments of the list methods. Replica-routed lists read the primary because
+# the ETag comes from the primary's TABLE_VERSION counters.
+API_LIST_OPTIONS = {'payments': {'since': PRIMARY}}
+API_ITEMS = {'hotels': 'get_hotel_by_id', 'customers': 'get_customer_by_id', 'bookings': 'get_booking_by_id_detailed',
+             'payments': 'get_payment_by_id'}
+API_CREATES = {'hotels': 'create_hotels', 'customers': 'create_customers', 'bookings': 'create_bookings',
+               'payments': 'create_payments'}
+API_PREFIX = f'/api/{api.API_VERSION}'
+
+def api_response(data, status=200):
+    return Response(api.dumps(data), status=status, mimetype='application/json')
+
+def api_resource(f):
+    """Decorator for /api/v1/<resource> routes: resolves the resource and checks the session's permission.
+
+    Errors are answered as JSON (401/403/404, or any api.ApiError raised by the route).
+    """
+    @wraps(f)
+    def decorated_function(resource, *args, **kwargs):
+        spec = api.RESOURCES.get(resource)
+        if spec is None:
+            return api_response({'error': f"Unknown resource {resource!r}."}, 404)
+        return api_call(spec, lambda: f(resource, spec, *args, **kwargs))
+    return decorated_function
+
+def api_call(spec, call):
+    """Runs call() for a session whose role has spec.module, answering errors as JSON."""
+    if 'logged_in' not in session:
+        return api_response({'error': "Log in first (POST /login)."}, 401)
+    if not has_permission(spec.module):
+        return api_response({'error': f"Your role does not have {spec.module} permission."}, 403)
+    return api_errors(call)
+
+def api_errors(call):
+    """Runs call(), answering api.ApiError and database errors as JSON."""
+    try:
+        return call()
+    except api.ApiError as e:
+        return api_response(dict(error=e.message, **e.details), e.status)
+    except sqlite3.Error:
+        return api_response({'error': "The database is busy. Please retry."}, 503)
+
+def api_history(resource, spec):
+    """Whether ?history=1 asks for archived rows too; their reads then also depend on the ARCHIVE registry."""
+    if request.args.get('history', '0') in ('', '0'):
+        return False, spec
+    if resource not in api.HISTORY_RESOURCES:
+        raise api.ApiError(400, f"{resource} have no archive history.")
+    return True, spec._replace(tables=spec.tables + ('ARCHIVE',))
+
+def api_conditional(spec, render):
+    """Serves a GET with an ETag from the TABLE_VERSION counters it depends on; 304 when it matches."""
+    versions = db.get_table_versions(spec.tables)
+    key = f"{api.API_VERSION}|{request.path}|{request.query_string.decode()}|{sorted(versions.items())}"
+    etag = hashlib.sha1(key.encode('utf-8')).hexdigest()[:20]
+    response = Response(status=304) if request.if_none_match.contains(etag) else render()
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'private, no-cache'
+    return response
+
+@app.route(f'{API_PREFIX}/quotes', methods=['GET'])
+def api_quotes():
+    """Stay prices at every hotel: ?check_in=&check_out=&room_type=, optionally narrowed by &hotl_id= (repeatable).
+
+    {"check_in", "check_out", "room_type", "nights", "data": [{"hotl_id", "total", "average"}, ...]}
+    Public, so guests on /add_booking see prices; each client IP gets api.QUOTE_RATE requests a minute.
+    """
+    spec = api.QUOTES
+    try:
+        quote_throttle.check(None, request.remote_addr)
+    except ThrottledError as e:
+        response = api_response({'error': f"Too many quote requests. Try again in {e.retry_after} seconds."}, 429)
+        response.headers['Retry-After'] = str(e.retry_after)
+        return response
+    def render():
+        args = request.args
+        try:
+            hotl_ids = [int(value) for values in args.getlist('hotl_id') for value in values.split(',') if value]
+        except ValueError:
+            raise api.ApiError(400, "hotl_id must be a list of hotel ids.")
+        try:
+            result = quote_engine().quote_all(args.get('room_type', ''), args.get('check_in', ''),
+                                              args.get('check_out', ''), hotl_ids or None)
+        except ValueError as e:
+            raise api.ApiError(400, str(e))
+        return api_response({'check_in': args.get('check_in'), 'check_out': args.get('check_out'),
+                             'room_type': args.get('room_type'), 'nights': result['nights'], 'data': result['quotes']})
+    return api_errors(lambda: api_conditional(spec, render))
+
+@app.route(f'{API_PREFIX}/<resource>', methods=['GET'])
+@api_resource
+def api_list(resource, spec):
+    """One keyset page: {"data": [...], "next": cursor or null} (?after=&limit=&sort=&order=&fields=&history=)."""
+    history, spec = api_history(resource, spec)
+    def render():
+        fields = api.parse_fields(request.args.get('fields'), spec)
+        try:
+            rows = getattr(db, API_LISTS[resource])(
+                after=request.args.get('after') or None,
+                limit=request.args.get('limit', DEFAULT_PAGE_SIZE, type=int),
+                sort=request.args.get('sort', spec.id_field),
+                descending=request.args.get('order') == 'desc',
+                **({'history': True} if history else API_LIST_OPTIONS.get(resource, {})),
+            )
+        except ValueError as e:
+            raise api.ApiError(400, str(e))
+        if rows is False:
+            raise sqlite3.OperationalError("list query failed")
+        return api_response({'data': [api.project(row, fields) for row in rows], 'next': rows.next_cursor})
+    return api_conditional(spec, render)
+
+@app.route(f'{API_PREFIX}/<resource>/<int:item_id>', methods=['GET'])
+@api_resource
+def api_item(resource, spec, item_id):
+    history, spec = api_history(resource, spec)
+    def render():
+        fields = api.parse_fields(request.args.get('fields'), spec)
+        row = getattr(db, API_ITEMS[resource])(item_id, **({'history': True} if history else {}))
+        if row is False:
+            raise sqlite3.OperationalError("item query failed")
+        if not row:
+            raise api.ApiError(404, f"{spec.id_field} {item_id} not found.")
+        return api_response({'data': api.project(row, fields)})
+    return api_conditional(spec, render)
+
+def api_batch_error(e):
+    """A failed batch as 409 (room sold out) or 422, naming the item that failed."""
+    status = 409 if isinstance(e.__cause__, RoomUnavailableError) else 422
+    return api.ApiError(status, f"{e.message.rstrip('.')}; nothing was written.", index=e.index)
+
+@app.route(f'{API_PREFIX}/<resource>', methods=['POST'])
+@api_resource
+def api_create(resource, spec):
+    """Creates an array of items in one transaction: 201 {"created": [...]} in request order.
+
+    Any invalid or failing item rolls the whole batch back (422, or 409 for a sold-out room).
+    """
+    items = api.validate_items(api.loads(request.get_data()), spec.create,
+                               api.check_new_booking if resource == 'bookings' else None)
+    metrics.set_batch_items(len(items))
+    try:
+        created = getattr(db, API_CREATES[resource])(items)
+    except BatchError as e:
+        raise api_batch_error(e)
+    if resource != 'bookings':
+        created = [{spec.id_field: row_id} for row_id in created]
+    return api_response({'created': created}, 201)
+
+@app.route(f'{API_PREFIX}/<resource>', methods=['PATCH'])
+@api_resource
+def api_update(resource, spec):
+    """Applies partial updates ([{"<id>": ..., field: value}, ...]) in one transaction: {"updated": n}."""
+    items = api.validate_items(api.loads(request.get_data()), spec.update,
+                               api.check_booking if resource == 'bookings' else None)
+    metrics.set_batch_items(len(items))
+    try:
+        updated = db.update_batch(spec.table, items)
+    except BatchError as e:
+        raise api_batch_error(e)
+    return api_response({'updated': updated})
+
+# --- Booking CRUD Routes ---
+
+@app.route('/add_booking', methods=['GET', 'POST'])
+def add_booking():
+    if request.method == 'GET':
+        return catalogue_page('add_booking', lambda: render_template('add_booking.html', hotels=db.get_all_hotels()))
+
+    hotels_list = db.get_all_hotels()
+    
+    if request.method == 'POST':
+        try:
+            # STEP 1: Get data including customer details and payment
+            customer_email = request.form['customer_email'] 
+            customer_name = request.form['customer_name'] 
+            customer_mobile = request.form['customer_mobile']
+            customer_address = request.form['customer_address']
+            hotl_id = int(request.form['hotl_id'])
+            book_type = request.form['book_type']
+            desc = request.form['book_desc']
+            check_in = request.form['check_in_date']
+            check_out = request.form['check_out_date']
+            initial_payment = float(request.form.get('initial_payment') or 0) 
+
+            try:
+                parse_stay(check_in, check_out)
+            except ValueError as e:
+                flash(str(e), 'error')
+                return render_template('add_booking.html', hotels=hotels_list)
+            
+            # STEP 2: Customer lookup/registration, booking and deposit in one transaction
+            result = db.create_booking_with_deposit(
+                customer_email, customer_name, customer_mobile, customer_address,
+                hotl_id, book_type, desc, check_in, check_out,
+                deposit=initial_payment, pay_date=date.today().isoformat(),
+            )
+
+            if result:
+                if result['new_customer']:
+                    flash(f'New customer "{customer_name}" registered successfully.', 'info')
+                if result['pay_id']:
+                    flash('Booking created successfully! Initial payment recorded.', 'success')
+                else:
+                    flash('Booking created successfully!', 'success')
+                
+                return redirect(url_for('index'))
+            else:
+                flash('Error creating booking. Check hotel details.', 'error')
+                
+        except RoomUnavailableError as e:
+             flash(str(e), 'error')
+        except ValueError:
+             flash('Invalid input: Hotel ID or Payment must be valid numbers.', 'error')
+        except Exception as e:
+             print(f"Booking Submission Error: {e}")
+             flash('An unexpected error occurred during submission.', 'error')
+             
+    return render_template('add_booking.html', hotels=hotels_list)
+
+@app.route('/edit_booking/<int:book_id>', methods=['GET', 'POST'])
+@permission_required('Bookings')
+def edit_booking(book_id):
+    booking = db.get_booking_by_id_detailed(book_id)
+    if not booking:
+        flash('Booking not found.', 'error')
+        return redirect(url_for('bookings'))
+
+    if request.method == 'POST':
+        hotl_id = request.form['book_hotel_id']
+        book_type = request.form['book_type']
+        desc = request.form['book_desc']
+        
+        if db.update_booking(book_id, hotl_id, book_type, desc):
+            flash(f'Booking {book_id} updated successfully!', 'success')
+            return redirect(url_for('bookings'))
+        else:
+            flash('Error updating booking. The hotel may have no free rooms of that type for this stay.', 'error')
+
+    return render_template('edit_booking.html', booking=booking)
+
+
+@app.route('/availability')
+def availability():
+    """JSON: hotels with a free room of ?room_type= for ?check_in= to ?check_out=.
+
+    Adding &hotl_id= answers for a single hotel instead.
+    """
+    check_in = request.args.get('check_in', '')
+    check_out = request.args.get('check_out', '')
+    room_type = request.args.get('room_type', ROOM_TYPES[0])
+    hotl_id = request.args.get('hotl_id', type=int)
+    try:
+        if hotl_id is not None:
+            return jsonify(hotl_id=hotl_id, room_type=room_type, check_in=check_in, check_out=check_out,
+                           available=db.is_available(hotl_id, check_in, check_out, room_type))
+        hotels_list = db.find_available_hotels(check_in, check_out, room_type) or []
+    except ValueError as e:
+        return jsonify(error=str(e)), 400
+    return jsonify(check_in=check_in, check_out=check_out, room_type=room_type,
+                   hotels=[dict(row) for row in hotels_list])
+
+
+# --- Customer CRUD Routes ---
+
+@app.route('/delete_customer/<int:cus_id>')
+@permission_required('Customers')
+def delete_customer(cus_id):
+    if db.delete_customer(cus_id):
+        flash(f'Customer ID {cus_id} deleted successfully.', 'success')
+    else:
+        flash(f'Error: Customer ID {cus_id} could not be deleted. Check for active bookings/payments.', 'error')
+    
+    return redirect(url_for('customers'))
+
+@app.route('/edit_customer/<int:cus_id>', methods=['GET', 'POST'])
+@permission_required('Customers')
+def edit_customer(cus_id):
+    customer = db.get_customer_by_id(cus_id)
+    if not customer:
+        flash('Customer not found.', 'error')
+        return redirect(url_for('customers'))
+
+    if request.method == 'POST':
+        name = request.form['cus_name']
+        mobile = request.form['cus_mobile']
+        email = request.form['cus_email']
+        address = request.form['cus_add']
+        
+        if db.update_customer(cus_id, name, mobile, email, address):
+            flash(f'Customer {name} updated successfully!', 'success')
+            return redirect(url_for('customers'))
+        else:
+            flash('Error updating customer.', 'error')
+
+    # Stays are listed on request only: reading them ATTACHes the archive files.
+    history = db.get_customer_history(cus_id) if request.args.get('history') else None
+    return render_template('edit_customer.html', customer=customer, history=history, balance=db.get_balance(cus_id))
+
+
+# --- Payment CRUD Routes ---
+
+@app.route('/delete_payment/<int:pay_id>')
+@permission_required('Payments')
+def delete_payment(pay_id):
+    if db.delete_payment(pay_id):
+        flash(f'Payment ID {pay_id} deleted successfully.', 'success')
+    else:
+        flash(f'Error deleting Payment ID {pay_id}.', 'error')
+    
+    return redirect(url_for('payments')) 
+
+@app.route('/add_payment', methods=['GET', 'POST'])
+@permission_required('Payments')
+def add_payment():
+    if request.method == 'POST':
+        try:
+            cus_id = int(request.form['cus_id'])
+            amount = float(request.form['pay_amt'])
+            date_str = request.form['pay_date']
+            desc = request.form['pay_desc']
+            book_id = request.form.get('pay_book_id', type=int)
+            
+            if db.add_payment(cus_id, amount, date_str, desc, book_id):
+                flash('Payment recorded successfully!', 'success')
+                return redirect(url_for('payments'))
+            else:
+                flash('Error recording payment. Check Customer ID and Booking ID.', 'error')
+        except Exception:
+            flash('Invalid input.', 'error')
+
+    return render_template('add_payment.html', today=date.today().isoformat())
+
+@app.route('/edit_payment/<int:pay_id>', methods=['GET', 'POST'])
+@permission_required('Payments')
+def edit_payment(pay_id):
+    payment = db.get_payment_by_id(pay_id)
+    if not payment:
+        flash('Payment not found.', 'error')
+        return redirect(url_for('payments'))
+
+    if request.method == 'POST':
+        try:
+            cus_id = int(request.form['pay_cus_id'])
+            amount = float(request.form['pay_amt'])
+            date_str = request.form['pay_date']
+            desc = request.form['pay_desc']
+            book_id = request.form.get('pay_book_id', type=int)
+            
+            if db.update_payment(pay_id, cus_id, amount, date_str, desc, book_id):
+                flash(f'Payment {pay_id} updated successfully!', 'success')
+                return redirect(url_for('payments'))
+            else:
+                flash('Error updating payment. Check Customer ID and Booking ID.', 'error')
+        except Exception:
+            flash('Invalid input.', 'error')
+
+    return render_template('edit_payment.html', payment=payment)
+
+
+if __name__ == '__main__':
+    create_app(preload=False)
     app.run(debug=True)
\ No newline at end of file
@@ -0,0 +1,269 @@
+"""Hot/cold archiving: moves old stays and their payments into per-year archive files.
+
+BOOKING and PAYMENTS only grow, and every list page, BOOKING_SUMMARY and the
+occupancy and search indexes carry years of finished stays. The archiver
+moves bookings whose check-out is before a retention cutoff, together with
+their payments, into <db>_archive_<year>.db files next to the main database
+(one per check-out year, registered in the ARCHIVE table). The hot tables and
+their indexes stay small; HotelDBManager.history() ATTACHes the archives when
+a caller asks for history, and the HOTEL_DAILY/HOTEL_MONTHLY rollups and the
+balance ledger keep the archived revenue and what is owed (see ARCHIVE_MOVING
+in db_setup migrations 10 and 11). Payments made against a stay after it was
+archived stay in the hot PAYMENTS table (migration 11).
+
+It runs online in small batches. Each batch is two short transactions that
+each write one file, so a crash can never lose a booking:
+  1. copy the bookings and payments into the archive (only the archive is written;
+     the main database is read from a WAL snapshot and writers are not blocked);
+  2. under BEGIN IMMEDIATE, delete from the hot tables only the rows whose archive
+     copy is identical. Rows edited between the two steps stay hot and are copied
+     again by the next run.
+
+    python archive.py run --db hotel_booking.db
+    python archive.py run --db hotel_booking.db --before 2024-01-01 --max-batches 20
+    python archive.py status --db hotel_booking.db
+
+Settings (environment variables):
+    HOTEL_ARCHIVE_DAYS        stays that checked out more than this many days ago are archived (default 365)
+    HOTEL_ARCHIVE_BATCH       bookings moved per transaction (default 500)
+    HOTEL_ARCHIVE_PAUSE_MS    pause between batches so other writers get the lock (default 50)
+"""
+import argparse
+import itertools
+import json
+import os
+import sys
+import time
+from datetime import date, timedelta
+
+from db_manager import ARCHIVE_KEYS, ARCHIVED_COLUMNS, HotelDBManager
+from db_setup import DB_NAME
+
+ARCHIVE_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS {s}.BOOKING ( book_id INTEGER PRIMARY KEY, book_desc TEXT, book_type TEXT, "
+    "book_cus_id INTEGER NOT NULL, book_hotel_id INTEGER NOT NULL, book_check_in TEXT, book_check_out TEXT, book_total REAL )",
+    "CREATE TABLE IF NOT EXISTS {s}.PAYMENTS ( pay_id INTEGER PRIMARY KEY, pay_cus_id INTEGER NOT NULL, "
+    "pay_amt REAL NOT NULL, pay_date TEXT, pay_desc TEXT, pay_book_id INTEGER )",
+    "CREATE INDEX IF NOT EXISTS {s}.idx_booking_cus_id ON BOOKING(book_cus_id)",
+    "CREATE INDEX IF NOT EXISTS {s}.idx_payments_book_id ON PAYMENTS(pay_book_id)",
+)
+
+IN_BATCH = "(SELECT value FROM json_each(?))"
+
+
+def archive_file_name(db_name, year):
+    """File name (relative to the main database's directory) of the archive for one check-out year."""
+    stem = os.path.splitext(os.path.basename(db_name))[0]
+    return f"{stem}_archive_{year}.db"
+
+
+def retention_cutoff(days=None, today=None):
+    """ISO date before which check-outs are archived."""
+    days = int(os.environ.get('HOTEL_ARCHIVE_DAYS', 365)) if days is None else days
+    return ((today or date.today()) - timedelta(days=days)).isoformat()
+
+
+def _same_row(table, archived, hot):
+    return ' AND '.join(f"{archived}.{column} IS {hot}.{column}" for column in ARCHIVED_COLUMNS[table])
+
+
+class Archiver:
+    """Moves checked-out bookings and their payments into archive files. See the module docstring."""
+
+    def __init__(self, db, batch_size=None, pause=None):
+        self.db = db
+        self.batch_size = batch_size or int(os.environ.get('HOTEL_ARCHIVE_BATCH', 500))
+        self.pause = pause if pause is not None else float(os.environ.get('HOTEL_ARCHIVE_PAUSE_MS', 50)) / 1000
+
+    def _next_batch(self, before, after):
+        """(book_id, year, check_out) of the next bookings checked out before `before`, in check-out order."""
+        query = ("SELECT book_id, CAST(substr(book_check_out, 1, 4) AS INTEGER) AS year, book_check_out "
+                 "FROM BOOKING WHERE book_check_out < ?")
+        params = [before]
+        if after:
+            query += " AND (book_check_out, book_id) > (?, ?)"
+            params.extend(after)
+        rows = self.db._execute(query + " ORDER BY book_check_out, book_id LIMIT ?", params + [self.batch_size])
+        if rows is False:
+            raise RuntimeError("could not read the next archive batch")
+        return rows
+
+    def run(self, before=None, max_batches=None, progress=None):
+        """Archives every booking checked out before `before` (default: retention_cutoff()).
+
+        Returns totals: bookings and payments moved, bookings left hot because
+        they changed while being copied, and batches run.
+        """
+        before = before or retention_cutoff()
+        totals = {'bookings': 0, 'payments': 0, 'skipped': 0, 'batches': 0}
+        after = None
+        while max_batches is None or totals['batches'] < max_batches:
+            rows = self._next_batch(before, after)
+            if not rows:
+                break
+            after = (rows[-1]['book_check_out'], rows[-1]['book_id'])
+            for year, group in itertools.groupby(rows, key=lambda row: row['year']):
+                ids = [row['book_id'] for row in group]
+                bookings, payments = self.archive_bookings(year, ids)
+                totals['bookings'] += bookings
+                totals['payments'] += payments
+                totals['skipped'] += len(ids) - bookings
+            totals['batches'] += 1
+            if progress:
+                progress(totals)
+            time.sleep(self.pause)
+        return totals
+
+    def archive_bookings(self, year, book_ids):
+        """Moves the given bookings (all checked out in `year`) and their payments. Returns (bookings, payments)."""
+        file_name = archive_file_name(self.db.db_name, year)
+        schema = f"archive_{year}"
+        ids = json.dumps(book_ids)
+        with self.db.pool.connection() as conn:
+            conn.execute(f"ATTACH DATABASE ? AS {schema}", (self.db.archive_path(file_name),))
+            try:
+                for statement in ARCHIVE_SCHEMA:
+                    conn.execute(statement.format(s=schema))
+                self.db.upgrade_archive(conn, schema)
+                self._copy(conn, schema, ids)
+                bookings, payments, vanished = self._delete_copied(conn, schema, year, file_name, ids)
+                if vanished:
+                    self._drop_vanished(conn, schema, json.dumps(vanished))
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                conn.execute(f"DETACH DATABASE {schema}")
+        return bookings, payments
+
+    def _copy(self, conn, schema, ids):
+        """Step 1: (re)writes the archive copies of the bookings and their payments. Writes only the archive.
+
+        An archive row with the same id may only be an earlier copy of the same
+        stay or payment (one left hot because it changed). Raises RuntimeError,
+        writing nothing, if it belongs to another guest's stay or to a stay that
+        is already archived: ids are never reused (AUTOINCREMENT, migration 10),
+        so that only happens after an insert with an explicit id.
+        """
+        booking, payment = ARCHIVED_COLUMNS['BOOKING'], ARCHIVED_COLUMNS['PAYMENTS']
+        conn.execute("BEGIN;")
+        try:
+            clashes = conn.execute(f"""
+                SELECT 'book_id', A.book_id FROM {schema}.BOOKING A JOIN main.BOOKING B ON B.book_id = A.book_id
+                WHERE A.book_id IN {IN_BATCH} AND A.book_cus_id IS NOT B.book_cus_id
+                UNION ALL
+                SELECT 'pay_id', A.pay_id FROM {schema}.PAYMENTS A JOIN main.PAYMENTS P ON P.pay_id = A.pay_id
+                WHERE P.pay_book_id IN {IN_BATCH} AND A.pay_book_id NOT IN (SELECT book_id FROM main.BOOKING)
+            """, (ids, ids)).fetchall()
+            if clashes:
+                listed = ', '.join(f"{key} {value}" for key, value in clashes[:20])
+                raise RuntimeError(f"{schema} already holds a different row with {listed}; not overwriting it")
+            conn.execute(f"DELETE FROM {schema}.PAYMENTS WHERE pay_book_id IN {IN_BATCH}", (ids,))
+            conn.execute(f"INSERT OR REPLACE INTO {schema}.BOOKING ({', '.join(booking)}) "
+                         f"SELECT {', '.join(booking)} FROM main.BOOKING WHERE book_id IN {IN_BATCH}", (ids,))
+            conn.execute(f"INSERT OR REPLACE INTO {schema}.PAYMENTS ({', '.join(payment)}) "
+                         f"SELECT {', '.join(payment)} FROM main.PAYMENTS WHERE pay_book_id IN {IN_BATCH}", (ids,))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+    def _delete_copied(self, conn, schema, year, file_name, ids):
+        """Step 2: deletes the hot rows whose archive copies are identical. Writes only the main database.
+
+        Returns (bookings, payments, ids of bookings no longer in the hot table).
+        """
+        conn.execute("BEGIN IMMEDIATE;")
+        try:
+            vanished = [row[0] for row in conn.execute(
+                "SELECT value FROM json_each(?) WHERE value NOT IN (SELECT book_id FROM main.BOOKING)", (ids,))]
+            # A booking moves only if it and the full set of its payments match the archive exactly.
+            conn.execute(f"""
+                INSERT INTO ARCHIVE_MOVING
+                SELECT B.book_id FROM main.BOOKING B
+                WHERE B.book_id IN {IN_BATCH}
+                  AND EXISTS (SELECT 1 FROM {schema}.BOOKING A WHERE A.book_id = B.book_id AND {_same_row('BOOKING', 'A', 'B')})
+                  AND NOT EXISTS (SELECT 1 FROM main.PAYMENTS P WHERE P.pay_book_id = B.book_id AND NOT EXISTS (
+                      SELECT 1 FROM {schema}.PAYMENTS A WHERE A.pay_id = P.pay_id AND {_same_row('PAYMENTS', 'A', 'P')}))
+                  AND NOT EXISTS (SELECT 1 FROM {schema}.PAYMENTS A WHERE A.pay_book_id = B.book_id AND NOT EXISTS (
+                      SELECT 1 FROM main.PAYMENTS P WHERE P.pay_id = A.pay_id AND {_same_row('PAYMENTS', 'A', 'P')}))
+            """, (ids,))
+            payments = conn.execute("DELETE FROM main.PAYMENTS WHERE pay_book_id IN "
+                                    "(SELECT am_book_id FROM ARCHIVE_MOVING)").rowcount
+            bookings = conn.execute("DELETE FROM main.BOOKING WHERE book_id IN "
+                                    "(SELECT am_book_id FROM ARCHIVE_MOVING)").rowcount
+            conn.execute("DELETE FROM ARCHIVE_MOVING")
+            if bookings:
+                conn.execute("""
+                    INSERT INTO ARCHIVE (ar_year, ar_file, ar_bookings, ar_payments, ar_updated_at)
+                    VALUES (?, ?, ?, ?, datetime('now'))
+                    ON CONFLICT (ar_year) DO UPDATE SET ar_bookings = ar_bookings + excluded.ar_bookings,
+                        ar_payments = ar_payments + excluded.ar_payments, ar_updated_at = excluded.ar_updated_at
+                """, (year, file_name, bookings, payments))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+        return bookings, payments, vanished
+
+    def _drop_vanished(self, conn, schema, ids):
+        """Removes the archive copies of bookings deleted from the hot tables between steps 1 and 2."""
+        key = ARCHIVE_KEYS['BOOKING']
+        conn.execute("BEGIN;")
+        try:
+            conn.execute(f"DELETE FROM {schema}.PAYMENTS WHERE pay_book_id IN {IN_BATCH} "
+                         f"AND pay_id NOT IN (SELECT pay_id FROM main.PAYMENTS)", (ids,))
+            conn.execute(f"DELETE FROM {schema}.BOOKING WHERE {key} IN {IN_BATCH} "
+                         f"AND {key} NOT IN (SELECT {key} FROM main.BOOKING)", (ids,))
+        except BaseException:
+            conn.rollback()
+            raise
+        conn.commit()
+
+
+def print_status(db):
+    archives = db.get_archives() or []
+    hot = db._execute("SELECT COUNT(*) AS bookings, MIN(book_check_out) AS oldest FROM BOOKING", fetch_one=True)
+    print(f"Hot bookings: {hot['bookings']} (oldest check-out {hot['oldest'] or '-'})")
+    if not archives:
+        print("No archives yet.")
+    for row in archives:
+        present = '' if os.path.exists(db.archive_path(row['ar_file'])) else '   ❌ file missing'
+        print(f"  {row['ar_year']}: {row['ar_bookings']} bookings, {row['ar_payments']} payments in "
+              f"{row['ar_file']} (updated {row['ar_updated_at']}){present}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Archive old bookings and payments into per-year files.")
+    parser.add_argument('command', choices=['run', 'status'],
+                        help="'run' archives stays past the retention cutoff; 'status' lists the archives")
+    parser.add_argument('--db', default=DB_NAME, help="Database file (default: %(default)s)")
+    parser.add_argument('--before', help="Archive check-outs before this YYYY-MM-DD date "
+                                         "(default: HOTEL_ARCHIVE_DAYS days ago)")
+    parser.add_argument('--batch-size', type=int, help="Bookings per transaction (default: HOTEL_ARCHIVE_BATCH)")
+    parser.add_argument('--max-batches', type=int, help="Stop after this many batches")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"database '{args.db}' not found")
+    db = HotelDBManager(args.db)
+    if args.command == 'status':
+        print_status(db)
+        return
+
+    before = args.before or retention_cutoff()
+    started = time.perf_counter()
+    archiver = Archiver(db, batch_size=args.batch_size)
+    progress = lambda totals: print(f"  ... {totals['bookings']} bookings archived", end='\r')
+    try:
+        totals = archiver.run(before, args.max_batches, progress=progress)
+    except Exception as e:
+        print(f"\n❌ Archiving failed: {e}")
+        sys.exit(1)
+    print(f"✅ Archived {totals['bookings']} bookings and {totals['payments']} payments checked out before {before} "
+          f"in {totals['batches']} batches ({time.perf_counter() - started:.1f}s).")
+    if totals['skipped']:
+        print(f"   {totals['skipped']} bookings changed while being copied and stay hot until the next run.")
+
+
+if __name__ == '__main__':
+    main()
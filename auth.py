@@ -0,0 +1,217 @@
+"""Login verification off the request thread, with throttling and re-hashing.
+
+bcrypt is deliberately slow, so a burst of logins must not be allowed to
+occupy every request thread. Authenticator runs checkpw on a small, bounded
+thread pool. When that pool and its queue are full, the caller gets
+AuthBusyError (a 503) immediately instead of waiting. LoginThrottle caps
+attempts per client IP and failures per username before any hashing is
+done. Hashes made with a different cost than BCRYPT_ROUNDS are replaced on
+the next successful login.
+
+Settings (environment variables):
+    HOTEL_BCRYPT_ROUNDS   cost factor for new hashes (default 12)
+    HOTEL_AUTH_WORKERS    concurrent hash checks (default: half the CPUs, at least 1)
+    HOTEL_AUTH_QUEUE      checks allowed to wait for a worker (default 8)
+"""
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, TimeoutError as FutureTimeoutError
+
+import bcrypt
+
+BCRYPT_ROUNDS = int(os.environ.get('HOTEL_BCRYPT_ROUNDS', 12))
+
+
+def hash_password(password, rounds=None):
+    """Hashes a password using bcrypt at `rounds` (default BCRYPT_ROUNDS)."""
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds or BCRYPT_ROUNDS)).decode('utf-8')
+
+
+def hash_rounds(hashed):
+    """Cost factor of a '$2b$12$...' hash, or None if it cannot be read."""
+    try:
+        return int(hashed.split('$')[2])
+    except (AttributeError, IndexError, ValueError):
+        return None
+
+
+class AuthBusyError(Exception):
+    """Every verification slot is taken; the client should retry shortly."""
+
+    def __init__(self, retry_after=1):
+        super().__init__("Too many sign-ins in progress. Please try again shortly.")
+        self.retry_after = retry_after
+
+
+class ThrottledError(Exception):
+    """Too many attempts for this IP or username."""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Too many login attempts. Try again in {retry_after} seconds.")
+        self.retry_after = retry_after
+
+
+# --- Throttling ---
+class LoginThrottle:
+    """Fixed-window counters: attempts per IP and failures per username.
+
+    Counting happens before hashing, so a blocked client costs a dict lookup,
+    not a bcrypt check. Expired windows are pruned when the table grows past
+    max_keys, which keeps memory bounded under a spray of random usernames.
+    """
+
+    def __init__(self, ip_attempts=30, ip_window=60, user_failures=5, user_window=300, max_keys=100000):
+        self.ip_attempts, self.ip_window = ip_attempts, ip_window
+        self.user_failures, self.user_window = user_failures, user_window
+        self.max_keys = max_keys
+        self._lock = threading.Lock()
+        self._counts = {}  # key -> [window_end, count]
+
+    def _bump(self, key, window, now):
+        entry = self._counts.get(key)
+        if entry is None or entry[0] <= now:
+            if len(self._counts) >= self.max_keys:
+                self._prune(now)
+            entry = self._counts[key] = [now + window, 0]
+        entry[1] += 1
+        return entry
+
+    def _prune(self, now):
+        for key in [key for key, (ends, _) in self._counts.items() if ends <= now]:
+            del self._counts[key]
+
+    def check(self, username, ip):
+        """Counts an attempt from `ip`. Raises ThrottledError if the IP or username is blocked.
+
+        username=None counts and checks the IP only.
+        """
+        now = time.monotonic()
+        with self._lock:
+            failures = self._counts.get(('user', username)) if username is not None else None
+            if failures and failures[0] > now and failures[1] >= self.user_failures:
+                raise ThrottledError(int(failures[0] - now) + 1)
+            attempts = self._bump(('ip', ip), self.ip_window, now)
+            if attempts[1] > self.ip_attempts:
+                raise ThrottledError(int(attempts[0] - now) + 1)
+
+    def record(self, username, success):
+        with self._lock:
+            if success:
+                self._counts.pop(('user', username), None)
+            else:
+                self._bump(('user', username), self.user_window, time.monotonic())
+
+
+# --- Verification ---
+class Authenticator:
+    """Verifies logins on a bounded executor. See the module docstring."""
+
+    def __init__(self, db, max_workers=None, max_queue=None, timeout=10.0, rounds=None, throttle=None):
+        self.db = db
+        self.max_workers = max_workers or int(os.environ.get('HOTEL_AUTH_WORKERS', 0)) \
+            or max(1, (os.cpu_count() or 2) // 2)
+        self.max_queue = max_queue if max_queue is not None else int(os.environ.get('HOTEL_AUTH_QUEUE', 8))
+        self.timeout = timeout
+        self.rounds = rounds or BCRYPT_ROUNDS
+        self.throttle = throttle or LoginThrottle()
+        # Compared against when the username does not exist, so unknown and
+        # known usernames take the same time to reject.
+        self._dummy_hash = None
+        self._dummy_lock = threading.Lock()
+        self._lock = threading.Lock()
+        self._pid = None
+        self._in_flight = 0
+        self._stats = {'verified': 0, 'rejected': 0, 'busy': 0, 'throttled': 0, 'rehashed': 0}
+
+    def _executor(self):
+        """The worker pool, recreated after a fork (threads do not survive one)."""
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._pool = ThreadPoolExecutor(max_workers=self.max_workers, thread_name_prefix='auth')
+                    self._in_flight = 0
+                    self._pid = os.getpid()
+        return self._pool
+
+    def _reserve(self):
+        """Takes a running-or-queued slot; False when all max_workers + max_queue are taken."""
+        with self._lock:
+            if self._in_flight >= self.max_workers + self.max_queue:
+                self._stats['busy'] += 1
+                return False
+            self._in_flight += 1
+            return True
+
+    def _release(self, _future=None):
+        with self._lock:
+            self._in_flight -= 1
+
+    def _count(self, key):
+        with self._lock:
+            self._stats[key] += 1
+
+    def stats(self):
+        """Counters plus the number of checks running or queued right now."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['in_flight'] = self._in_flight
+        stats['capacity'] = self.max_workers + self.max_queue
+        return stats
+
+    def _dummy(self):
+        with self._dummy_lock:
+            if self._dummy_hash is None:
+                self._dummy_hash = hash_password('not-a-real-password', self.rounds)
+            return self._dummy_hash
+
+    def _check(self, password, hashed):
+        """Runs on the executor. Returns (ok, replacement_hash_or_None); hashed=None checks a dummy."""
+        if hashed is None:
+            bcrypt.checkpw(password.encode('utf-8'), self._dummy().encode('utf-8'))
+            return False, None
+        ok = bcrypt.checkpw(password.encode('utf-8'), hashed.encode('utf-8'))
+        if ok and hash_rounds(hashed) != self.rounds:
+            return True, hash_password(password, self.rounds)
+        return ok, None
+
+    def verify(self, username, password, ip=None):
+        """Returns the login row (user_password, role_name) on success, None on bad credentials.
+
+        Raises ThrottledError when the IP or username is over its limit and
+        AuthBusyError when no verification slot is free.
+        """
+        try:
+            self.throttle.check(username, ip)
+        except ThrottledError:
+            self._count('throttled')
+            raise
+
+        pool = self._executor()
+        record = self.db.get_login(username)
+        hashed = record['user_password'] if record else None
+
+        if not self._reserve():
+            raise AuthBusyError()
+        try:
+            future = pool.submit(self._check, password, hashed)
+        except BaseException:
+            self._release()
+            raise
+        # The slot is freed when the check finishes, even if we stop waiting for it.
+        future.add_done_callback(self._release)
+        try:
+            ok, new_hash = future.result(timeout=self.timeout)
+        except FutureTimeoutError:
+            self._count('busy')
+            raise AuthBusyError()
+
+        ok = ok and record is not None
+        self.throttle.record(username, ok)
+        if not ok:
+            self._count('rejected')
+            return None
+        if new_hash and self.db.update_login_password(username, new_hash):
+            self._count('rehashed')
+        self._count('verified')
+        return record
@@ -0,0 +1,103 @@
+"""Booking-ingest benchmark: the HTML form path versus the batch JSON API.
+
+Creates the same kind of bookings (new guest, booking, 500 deposit) first one
+form POST to /add_booking at a time, following the redirect the way the old
+channel-manager scraper does, then as arrays POSTed to /api/v1/bookings.
+Reports bookings/s for each path, plus a conditional GET of the booking list
+answered with 304 against a full page.
+
+    python generate_data.py --db bench.db
+    python bench_api.py --db bench.db --bookings 1000 --batch 100
+
+Both phases add rows, so run it against a scratch copy.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from bench_routes import _booking_form, _max_ids
+
+
+def _api_item(form):
+    """The /api/v1/bookings item for one /add_booking form."""
+    return {'cus_email': form['customer_email'], 'cus_name': form['customer_name'],
+            'cus_mobile': form['customer_mobile'], 'cus_add': form['customer_address'],
+            'book_hotel_id': form['hotl_id'], 'book_type': form['book_type'], 'book_desc': form['book_desc'],
+            'book_check_in': form['check_in_date'], 'book_check_out': form['check_out_date'],
+            'deposit': form['initial_payment']}
+
+
+def run_forms(client, forms):
+    failed = 0
+    started = time.perf_counter()
+    for form in forms:
+        response = client.post('/add_booking', data=form, follow_redirects=True)
+        failed += response.status_code != 200 or b'Booking created' not in response.get_data()
+    return time.perf_counter() - started, failed
+
+
+def run_api(client, forms, batch):
+    failed = 0
+    started = time.perf_counter()
+    for start in range(0, len(forms), batch):
+        items = [_api_item(form) for form in forms[start:start + batch]]
+        response = client.post('/api/v1/bookings', data=json.dumps(items), content_type='application/json')
+        failed += 0 if response.status_code == 201 else len(items)
+    return time.perf_counter() - started, failed
+
+
+def time_requests(client, count, **kwargs):
+    started = time.perf_counter()
+    for _ in range(count):
+        client.get('/api/v1/bookings', **kwargs).get_data()
+    return (time.perf_counter() - started) / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare booking throughput of the form path and the JSON API.")
+    parser.add_argument('--db', default='bench.db', help="Scratch database to write to (see generate_data.py)")
+    parser.add_argument('--bookings', type=int, default=1000, help="Bookings created by each path")
+    parser.add_argument('--batch', type=int, default=100, help="Bookings per API request")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"database '{args.db}' not found; create it with generate_data.py")
+    import api
+    import app as app_module
+    app = app_module.create_app(args.db)
+    client = app.test_client()
+    client.post('/login', data={'username': 'alice123', 'password': 'pass1'})
+
+    rng, ids = random.Random(17), _max_ids(args.db)
+    form_bookings = [_booking_form(rng, ids, 0) for _ in range(args.bookings)]
+    api_bookings = [_booking_form(rng, ids, 1) for _ in range(args.bookings)]
+    results = {'bookings': args.bookings, 'batch': args.batch, 'encoder': 'orjson' if api.orjson else 'json'}
+    for path, (elapsed, failed) in (('form', run_forms(client, form_bookings)),
+                                    ('api', run_api(client, api_bookings, args.batch))):
+        results[path] = {'seconds': round(elapsed, 3), 'failed': failed,
+                         'bookings_per_sec': round((args.bookings - failed) / elapsed, 1)}
+
+    etag = client.get('/api/v1/bookings').headers['ETag']
+    results['list_ms'] = round(time_requests(client, 50) * 1000, 3)
+    results['list_304_ms'] = round(time_requests(client, 50, headers={'If-None-Match': etag}) * 1000, 3)
+
+    print(f"{'path':<6}{'bookings/s':>12}{'failed':>8}{'seconds':>9}")
+    for path in ('form', 'api'):
+        r = results[path]
+        print(f"{path:<6}{r['bookings_per_sec']:>12.1f}{r['failed']:>8}{r['seconds']:>9.2f}")
+    if results['form']['bookings_per_sec']:
+        print(f"JSON API: {results['api']['bookings_per_sec'] / results['form']['bookings_per_sec']:.1f}x "
+              f"the bookings/s of the form path ({results['encoder']} encoder)")
+    print(f"GET /api/v1/bookings: {results['list_ms']} ms, {results['list_304_ms']} ms when answered with 304")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
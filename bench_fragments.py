@@ -0,0 +1,100 @@
+"""Fragment-cache benchmark for the four list pages.
+
+Requests the hotels, customers, payments and bookings pages through Flask's
+test client (see bench_routes.py) in three phases:
+
+    off     the fragment cache disabled: every request queries and renders its rows
+    warm    the cache on and already holding the page: only the page shell is rendered
+    churn   the cache on while a payment is added every --write-every requests,
+            so the payments and bookings pages keep being invalidated
+
+Each phase reports p50/p95 latency per page and the cache hit rate. Larger
+pages (--limit) spend more of their time rendering rows, so they gain most.
+
+    python generate_data.py --db bench.db
+    python bench_fragments.py --db bench.db --limit 200
+
+The churn phase adds payments, so run it against a scratch copy.
+"""
+import argparse
+import json
+import os
+import random
+import time
+
+from bench_routes import _percentile
+
+PAGES = ('hotels', 'customers', 'payments', 'bookings')
+
+
+def run_phase(app_module, client, args, write_every=0):
+    """args.requests GETs per page; returns {page: {p50_ms, p95_ms}} plus the phase's hit rate."""
+    fragments = app_module.fragments
+    hits, misses = fragments.stats()['hits'], fragments.stats()['misses']
+    rng = random.Random(args.seed)
+    cus_max = app_module.db._execute("SELECT MAX(cus_id) AS n FROM CUSTOMER", fetch_one=True)['n']
+    latencies = {page: [] for page in PAGES}
+    for n in range(args.requests):
+        for page in PAGES:
+            if write_every and n % write_every == 0 and page == 'payments':
+                client.post('/add_payment', data={'cus_id': rng.randint(1, cus_max), 'pay_amt': 250,
+                                                  'pay_date': '2026-01-15', 'pay_desc': 'Benchmark'})
+            started = time.perf_counter()
+            response = client.get(f"/{page}?limit={args.limit}")
+            response.get_data()
+            latencies[page].append(time.perf_counter() - started)
+            if response.status_code != 200:
+                raise SystemExit(f"❌ /{page} returned {response.status_code}")
+    stats = fragments.stats()
+    lookups = stats['hits'] - hits + stats['misses'] - misses
+    result = {}
+    for page, values in latencies.items():
+        values.sort()
+        result[page] = {'p50_ms': round(_percentile(values, 50) * 1000, 2),
+                        'p95_ms': round(_percentile(values, 95) * 1000, 2)}
+    result['hit_rate'] = round((stats['hits'] - hits) / lookups, 3) if lookups else 0.0
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List-page latency with and without the fragment cache.")
+    parser.add_argument('--db', default='bench.db', help="Database to benchmark (see generate_data.py)")
+    parser.add_argument('--requests', type=int, default=100, help="Requests per page and phase")
+    parser.add_argument('--limit', type=int, default=200, help="Rows per page")
+    parser.add_argument('--write-every', type=int, default=5, help="Requests between payments in the churn phase")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"database '{args.db}' not found; create it with generate_data.py")
+    import app as app_module
+    app = app_module.create_app(args.db)
+    client = app.test_client()
+    client.post('/login', data={'username': 'alice123', 'password': 'pass1'})
+    client.get('/')  # consume the login flash message
+
+    fragments = app_module.fragments
+    max_bytes = fragments.max_bytes or 32 * 2 ** 20
+    results = {'requests': args.requests, 'limit': args.limit, 'write_every': args.write_every}
+    fragments.max_bytes = 0
+    results['off'] = run_phase(app_module, client, args)
+    fragments.max_bytes = max_bytes
+    run_phase(app_module, client, argparse.Namespace(**{**vars(args), 'requests': 1}))  # fill the cache
+    results['warm'] = run_phase(app_module, client, args)
+    results['churn'] = run_phase(app_module, client, args, write_every=args.write_every)
+
+    print(f"{'page':<11}" + ''.join(f"{phase + ' p50':>12}{phase + ' p95':>12}" for phase in ('off', 'warm', 'churn')))
+    for page in PAGES:
+        print(f"{page:<11}" + ''.join(f"{results[phase][page]['p50_ms']:>12.2f}{results[phase][page]['p95_ms']:>12.2f}"
+                                      for phase in ('off', 'warm', 'churn')))
+    print(f"{'hit rate':<11}" + ''.join(f"{results[phase]['hit_rate']:>24.0%}" for phase in ('off', 'warm', 'churn')))
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,147 @@
+"""Write-throughput benchmark: per-request commits versus the group-commit writer.
+
+Worker threads call HotelDBManager write methods as fast as they can, first
+with every write committing on its own thread (the default path), then
+through a GroupCommitWriter. Each phase reports writes/s, failed writes
+(errors and sold-out rooms) and p50/p95/p99 latency; the group phase also
+reports the average batch size.
+
+    python generate_data.py --db bench.db
+    python bench_group_commit.py --db bench.db --threads 16 --seconds 10
+    python bench_group_commit.py --db bench.db --synchronous FULL --timeout 0.5
+
+The --synchronous FULL run shows the fsync-per-commit cost that batching
+amortizes, and a short --timeout shows "database is locked" failures on the
+default path. Both phases add rows, so run it against a scratch copy.
+"""
+import argparse
+import json
+import logging
+import os
+import random
+import threading
+import time
+from datetime import date, timedelta
+
+from bench_routes import _percentile
+from db_manager import HotelDBManager, ROOM_TYPES
+
+FIRST_BENCH_STAY = date(2028, 1, 1)
+
+
+def _booking(db, rng, ids):
+    check_in = FIRST_BENCH_STAY + timedelta(days=rng.randrange(700))
+    check_out = check_in + timedelta(days=rng.randint(1, 3))
+    result = db.create_booking_with_deposit(
+        f"guest{rng.randint(1, ids['customers'])}@example.com", 'Bench Guest', '9000000000', 'Bench Road',
+        rng.randint(1, ids['hotels']), rng.choice(ROOM_TYPES), 'Benchmark booking',
+        check_in.isoformat(), check_out.isoformat(), deposit=500)
+    return bool(result)
+
+
+def _payment(db, rng, ids):
+    return bool(db.add_payment(rng.randint(1, ids['customers']), 250, FIRST_BENCH_STAY.isoformat(),
+                               'Benchmark payment'))
+
+
+OPERATIONS = {'bookings': (_booking,), 'payments': (_payment,), 'mixed': (_booking, _payment)}
+
+
+def worker(db, ids, operations, stop, n, latencies, counts, lock):
+    rng = random.Random(n)
+    done = failed = 0
+    mine = []
+    while not stop.is_set():
+        operation = operations[done % len(operations)]
+        started = time.perf_counter()
+        try:
+            ok = operation(db, rng, ids)
+        except Exception:
+            ok = False
+        mine.append(time.perf_counter() - started)
+        done += 1
+        failed += not ok
+    with lock:
+        latencies.extend(mine)
+        counts['writes'] += done
+        counts['failed'] += failed
+
+
+def run_phase(args, ids, group_commit):
+    db = HotelDBManager(args.db, group_commit=group_commit, max_size=args.threads + 1, timeout=args.timeout)
+    db.pool.PRAGMAS = tuple(pragma for pragma in db.pool.PRAGMAS if 'synchronous' not in pragma) \
+        + (f"PRAGMA synchronous = {args.synchronous};",)
+    stop, lock = threading.Event(), threading.Lock()
+    latencies, counts = [], {'writes': 0, 'failed': 0}
+    threads = [threading.Thread(target=worker, args=(db, ids, OPERATIONS[args.mix], stop, n, latencies, counts, lock))
+               for n in range(args.threads)]
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    time.sleep(args.seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    ms = lambda value: None if value is None else round(value * 1000, 2)
+    result = {'writes': counts['writes'], 'failed': counts['failed'],
+              'writes_per_sec': round((counts['writes'] - counts['failed']) / elapsed, 1),
+              'p50_ms': ms(_percentile(latencies, 50)), 'p95_ms': ms(_percentile(latencies, 95)),
+              'p99_ms': ms(_percentile(latencies, 99))}
+    stats = db.group_commit_stats()
+    if stats:
+        result['writer'] = stats
+        result['avg_batch'] = round(stats['operations'] / max(stats['batches'], 1), 1)
+    db.close()
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare write throughput with and without group commit.")
+    parser.add_argument('--db', default='bench.db', help="Scratch database to write to (see generate_data.py)")
+    parser.add_argument('--threads', type=int, default=16, help="Concurrent writers")
+    parser.add_argument('--seconds', type=float, default=10, help="Length of each phase")
+    parser.add_argument('--mix', choices=sorted(OPERATIONS), default='mixed',
+                        help="bookings (customer lookup + booking + deposit), payments, or both alternating")
+    parser.add_argument('--batch', type=int, default=64, help="Group commit: most operations per transaction")
+    parser.add_argument('--delay-ms', type=float, default=0, help="Group commit: how long a batch waits for more")
+    parser.add_argument('--synchronous', choices=('OFF', 'NORMAL', 'FULL'), default='NORMAL',
+                        help="PRAGMA synchronous for both phases (the app uses NORMAL)")
+    parser.add_argument('--timeout', type=float, default=10.0, help="SQLite busy timeout in seconds")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"database '{args.db}' not found; create it with generate_data.py")
+    # Failed writes are counted below; one warning per lock timeout would drown the table.
+    logging.getLogger('hotel_booking').setLevel(logging.CRITICAL)
+
+    probe = HotelDBManager(args.db)
+    ids = {'customers': probe._execute("SELECT MAX(cus_id) AS n FROM CUSTOMER", fetch_one=True)['n'],
+           'hotels': probe._execute("SELECT MAX(hotl_id) AS n FROM HOTEL", fetch_one=True)['n']}
+    probe.close()
+
+    results = {'threads': args.threads, 'seconds': args.seconds, 'mix': args.mix, 'synchronous': args.synchronous,
+               'timeout': args.timeout, 'batch': args.batch, 'delay_ms': args.delay_ms}
+    results['direct'] = run_phase(args, ids, False)
+    results['group'] = run_phase(args, ids, {'max_batch': args.batch, 'max_delay': args.delay_ms / 1000})
+
+    print(f"{'path':<8}{'writes/s':>10}{'failed':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'batch':>7}")
+    for path in ('direct', 'group'):
+        r = results[path]
+        print(f"{path:<8}{r['writes_per_sec']:>10.1f}{r['failed']:>8}{r['p50_ms'] or 0:>9.2f}{r['p95_ms'] or 0:>9.2f}"
+              f"{r['p99_ms'] or 0:>9.2f}{r.get('avg_batch', 1):>7}")
+    if results['direct']['writes_per_sec']:
+        print(f"group commit: {results['group']['writes_per_sec'] / results['direct']['writes_per_sec']:.1f}x "
+              f"the writes/s of per-request commits")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,127 @@
+"""Login-flood benchmark: do other routes stay fast while logins are hammered?
+
+Probe threads fetch ordinary pages first on their own (baseline) and then
+while flood threads post wrong passwords for random usernames from rotating
+IP addresses (a credential-stuffing pattern the per-IP/username throttle alone
+does not stop). Reports probe latency for both phases and how the logins were
+answered (302/200 checked, 429 throttled, 503 shed).
+
+    python bench_login_flood.py --db bench.db
+    python bench_login_flood.py --db bench.db --unbounded   # one bcrypt thread per flooder, no throttle
+"""
+import argparse
+import itertools
+import json
+import os
+import random
+import threading
+import time
+
+from bench_routes import _percentile
+
+PROBE_PATHS = ('/hotels', '/bookings', '/customers', '/payments', '/add_booking')
+
+
+def _summary(latencies):
+    latencies = sorted(latencies)
+    ms = lambda value: None if value is None else round(value * 1000, 2)
+    return {'requests': len(latencies), 'p50_ms': ms(_percentile(latencies, 50)),
+            'p95_ms': ms(_percentile(latencies, 95)), 'p99_ms': ms(_percentile(latencies, 99))}
+
+
+def probe(client, stop, latencies):
+    paths = itertools.cycle(PROBE_PATHS)
+    while not stop.is_set():
+        started = time.perf_counter()
+        client.get(next(paths)).get_data()
+        latencies.append(time.perf_counter() - started)
+
+
+def flood(app, stop, statuses, lock, n, interval):
+    client = app.test_client()
+    rng = random.Random(n)
+    next_at = time.perf_counter()
+    for i in itertools.count():
+        if stop.is_set():
+            break
+        client.environ_base['REMOTE_ADDR'] = f"172.{16 + n % 16}.{i // 256 % 256}.{i % 256}"
+        response = client.post('/login', data={'username': f"user{rng.randrange(10**6)}", 'password': 'guess'})
+        with lock:
+            statuses[response.status_code] = statuses.get(response.status_code, 0) + 1
+        next_at += interval
+        stop.wait(max(0.0, next_at - time.perf_counter()))
+
+
+def run_phase(app, seconds, probe_clients, flooders, rate):
+    stop = threading.Event()
+    latencies, statuses, lock = [], {}, threading.Lock()
+    interval = flooders / rate if flooders else 0
+    threads = [threading.Thread(target=probe, args=(client, stop, latencies)) for client in probe_clients]
+    threads += [threading.Thread(target=flood, args=(app, stop, statuses, lock, n, interval)) for n in range(flooders)]
+    for thread in threads:
+        thread.start()
+    time.sleep(seconds)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    result = _summary(latencies)
+    result['logins'] = {str(code): count for code, count in sorted(statuses.items())}
+    result['login_rps'] = round(sum(statuses.values()) / seconds, 1)
+    return result
+
+
+def logged_in_clients(app, count):
+    clients = []
+    for n in range(count):
+        client = app.test_client()
+        client.environ_base['REMOTE_ADDR'] = f"10.1.0.{n + 1}"
+        client.post('/login', data={'username': 'alice123', 'password': 'pass1'})
+        clients.append(client)
+    return clients
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure page latency during a login flood.")
+    parser.add_argument('--db', default='bench.db', help="Database to benchmark (see generate_data.py)")
+    parser.add_argument('--seconds', type=float, default=10, help="Length of each phase")
+    parser.add_argument('--probes', type=int, default=2, help="Threads fetching ordinary pages")
+    parser.add_argument('--flooders', type=int, default=16, help="Threads posting bad logins")
+    parser.add_argument('--rate', type=float, default=200, help="Offered login attempts per second, all flooders")
+    parser.add_argument('--unbounded', action='store_true',
+                        help="Verify every login immediately (one hash thread per flooder, no throttle) for comparison")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"database '{args.db}' not found; create it with generate_data.py")
+    import app as app_module
+    from auth import Authenticator, LoginThrottle
+    app = app_module.create_app(args.db)
+    if args.unbounded:
+        app_module.authenticator = Authenticator(app_module.db, max_workers=args.flooders, max_queue=args.flooders,
+                                                 throttle=LoginThrottle(ip_attempts=10**9, user_failures=10**9))
+
+    results = {'mode': 'unbounded' if args.unbounded else 'bounded', 'probes': args.probes,
+               'flooders': args.flooders, 'offered_login_rps': args.rate, 'seconds': args.seconds,
+               'auth_workers': app_module.authenticator.max_workers, 'auth_queue': app_module.authenticator.max_queue}
+    probe_clients = logged_in_clients(app, args.probes)
+    results['baseline'] = run_phase(app, args.seconds, probe_clients, 0, args.rate)
+    results['flood'] = run_phase(app, args.seconds, probe_clients, args.flooders, args.rate)
+    results['auth'] = app_module.authenticator.stats()
+
+    print(f"{'phase':<10}{'pages':>8}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}   logins")
+    for phase in ('baseline', 'flood'):
+        r = results[phase]
+        print(f"{phase:<10}{r['requests']:>8}{r['p50_ms'] or 0:>9.2f}{r['p95_ms'] or 0:>9.2f}{r['p99_ms'] or 0:>9.2f}"
+              f"   {r['login_rps']}/s {r['logins']}")
+    if results['baseline']['p95_ms'] and results['flood']['p95_ms']:
+        print(f"p95 during flood: {results['flood']['p95_ms'] / results['baseline']['p95_ms']:.1f}x baseline")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,152 @@
+"""Quote benchmark: pricing one stay at every hotel from the rate calendar.
+
+Adds a rate calendar to every hotel (a high season, a holiday peak, weekend
+rates and a Suite rate, see add_sample_rates) and then prices random stays
+of 1 to --max-nights nights, for every hotel at once, three ways:
+
+    per-night   one indexed RATE lookup per hotel and night, as a loop over SQL
+    cold        QuoteEngine with its price blocks dropped before each stay
+    warm        QuoteEngine with its price blocks cached (the steady state)
+
+Every engine total is checked against the per-night loop. Reports p50/p95
+latency per all-hotel quote.
+
+    python generate_data.py --db bench.db
+    python bench_quotes.py --db bench.db
+
+The rates are written to the database, so run it against a scratch copy.
+"""
+import argparse
+import json
+import os
+import random
+import time
+from datetime import date, timedelta
+
+from bench_routes import _percentile
+from db_manager import ALL_WEEKDAYS, ROOM_TYPES, WEEKEND, HotelDBManager
+from db_setup import init_database
+from quotes import QuoteEngine
+
+NIGHT_PRICE_QUERY = """
+    SELECT rate_price FROM RATE
+    WHERE rate_hotel_id = ? AND (rate_room_type IS NULL OR rate_room_type = ?)
+      AND (rate_start IS NULL OR rate_start <= ?) AND (rate_end IS NULL OR rate_end >= ?)
+      AND rate_weekdays & ? != 0
+    ORDER BY rate_priority DESC, rate_id DESC LIMIT 1"""
+
+
+def add_sample_rates(db, year):
+    """Gives every hotel a season, a peak, weekend and Suite rates for `year` and the next; returns the count."""
+    added = 0
+    for hotel in db.get_catalogue().hotels:
+        rent = hotel['hotl_rent'] or 2000
+        for y in (year, year + 1):
+            rates = [
+                (rent * 1.3, None, f'{y}-10-01', f'{y}-12-31', ALL_WEEKDAYS, 1, 'High season'),
+                (rent * 2.0, None, f'{y}-12-24', f'{y}-12-31', ALL_WEEKDAYS, 3, 'Holiday peak'),
+                (rent * 1.15, None, f'{y}-01-01', f'{y}-12-31', WEEKEND, 2, 'Weekend'),
+                (rent * 1.8, 'Suite', None, None, ALL_WEEKDAYS, 2, 'Suite'),
+            ]
+            for price, room_type, start, end, weekdays, priority, desc in rates:
+                if db.add_rate(hotel['hotl_id'], round(price, 2), room_type, start, end, weekdays, priority, desc):
+                    added += 1
+    return added
+
+
+def per_night_quotes(db, room_type, check_in, check_out):
+    """{hotl_id: total or None}: one RATE query per hotel and night."""
+    totals = {}
+    nights = (check_out - check_in).days
+    with db.pool.connection() as conn:
+        for hotel in db.get_catalogue().hotels:
+            total = 0.0
+            for n in range(nights):
+                day = check_in + timedelta(days=n)
+                row = conn.execute(NIGHT_PRICE_QUERY, (hotel['hotl_id'], room_type, day.isoformat(), day.isoformat(),
+                                                       1 << day.weekday())).fetchone()
+                price = row[0] if row else hotel['hotl_rent']
+                if price is None:
+                    total = None
+                    break
+                total += price
+            totals[hotel['hotl_id']] = None if total is None else round(total, 2)
+    return totals
+
+
+def sample_stays(args, rng):
+    stays = []
+    for _ in range(args.stays):
+        check_in = date(args.year, 1, 1) + timedelta(days=rng.randrange(365))
+        stays.append((rng.choice(ROOM_TYPES), check_in, check_in + timedelta(days=rng.randint(1, args.max_nights))))
+    return stays
+
+
+def _same(total, expected):
+    return total == expected or (total is not None and expected is not None and abs(total - expected) <= 0.01)
+
+
+def timed(values, fn, *args):
+    started = time.perf_counter()
+    result = fn(*args)
+    values.append(time.perf_counter() - started)
+    return result
+
+
+def summary(values):
+    values.sort()
+    return {'p50_ms': round(_percentile(values, 50) * 1000, 3), 'p95_ms': round(_percentile(values, 95) * 1000, 3)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="All-hotel stay quotes: per-night SQL loop vs the QuoteEngine.")
+    parser.add_argument('--db', default='bench.db', help="Database to benchmark (see generate_data.py)")
+    parser.add_argument('--stays', type=int, default=50, help="Stays to price")
+    parser.add_argument('--max-nights', type=int, default=14, help="Longest stay")
+    parser.add_argument('--year', type=int, default=2025, help="Year the stays start in")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"database '{args.db}' not found; create it with generate_data.py")
+    init_database(args.db)
+    db = HotelDBManager(args.db)
+    try:
+        added = add_sample_rates(db, args.year)
+        hotels = len(db.get_catalogue().hotels)
+        print(f"📅 {added} rates added for {hotels} hotels")
+        engine = QuoteEngine(db)
+        stays = sample_stays(args, random.Random(args.seed))
+        timings = {'per-night': [], 'cold': [], 'warm': []}
+        mismatches = 0
+        for room_type, check_in, check_out in stays:
+            expected = timed(timings['per-night'], per_night_quotes, db, room_type, check_in, check_out)
+            engine.clear()
+            timed(timings['cold'], engine.quote_all, room_type, check_in.isoformat(), check_out.isoformat())
+            result = timed(timings['warm'], engine.quote_all, room_type, check_in.isoformat(), check_out.isoformat())
+            mismatches += sum(1 for quote in result['quotes'] if not _same(quote['total'], expected[quote['hotl_id']]))
+    finally:
+        db.close()
+
+    results = {'hotels': hotels, 'stays': args.stays, 'max_nights': args.max_nights, 'mismatches': mismatches,
+               'engine': engine.stats()}
+    print(f"{'method':<11}{'p50 ms':>10}{'p95 ms':>10}")
+    for method, values in timings.items():
+        results[method] = summary(values)
+        print(f"{method:<11}{results[method]['p50_ms']:>10.3f}{results[method]['p95_ms']:>10.3f}")
+    speedup = results['per-night']['p50_ms'] / results['warm']['p50_ms'] if results['warm']['p50_ms'] else 0
+    print(f"⚡ warm quotes are {speedup:.0f}x faster than the per-night loop (p50)")
+    if mismatches:
+        print(f"❌ {mismatches} quote(s) differ from the per-night loop")
+    else:
+        print("✅ Every quote matches the per-night loop.")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
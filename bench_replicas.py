@@ -0,0 +1,155 @@
+"""Mixed-load benchmark: booking write latency while reports run, with and without read replicas.
+
+Writer threads create bookings as fast as they can (see bench_group_commit.py)
+while separate reporter processes, standing in for other app workers, load
+the full booking summary and payments list over and over. Three phases:
+
+    quiet     writers only
+    primary   writers plus reports on hotel_booking.db itself
+    replica   writers plus reports routed to a snapshot copy (replica.py)
+
+Each phase reports writes/s and p50/p95/p99 write latency, the reports
+finished, the share of reports a replica served, and the largest WAL the
+primary reached. Long report transactions hold back checkpoints, so the WAL
+grows while they run. Moving the reports to a replica lets checkpoints run
+again, and the committing writers pay for them. On a single core the
+reporters also take CPU from the writers, whichever file they read, so
+compare tail latency on the hardware the app runs on.
+
+    python generate_data.py --db bench.db --bookings 200000 --payments 200000
+    python bench_replicas.py --db bench.db --threads 4 --reporters 2 --seconds 20
+
+The writers add rows, so run it against a scratch copy.
+"""
+import argparse
+import json
+import logging
+import multiprocessing
+import os
+import random
+import threading
+import time
+
+from bench_group_commit import _booking
+from bench_routes import _percentile
+from db_manager import HotelDBManager
+
+
+def reporter(db_name, replicas, refresh_interval, stop, results):
+    """One reporter process: full report reads until `stop` is set."""
+    logging.getLogger('hotel_booking').setLevel(logging.CRITICAL)
+    options = {'count': 1, 'refresh_interval': refresh_interval, 'max_staleness': 4 * refresh_interval} \
+        if replicas else 0
+    db = HotelDBManager(db_name, replicas=options)
+    reports = 0
+    while not stop.is_set():
+        db.get_booking_summary_report()
+        db.get_all_payments_detailed()
+        reports += 2
+    stats = db.replica_stats()
+    db.close()
+    results.put({'reports': reports, 'replica_reads': stats.get('replica_reads', 0)})
+
+
+def writer(db, ids, stop, n, latencies, counts, lock):
+    rng = random.Random(n)
+    done = failed = 0
+    mine = []
+    while not stop.is_set():
+        started = time.perf_counter()
+        try:
+            ok = _booking(db, rng, ids)
+        except Exception:
+            ok = False
+        mine.append(time.perf_counter() - started)
+        done += 1
+        failed += not ok
+    with lock:
+        latencies.extend(mine)
+        counts['writes'] += done
+        counts['failed'] += failed
+
+
+def run_phase(args, ids, reporters, replicas):
+    db = HotelDBManager(args.db, max_size=args.threads + 1, replicas={'count': 1, 'refresh_interval': 0})
+    if replicas:
+        db.replicas.refresh()  # start with a fresh copy; the reporters refresh it from then on
+    context = multiprocessing.get_context('spawn')
+    report_stop, report_results = context.Event(), context.Queue()
+    processes = [context.Process(target=reporter, args=(args.db, replicas, args.refresh, report_stop, report_results))
+                 for _ in range(reporters)]
+    for process in processes:
+        process.start()
+    time.sleep(2)  # let the reporters import and start their first report
+
+    stop, lock = threading.Event(), threading.Lock()
+    latencies, counts = [], {'writes': 0, 'failed': 0}
+    threads = [threading.Thread(target=writer, args=(db, ids, stop, n, latencies, counts, lock))
+               for n in range(args.threads)]
+    wal, largest_wal = args.db + '-wal', 0
+    started = time.perf_counter()
+    for thread in threads:
+        thread.start()
+    while time.perf_counter() - started < args.seconds:
+        time.sleep(0.1)
+        largest_wal = max(largest_wal, os.path.getsize(wal) if os.path.exists(wal) else 0)
+    stop.set()
+    for thread in threads:
+        thread.join()
+    elapsed = time.perf_counter() - started
+    report_stop.set()
+    totals = [report_results.get() for _ in processes]
+    for process in processes:
+        process.join()
+    db.close()
+
+    latencies.sort()
+    ms = lambda value: None if value is None else round(value * 1000, 2)
+    reports = sum(t['reports'] for t in totals)
+    return {'writes': counts['writes'], 'failed': counts['failed'],
+            'writes_per_sec': round((counts['writes'] - counts['failed']) / elapsed, 1),
+            'p50_ms': ms(_percentile(latencies, 50)), 'p95_ms': ms(_percentile(latencies, 95)),
+            'p99_ms': ms(_percentile(latencies, 99)), 'reports': reports,
+            'replica_share': round(sum(t['replica_reads'] for t in totals) / reports, 2) if reports else 0,
+            'largest_wal_mb': round(largest_wal / 2 ** 20, 1)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Booking write latency under report load, with and without replicas.")
+    parser.add_argument('--db', default='bench.db', help="Scratch database to write to (see generate_data.py)")
+    parser.add_argument('--threads', type=int, default=4, help="Concurrent writers")
+    parser.add_argument('--reporters', type=int, default=2, help="Processes running full reports")
+    parser.add_argument('--seconds', type=float, default=20, help="Length of each phase")
+    parser.add_argument('--refresh', type=float, default=5, help="Replica refresh interval in seconds")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"database '{args.db}' not found; create it with generate_data.py")
+    logging.getLogger('hotel_booking').setLevel(logging.CRITICAL)
+
+    probe = HotelDBManager(args.db)
+    ids = {'customers': probe._execute("SELECT MAX(cus_id) AS n FROM CUSTOMER", fetch_one=True)['n'],
+           'hotels': probe._execute("SELECT MAX(hotl_id) AS n FROM HOTEL", fetch_one=True)['n']}
+    probe.close()
+
+    results = {'threads': args.threads, 'reporters': args.reporters, 'seconds': args.seconds,
+               'refresh': args.refresh}
+    for phase, reporters, replicas in (('quiet', 0, False), ('primary', args.reporters, False),
+                                       ('replica', args.reporters, True)):
+        results[phase] = run_phase(args, ids, reporters, replicas)
+
+    print(f"{'phase':<9}{'writes/s':>10}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'reports':>9}{'replica':>9}{'WAL MB':>8}")
+    for phase in ('quiet', 'primary', 'replica'):
+        r = results[phase]
+        print(f"{phase:<9}{r['writes_per_sec']:>10.1f}{r['p50_ms'] or 0:>9.2f}{r['p95_ms'] or 0:>9.2f}"
+              f"{r['p99_ms'] or 0:>9.2f}{r['reports']:>9}{r['replica_share']:>9.0%}{r['largest_wal_mb']:>8}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
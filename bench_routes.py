@@ -0,0 +1,272 @@
+"""End-to-end route benchmark.
+
+Drives every page of the app through Flask's test client from several worker
+threads (each with its own logged-in session) and reports throughput and
+p50/p95/p99 latency per route. Results are written as JSON so runs from two
+commits can be compared:
+
+    python generate_data.py --db bench.db
+    python bench_routes.py --db bench.db --output before.json
+    ... change code, regenerate ...
+    python bench_routes.py --db bench.db --compare before.json
+
+Write routes (add_booking, add_payment, ...) modify the database, so compare
+runs against freshly generated copies, or pass --read-only. Delete routes are
+not exercised.
+"""
+import argparse
+import itertools
+import json
+import os
+import platform
+import random
+import sqlite3
+import subprocess
+import sys
+import threading
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+
+from db_manager import ROOM_TYPES, encode_cursor
+
+# Route(name, method, path(rng, ids), form(rng, ids, n) or None, writes, share of --requests)
+Route = namedtuple('Route', 'name method path form writes share')
+
+FIRST_BENCH_STAY = date(2027, 1, 1)
+
+_client_ids = itertools.count(1)
+
+
+def _id(rng, ids, table):
+    return rng.randint(1, max(ids[table], 1))
+
+
+def _stay(rng):
+    """A short stay after the generated bookings' window, so it never conflicts with them."""
+    check_in = FIRST_BENCH_STAY + timedelta(days=rng.randrange(700))
+    return check_in.isoformat(), (check_in + timedelta(days=rng.randint(1, 3))).isoformat()
+
+
+def _booking_form(rng, ids, n):
+    check_in, check_out = _stay(rng)
+    return {
+        'customer_email': f"bench{n}-{rng.randrange(10**9)}@example.com",
+        'customer_name': 'Bench Guest', 'customer_mobile': '9000000000', 'customer_address': 'Bench Road',
+        'hotl_id': _id(rng, ids, 'hotel'), 'book_type': rng.choice(ROOM_TYPES), 'book_desc': 'Benchmark booking',
+        'check_in_date': check_in, 'check_out_date': check_out, 'initial_payment': 500,
+    }
+
+
+def _payment_form(rng, ids, n):
+    return {'cus_id': _id(rng, ids, 'customer'), 'pay_amt': 250, 'pay_date': '2026-01-15', 'pay_desc': 'Benchmark'}
+
+
+def _deep_cursor(ids, table):
+    """A keyset cursor half way through `table` (the first sort key is the id)."""
+    middle = max(ids[table] // 2, 1)
+    return encode_cursor([middle, middle])
+
+
+ROUTES = [
+    Route('index', 'GET', lambda rng, ids: '/', None, False, 1.0),
+    Route('login_page', 'GET', lambda rng, ids: '/login', None, False, 1.0),
+    # bcrypt makes this deliberately slow; fewer samples keep the run short.
+    Route('login', 'POST', lambda rng, ids: '/login',
+          lambda rng, ids, n: {'username': 'alice123', 'password': 'pass1'}, False, 0.1),
+    Route('hotels', 'GET', lambda rng, ids: '/hotels', None, False, 1.0),
+    Route('hotels_by_rent', 'GET', lambda rng, ids: '/hotels?sort=hotl_rent&order=desc&limit=100', None, False, 1.0),
+    Route('bookings', 'GET', lambda rng, ids: '/bookings', None, False, 1.0),
+    Route('bookings_deep_page', 'GET', lambda rng, ids: f"/bookings?after={_deep_cursor(ids, 'booking')}",
+          None, False, 1.0),
+    Route('customers', 'GET', lambda rng, ids: '/customers', None, False, 1.0),
+    Route('customers_by_name', 'GET', lambda rng, ids: '/customers?sort=cus_name', None, False, 1.0),
+    Route('payments', 'GET', lambda rng, ids: '/payments', None, False, 1.0),
+    Route('availability', 'GET',
+          lambda rng, ids: '/availability?check_in=2025-06-01&check_out=2025-06-04&room_type=' + rng.choice(ROOM_TYPES),
+          None, False, 1.0),
+    Route('availability_hotel', 'GET',
+          lambda rng, ids: (f"/availability?hotl_id={_id(rng, ids, 'hotel')}&check_in=2025-06-01"
+                            f"&check_out=2025-06-04&room_type={rng.choice(ROOM_TYPES)}"), None, False, 1.0),
+    Route('add_hotel_page', 'GET', lambda rng, ids: '/add_hotel', None, False, 1.0),
+    Route('edit_hotel_page', 'GET', lambda rng, ids: f"/edit_hotel/{_id(rng, ids, 'hotel')}", None, False, 1.0),
+    Route('add_booking_page', 'GET', lambda rng, ids: '/add_booking', None, False, 1.0),
+    Route('edit_booking_page', 'GET', lambda rng, ids: f"/edit_booking/{_id(rng, ids, 'booking')}", None, False, 1.0),
+    Route('edit_customer_page', 'GET', lambda rng, ids: f"/edit_customer/{_id(rng, ids, 'customer')}",
+          None, False, 1.0),
+    Route('add_payment_page', 'GET', lambda rng, ids: '/add_payment', None, False, 1.0),
+    Route('edit_payment_page', 'GET', lambda rng, ids: f"/edit_payment/{_id(rng, ids, 'payment')}", None, False, 1.0),
+    Route('export_hotels', 'GET', lambda rng, ids: '/export/hotels.csv', None, False, 0.1),
+    Route('export_bookings', 'GET', lambda rng, ids: '/export/bookings.csv', None, False, 0.01),
+    Route('add_booking', 'POST', lambda rng, ids: '/add_booking', _booking_form, True, 1.0),
+    Route('add_payment', 'POST', lambda rng, ids: '/add_payment', _payment_form, True, 1.0),
+    Route('logout', 'GET', lambda rng, ids: '/logout', None, False, 0.1),
+]
+
+
+def _max_ids(db_name):
+    conn = sqlite3.connect(db_name)
+    try:
+        return {name: conn.execute(f"SELECT COALESCE(MAX({pk}), 0) FROM {table}").fetchone()[0]
+                for name, table, pk in (('hotel', 'HOTEL', 'hotl_id'), ('customer', 'CUSTOMER', 'cus_id'),
+                                        ('booking', 'BOOKING', 'book_id'), ('payment', 'PAYMENTS', 'pay_id'))}
+    finally:
+        conn.close()
+
+
+def _percentile(sorted_values, pct):
+    if not sorted_values:
+        return None
+    index = min(len(sorted_values) - 1, max(0, round(pct / 100 * len(sorted_values)) - 1))
+    return sorted_values[index]
+
+
+def _summarize(latencies, errors, statuses, wall):
+    latencies.sort()
+    ms = lambda value: None if value is None else round(value * 1000, 3)
+    return {
+        'requests': len(latencies),
+        'errors': errors,
+        'statuses': {str(code): count for code, count in sorted(statuses.items())},
+        'throughput_rps': round(len(latencies) / wall, 1) if wall else None,
+        'mean_ms': ms(sum(latencies) / len(latencies)) if latencies else None,
+        'p50_ms': ms(_percentile(latencies, 50)),
+        'p95_ms': ms(_percentile(latencies, 95)),
+        'p99_ms': ms(_percentile(latencies, 99)),
+        'max_ms': ms(latencies[-1]) if latencies else None,
+    }
+
+
+def run_route(app, route, ids, total, workers, seed):
+    """Runs `total` requests of one route across `workers` threads. Returns the summary dict."""
+    latencies, statuses = [], {}
+    errors = 0
+    lock = threading.Lock()
+
+    def worker(n, client):
+        nonlocal errors
+        rng = random.Random(f"{seed}-{route.name}-{n}")
+        local, local_status, local_errors = [], {}, 0
+        for _ in range(n, total, workers):
+            path = route.path(rng, ids)
+            started = time.perf_counter()
+            if route.method == 'POST':
+                response = client.post(path, data=route.form(rng, ids, n))
+            else:
+                response = client.get(path)
+            response.get_data()
+            local.append(time.perf_counter() - started)
+            local_status[response.status_code] = local_status.get(response.status_code, 0) + 1
+            local_errors += response.status_code >= 500
+            response.close()
+        with lock:
+            latencies.extend(local)
+            for code, count in local_status.items():
+                statuses[code] = statuses.get(code, 0) + count
+            errors += local_errors
+
+    # Log every client in up front so bcrypt does not count against the route.
+    clients = []
+    for _ in range(workers):
+        client = app.test_client()
+        # One address per client, so the login throttle sees separate clients.
+        client_id = next(_client_ids)
+        client.environ_base['REMOTE_ADDR'] = f"10.{client_id // 65536 % 256}.{client_id // 256 % 256}.{client_id % 256}"
+        client.post('/login', data={'username': 'alice123', 'password': 'pass1'})
+        clients.append(client)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        for future in [pool.submit(worker, n, client) for n, client in enumerate(clients)]:
+            future.result()
+    return _summarize(latencies, errors, statuses, time.perf_counter() - started)
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare(results, baseline, threshold):
+    """Prints per-route p95/throughput changes. Returns the routes that regressed by more than `threshold`."""
+    regressed = []
+    print(f"\n{'route':<22}{'p95 before':>12}{'p95 after':>12}{'change':>9}{'rps before':>12}{'rps after':>11}")
+    for name, now in results['routes'].items():
+        before = baseline.get('routes', {}).get(name)
+        if not before or not before.get('p95_ms') or now.get('p95_ms') is None:
+            continue
+        change = now['p95_ms'] / before['p95_ms'] - 1
+        flag = ''
+        if change > threshold:
+            regressed.append(name)
+            flag = '  ⚠️'
+        print(f"{name:<22}{before['p95_ms']:>12.2f}{now['p95_ms']:>12.2f}{change:>+9.0%}"
+              f"{before['throughput_rps'] or 0:>12.1f}{now['throughput_rps'] or 0:>11.1f}{flag}")
+    return regressed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark every route through Flask's test client.")
+    parser.add_argument('--db', default='bench.db', help="Database to benchmark (see generate_data.py)")
+    parser.add_argument('--requests', type=int, default=200, help="Requests per route (scaled down for slow routes)")
+    parser.add_argument('--workers', type=int, default=8, help="Concurrent client threads")
+    parser.add_argument('--routes', help="Comma-separated route names to run (default: all)")
+    parser.add_argument('--read-only', action='store_true', help="Skip routes that write to the database")
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--output', default='bench_results.json', help="Where to write the JSON results")
+    parser.add_argument('--compare', help="Earlier results file to compare against")
+    parser.add_argument('--threshold', type=float, default=0.2,
+                        help="p95 slowdown (fraction) that counts as a regression with --compare")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"database '{args.db}' not found; create it with generate_data.py")
+    import app as app_module
+    app = app_module.create_app(args.db)
+
+    selected = set(args.routes.split(',')) if args.routes else None
+    routes = [route for route in ROUTES
+              if (selected is None or route.name in selected) and not (args.read_only and route.writes)]
+    ids = _max_ids(args.db)
+
+    results = {
+        'meta': {
+            'commit': _git_commit(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'db': os.path.abspath(args.db),
+            'max_ids': ids,
+            'workers': args.workers,
+            'requests_per_route': args.requests,
+            'python': platform.python_version(),
+            'sqlite': sqlite3.sqlite_version,
+        },
+        'routes': {},
+    }
+
+    print(f"{'route':<22}{'n':>6}{'rps':>9}{'p50 ms':>9}{'p95 ms':>9}{'p99 ms':>9}{'errors':>8}")
+    for route in routes:
+        total = max(args.workers, int(args.requests * route.share))
+        summary = run_route(app, route, ids, total, args.workers, args.seed)
+        results['routes'][route.name] = summary
+        print(f"{route.name:<22}{summary['requests']:>6}{summary['throughput_rps']:>9.1f}{summary['p50_ms']:>9.2f}"
+              f"{summary['p95_ms']:>9.2f}{summary['p99_ms']:>9.2f}{summary['errors']:>8}")
+
+    results['meta']['pool'] = app_module.db.pool_stats()
+    with open(args.output, 'w', encoding='utf-8') as f:
+        json.dump(results, f, indent=2)
+    print(f"✅ Results written to {args.output}")
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            regressed = compare(results, json.load(f), args.threshold)
+        if regressed:
+            print(f"❌ p95 regressed by more than {args.threshold:.0%}: {', '.join(regressed)}")
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
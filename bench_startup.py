@@ -0,0 +1,88 @@
+"""Startup-time benchmark: fresh interpreter to first HTTP response.
+
+Each run starts a new Python process that imports app.py, prepares it
+(create_app() in 'factory' mode, or nothing in 'lazy' mode, where the first
+request initializes the database) and serves one request through the test
+client. Reports the median of each phase over --runs processes.
+
+    python bench_startup.py --db hotel_booking.db
+    python bench_startup.py --db hotel_booking.db --output startup.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import app as app_module
+imported = time.perf_counter()
+db_name, mode, path = sys.argv[1:4]
+if mode == 'factory':
+    app = app_module.create_app(db_name)
+else:
+    app_module.db = app_module.HotelDBManager(db_name)
+    app = app_module.app
+ready = time.perf_counter()
+response = app.test_client().get(path)
+response.get_data()
+done = time.perf_counter()
+print(json.dumps({'import_s': imported - started, 'init_s': ready - imported,
+                  'first_response_s': done - ready, 'import_to_first_response_s': done - started,
+                  'status': response.status_code}))
+"""
+
+PHASES = ('process_s', 'import_s', 'init_s', 'first_response_s', 'import_to_first_response_s')
+
+
+def run_once(db_name, mode, path):
+    started = time.perf_counter()
+    result = subprocess.run([sys.executable, '-c', CHILD, db_name, mode, path],
+                            cwd=os.path.dirname(os.path.abspath(__file__)), capture_output=True, text=True)
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        raise RuntimeError(f"startup run failed:\n{result.stderr}")
+    timings = json.loads(result.stdout.strip().splitlines()[-1])
+    timings['process_s'] = elapsed
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure import-to-first-response time of app.py.")
+    parser.add_argument('--db', default='hotel_booking.db', help="Existing database to start against")
+    parser.add_argument('--runs', type=int, default=10)
+    parser.add_argument('--path', default='/login', help="Path of the first request (default: %(default)s)")
+    parser.add_argument('--modes', default='factory,lazy', help="Comma-separated: factory, lazy")
+    parser.add_argument('--output', help="Write results as JSON to this file")
+    args = parser.parse_args()
+
+    db_name = os.path.abspath(args.db)
+    if not os.path.exists(db_name):
+        parser.error(f"database '{args.db}' not found; run 'python db_setup.py init --db {args.db}' first")
+
+    results = {'db': db_name, 'path': args.path, 'runs': args.runs, 'modes': {}}
+    print(f"{'mode':<9}{'phase':<30}{'median ms':>11}{'min ms':>10}")
+    for mode in args.modes.split(','):
+        runs = [run_once(db_name, mode, args.path) for _ in range(args.runs)]
+        statuses = sorted({run['status'] for run in runs})
+        summary = {phase: {'median_ms': round(statistics.median(run[phase] for run in runs) * 1000, 2),
+                           'min_ms': round(min(run[phase] for run in runs) * 1000, 2)}
+                   for phase in PHASES}
+        summary['statuses'] = statuses
+        results['modes'][mode] = summary
+        for phase in PHASES:
+            print(f"{mode:<9}{phase[:-2]:<30}{summary[phase]['median_ms']:>11.1f}{summary[phase]['min_ms']:>10.1f}")
+        print(f"{mode:<9}{'first response status':<30}{', '.join(map(str, statuses)):>11}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+        print(f"✅ Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,468 @@
+"""Bulk import/export for customers, hotels, bookings and payments.
+
+Streams CSV or JSONL files (chosen by extension) through batched executemany
+transactions, so memory stays flat whatever the file size.
+
+    python bulk_load.py import customers customers.csv
+    python bulk_load.py import bookings bookings.jsonl --batch-size 20000 --defer
+    python bulk_load.py export payments payments.csv
+
+Bookings and payments may name their customer by `customer_email` instead of
+the id column; emails are resolved in bulk per batch. Rows that fail
+validation are written to a reject file (JSONL, one object per row with the
+source line number and reason) and the load carries on.
+
+Bookings are checked against ROOM_INVENTORY like HotelDBManager.add_booking:
+after each batch insert, ROOM_OCCUPANCY is compared with the inventory of the
+batch's hotels, room types and dates, and stays that would overbook a night
+are rejected. With --defer the occupancy triggers are dropped, so the check
+runs once the derived tables are rebuilt: the newest loaded stays on each
+overbooked night are deleted again and rejected (with their stored values
+and no line number).
+"""
+import argparse
+import csv
+import json
+import sqlite3
+import sys
+import time
+from contextlib import contextmanager
+
+from db_manager import HotelDBManager, DERIVED_TRIGGER_PREFIXES, RoomUnavailableError, parse_stay
+from db_setup import DB_NAME
+
+# Columns written for each entity, in insert order. The id column is optional
+# on import: leave it blank to let SQLite assign one.
+ENTITIES = {
+    'customers': ('CUSTOMER', ('cus_id', 'cus_name', 'cus_mobile', 'cus_email', 'cus_pass', 'cus_add')),
+    'hotels': ('HOTEL', ('hotl_id', 'hotl_name', 'hotl_type', 'hotl_desc', 'hotl_rent', 'hotl_manager_id')),
+    'bookings': ('BOOKING', ('book_id', 'book_cus_id', 'book_hotel_id', 'book_type', 'book_desc',
+                             'book_check_in', 'book_check_out')),
+    'payments': ('PAYMENTS', ('pay_id', 'pay_cus_id', 'pay_amt', 'pay_date', 'pay_desc', 'pay_book_id')),
+}
+
+# Keeps IN (...) lists well under SQLite's bound-parameter limit.
+LOOKUP_CHUNK = 900
+
+
+# --- Field Parsing ---
+def _text(record, key, required=False):
+    value = record.get(key)
+    if value is None or value == '':
+        if required:
+            raise ValueError(f"missing {key}")
+        return None
+    return str(value)
+
+def _int(record, key, required=False):
+    value = _text(record, key, required)
+    try:
+        return int(value) if value is not None else None
+    except ValueError:
+        raise ValueError(f"{key} is not an integer: {value!r}")
+
+def _float(record, key, required=False):
+    value = _text(record, key, required)
+    try:
+        return float(value) if value is not None else None
+    except ValueError:
+        raise ValueError(f"{key} is not a number: {value!r}")
+
+
+def convert_customer(record):
+    return {
+        'cus_id': _int(record, 'cus_id'),
+        'cus_name': _text(record, 'cus_name', required=True),
+        'cus_mobile': _text(record, 'cus_mobile'),
+        'cus_email': _text(record, 'cus_email'),
+        'cus_pass': _text(record, 'cus_pass') or 'temporary',
+        'cus_add': _text(record, 'cus_add'),
+    }
+
+def convert_hotel(record):
+    return {
+        'hotl_id': _int(record, 'hotl_id'),
+        'hotl_name': _text(record, 'hotl_name', required=True),
+        'hotl_type': _text(record, 'hotl_type'),
+        'hotl_desc': _text(record, 'hotl_desc'),
+        'hotl_rent': _float(record, 'hotl_rent'),
+        'hotl_manager_id': _int(record, 'hotl_manager_id'),
+    }
+
+def convert_booking(record):
+    check_in, check_out = parse_stay(_text(record, 'book_check_in', required=True),
+                                     _text(record, 'book_check_out', required=True))
+    row = {
+        'book_id': _int(record, 'book_id'),
+        'book_cus_id': _int(record, 'book_cus_id'),
+        'book_hotel_id': _int(record, 'book_hotel_id', required=True),
+        'book_type': _text(record, 'book_type', required=True),
+        'book_desc': _text(record, 'book_desc'),
+        'book_check_in': check_in.isoformat(),
+        'book_check_out': check_out.isoformat(),
+        '_email': _text(record, 'customer_email'),
+    }
+    if row['book_cus_id'] is None and row['_email'] is None:
+        raise ValueError("missing book_cus_id or customer_email")
+    return row
+
+def convert_payment(record):
+    row = {
+        'pay_id': _int(record, 'pay_id'),
+        'pay_cus_id': _int(record, 'pay_cus_id'),
+        'pay_amt': _float(record, 'pay_amt', required=True),
+        'pay_date': _text(record, 'pay_date'),
+        'pay_desc': _text(record, 'pay_desc'),
+        'pay_book_id': _int(record, 'pay_book_id'),
+        '_email': _text(record, 'customer_email'),
+    }
+    if row['pay_cus_id'] is None and row['_email'] is None:
+        raise ValueError("missing pay_cus_id or customer_email")
+    return row
+
+CONVERTERS = {
+    'customers': convert_customer,
+    'hotels': convert_hotel,
+    'bookings': convert_booking,
+    'payments': convert_payment,
+}
+
+
+# --- File Streaming ---
+def iter_records(path):
+    """Yields (line_number, dict) from a .csv or .jsonl/.ndjson file without reading it whole."""
+    if path.endswith('.csv'):
+        with open(path, newline='', encoding='utf-8') as f:
+            reader = csv.DictReader(f)
+            for record in reader:
+                yield reader.line_num, record
+    else:
+        with open(path, encoding='utf-8') as f:
+            for line_no, line in enumerate(f, 1):
+                if line.strip():
+                    try:
+                        yield line_no, json.loads(line)
+                    except ValueError as e:
+                        yield line_no, {'_error': f"invalid JSON: {e}"}
+
+
+def _lookup(conn, query, keys):
+    """Runs `query` (containing one `{}` placeholder for an IN list) over keys in chunks."""
+    keys = list(keys)
+    rows = []
+    for start in range(0, len(keys), LOOKUP_CHUNK):
+        chunk = keys[start:start + LOOKUP_CHUNK]
+        rows.extend(conn.execute(query.format(','.join('?' * len(chunk))), chunk).fetchall())
+    return rows
+
+
+class BulkLoader:
+    """Loads one entity's records in batches of `batch_size`, one transaction per batch."""
+
+    def __init__(self, db, entity, batch_size=5000, reject_file=None, progress_every=50000, out=sys.stderr,
+                 deferred=False):
+        self.db = db
+        self.entity = entity
+        self.table, self.columns = ENTITIES[entity]
+        self.convert = CONVERTERS[entity]
+        self.batch_size = batch_size
+        self.reject_file = reject_file
+        self.progress_every = progress_every
+        self.out = out
+        self.loaded = 0
+        self.rejected = 0
+        self._started = None
+        self._next_report = progress_every
+        # deferred: derived-data triggers are dropped, so checks that read derived tables
+        # wait for reject_overbooked(). Loaded bookings are the ids above _high_water plus
+        # the explicit ids in _gap_ids (gaps below it).
+        self.deferred = deferred
+        self._high_water = None
+        self._gap_ids = set()
+        self.insert_sql = (f"INSERT INTO {self.table} ({', '.join(self.columns)}) "
+                           f"VALUES ({', '.join('?' * len(self.columns))})")
+
+    def reject(self, line_no, record, reason):
+        self.rejected += 1
+        if self.reject_file:
+            self.reject_file.write(json.dumps({'line': line_no, 'reason': reason, 'record': record}, default=str) + '\n')
+
+    def load(self, records):
+        self._started = time.perf_counter()
+        if self.deferred and self.entity == 'bookings':
+            self._high_water = self.db._execute("SELECT COALESCE(MAX(book_id), 0) FROM BOOKING", fetch_one=True)[0]
+        batch = []
+        for line_no, record in records:
+            if '_error' in record:
+                self.reject(line_no, record, record['_error'])
+                continue
+            try:
+                batch.append((line_no, record, self.convert(record)))
+            except ValueError as e:
+                self.reject(line_no, record, str(e))
+            if len(batch) >= self.batch_size:
+                self._flush(batch)
+                batch = []
+        if batch:
+            self._flush(batch)
+        self.report(final=True)
+        return self.loaded, self.rejected
+
+    def report(self, final=False):
+        elapsed = max(time.perf_counter() - self._started, 1e-9)
+        label = "done" if final else "progress"
+        print(f"{self.entity} {label}: {self.loaded:,} loaded, {self.rejected:,} rejected "
+              f"({self.loaded / elapsed:,.0f} rows/s)", file=self.out)
+
+    def _flush(self, batch):
+        with self.db.transaction() as conn:
+            batch = self._resolve(conn, batch)
+            params = [tuple(row[c] for c in self.columns) for _, _, row in batch]
+            conn.execute("SAVEPOINT bulk_batch;")
+            try:
+                conn.executemany(self.insert_sql, params)
+                self._check(conn, batch)
+                conn.execute("RELEASE bulk_batch;")
+                self.loaded += len(params)
+            except (sqlite3.Error, RoomUnavailableError):
+                # One bad row (e.g. a duplicate id or an overbooked night) fails the whole
+                # batch; redo it row by row so only the offending rows are rejected.
+                conn.execute("ROLLBACK TO bulk_batch;")
+                conn.execute("RELEASE bulk_batch;")
+                for item, values in zip(batch, params):
+                    conn.execute("SAVEPOINT bulk_row;")
+                    try:
+                        conn.execute(self.insert_sql, values)
+                        self._check(conn, [item])
+                        conn.execute("RELEASE bulk_row;")
+                        self.loaded += 1
+                    except (sqlite3.Error, RoomUnavailableError) as e:
+                        conn.execute("ROLLBACK TO bulk_row;")
+                        conn.execute("RELEASE bulk_row;")
+                        self.reject(item[0], item[1], str(e))
+
+        if self.progress_every and self.loaded + self.rejected >= self._next_report:
+            self.report()
+            self._next_report += self.progress_every
+
+    # --- Post-Insert Checks ---
+    def _check(self, conn, batch):
+        """Checks rows just inserted (in the same transaction); raises to undo them."""
+        checker = getattr(self, f"_check_{self.entity}", None)
+        if checker:
+            checker(conn, batch)
+
+    def _check_bookings(self, conn, batch):
+        if self.deferred:
+            for _, _, row in batch:
+                if row['book_id'] is not None and row['book_id'] <= self._high_water:
+                    self._gap_ids.add(row['book_id'])
+            return
+        stays = {}
+        for _, _, row in batch:
+            key = (row['book_hotel_id'], row['book_type'])
+            first, last = stays.get(key, (row['book_check_in'], row['book_check_out']))
+            stays[key] = (min(first, row['book_check_in']), max(last, row['book_check_out']))
+        for (hotl_id, room_type), (check_in, check_out) in stays.items():
+            self.db._assert_capacity(conn, hotl_id, room_type, check_in, check_out)
+
+    def reject_overbooked(self):
+        """After a deferred bookings load, once the derived tables are rebuilt: rejects overbooking stays.
+
+        For every night over a room type's inventory, the newest stays from this
+        load that cover it are deleted again until the night fits (stays booked
+        before the load are never touched). Returns the number rejected.
+        """
+        rejected = 0
+        with self.db.transaction() as conn:
+            nights = conn.execute("""
+                SELECT O.occ_hotel_id, O.occ_room_type, O.occ_date FROM ROOM_INVENTORY I
+                JOIN ROOM_OCCUPANCY O ON O.occ_hotel_id = I.inv_hotel_id AND O.occ_room_type = I.inv_room_type
+                WHERE O.occ_booked > I.inv_rooms ORDER BY 1, 2, 3""").fetchall()
+            for hotl_id, room_type, night in nights:
+                # Stays rejected for an earlier night may already have made room on this one.
+                excess = conn.execute("""
+                    SELECT O.occ_booked - I.inv_rooms FROM ROOM_OCCUPANCY O JOIN ROOM_INVENTORY I
+                      ON I.inv_hotel_id = O.occ_hotel_id AND I.inv_room_type = O.occ_room_type
+                    WHERE O.occ_hotel_id = ? AND O.occ_room_type = ? AND O.occ_date = ?""",
+                    (hotl_id, room_type, night)).fetchone()
+                if excess is None or excess[0] <= 0:
+                    continue
+                stays = conn.execute(f"""
+                    SELECT {', '.join(self.columns)} FROM BOOKING
+                    WHERE book_hotel_id = ? AND book_type = ? AND date(book_check_in) <= ? AND date(book_check_out) > ?
+                      AND (book_id > ? OR book_id IN (SELECT value FROM json_each(?)))
+                    ORDER BY book_id DESC LIMIT ?""",
+                    (hotl_id, room_type, night, night, self._high_water, json.dumps(sorted(self._gap_ids)),
+                     excess[0])).fetchall()
+                for stay in stays:
+                    conn.execute("DELETE FROM BOOKING WHERE book_id = ?", (stay['book_id'],))
+                    self.reject(None, dict(stay), f"No {room_type} rooms are free at this hotel on {night}.")
+                    rejected += 1
+        self.loaded -= rejected
+        return rejected
+
+    # --- Batch Resolution ---
+    def _resolve(self, conn, batch):
+        """Validates references for a whole batch with a few IN queries; rejects the rest."""
+        resolver = getattr(self, f"_resolve_{self.entity}", None)
+        return resolver(conn, batch) if resolver else batch
+
+    def _keep(self, batch, check):
+        kept = []
+        for line_no, record, row in batch:
+            reason = check(row)
+            if reason:
+                self.reject(line_no, record, reason)
+            else:
+                kept.append((line_no, record, row))
+        return kept
+
+    def _resolve_customers(self, conn, batch):
+        emails = {row['cus_email'] for _, _, row in batch if row['cus_email']}
+        existing = {r[0] for r in _lookup(conn, "SELECT cus_email FROM CUSTOMER WHERE cus_email IN ({})", emails)}
+        seen = set()
+
+        def check(row):
+            email = row['cus_email']
+            if email is None:
+                return None
+            if email in existing or email in seen:
+                return f"duplicate cus_email {email!r}"
+            seen.add(email)
+            return None
+        return self._keep(batch, check)
+
+    def _resolve_customer_refs(self, conn, batch, cus_key):
+        emails = {row['_email'] for _, _, row in batch if row[cus_key] is None}
+        by_email = dict(_lookup(conn, "SELECT cus_email, cus_id FROM CUSTOMER WHERE cus_email IN ({})", emails))
+        for _, _, row in batch:
+            if row[cus_key] is None:
+                row[cus_key] = by_email.get(row['_email'])
+        ids = {row[cus_key] for _, _, row in batch if row[cus_key] is not None}
+        known = {r[0] for r in _lookup(conn, "SELECT cus_id FROM CUSTOMER WHERE cus_id IN ({})", ids)}
+        return self._keep(batch, lambda row: None if row[cus_key] in known
+                          else f"unknown customer {row[cus_key] or row['_email']!r}")
+
+    def _resolve_bookings(self, conn, batch):
+        batch = self._resolve_customer_refs(conn, batch, 'book_cus_id')
+        hotel_ids = {row['book_hotel_id'] for _, _, row in batch}
+        known = {r[0] for r in _lookup(conn, "SELECT hotl_id FROM HOTEL WHERE hotl_id IN ({})", hotel_ids)}
+        return self._keep(batch, lambda row: None if row['book_hotel_id'] in known
+                          else f"unknown hotel {row['book_hotel_id']}")
+
+    def _resolve_payments(self, conn, batch):
+        batch = self._resolve_customer_refs(conn, batch, 'pay_cus_id')
+        book_ids = {row['pay_book_id'] for _, _, row in batch if row['pay_book_id'] is not None}
+        owners = dict(_lookup(conn, "SELECT book_id, book_cus_id FROM BOOKING WHERE book_id IN ({})", book_ids))
+        # Like HotelDBManager.add_payment: no booking given means the customer's latest booking.
+        unattached = {row['pay_cus_id'] for _, _, row in batch if row['pay_book_id'] is None}
+        latest = dict(_lookup(conn, "SELECT book_cus_id, MAX(book_id) FROM BOOKING WHERE book_cus_id IN ({}) "
+                                    "GROUP BY book_cus_id", unattached))
+
+        def check(row):
+            if row['pay_book_id'] is None:
+                row['pay_book_id'] = latest.get(row['pay_cus_id'])
+            elif owners.get(row['pay_book_id']) != row['pay_cus_id']:
+                return f"booking {row['pay_book_id']} does not belong to customer {row['pay_cus_id']}"
+            return None
+        return self._keep(batch, check)
+
+
+@contextmanager
+def deferred_maintenance(db, *tables, indexes=True, triggers=True):
+    """Drops the secondary indexes and derived-data triggers of `tables` for the duration of a load.
+
+    Unique indexes and integrity triggers stay in place. Everything dropped is
+    recreated afterwards (even if the load fails) and, when triggers were
+    dropped, the derived tables are rebuilt in one pass. Pass every table a
+    load writes to one call: nested blocks would each rebuild everything.
+    """
+    saved = []
+    with db.transaction() as conn:
+        for obj in conn.execute(f"SELECT type, name, sql FROM sqlite_master WHERE tbl_name IN "
+                                f"({', '.join('?' * len(tables))}) AND sql IS NOT NULL "
+                                f"AND type IN ('index', 'trigger') ORDER BY type, name", tables).fetchall():
+            if obj['type'] == 'index' and indexes and not obj['sql'].upper().startswith('CREATE UNIQUE'):
+                conn.execute(f"DROP INDEX {obj['name']}")
+                saved.append(obj['sql'])
+            elif obj['type'] == 'trigger' and triggers and obj['name'].startswith(DERIVED_TRIGGER_PREFIXES):
+                conn.execute(f"DROP TRIGGER {obj['name']}")
+                saved.append(obj['sql'])
+    try:
+        yield
+    finally:
+        with db.transaction() as conn:
+            for sql in saved:
+                conn.execute(sql)
+        if triggers and saved:
+            db.rebuild_derived_tables()
+
+
+def import_file(db, entity, path, batch_size=5000, reject_path=None, defer=False, progress_every=50000):
+    """Loads `path` into `entity`. Returns (loaded, rejected)."""
+    table = ENTITIES[entity][0]
+    reject_path = reject_path or f"{path}.rejects.jsonl"
+    with open(reject_path, 'w', encoding='utf-8') as reject_file:
+        loader = BulkLoader(db, entity, batch_size, reject_file, progress_every, deferred=defer)
+        if defer:
+            with deferred_maintenance(db, table):
+                loader.load(iter_records(path))
+            if entity == 'bookings':
+                loader.reject_overbooked()
+            result = loader.loaded, loader.rejected
+        else:
+            result = loader.load(iter_records(path))
+    if table == 'HOTEL':
+        db.invalidate_catalogue()
+    return result
+
+
+def export_file(db, entity, path, chunk_size=5000):
+    """Writes every row of `entity` to a .csv or .jsonl file in chunks. Returns the row count."""
+    table, columns = ENTITIES[entity]
+    query = f"SELECT {', '.join(columns)} FROM {table} ORDER BY {columns[0]}"
+    count = 0
+    chunk = []
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        if path.endswith('.csv'):
+            writer = csv.writer(f)
+            writer.writerow(columns)
+            write = writer.writerows
+        else:
+            def write(rows):
+                f.writelines(json.dumps(dict(zip(columns, row))) + '\n' for row in rows)
+        for row in db.iter_rows(query, chunk_size=chunk_size):
+            chunk.append(tuple(row))
+            if len(chunk) >= chunk_size:
+                write(chunk)
+                count += len(chunk)
+                chunk = []
+        write(chunk)
+        count += len(chunk)
+    return count
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Bulk import/export for the hotel booking database.")
+    parser.add_argument('action', choices=['import', 'export'])
+    parser.add_argument('entity', choices=sorted(ENTITIES))
+    parser.add_argument('path', help="CSV (.csv) or JSON Lines (.jsonl) file")
+    parser.add_argument('--db', default=DB_NAME, help="Database file (default: %(default)s)")
+    parser.add_argument('--batch-size', type=int, default=5000, help="Rows per transaction (default: %(default)s)")
+    parser.add_argument('--rejects', help="Reject file (default: <path>.rejects.jsonl)")
+    parser.add_argument('--defer', action='store_true',
+                        help="Drop secondary indexes and derived-data triggers during the load, then rebuild")
+    args = parser.parse_args()
+
+    db = HotelDBManager(args.db)
+    started = time.perf_counter()
+    if args.action == 'import':
+        loaded, rejected = import_file(db, args.entity, args.path, args.batch_size, args.rejects, args.defer)
+        print(f"✅ Imported {loaded:,} {args.entity} ({rejected:,} rejected) in {time.perf_counter() - started:.1f}s")
+        if rejected:
+            print(f"   Rejected rows written to {args.rejects or args.path + '.rejects.jsonl'}")
+    else:
+        count = export_file(db, args.entity, args.path, args.batch_size)
+        print(f"✅ Exported {count:,} {args.entity} to {args.path} in {time.perf_counter() - started:.1f}s")
+    db.close()
@@ -0,0 +1,259 @@
+"""Consistency check for the trigger-maintained tables.
+
+Builds a scratch database and runs a scripted mix of writes through
+HotelDBManager: bookings and payments, edits and deletes, rent changes,
+bookings refused because a room type is sold out, and archive runs in which
+one stay is edited and one deleted between the archiver's copy and delete
+steps, followed by payments against an archived stay, and stays priced from the
+rate calendar whose charge must not move with later rent or rate edits. After every step
+BOOKING_SUMMARY, HOTEL_DAILY/HOTEL_MONTHLY and the balance ledger are
+reconciled with the base tables (check_booking_summary, check_hotel_daily and
+check_ledger). The check fails (exit status 1) on any drift, or when a step
+does not behave as expected.
+
+    python check_consistency.py
+"""
+import json
+import os
+import sys
+import tempfile
+
+from archive import Archiver
+from db_manager import HotelDBManager, RoomUnavailableError
+from db_setup import setup_database
+from quotes import QuoteEngine
+
+ARCHIVE_BEFORE = '2021-01-01'
+
+
+class InterleavedArchiver(Archiver):
+    """An Archiver that calls `between(ids)` (the batch as JSON) after each copy step, like a concurrent writer."""
+
+    def __init__(self, db, between):
+        super().__init__(db, pause=0)
+        self.between = between
+
+    def _copy(self, conn, schema, ids):
+        super()._copy(conn, schema, ids)
+        self.between(ids)
+
+
+def _count(db, query, params=()):
+    return db._execute(query, params, fetch_one=True)[0]
+
+
+def _book(db, email, hotl_id, book_type, check_in, check_out, deposit=0, pay_date=None):
+    """create_booking_with_deposit() for a sample guest; returns its result dict."""
+    return db.create_booking_with_deposit(email, email.split('@')[0].title(), '9000000000', 'Sample address', hotl_id,
+                                          book_type, 'Consistency check', check_in, check_out, deposit, pay_date)
+
+
+# --- Steps ---
+# Each step takes (db, state) and returns a list of problems; `state` carries ids between steps.
+
+def step_bookings(db, state):
+    problems = []
+    state['old'] = _book(db, 'ann@example.com', 1, 'Single', '2020-03-01', '2020-03-04', 1000, '2020-02-20')
+    state['old_edited'] = _book(db, 'ben@example.com', 2, 'Double', '2020-05-10', '2020-05-12', 500, '2020-05-01')
+    state['old_deleted'] = _book(db, 'ann@example.com', 2, 'Single', '2020-07-01', '2020-07-03')
+    state['hot'] = _book(db, 'ben@example.com', 1, 'Suite', '2025-11-01', '2025-11-05', 2000, '2025-10-20')
+    if None in (state['old'], state['old_edited'], state['old_deleted'], state['hot']):
+        return ["create_booking_with_deposit() failed"]
+    if not db.add_booking(state['old']['cus_id'], 1, 'Double', 'Second stay', '2025-12-20', '2025-12-27'):
+        problems.append("add_booking() failed")
+    for cus_id, amount, day, book_id in ((state['old']['cus_id'], 300, '2020-03-04', state['old']['book_id']),
+                                         (state['old']['cus_id'], 250, '2020-07-01', state['old_deleted']['book_id']),
+                                         (state['hot']['cus_id'], 120, '2025-11-05', None)):
+        if not db.add_payment(cus_id, amount, day, 'Consistency check', book_id):
+            problems.append(f"add_payment() failed for booking {book_id}")
+    if db.add_payment(state['hot']['cus_id'], 50, '2025-11-02', 'Wrong guest', state['old']['book_id']):
+        problems.append("a payment against another customer's booking was accepted")
+    return problems
+
+
+def step_edits(db, state):
+    problems = []
+    hot = state['hot']
+    if not db.update_booking(hot['book_id'], 2, 'Double', 'Moved to hotel 2'):
+        problems.append("update_booking() failed")
+    if not db.update_payment(hot['pay_id'], hot['cus_id'], 2200, '2025-10-30', 'Deposit, corrected'):
+        problems.append("update_payment() failed")
+    if not db.update_customer(hot['cus_id'], 'Ben Renamed', '9000000001', 'ben@example.com', 'New address'):
+        problems.append("update_customer() failed")
+    db.update_batch('PAYMENTS', [{'pay_id': hot['pay_id'], 'pay_amt': 2100}])
+    # No HotelDBManager method moves a stay's dates; a direct UPDATE covers the date triggers.
+    with db.transaction() as conn:
+        conn.execute("UPDATE BOOKING SET book_check_in = '2025-11-02', book_check_out = '2025-11-07' WHERE book_id = ?",
+                     (hot['book_id'],))
+    return problems
+
+
+def step_deletes(db, state):
+    problems = []
+    pay_id = db.add_payment(state['hot']['cus_id'], 75, '2025-11-03', 'Refunded', state['hot']['book_id'])
+    if not pay_id or not db.delete_payment(pay_id):
+        problems.append("add_payment()/delete_payment() failed")
+    book = _book(db, 'cal@example.com', 1, 'Single', '2026-01-10', '2026-01-12', 400)
+    with db.transaction() as conn:
+        conn.execute("DELETE FROM PAYMENTS WHERE pay_book_id = ?", (book['book_id'],))
+        conn.execute("DELETE FROM BOOKING WHERE book_id = ?", (book['book_id'],))
+    return problems
+
+
+def step_rents(db, state):
+    problems = []
+    if not db.update_hotel(1, 'Hotel A', '5-Star', 'Luxury hotel', 5500, 1):
+        problems.append("update_hotel() failed")
+    db.update_batch('HOTEL', [{'hotl_id': 2, 'hotl_rent': None}])
+    db.update_batch('HOTEL', [{'hotl_id': 2, 'hotl_rent': 4200}])
+    return problems
+
+
+def step_capacity(db, state):
+    """Sold-out room types are refused and nothing of the refused booking is written."""
+    problems = []
+    db.set_room_inventory(1, 'Suite', 1)
+    if not db.add_booking(state['old']['cus_id'], 1, 'Suite', 'Last suite', '2026-02-01', '2026-02-05'):
+        problems.append("add_booking() refused the last free Suite")
+    single = _book(db, 'ann@example.com', 1, 'Single', '2026-02-02', '2026-02-03')
+    before = (_count(db, "SELECT COUNT(*) FROM BOOKING"), _count(db, "SELECT COUNT(*) FROM PAYMENTS"),
+              _count(db, "SELECT COUNT(*) FROM CUSTOMER"))
+    if db.add_booking(state['old']['cus_id'], 1, 'Suite', 'Overbooked', '2026-02-04', '2026-02-06'):
+        problems.append("add_booking() overbooked the Suite")
+    try:
+        _book(db, 'dan@example.com', 1, 'Suite', '2026-02-03', '2026-02-04', 300)
+        problems.append("create_booking_with_deposit() overbooked the Suite")
+    except RoomUnavailableError:
+        pass
+    if db.update_booking(single['book_id'], 1, 'Suite', 'Upgraded to a sold-out Suite'):
+        problems.append("update_booking() moved a stay into a sold-out Suite")
+    after = (_count(db, "SELECT COUNT(*) FROM BOOKING"), _count(db, "SELECT COUNT(*) FROM PAYMENTS"),
+             _count(db, "SELECT COUNT(*) FROM CUSTOMER"))
+    if after != before:
+        problems.append(f"refused bookings left rows behind (bookings, payments, customers): {before} -> {after}")
+    return problems
+
+
+def step_archive(db, state):
+    """Two-phase move: a stay edited between copy and delete stays hot, a deleted one leaves no archive copy."""
+    problems = []
+    edited, deleted = state['old_edited'], state['old_deleted']
+
+    def between(ids):
+        ids = json.loads(ids)
+        if edited['book_id'] in ids:
+            db.update_payment(edited['pay_id'], edited['cus_id'], 550, '2020-05-01', 'Deposit, edited while archiving')
+        if deleted['book_id'] in ids:
+            with db.transaction() as conn:
+                conn.execute("DELETE FROM PAYMENTS WHERE pay_book_id = ?", (deleted['book_id'],))
+                conn.execute("DELETE FROM BOOKING WHERE book_id = ?", (deleted['book_id'],))
+
+    totals = InterleavedArchiver(db, between).run(ARCHIVE_BEFORE)
+    if totals['bookings'] != 1 or totals['skipped'] != 2:
+        problems.append(f"expected 1 stay archived and 2 skipped, got {totals}")
+    if db.get_booking_by_id_detailed(deleted['book_id'], history=True):
+        problems.append(f"deleted booking {deleted['book_id']} still has an archive copy")
+    totals = Archiver(db, pause=0).run(ARCHIVE_BEFORE)
+    if totals['bookings'] != 1 or totals['skipped']:
+        problems.append(f"expected the edited stay to be archived on the next run, got {totals}")
+    if _count(db, "SELECT COUNT(*) FROM BOOKING WHERE book_check_out < ?", (ARCHIVE_BEFORE,)):
+        problems.append("stays checked out before the cutoff are still hot")
+    return problems
+
+
+def step_late_payments(db, state):
+    """Payments against an archived stay are accepted for its guest only, and can be edited and deleted."""
+    problems = []
+    old = state['old']
+    pay_id = db.add_payment(old['cus_id'], 400, '2022-06-01', 'Late payment', old['book_id'])
+    if not pay_id:
+        return ["a late payment against an archived stay was refused"]
+    if db.add_payment(state['hot']['cus_id'], 10, '2022-06-01', 'Wrong guest', old['book_id']):
+        problems.append("a late payment from another customer was accepted")
+    if not db.update_payment(pay_id, old['cus_id'], 450, '2022-06-02', 'Late payment, corrected', old['book_id']):
+        problems.append("update_payment() failed for a late payment")
+    balance = db.get_booking_balance(old['book_id'])
+    if not balance or balance['paid'] != 1000 + 300 + 450:
+        problems.append(f"archived stay {old['book_id']} ledger shows {balance and dict(balance)}")
+    db.update_hotel(1, 'Hotel A', '5-Star', 'Luxury hotel', 5800, 1)
+    second = db.add_payment(old['cus_id'], 20, '2022-07-01', 'Paid twice', old['book_id'])
+    if not second or not db.delete_payment(second):
+        problems.append("add_payment()/delete_payment() failed for a late payment")
+    return problems
+
+
+def step_rates(db, state):
+    """A stay is charged what the quote engine priced it at, until the stay itself changes."""
+    problems = []
+    quotes = QuoteEngine(db)
+    # Weekend nights in February 2026 at hotel 2 cost 9000; Friday 6th stays at the rent.
+    rate_id = db.add_rate(2, 9000, start='2026-02-01', end='2026-02-28', weekdays=0b1100000, desc='Winter weekends')
+    if not rate_id:
+        return ["add_rate() failed"]
+    quote = quotes.quote(2, 'Single', '2026-02-06', '2026-02-09')
+    book = _book(db, 'dee@example.com', 2, 'Single', '2026-02-06', '2026-02-09')
+    balance = book and db.get_booking_balance(book['book_id'])
+    if not balance or quote['total'] != 4200 + 2 * 9000 or balance['charged'] != quote['total']:
+        return [f"stay charged {balance and dict(balance)} but quoted {quote}"]
+    db.update_batch('HOTEL', [{'hotl_id': 2, 'hotl_rent': 4300}])
+    db.delete_rate(rate_id)
+    if db.get_booking_balance(book['book_id'])['charged'] != quote['total']:
+        problems.append("a rent or rate change repriced a booked stay")
+    with db.transaction() as conn:
+        conn.execute("UPDATE BOOKING SET book_check_out = '2026-02-10' WHERE book_id = ?", (book['book_id'],))
+    if db.get_booking_balance(book['book_id'])['charged'] != 4 * 4300:
+        problems.append("moving a stay did not reprice it at the current rent")
+    return problems
+
+
+STEPS = (
+    ('bookings and payments', step_bookings),
+    ('edits', step_edits),
+    ('deletes', step_deletes),
+    ('rent changes', step_rents),
+    ('capacity checks', step_capacity),
+    ('archive runs', step_archive),
+    ('late payments', step_late_payments),
+    ('rate calendar', step_rates),
+)
+
+
+def drift(db):
+    """Drift reported by the reconciliation checks, one message per table that drifted."""
+    problems = []
+    for name, check in (('BOOKING_SUMMARY', db.check_booking_summary),
+                        ('HOTEL_DAILY/HOTEL_MONTHLY', db.check_hotel_daily),
+                        ('ledger', db.check_ledger)):
+        keys = check()
+        if keys:
+            problems.append(f"{name} drifted for {len(keys)} keys: {keys[:20]}")
+    return problems
+
+
+def check_consistency():
+    """Runs every step on a scratch database and returns a list of failure messages (empty on success)."""
+    failures = []
+    workdir = tempfile.mkdtemp()
+    db_name = os.path.join(workdir, 'consistency_check.db')
+    setup_database(db_name)
+    db = HotelDBManager(db_name)
+    state = {}
+    try:
+        for name, step in STEPS:
+            problems = step(db, state)
+            problems.extend(drift(db))
+            failures.extend(f"{name}: {problem}" for problem in problems)
+            print(f"{'❌' if problems else '✅'} {name}")
+    finally:
+        db.close()
+    return failures
+
+
+if __name__ == '__main__':
+    failures = check_consistency()
+    if failures:
+        print(f"❌ {len(failures)} consistency problem(s):")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("✅ BOOKING_SUMMARY, the rollups and the ledger match the base tables after every step.")
@@ -0,0 +1,239 @@
+"""Query-plan regression check for HotelDBManager.
+
+Builds a scratch database, calls every public HotelDBManager method, captures
+each SQL statement it runs and feeds it to EXPLAIN QUERY PLAN. The check fails
+(exit status 1) when a statement does a full table scan or sorts through a
+temporary B-tree, unless the method is listed in ALLOWED_FULL_SCANS.
+One old stay is archived first, so history reads are explained with an
+archive file attached.
+
+    python check_query_plans.py
+"""
+import inspect
+import os
+import re
+import sys
+import tempfile
+
+from archive import Archiver
+from db_manager import HotelDBManager, encode_cursor
+from db_setup import setup_database
+
+# Sample arguments for every method that touches the database. A public method
+# missing from here (and from NOT_QUERIES) fails the check, so new queries
+# cannot slip in without a plan review.
+SAMPLE_CALLS = {
+    'authenticate_user': ('alice123', 'wrong-password'),
+    'get_login': ('alice123',),
+    'update_login_password': ('bob123', '$2b$04$invalidinvalidinvalidinvalidinvalidinvalidinvalidinv'),
+    'get_booking_summary_report': (),
+    'get_all_hotels': (),
+    'get_hotel_by_id': (1,),
+    'add_hotel': ('Hotel C', '3-Star', 'Budget stay', 2500, 1),
+    'update_hotel': (3, 'Hotel C', '3-Star', 'Budget stay', 2600, 1),
+    'delete_hotel': (3,),
+    'get_all_customers': (),
+    'get_customer_id_by_email': ('tom@email.com',),
+    'create_customer_full': ('Spike', '9988776657', 'spike@email.com', None, 'Addr3'),
+    'delete_customer': (3,),
+    'get_customer_by_id': (1,),
+    'update_customer': (1, 'Tom', '9988776655', 'tom@email.com', 'Addr1'),
+    'add_booking': (1, 1, 'Single', 'Plan check', '2025-11-01', '2025-11-03'),
+    'create_booking_with_deposit': ('tom@email.com', 'Tom', '9988776655', 'Addr1', 1, 'Single',
+                                    'Plan check', '2025-12-01', '2025-12-03', 500),
+    'get_booking_by_id_detailed': (1,),
+    'update_booking': (1, 1, 'Single', 'Single room booking'),
+    'delete_payment': (3,),
+    'get_all_payments_detailed': (),
+    'get_payment_by_id': (1,),
+    'add_payment': (1, 100, '2025-10-03', 'Plan check'),
+    'update_payment': (1, 1, 5000, '2025-10-01', 'Payment for booking 1'),
+    'iter_export': ('payments',),
+    'rebuild_booking_summary': (),
+    'check_booking_summary': (),
+    'set_room_inventory': (1, 'Single', 5),
+    'set_room_inventories': (1, {'Double': 4, 'Suite': None}),
+    'get_room_inventory': (1,),
+    'is_available': (1, '2025-10-01', '2025-10-05', 'Single'),
+    'find_available_hotels': ('2025-10-01', '2025-10-05', 'Single'),
+    'rebuild_room_occupancy': (),
+    'get_catalogue': (),
+    'get_permissions': (),
+    'search': ('tom 99887',),
+    'rebuild_search_index': (),
+    'get_hotel_totals': ('2025-10-01', '2025-10-31'),
+    'get_daily_totals': ('2025-10-01', '2025-10-31'),
+    'get_room_counts': (),
+    'rebuild_hotel_daily': (),
+    'check_hotel_daily': (),
+    'rebuild_derived_tables': (),
+    'get_table_versions': (('HOTEL', 'BOOKING', 'PAYMENTS'),),
+    'get_bookings': (),
+    'create_hotels': ([{'hotl_name': 'Hotel D', 'hotl_type': '3-Star', 'hotl_rent': 2500, 'hotl_manager_id': 1}],),
+    'create_customers': ([{'cus_name': 'Tyke', 'cus_email': 'tyke@email.com'}],),
+    'create_bookings': ([{'book_cus_id': 1, 'book_hotel_id': 1, 'book_type': 'Single',
+                          'book_check_in': '2026-01-01', 'book_check_out': '2026-01-03', 'deposit': 500},
+                         {'cus_email': 'tom@email.com', 'book_hotel_id': 1, 'book_type': 'Double',
+                          'book_check_in': '2026-01-01', 'book_check_out': '2026-01-02'}],),
+    'create_payments': ([{'pay_cus_id': 1, 'pay_amt': 100, 'pay_date': '2025-10-04'}],),
+    'update_batch': ('BOOKING', [{'book_id': 1, 'book_type': 'Double', 'book_desc': 'Plan check'}]),
+    'get_archives': (),
+    'get_customer_history': (1,),
+    'get_balance': (1,),
+    'get_booking_balance': (1,),
+    'get_outstanding_balances': (),
+    'rebuild_ledger': (),
+    'check_ledger': (),
+    'get_rates': (1,),
+    'add_rate': (1, 9000, 'Suite', '2025-12-24', '2025-12-31', 0b1100000, 1, 'Plan check'),
+    'delete_rate': (1,),
+    'get_rate_calendar': (),
+}
+
+# Keyset-paginated variants of the list methods. These must never scan or sort,
+# whatever the method's entry in ALLOWED_FULL_SCANS says.
+PAGED_CALLS = [
+    ('get_all_hotels', {'limit': 10, 'sort': 'hotl_name', 'after': encode_cursor(['Hotel A', 1])}),
+    ('get_all_hotels', {'limit': 10, 'sort': 'hotl_rent', 'descending': True, 'after': encode_cursor([5000, 1])}),
+    ('get_all_hotels', {'limit': 10, 'sort': 'hotl_rent', 'after': encode_cursor([None, 1])}),
+    ('get_all_hotels', {'limit': 10, 'sort': 'hotl_rent', 'descending': True, 'after': encode_cursor([None, 9])}),
+    ('get_all_customers', {'limit': 10, 'sort': 'cus_name', 'after': encode_cursor(['Jerry', 2])}),
+    ('get_all_customers', {'limit': 10, 'after': encode_cursor([1, 1])}),
+    ('get_all_payments_detailed', {'limit': 10, 'after': encode_cursor(['2025-10-02', 2])}),
+    ('get_all_payments_detailed', {'limit': 10, 'after': encode_cursor([None, 2])}),
+    ('get_all_payments_detailed', {'limit': 10, 'sort': 'pay_id', 'after': encode_cursor([2, 2])}),
+    ('get_booking_summary_report', {'limit': 10, 'after': encode_cursor([1, 1])}),
+    ('get_bookings', {'limit': 10, 'descending': True, 'after': encode_cursor([2, 2])}),
+    ('get_bookings', {'limit': 10, 'after': encode_cursor([2, 2]), 'history': True}),
+    ('get_booking_by_id_detailed', {'book_id': 4, 'history': True}),
+    ('get_outstanding_balances', {'limit': 10, 'after': encode_cursor([15000, 1])}),
+    ('get_outstanding_balances', {'limit': 10, 'sort': 'cus_id', 'descending': False, 'after': encode_cursor([1, 1])}),
+]
+
+# Methods that do not issue SQL of their own.
+NOT_QUERIES = {'pool_stats', 'close', 'transaction', 'iter_rows', 'invalidate_catalogue', 'catalogue_cache_stats',
+               'invalidate_permissions', 'group_commit_stats', 'history', 'archive_path', 'replica_stats',
+               'read_pool', 'upgrade_archive', 'upgrade_archives'}
+
+# Methods whose purpose is to read a whole table; their scans are expected.
+ALLOWED_FULL_SCANS = {
+    'get_all_hotels': "lists the full hotel catalogue",
+    'get_all_customers': "lists every customer",
+    'get_all_payments_detailed': "lists every payment (walks idx_payments_date, no sort)",
+    'get_booking_summary_report': "reports on every booking",
+    'get_bookings': "first page walks BOOKING in rowid order (keyset pages are checked below)",
+    'iter_export': "streams a whole table for export",
+    'rebuild_booking_summary': "recomputes every BOOKING_SUMMARY row",
+    'check_booking_summary': "compares every BOOKING_SUMMARY row with the base tables",
+    'find_available_hotels': "checks every hotel (one occupancy range probe each)",
+    'rebuild_room_occupancy': "recomputes occupancy from every booking",
+    'get_catalogue': "loads the full hotel catalogue",
+    'get_permissions': "compiles every role's permissions (a handful of rows)",
+    'rebuild_search_index': "re-reads every base table into its FTS5 index",
+    'get_room_counts': "sums the room inventory of every hotel",
+    'rebuild_hotel_daily': "recomputes HOTEL_DAILY and HOTEL_MONTHLY from every booking and payment",
+    'check_hotel_daily': "compares every rollup row with the base tables",
+    'rebuild_derived_tables': "rebuilds every derived table",
+    'get_archives': "lists the archive registry (one row per year)",
+    'get_customer_history': "sorts one customer's stays from the hot table and every archive",
+    'rebuild_ledger': "recomputes BOOKING_LEDGER and CUSTOMER_LEDGER from every booking and payment",
+    'check_ledger': "reconciles every ledger row with the base tables and archives",
+    'get_rate_calendar': "loads every hotel rent and rate for the quote engine",
+}
+
+# Tables small enough by design to be read whole from any method.
+SMALL_TABLES = {
+    'ARCHIVE': "the archive registry (one row per year), read by every history() call",
+}
+
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+# FTS5 reads its own shadow tables ('main'.'X_FTS_config', ...) with statements
+# that show up in the trace but are not ours to index.
+FTS5_INTERNAL = re.compile(r"'main'\.'\w+_(config|data|idx|docsize|content)'")
+
+
+def _plan_problems(conn, sql):
+    """Returns the plan lines of one statement that indicate a scan or a sort."""
+    problems = []
+    for row in conn.execute(f"EXPLAIN QUERY PLAN {sql}"):
+        detail = row[3]
+        if detail.startswith('SCAN ') and 'USING' not in detail and 'VIRTUAL TABLE' not in detail \
+                and detail != 'SCAN CONSTANT ROW' and detail.split()[1] not in SMALL_TABLES:
+            problems.append(detail)
+        elif detail.startswith('USE TEMP B-TREE'):
+            problems.append(detail)
+    return problems
+
+
+def capture_statements(db):
+    """Calls every sampled method and returns [(label, allow_scans, [sql, ...])]."""
+    captured = []
+
+    connect = db.pool._connect
+
+    def traced_connect():
+        conn = connect()
+        conn.set_trace_callback(captured.append)
+        return conn
+
+    db.pool._connect = traced_connect
+
+    calls = [(name, SAMPLE_CALLS[name], {}, name in ALLOWED_FULL_SCANS) for name in sorted(SAMPLE_CALLS)]
+    calls += [(name, (), kwargs, False) for name, kwargs in PAGED_CALLS]
+
+    statements = []
+    for name, args, kwargs, allow_scans in calls:
+        del captured[:]
+        result = getattr(db, name)(*args, **kwargs)
+        if inspect.isgenerator(result):
+            for _ in result:
+                pass
+        label = f"{name}({', '.join(f'{k}={v!r}' for k, v in kwargs.items())})" if kwargs else name
+        statements.append((label, allow_scans, [sql for sql in captured
+                                                if sql.lstrip().upper().startswith(EXPLAINABLE)
+                                                and not FTS5_INTERNAL.search(sql)]))
+    return statements
+
+
+def check_query_plans():
+    """Runs the check and returns a list of failure messages (empty on success)."""
+    failures = []
+    public = {name for name, _ in inspect.getmembers(HotelDBManager, inspect.isfunction)
+              if not name.startswith('_')}
+    for name in sorted(public - set(SAMPLE_CALLS) - NOT_QUERIES):
+        failures.append(f"{name}: no sample call registered in check_query_plans.SAMPLE_CALLS")
+
+    workdir = tempfile.mkdtemp()
+    db_name = os.path.join(workdir, 'plan_check.db')
+    setup_database(db_name)
+    archiver_db = HotelDBManager(db_name)
+    try:
+        archiver_db.add_booking(1, 1, 'Single', 'Archived stay', '2020-01-01', '2020-01-03')
+        Archiver(archiver_db, pause=0).run('2021-01-01')
+    finally:
+        archiver_db.close()
+    db = HotelDBManager(db_name)
+    try:
+        statements = capture_statements(db)
+        # history() supplies the attached archives and the *_HISTORY views.
+        with db.history() as conn:
+            for name, allow_scans, sqls in statements:
+                if allow_scans:
+                    continue
+                for sql in sqls:
+                    for detail in _plan_problems(conn, sql):
+                        failures.append(f"{name}: {detail}\n    {' '.join(sql.split())}")
+    finally:
+        db.close()
+    return failures
+
+
+if __name__ == '__main__':
+    failures = check_query_plans()
+    if failures:
+        print(f"❌ {len(failures)} query plan problem(s):")
+        for failure in failures:
+            print(f"  - {failure}")
+        sys.exit(1)
+    print("✅ All HotelDBManager queries use indexed access paths.")
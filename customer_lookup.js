@@ -0,0 +1,77 @@
+// static/js/customer_lookup.js
+
+// As-you-type customer lookup for the booking form. Typing in the email, name
+// or mobile field suggests existing customers; picking one fills all four
+// customer fields so the booking is attached to that customer.
+document.addEventListener('DOMContentLoaded', function() {
+    const suggestions = document.getElementById('customerSuggestions');
+    if (!suggestions) {
+        return;
+    }
+
+    const lookupUrl = suggestions.dataset.lookupUrl;
+    const fields = {
+        cus_email: document.getElementById('customer_email'),
+        cus_name: document.getElementById('customer_name'),
+        cus_mobile: document.getElementById('customer_mobile'),
+        cus_add: document.getElementById('customer_address'),
+    };
+    let timer = null;
+    let latest = 0;
+
+    function clearSuggestions() {
+        suggestions.innerHTML = '';
+        suggestions.style.display = 'none';
+    }
+
+    function fill(customer) {
+        for (const column in fields) {
+            fields[column].value = customer[column] || '';
+        }
+        clearSuggestions();
+    }
+
+    function show(customers) {
+        clearSuggestions();
+        customers.forEach(function(customer) {
+            const item = document.createElement('li');
+            item.textContent = `${customer.cus_name} · ${customer.cus_mobile} · ${customer.cus_email}`;
+            item.style.cursor = 'pointer';
+            item.addEventListener('mousedown', function(event) {
+                event.preventDefault();  // keep focus so blur does not hide the list first
+                fill(customer);
+            });
+            suggestions.appendChild(item);
+        });
+        suggestions.style.display = customers.length ? 'block' : 'none';
+    }
+
+    function lookup(text) {
+        // Only the newest request may update the list; slower earlier ones are dropped.
+        const requestId = ++latest;
+        fetch(`${lookupUrl}?q=${encodeURIComponent(text)}`, {credentials: 'same-origin'})
+            .then(function(response) { return response.ok ? response.json() : {customers: []}; })
+            .then(function(data) {
+                if (requestId === latest) {
+                    show(data.customers || []);
+                }
+            })
+            .catch(clearSuggestions);
+    }
+
+    ['cus_email', 'cus_name', 'cus_mobile'].forEach(function(column) {
+        const input = fields[column];
+        input.setAttribute('autocomplete', 'off');
+        input.addEventListener('input', function() {
+            clearTimeout(timer);
+            const text = input.value.trim();
+            if (text.length < 2) {
+                latest++;
+                clearSuggestions();
+                return;
+            }
+            timer = setTimeout(function() { lookup(text); }, 150);
+        });
+        input.addEventListener('blur', clearSuggestions);
+    });
+});
@@ -1,124 +1,1720 @@
-import sqlite3
-import bcrypt
-
-class HotelDBManager:
-    """Manages all database interactions for the Hotel Booking System."""
-    
-    def __init__(self, db_name='hotel_booking.db'):
-        self.db_name = db_name
-
-    def _execute(self, query, params=(), fetch_one=False):
-        """Internal method to handle connection, execution, and closing."""
-        conn = None
-        try:
-            conn = sqlite3.connect(self.db_name)
-            conn.row_factory = sqlite3.Row
-            cursor = conn.cursor()
-            cursor.execute(query, params)
-            
-            if query.strip().upper().startswith(("SELECT", "PRAGMA", "WITH")):
-                return cursor.fetchone() if fetch_one else cursor.fetchall()
-            else:
-                conn.commit()
-                return True
-
-        except sqlite3.Error as e:
-            # Uncomment the line below temporarily if you need to debug a database error
-            # print(f"Database Error: {e}") 
-            if conn:
-                conn.rollback()
-            return False
-
-        finally:
-            if conn:
-                conn.close()
-
-    # --- Authentication ---
-    def authenticate_user(self, username, password):
-        query = "SELECT L.user_password, R.role_name FROM LOGIN L JOIN ROLES R ON L.login_role_id = R.role_id WHERE L.login_username = ?"
-        user_record = self._execute(query, (username,), fetch_one=True)
-        
-        if user_record:
-            hashed_password = user_record['user_password'].encode('utf-8')
-            if bcrypt.checkpw(password.encode('utf-8'), hashed_password):
-                return user_record 
-        return None
-
-    # --- Reporting ---
-    def get_booking_summary_report(self):
-        """Uses the corrected BookingSummary VIEW."""
-        return self._execute("SELECT * FROM BookingSummary;")
-    
-    # --- Hotel CRUD Operations ---
-    def get_all_hotels(self):
-        return self._execute("SELECT hotl_id, hotl_name, hotl_type, hotl_rent, hotl_manager_id FROM HOTEL;")
-    def get_hotel_by_id(self, hotel_id):
-        return self._execute("SELECT * FROM HOTEL WHERE hotl_id = ?", (hotel_id,), fetch_one=True)
-    def add_hotel(self, name, type, desc, rent, manager_id):
-        query = "INSERT INTO HOTEL (hotl_name, hotl_type, hotl_desc, hotl_rent, hotl_manager_id) VALUES (?, ?, ?, ?, ?)"
-        return self._execute(query, (name, type, desc, rent, manager_id))
-    def update_hotel(self, hotel_id, name, type, desc, rent, manager_id):
-        query = "UPDATE HOTEL SET hotl_name=?, hotl_type=?, hotl_desc=?, hotl_rent=?, hotl_manager_id=? WHERE hotl_id=?"
-        return self._execute(query, (name, type, desc, rent, manager_id, hotel_id))
-    def delete_hotel(self, hotel_id):
-        return self._execute("DELETE FROM HOTEL WHERE hotl_id = ?", (hotel_id,))
-
-    # --- Customer CRUD Operations ---
-    def get_all_customers(self):
-        return self._execute("SELECT cus_id, cus_name, cus_mobile, cus_email, cus_add FROM CUSTOMER;")
-    
-    def get_customer_id_by_email(self, email):
-        """Retrieves customer ID based on email address."""
-        query = "SELECT cus_id FROM CUSTOMER WHERE cus_email = ?"
-        result = self._execute(query, (email,), fetch_one=True)
-        return result['cus_id'] if result else None
-    
-    def create_customer_full(self, name, mobile, email, password, address):
-        """Inserts a new customer with all fields (Used by add_booking)."""
-        query = """
-        INSERT INTO CUSTOMER (cus_name, cus_mobile, cus_email, cus_pass, cus_add) 
-        VALUES (?, ?, ?, ?, ?);
-        """
-        default_pass = "temporary" 
-        
-        # NOTE: Using 'name' from the form, which may be None if not provided
-        return self._execute(query, (name, mobile, email, default_pass, address))
-
-    def delete_customer(self, cus_id):
-        """Deletes a customer record. (Will fail on active FKs)."""
-        query = "DELETE FROM CUSTOMER WHERE cus_id = ?"
-        return self._execute(query, (cus_id,))
-    
-    def get_customer_by_id(self, cus_id):
-        return self._execute("SELECT * FROM CUSTOMER WHERE cus_id = ?", (cus_id,), fetch_one=True)
-    
-    def update_customer(self, cus_id, name, mobile, email, address):
-        query = "UPDATE CUSTOMER SET cus_name=?, cus_mobile=?, cus_email=?, cus_add=? WHERE cus_id=?"
-        return self._execute(query, (name, mobile, email, address, cus_id))
-
-    # --- Booking CRUD Operations ---
-    def add_booking(self, cus_id, hotl_id, book_type, desc, check_in, check_out):
-        query = "INSERT INTO BOOKING (book_cus_id, book_hotel_id, book_type, book_desc, book_check_in, book_check_out) VALUES (?, ?, ?, ?, ?, ?)"
-        return self._execute(query, (cus_id, hotl_id, book_type, desc, check_in, check_out))
-    def get_booking_by_id_detailed(self, book_id):
-        query = "SELECT B.*, C.cus_name AS Customer_Name, H.hotl_name AS Hotel_Name FROM BOOKING B JOIN CUSTOMER C ON B.book_cus_id = C.cus_id JOIN HOTEL H ON B.book_hotel_id = H.hotl_id WHERE B.book_id = ?"
-        return self._execute(query, (book_id,), fetch_one=True)
-    def update_booking(self, book_id, hotl_id, book_type, desc):
-        query = "UPDATE BOOKING SET book_hotel_id=?, book_type=?, book_desc=? WHERE book_id=?"
-        return self._execute(query, (hotl_id, book_type, desc, book_id))
-        
-    # --- Payment CRUD Operations ---
-    def delete_payment(self, pay_id):
-        query = "DELETE FROM PAYMENTS WHERE pay_id = ?"
-        return self._execute(query, (pay_id,))
-    def get_all_payments_detailed(self):
-        query = "SELECT P.*, C.cus_name AS Customer_Name FROM PAYMENTS P JOIN CUSTOMER C ON P.pay_cus_id = C.cus_id ORDER BY P.pay_date DESC"
-        return self._execute(query)
-    def get_payment_by_id(self, pay_id):
-        return self._execute("SELECT * FROM PAYMENTS WHERE pay_id = ?", (pay_id,), fetch_one=True)
-    def add_payment(self, cus_id, amount, date, desc):
-        query = "INSERT INTO PAYMENTS (pay_cus_id, pay_amt, pay_date, pay_desc) VALUES (?, ?, ?, ?)"
-        return self._execute(query, (cus_id, amount, date, desc))
-    def update_payment(self, pay_id, cus_id, amount, date, desc):
-        query = "UPDATE PAYMENTS SET pay_cus_id=?, pay_amt=?, pay_date=?, pay_desc=? WHERE pay_id=?"
-        return self._execute(query, (cus_id, amount, date, desc, pay_id))
\ No newline at end of file
+import base64
+import json
+import logging
+import os
+import queue
+import re
+import sqlite3
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timezone
+import bcrypt
+
+from group_commit import GroupCommitWriter
+from instrumentation import InstrumentedConnection, caller_method
+from replica import ReplicaSet
+
+logger = logging.getLogger('hotel_booking.db')
+
+# --- Keyset Pagination Helpers ---
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+class Page(list):
+    """A list of rows plus the cursor token for the next page (None on the last page)."""
+
+    def __init__(self, rows=(), next_cursor=None):
+        super().__init__(rows)
+        self.next_cursor = next_cursor
+
+def encode_cursor(values):
+    """Packs the last row's sort key into an opaque, URL-safe token."""
+    raw = json.dumps(values, separators=(',', ':')).encode('utf-8')
+    return base64.urlsafe_b64encode(raw).decode('ascii').rstrip('=')
+
+def decode_cursor(token):
+    """Reverses encode_cursor(). Raises ValueError for malformed tokens."""
+    try:
+        raw = base64.urlsafe_b64decode(token + '=' * (-len(token) % 4))
+        values = json.loads(raw)
+    except (ValueError, TypeError) as e:
+        raise ValueError(f"Invalid page cursor: {token!r}") from e
+    if not isinstance(values, list) or len(values) != 2:
+        raise ValueError(f"Invalid page cursor: {token!r}")
+    return values
+
+
+# --- Availability Helpers ---
+ROOM_TYPES = ('Single', 'Double', 'Suite', 'Family')
+MAX_STAY_NIGHTS = 365
+
+class RoomUnavailableError(Exception):
+    """Raised when a booking would exceed a hotel's room inventory on some night."""
+
+class BatchError(Exception):
+    """A batch write failed at item `index`; nothing in the batch was written."""
+
+    def __init__(self, index, message):
+        super().__init__(f"Item {index}: {message}")
+        self.index = index
+        self.message = message
+
+def parse_stay(check_in, check_out):
+    """Validates ISO (YYYY-MM-DD) check-in/check-out dates and returns them as date objects.
+
+    Raises ValueError with a user-facing message for malformed or out-of-range stays.
+    The range limit matches the CALENDAR table (2000-2099) that occupancy is built from.
+    """
+    try:
+        start = date.fromisoformat(str(check_in))
+        end = date.fromisoformat(str(check_out))
+    except ValueError:
+        raise ValueError("Dates must be in YYYY-MM-DD format.")
+    if end <= start:
+        raise ValueError("Check-out date must be after the check-in date.")
+    if (end - start).days > MAX_STAY_NIGHTS:
+        raise ValueError(f"Stays are limited to {MAX_STAY_NIGHTS} nights.")
+    if start.year < 2000 or end.year > 2099:
+        raise ValueError("Dates must fall between 2000 and 2099.")
+    return start, end
+
+
+# --- Derived Data ---
+# Triggers that only maintain derived tables (summaries, occupancy, versions). Bulk
+# loads may drop them and call HotelDBManager.rebuild_derived_tables() afterwards.
+# Integrity triggers (e.g. trg_payments_book_owner_*) are never in this list.
+DERIVED_TRIGGER_PREFIXES = ('trg_summary_', 'trg_occupancy_', 'trg_version_', 'trg_search_', 'trg_rollup_',
+                            'trg_ledger_')
+
+# --- Archives ---
+# Columns copied into the per-year archive files (archive.py) and exposed, together
+# with `archived_year`, by the BOOKING_HISTORY/PAYMENTS_HISTORY views of history().
+ARCHIVED_COLUMNS = {
+    'BOOKING': ('book_id', 'book_desc', 'book_type', 'book_cus_id', 'book_hotel_id', 'book_check_in', 'book_check_out',
+                'book_total'),
+    'PAYMENTS': ('pay_id', 'pay_cus_id', 'pay_amt', 'pay_date', 'pay_desc', 'pay_book_id'),
+}
+# Columns added to ARCHIVED_COLUMNS after archive files were first written, with their
+# SQL types; upgrade_archive() adds them to older files.
+ARCHIVE_ADDED_COLUMNS = {'BOOKING': (('book_total', 'REAL'),)}
+ARCHIVE_KEYS = {'BOOKING': 'book_id', 'PAYMENTS': 'pay_id'}
+# Bookings per PAYMENTS_HISTORY lookup in get_customer_history (well under SQLite's bound-parameter limit).
+HISTORY_ID_CHUNK = 500
+
+# --- Catalogue Cache ---
+# An immutable snapshot of the hotel list. `version` is TABLE_VERSION's counter for
+# HOTEL, `changed_at` the UTC time of that change, `checked_at` when it was last validated.
+CatalogueSnapshot = namedtuple('CatalogueSnapshot', 'version changed_at hotels checked_at')
+
+# --- Rate Calendar ---
+# RATE.rate_weekdays is a bitmask over the night's weekday: bit 0 = Monday ... bit 6 = Sunday.
+WEEKDAYS = ('Mon', 'Tue', 'Wed', 'Thu', 'Fri', 'Sat', 'Sun')
+ALL_WEEKDAYS = 0b1111111
+WEEKEND = 0b1100000
+
+def weekday_names(mask):
+    """'Every night' or the weekdays of a rate_weekdays mask, e.g. 'Sat, Sun'."""
+    if mask == ALL_WEEKDAYS:
+        return 'Every night'
+    return ', '.join(day for bit, day in enumerate(WEEKDAYS) if mask & 1 << bit)
+
+# Everything the quote engine prices from, read in one transaction: `versions` is
+# {'HOTEL': n, 'RATE': n}, `hotels` (hotl_id, hotl_rent) rows, `rates` RATE rows in
+# the order they apply (lowest priority first, newest last within a priority).
+RateCalendar = namedtuple('RateCalendar', 'versions hotels rates')
+
+# --- Full-Text Search ---
+SEARCH_MAX_TERMS = 8
+SEARCH_MIN_TERM_LENGTH = 2   # shorter prefixes are not in the FTS5 prefix indexes
+# bm25 has to score every match, so queries matching more rows than this are
+# returned newest first instead (a front-desk search that broad is refined anyway).
+SEARCH_RANK_LIMIT = 2000
+
+def build_match_query(text):
+    """Turns free text into an FTS5 query where every word must match as a prefix.
+
+    Only word characters survive, so user input can never inject FTS5 syntax.
+    Returns None when nothing searchable is left.
+    """
+    terms = [term for term in re.findall(r'\w+', text.lower()) if len(term) >= SEARCH_MIN_TERM_LENGTH]
+    return ' '.join(f'"{term}"*' for term in terms[:SEARCH_MAX_TERMS]) or None
+
+# --- Permissions ---
+# Each PERMISSION.per_module a route can require is one bit; 'All' grants every bit.
+PERMISSION_MODULES = ('Hotels', 'Bookings', 'Customers', 'Payments', 'Reports')
+ALL_PERMISSIONS = (1 << len(PERMISSION_MODULES)) - 1
+
+def permission_bit(module):
+    """Bit for one of PERMISSION_MODULES. Raises ValueError for unknown modules."""
+    return 1 << PERMISSION_MODULES.index(module)
+
+def compile_permissions(modules):
+    """Folds per_module values into a bitmask; unknown modules grant nothing."""
+    mask = 0
+    for module in modules:
+        if module == 'All':
+            mask |= ALL_PERMISSIONS
+        elif module in PERMISSION_MODULES:
+            mask |= permission_bit(module)
+    return mask
+
+# Role name -> bitmask for every role, tagged with TABLE_VERSION's 'PERMISSION' counter.
+PermissionSnapshot = namedtuple('PermissionSnapshot', 'version masks checked_at')
+
+
+class ConnectionPool:
+    """Bounded pool of tuned SQLite connections shared across request threads."""
+
+    # Applied to every new connection. WAL lets readers run alongside the single
+    # writer; synchronous=NORMAL is durable in WAL mode and avoids an fsync per commit.
+    PRAGMAS = (
+        "PRAGMA journal_mode = WAL;",
+        "PRAGMA synchronous = NORMAL;",
+        "PRAGMA cache_size = -16000;",      # ~16 MB page cache per connection
+        "PRAGMA mmap_size = 268435456;",    # 256 MB memory-mapped I/O
+        "PRAGMA temp_store = MEMORY;",
+    )
+
+    def __init__(self, db_name, max_size=8, timeout=10.0, statement_cache_size=256,
+                 health_check_interval=30.0, factory=InstrumentedConnection):
+        self.db_name = db_name
+        self.factory = factory  # sqlite3.Connection turns query instrumentation off
+        self.max_size = max_size
+        self.timeout = timeout
+        self.statement_cache_size = statement_cache_size
+        self.health_check_interval = health_check_interval
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self):
+        """(Re)initializes pool state. Also used after a fork so children never share sockets/files."""
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._open = 0
+        self._stats = {'checkouts': 0, 'waits': 0, 'opened': 0, 'closed': 0, 'health_check_failures': 0}
+
+    def _connect(self):
+        conn = sqlite3.connect(
+            self.db_name,
+            timeout=self.timeout,
+            check_same_thread=False,
+            isolation_level=None,  # autocommit; transactions are opened explicitly
+            cached_statements=self.statement_cache_size,
+            factory=self.factory,
+        )
+        conn.row_factory = sqlite3.Row
+        for pragma in self.PRAGMAS:
+            conn.execute(pragma)
+        with self._lock:
+            self._stats['opened'] += 1
+        return conn
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except sqlite3.Error:
+            pass
+        with self._lock:
+            self._open -= 1
+            self._stats['closed'] += 1
+
+    def _is_healthy(self, conn):
+        try:
+            conn.execute("SELECT 1").fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def acquire(self):
+        """Checks out a connection, opening a new one while under max_size, else waiting."""
+        if os.getpid() != self._pid:
+            with self._lock:
+                self._reset()
+
+        try:
+            conn, last_used = self._idle.get_nowait()
+        except queue.Empty:
+            with self._lock:
+                can_open = self._open < self.max_size
+                if can_open:
+                    self._open += 1
+                else:
+                    self._stats['waits'] += 1
+            if can_open:
+                try:
+                    conn = self._connect()
+                except sqlite3.Error:
+                    with self._lock:
+                        self._open -= 1
+                    raise
+                last_used = time.monotonic()
+            else:
+                try:
+                    conn, last_used = self._idle.get(timeout=self.timeout)
+                except queue.Empty:
+                    raise sqlite3.OperationalError("connection pool exhausted")
+
+        if time.monotonic() - last_used > self.health_check_interval and not self._is_healthy(conn):
+            with self._lock:
+                self._stats['health_check_failures'] += 1
+            self._discard(conn)
+            with self._lock:
+                self._open += 1
+            try:
+                conn = self._connect()
+            except sqlite3.Error:
+                with self._lock:
+                    self._open -= 1
+                raise
+
+        with self._lock:
+            self._stats['checkouts'] += 1
+        return conn
+
+    def release(self, conn):
+        """Returns a connection to the pool, rolling back anything left open."""
+        if os.getpid() != self._pid:
+            return
+        try:
+            if conn.in_transaction:
+                conn.rollback()
+        except sqlite3.Error:
+            self._discard(conn)
+            return
+        self._idle.put((conn, time.monotonic()))
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        """Closes every idle connection (e.g. before the database file is replaced)."""
+        while True:
+            try:
+                conn, _ = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(conn)
+
+    def stats(self):
+        with self._lock:
+            stats = dict(self._stats)
+            stats['open'] = self._open
+        stats['idle'] = self._idle.qsize()
+        stats['in_use'] = stats['open'] - stats['idle']
+        stats['max_size'] = self.max_size
+        return stats
+
+
+class ReplicaPool(ConnectionPool):
+    """Pool over a read-replica snapshot copy (replica.py); its connections can only read."""
+
+    PRAGMAS = ConnectionPool.PRAGMAS + ("PRAGMA query_only = ON;",)
+
+
+# since= value for replica-routed reads that must see every committed write.
+PRIMARY = float('inf')
+
+
+class HotelDBManager:
+    """Manages all database interactions for the Hotel Booking System."""
+    
+    def __init__(self, db_name='hotel_booking.db', catalogue_ttl=1.0, permissions_ttl=1.0, group_commit=False,
+                 replicas=0, **pool_options):
+        self.db_name = db_name
+        self.pool = ConnectionPool(db_name, **pool_options)
+        # replicas: a number of snapshot copies, or a dict of ReplicaSet options, that serve
+        # the heavy report reads (see replica.py); 0 keeps every read on this database.
+        if replicas:
+            options = replicas if isinstance(replicas, dict) else {'count': replicas}
+            self.replicas = ReplicaSet(db_name, ReplicaPool, **options)
+        else:
+            self.replicas = None
+        # group_commit: True, or a dict of GroupCommitWriter options (max_batch, max_delay, max_queue),
+        # sends every write through one writer thread that commits them in batches.
+        if group_commit:
+            self.writer = GroupCommitWriter(self.pool, **(group_commit if isinstance(group_commit, dict) else {}))
+        else:
+            self.writer = None
+        # Seconds a catalogue snapshot is trusted before its version is re-checked,
+        # which is how writes from other processes are picked up.
+        self.catalogue_ttl = catalogue_ttl
+        self._catalogue = None
+        self._catalogue_lock = threading.Lock()
+        self._catalogue_stats = {'hits': 0, 'misses': 0, 'version_checks': 0, 'invalidations': 0}
+        self.permissions_ttl = permissions_ttl
+        self._permissions = None
+        self._permissions_lock = threading.Lock()
+
+    def _execute(self, query, params=(), fetch_one=False, pool=None):
+        """Internal method to run one statement on a pooled connection (from `pool`, default the primary's)."""
+        is_read = query.strip().upper().startswith(("SELECT", "PRAGMA", "WITH"))
+        if not is_read and self.writer is not None:
+            try:
+                self._write(lambda conn: conn.execute(query, params))
+                return True
+            except sqlite3.Error as e:
+                logger.warning("Database error: %s\n  %s", e, ' '.join(query.split()))
+                return False
+
+        pool = pool or self.pool
+        conn = None
+        try:
+            conn = pool.acquire()
+            cursor = conn.execute(query, params)
+            
+            if is_read:
+                result = cursor.fetchone() if fetch_one else cursor.fetchall()
+                cursor.close()  # records the statement's timing before the connection goes back
+                return result
+            else:
+                # Connections run in autocommit mode, so the write is already committed.
+                return True
+
+        except sqlite3.Error as e:
+            logger.warning("Database error: %s\n  %s", e, ' '.join(query.split()))
+            if conn and conn.in_transaction:
+                conn.rollback()
+            return False
+
+        finally:
+            if conn:
+                pool.release(conn)
+
+    def read_pool(self, since=None):
+        """The pool a heavy read runs on: a replica whose snapshot is fresh enough, else the primary.
+
+        `since` is the time.time() of the caller's last write (read-your-writes);
+        PRIMARY always reads the primary. Callers whose reads must agree (e.g.
+        TABLE_VERSION and the rows it versions) pick one pool and pass it as `pool`.
+        """
+        if self.replicas is None or since == PRIMARY:
+            return self.pool
+        return self.replicas.pool_for(since) or self.pool
+
+    def _write(self, work):
+        """Runs work(conn) in a write transaction and returns its result.
+
+        With group commit on, the work is queued for the writer thread and may
+        share a commit with other callers' writes. Either way it has been
+        committed, or its exception re-raised here, when this returns.
+        """
+        if self.writer is None:
+            with self.transaction() as conn:
+                return work(conn)
+        return self.writer.submit(work, caller_method(1)).result()
+
+    def pool_stats(self):
+        """Connection pool counters: checkouts, waits, open/idle/in-use connections."""
+        return self.pool.stats()
+
+    def group_commit_stats(self):
+        """Group-commit writer counters (operations, batches, queue depth); empty when it is off."""
+        return self.writer.stats() if self.writer is not None else {}
+
+    def replica_stats(self):
+        """Read-replica routing and refresh counters; empty when there are no replicas."""
+        return self.replicas.stats() if self.replicas is not None else {}
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+        if self.replicas is not None:
+            self.replicas.close()
+        self.pool.close()
+
+    # --- Keyset Pagination / Streaming ---
+    def _keyset_page(self, select, id_key, sort_columns, sort, after, limit, descending, params=(), history=False,
+                     pool=None, where=None):
+        """Runs `select` as one keyset (seek) page.
+
+        sort_columns maps each allowed sort name (also the result column name)
+        to its SQL expression; every one of them must be indexed. Rows are
+        ordered by (sort, id) so the cursor is unique even for duplicate values.
+        SQLite sorts NULLs first ascending and last descending; a page that
+        crosses between NULL and non-NULL sort values is read as two seeks.
+        history=True runs it on a history() connection; `pool` picks another
+        pool (a replica's, see read_pool()). `where` is a fixed filter
+        (without parameters) that every page applies.
+        """
+        if sort not in sort_columns:
+            raise ValueError(f"Unsupported sort column: {sort!r}")
+        column = sort_columns[sort]
+        id_column = sort_columns[id_key]
+        limit = max(1, min(int(limit or DEFAULT_PAGE_SIZE), MAX_PAGE_SIZE))
+        direction, op = ('DESC', '<') if descending else ('ASC', '>')
+
+        # Each seek is (conditions, params); they are read in order until the page is full.
+        if not after:
+            seeks = [([], [])]
+        else:
+            sort_value, last_id = decode_cursor(after)
+            if column == id_column:
+                seeks = [([f"{id_column} {op} ?"], [last_id])]
+            elif sort_value is None:
+                seeks = [([f"{column} IS NULL", f"{id_column} {op} ?"], [last_id])]
+                if not descending:
+                    seeks.append(([f"{column} IS NOT NULL"], []))
+            else:
+                seeks = [([f"({column}, {id_column}) {op} (?, ?)"], [sort_value, last_id])]
+                if descending:
+                    seeks.append(([f"{column} IS NULL"], []))
+
+        if column == id_column:
+            order = f" ORDER BY {id_column} {direction}"
+        else:
+            order = f" ORDER BY {column} {direction}, {id_column} {direction}"
+
+        rows = []
+        for conditions, seek_params in seeks:
+            conditions = ([where] if where else []) + conditions
+            where_sql = f" WHERE {' AND '.join(conditions)}" if conditions else ''
+            query = f"{select}{where_sql}{order} LIMIT ?"
+            query_params = list(params) + seek_params + [limit + 1 - len(rows)]
+            if history:
+                found = self._read_history(query, query_params)
+            else:
+                found = self._execute(query, query_params, pool=pool)
+            if found is False:
+                return False
+            rows.extend(found)
+            if len(rows) > limit:
+                break
+
+        page = Page(rows[:limit])
+        if len(rows) > limit:
+            last = rows[limit - 1]
+            page.next_cursor = encode_cursor([last[sort], last[id_key]])
+        return page
+
+    def iter_rows(self, query, params=(), chunk_size=1000, pool=None):
+        """Yields the rows of a SELECT in chunks so memory stays flat for any table size.
+
+        The pooled connection (from `pool`, default the primary's) is held until
+        the generator is exhausted or closed.
+        """
+        with (pool or self.pool).connection() as conn:
+            cursor = conn.execute(query, params)
+            try:
+                while True:
+                    rows = cursor.fetchmany(chunk_size)
+                    if not rows:
+                        break
+                    yield from rows
+            finally:
+                cursor.close()
+
+    # --- Transactions ---
+    @contextmanager
+    def transaction(self, history=False):
+        """Runs a unit of work on one pooled connection with a single commit.
+
+        BEGIN IMMEDIATE takes the write lock up front, so read-then-write steps
+        inside the block cannot interleave with another writer. Any exception
+        rolls the whole unit back and is re-raised to the caller. With
+        history=True the connection is a history() one (archives attached).
+        """
+        with (self.history() if history else self.pool.connection()) as conn:
+            conn.execute("BEGIN IMMEDIATE;")
+            try:
+                yield conn
+            except BaseException:
+                conn.rollback()
+                raise
+            else:
+                conn.commit()
+
+    # --- Archive History ---
+    def get_archives(self):
+        """ARCHIVE registry rows (ar_year, ar_file, ar_bookings, ar_payments, ar_updated_at), oldest year first."""
+        return self._execute("SELECT * FROM ARCHIVE ORDER BY ar_year")
+
+    def archive_path(self, file_name):
+        """Absolute path of an archive file; ARCHIVE.ar_file is relative to the main database's directory."""
+        return os.path.join(os.path.dirname(os.path.abspath(self.db_name)), file_name)
+
+    @staticmethod
+    def upgrade_archive(conn, schema):
+        """Adds the ARCHIVE_ADDED_COLUMNS that the archive file attached as `schema` lacks."""
+        for table, columns in ARCHIVE_ADDED_COLUMNS.items():
+            present = {row[1] for row in conn.execute(f"PRAGMA {schema}.table_info({table})")}
+            for column, kind in columns:
+                if column not in present:
+                    conn.execute(f"ALTER TABLE {schema}.{table} ADD COLUMN {column} {kind}")
+
+    def upgrade_archives(self):
+        """Runs upgrade_archive() on every registered archive file. Returns True, or False on error."""
+        try:
+            with self.pool.connection() as conn:
+                for row in self.get_archives() or ():
+                    path = self.archive_path(row['ar_file'])
+                    if not os.path.exists(path):
+                        continue
+                    conn.execute("ATTACH DATABASE ? AS upgrade", (path,))
+                    try:
+                        self.upgrade_archive(conn, 'upgrade')
+                    finally:
+                        conn.execute("DETACH DATABASE upgrade")
+            return True
+        except sqlite3.Error as e:
+            logger.warning("Archive upgrade failed: %s", e)
+            return False
+
+    @staticmethod
+    def _history_view(conn, table, schemas):
+        """(Re)creates the temp view <table>_HISTORY over the hot table and the attached archives.
+
+        An archive row whose key is still in the hot table (copied, not yet
+        deleted by the archiver) is hidden, so every row appears exactly once.
+        """
+        columns = ', '.join(ARCHIVED_COLUMNS[table])
+        key = ARCHIVE_KEYS[table]
+        arms = [f"SELECT {columns}, NULL AS archived_year FROM main.{table}"]
+        arms += [f"SELECT {columns}, {year} AS archived_year FROM {schema}.{table} A "
+                 f"WHERE NOT EXISTS (SELECT 1 FROM main.{table} M WHERE M.{key} = A.{key})"
+                 for year, schema in schemas]
+        conn.execute(f"DROP VIEW IF EXISTS temp.{table}_HISTORY")
+        conn.execute(f"CREATE TEMP VIEW {table}_HISTORY AS {' UNION ALL '.join(arms)}")
+
+    @contextmanager
+    def history(self):
+        """A pooled connection that can read archived bookings and payments.
+
+        Every archive file in the ARCHIVE registry is ATTACHed (as archive_<year>)
+        and the temp views BOOKING_HISTORY and PAYMENTS_HISTORY combine it with
+        the hot table, adding an `archived_year` column (NULL for hot rows).
+        Everything is detached again before the connection goes back to the pool.
+        Raises sqlite3.OperationalError when there are more archives than SQLite
+        can attach at once.
+        """
+        archives = [row for row in self.get_archives() or ()
+                    if os.path.exists(self.archive_path(row['ar_file']))]
+        with self.pool.connection() as conn:
+            limit = conn.getlimit(sqlite3.SQLITE_LIMIT_ATTACHED)
+            if len(archives) > limit:
+                raise sqlite3.OperationalError(
+                    f"{len(archives)} archive files exceed SQLite's limit of {limit} attached databases")
+            schemas = []
+            try:
+                for row in archives:
+                    schema = f"archive_{row['ar_year']}"
+                    conn.execute(f"ATTACH DATABASE ? AS {schema}", (self.archive_path(row['ar_file']),))
+                    schemas.append((row['ar_year'], schema))
+                for table in ARCHIVED_COLUMNS:
+                    self._history_view(conn, table, schemas)
+                yield conn
+            finally:
+                if conn.in_transaction:
+                    conn.rollback()
+                for table in ARCHIVED_COLUMNS:
+                    conn.execute(f"DROP VIEW IF EXISTS temp.{table}_HISTORY")
+                for _, schema in schemas:
+                    conn.execute(f"DETACH DATABASE {schema}")
+
+    def _read_history(self, query, params=(), fetch_one=False):
+        """_execute() for a SELECT that reads BOOKING_HISTORY/PAYMENTS_HISTORY. False on error."""
+        try:
+            with self.history() as conn:
+                cursor = conn.execute(query, params)
+                result = cursor.fetchone() if fetch_one else cursor.fetchall()
+                cursor.close()
+                return result
+        except sqlite3.Error as e:
+            logger.warning("Database error: %s\n  %s", e, ' '.join(query.split()))
+            return False
+
+    def get_customer_history(self, cus_id):
+        """Every stay of a customer, hot and archived, newest first, with what was paid for each.
+
+        Rows (dicts) carry Hotel_Name, Payment_Amount and archived_year (None while
+        the booking is still in the hot tables). False on error.
+        """
+        stays_query = """
+        SELECT B.book_id, B.book_hotel_id, H.hotl_name AS Hotel_Name, B.book_type, B.book_desc,
+               B.book_check_in, B.book_check_out, B.archived_year
+        FROM BOOKING_HISTORY B LEFT JOIN HOTEL H ON H.hotl_id = B.book_hotel_id
+        WHERE B.book_cus_id = ?
+        ORDER BY B.book_check_in DESC, B.book_id DESC
+        """
+        try:
+            with self.history() as conn:
+                stays = [dict(row) for row in conn.execute(stays_query, (cus_id,))]
+                paid = {}
+                # A literal id list (unlike a subquery or a correlated lookup) is pushed
+                # into every arm of PAYMENTS_HISTORY and uses each idx_payments_book_id.
+                for start in range(0, len(stays), HISTORY_ID_CHUNK):
+                    ids = [stay['book_id'] for stay in stays[start:start + HISTORY_ID_CHUNK]]
+                    paid.update(conn.execute(
+                        f"SELECT pay_book_id, SUM(pay_amt) FROM PAYMENTS_HISTORY "
+                        f"WHERE pay_book_id IN ({', '.join('?' * len(ids))}) GROUP BY pay_book_id", ids).fetchall())
+                for stay in stays:
+                    stay['Payment_Amount'] = paid.get(stay['book_id'], 0)
+                return stays
+        except sqlite3.Error as e:
+            logger.warning("Database error: %s\n  %s", e, ' '.join(stays_query.split()))
+            return False
+
+    # --- Authentication ---
+    def get_login(self, username):
+        """The login row (user_password, role_name) for `username`, without checking the password."""
+        query = "SELECT L.user_password, R.role_name FROM LOGIN L JOIN ROLES R ON L.login_role_id = R.role_id WHERE L.login_username = ?"
+        return self._execute(query, (username,), fetch_one=True)
+
+    def update_login_password(self, username, hashed_password):
+        """Stores a new password hash (e.g. after a bcrypt cost change)."""
+        return self._execute("UPDATE LOGIN SET user_password = ? WHERE login_username = ?", (hashed_password, username))
+
+    def authenticate_user(self, username, password):
+        """Synchronous check; the web app goes through auth.Authenticator instead."""
+        user_record = self.get_login(username)
+        
+        if user_record:
+            hashed_password = user_record['user_password'].encode('utf-8')
+            if bcrypt.checkpw(password.encode('utf-8'), hashed_password):
+                return user_record 
+        return None
+
+    # --- Reporting ---
+    BOOKING_SORTS = {'book_id': 'bs_book_id'}
+
+    BOOKING_SUMMARY_SELECT = """
+        SELECT bs_book_id AS book_id, bs_cus_id AS cus_id, bs_hotel_id AS hotl_id,
+               bs_cus_name AS Customer_Name, bs_cus_mobile AS Customer_Mobile, bs_cus_add AS Customer_Address,
+               bs_hotel_name AS Hotel_Name, bs_room_type AS Room_Type, bs_room_rent AS Room_Rent,
+               bs_paid_total AS Payment_Amount, bs_payment_count AS Payment_Count,
+               bs_last_payment_date AS Payment_Date
+        FROM BOOKING_SUMMARY"""
+
+    def get_booking_summary_report(self, after=None, limit=None, sort='book_id', descending=False, since=None,
+                                   pool=None):
+        """Reads the trigger-maintained BOOKING_SUMMARY table (one row per booking with paid totals).
+
+        Pass `limit` (and `after`) for one keyset page. Served from a read
+        replica when there is a fresh enough one (see read_pool() for `since`
+        and `pool`).
+        """
+        pool = pool or self.read_pool(since)
+        if limit is None and after is None:
+            return self._execute(self.BOOKING_SUMMARY_SELECT + " ORDER BY bs_book_id;", pool=pool)
+        return self._keyset_page(self.BOOKING_SUMMARY_SELECT, 'book_id',
+                                 self.BOOKING_SORTS, sort, after, limit, descending, pool=pool)
+
+    EXPORT_QUERIES = {
+        'hotels': "SELECT hotl_id, hotl_name, hotl_type, hotl_desc, hotl_rent, hotl_manager_id FROM HOTEL ORDER BY hotl_id",
+        'customers': "SELECT cus_id, cus_name, cus_mobile, cus_email, cus_add FROM CUSTOMER ORDER BY cus_id",
+        'bookings': BOOKING_SUMMARY_SELECT + " ORDER BY bs_book_id",
+        'payments': "SELECT P.*, C.cus_name AS Customer_Name FROM PAYMENTS P JOIN CUSTOMER C ON P.pay_cus_id = C.cus_id ORDER BY P.pay_id",
+        'balances': ("SELECT L.cl_cus_id AS cus_id, C.cus_name AS Customer_Name, C.cus_mobile AS Customer_Mobile, "
+                     "L.cl_charged, L.cl_paid, L.cl_balance, L.cl_updated_at "
+                     "FROM CUSTOMER_LEDGER L LEFT JOIN CUSTOMER C ON C.cus_id = L.cl_cus_id "
+                     "WHERE L.cl_balance > 0 ORDER BY L.cl_balance DESC, L.cl_cus_id DESC"),
+    }
+
+    def iter_export(self, name, chunk_size=1000, since=None):
+        """Streams one of EXPORT_QUERIES ('hotels', 'customers', 'bookings', 'payments'), from a replica if possible."""
+        if name not in self.EXPORT_QUERIES:
+            raise ValueError(f"Unknown export: {name!r}")
+        return self.iter_rows(self.EXPORT_QUERIES[name], chunk_size=chunk_size, pool=self.read_pool(since))
+
+    # Expected BOOKING_SUMMARY contents, computed from the base tables.
+    BOOKING_SUMMARY_SOURCE = """
+        SELECT B.book_id, B.book_cus_id, B.book_hotel_id, C.cus_name, C.cus_mobile, C.cus_add,
+               H.hotl_name, B.book_type, H.hotl_rent,
+               COALESCE(P.paid_total, 0) AS paid_total, COALESCE(P.payment_count, 0) AS payment_count,
+               P.last_payment_date
+        FROM BOOKING B
+        JOIN CUSTOMER C ON B.book_cus_id = C.cus_id
+        JOIN HOTEL H ON B.book_hotel_id = H.hotl_id
+        LEFT JOIN (SELECT pay_book_id, SUM(pay_amt) AS paid_total, COUNT(*) AS payment_count,
+                          MAX(pay_date) AS last_payment_date
+                   FROM PAYMENTS WHERE pay_book_id IS NOT NULL GROUP BY pay_book_id) P
+               ON P.pay_book_id = B.book_id"""
+
+    def rebuild_booking_summary(self):
+        """Recomputes BOOKING_SUMMARY from the base tables in one transaction."""
+        try:
+            with self.transaction() as conn:
+                conn.execute("DELETE FROM BOOKING_SUMMARY;")
+                conn.execute("INSERT INTO BOOKING_SUMMARY " + self.BOOKING_SUMMARY_SOURCE)
+            return True
+        except sqlite3.Error:
+            return False
+
+    def check_booking_summary(self):
+        """Returns the booking IDs whose BOOKING_SUMMARY row is missing, stale or orphaned."""
+        query = f"""
+        WITH expected AS ({self.BOOKING_SUMMARY_SOURCE})
+        SELECT E.book_id FROM expected E
+        LEFT JOIN BOOKING_SUMMARY S ON S.bs_book_id = E.book_id
+        WHERE S.bs_book_id IS NULL
+           OR S.bs_cus_id IS NOT E.book_cus_id OR S.bs_hotel_id IS NOT E.book_hotel_id
+           OR S.bs_cus_name IS NOT E.cus_name OR S.bs_cus_mobile IS NOT E.cus_mobile
+           OR S.bs_cus_add IS NOT E.cus_add OR S.bs_hotel_name IS NOT E.hotl_name
+           OR S.bs_room_type IS NOT E.book_type OR S.bs_room_rent IS NOT E.hotl_rent
+           OR ROUND(S.bs_paid_total, 2) != ROUND(E.paid_total, 2)
+           OR S.bs_payment_count != E.payment_count
+           OR S.bs_last_payment_date IS NOT E.last_payment_date
+        UNION
+        SELECT bs_book_id FROM BOOKING_SUMMARY WHERE bs_book_id NOT IN (SELECT book_id FROM expected)
+        ORDER BY 1
+        """
+        rows = self._execute(query)
+        if rows is False:
+            raise sqlite3.DatabaseError("BOOKING_SUMMARY consistency check failed to run")
+        return [row[0] for row in rows]
+    
+    # --- Derived Data Maintenance ---
+    def rebuild_derived_tables(self):
+        """Recomputes every trigger-maintained table and bumps all data versions.
+
+        Used after bulk operations that ran with DERIVED_TRIGGER_PREFIXES triggers dropped.
+        """
+        ok = (self.rebuild_booking_summary() and self.rebuild_room_occupancy() and self.rebuild_search_index()
+              and self.rebuild_hotel_daily() and self.rebuild_ledger())
+        ok = self._execute("UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now');") and ok
+        self.invalidate_catalogue()
+        self.invalidate_permissions()
+        return bool(ok)
+
+    # --- Data Versions ---
+    def get_table_versions(self, tables, pool=None):
+        """{table: tv_version} for the given TABLE_VERSION tables, read in one statement.
+
+        Tables without a version row are missing from the result. `pool` reads
+        a replica's copy (see read_pool()); the default is the primary.
+        """
+        tables = list(tables)
+        query = f"SELECT tv_table, tv_version FROM TABLE_VERSION WHERE tv_table IN ({', '.join('?' * len(tables))})"
+        rows = self._execute(query, tables, pool=pool)
+        if rows is False:
+            raise sqlite3.DatabaseError("TABLE_VERSION could not be read")
+        return {row['tv_table']: row['tv_version'] for row in rows}
+
+    # --- Hotel Catalogue Cache ---
+    CATALOGUE_QUERY = "SELECT hotl_id, hotl_name, hotl_type, hotl_rent, hotl_manager_id FROM HOTEL;"
+
+    def _load_catalogue(self):
+        """Reads the HOTEL version and rows in one read transaction so they always match."""
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN;")
+            try:
+                version_row = conn.execute(
+                    "SELECT tv_version, tv_changed_at FROM TABLE_VERSION WHERE tv_table = 'HOTEL'").fetchone()
+                hotels = conn.execute(self.CATALOGUE_QUERY).fetchall()
+            finally:
+                conn.rollback()
+        changed_at = datetime.strptime(version_row['tv_changed_at'], '%Y-%m-%d %H:%M:%S').replace(tzinfo=timezone.utc)
+        return CatalogueSnapshot(version_row['tv_version'], changed_at, hotels, time.monotonic())
+
+    def get_catalogue(self):
+        """Returns the current CatalogueSnapshot, reloading it only when HOTEL has changed."""
+        snapshot = self._catalogue
+        now = time.monotonic()
+        if snapshot is not None and now - snapshot.checked_at < self.catalogue_ttl:
+            self._catalogue_stats['hits'] += 1
+            return snapshot
+
+        with self._catalogue_lock:
+            snapshot = self._catalogue
+            if snapshot is not None:
+                if now - snapshot.checked_at < self.catalogue_ttl:
+                    self._catalogue_stats['hits'] += 1
+                    return snapshot
+                self._catalogue_stats['version_checks'] += 1
+                row = self._execute("SELECT tv_version FROM TABLE_VERSION WHERE tv_table = 'HOTEL'", fetch_one=True)
+                if row and row['tv_version'] == snapshot.version:
+                    snapshot = self._catalogue = snapshot._replace(checked_at=now)
+                    self._catalogue_stats['hits'] += 1
+                    return snapshot
+
+            self._catalogue_stats['misses'] += 1
+            snapshot = self._catalogue = self._load_catalogue()
+            return snapshot
+
+    def invalidate_catalogue(self):
+        """Drops the cached snapshot; called after every local HOTEL write."""
+        self._catalogue = None
+        self._catalogue_stats['invalidations'] += 1
+
+    def catalogue_cache_stats(self):
+        stats = dict(self._catalogue_stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = stats['hits'] / lookups if lookups else 0.0
+        snapshot = self._catalogue
+        stats['version'] = snapshot.version if snapshot else None
+        return stats
+
+    # --- Role Permission Cache ---
+    PERMISSIONS_QUERY = """
+        SELECT R.role_name, P.per_module
+        FROM ROLES R LEFT JOIN PERMISSION P ON P.per_role_id = R.role_id"""
+
+    def _load_permissions(self):
+        """Reads the PERMISSION version and compiles every role's mask in one read transaction."""
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN;")
+            try:
+                version_row = conn.execute("SELECT tv_version FROM TABLE_VERSION WHERE tv_table = 'PERMISSION'").fetchone()
+                rows = conn.execute(self.PERMISSIONS_QUERY).fetchall()
+            finally:
+                conn.rollback()
+        modules = {}
+        for row in rows:
+            modules.setdefault(row['role_name'], []).append(row['per_module'])
+        masks = {role: compile_permissions(role_modules) for role, role_modules in modules.items()}
+        return PermissionSnapshot(version_row['tv_version'] if version_row else 0, masks, time.monotonic())
+
+    def get_permissions(self):
+        """Returns the current PermissionSnapshot; the database is consulted at most once per permissions_ttl."""
+        snapshot = self._permissions
+        now = time.monotonic()
+        if snapshot is not None and now - snapshot.checked_at < self.permissions_ttl:
+            return snapshot
+
+        with self._permissions_lock:
+            snapshot = self._permissions
+            if snapshot is not None:
+                if now - snapshot.checked_at < self.permissions_ttl:
+                    return snapshot
+                row = self._execute("SELECT tv_version FROM TABLE_VERSION WHERE tv_table = 'PERMISSION'", fetch_one=True)
+                if row and row['tv_version'] == snapshot.version:
+                    snapshot = self._permissions = snapshot._replace(checked_at=now)
+                    return snapshot
+            snapshot = self._permissions = self._load_permissions()
+            return snapshot
+
+    def invalidate_permissions(self):
+        self._permissions = None
+
+    # --- Full-Text Search ---
+    # scope -> (FTS table, SELECT ... WHERE <table> MATCH ? returning the display columns)
+    SEARCH_SCOPES = {
+        'customers': ('CUSTOMER_FTS', """
+            SELECT C.cus_id, C.cus_name, C.cus_mobile, C.cus_email, C.cus_add
+            FROM CUSTOMER_FTS JOIN CUSTOMER C ON C.cus_id = CUSTOMER_FTS.rowid
+            WHERE CUSTOMER_FTS MATCH ?"""),
+        'hotels': ('HOTEL_FTS', """
+            SELECT H.hotl_id, H.hotl_name, H.hotl_type, H.hotl_desc, H.hotl_rent
+            FROM HOTEL_FTS JOIN HOTEL H ON H.hotl_id = HOTEL_FTS.rowid
+            WHERE HOTEL_FTS MATCH ?"""),
+        'bookings': ('BOOKING_FTS', """
+            SELECT B.book_id, B.book_desc, B.book_type, B.book_check_in, B.book_check_out,
+                   C.cus_name AS Customer_Name, H.hotl_name AS Hotel_Name
+            FROM BOOKING_FTS
+            JOIN BOOKING B ON B.book_id = BOOKING_FTS.rowid
+            JOIN CUSTOMER C ON C.cus_id = B.book_cus_id
+            JOIN HOTEL H ON H.hotl_id = B.book_hotel_id
+            WHERE BOOKING_FTS MATCH ?"""),
+    }
+
+    def search(self, text, scopes=None, limit=20):
+        """Ranked prefix search. Returns {scope: [rows]} for each requested scope.
+
+        Every word of `text` (2+ characters) must prefix-match some indexed
+        column, e.g. "jer 9988" finds Jerry by name and mobile. Results are
+        ordered by bm25 relevance, or newest first when more than
+        SEARCH_RANK_LIMIT rows match. Unknown scopes raise ValueError.
+        """
+        scopes = list(self.SEARCH_SCOPES) if scopes is None else list(scopes)
+        unknown = set(scopes) - set(self.SEARCH_SCOPES)
+        if unknown:
+            raise ValueError(f"Unknown search scope(s): {', '.join(sorted(unknown))}")
+        match = build_match_query(text or '')
+        limit = max(1, min(int(limit), MAX_PAGE_SIZE))
+        results = {}
+        for scope in scopes:
+            if not match:
+                results[scope] = []
+                continue
+            table, select = self.SEARCH_SCOPES[scope]
+            # Is there a match past the cap? Unscored, so this stops after SEARCH_RANK_LIMIT rows.
+            too_many = self._execute(f"SELECT rowid FROM {table} WHERE {table} MATCH ? LIMIT 1 OFFSET ?",
+                                     (match, SEARCH_RANK_LIMIT), fetch_one=True)
+            order = f"{table}.rowid DESC" if too_many else f"{table}.rank"
+            results[scope] = self._execute(f"{select} ORDER BY {order} LIMIT ?", (match, limit)) or []
+        return results
+
+    def rebuild_search_index(self):
+        """Rebuilds every FTS5 index from its base table."""
+        try:
+            with self.transaction() as conn:
+                for table, _ in self.SEARCH_SCOPES.values():
+                    conn.execute(f"INSERT INTO {table}({table}) VALUES ('rebuild');")
+            return True
+        except sqlite3.Error:
+            return False
+
+    # --- Hotel CRUD Operations ---
+    HOTEL_SORTS = {'hotl_id': 'hotl_id', 'hotl_name': 'hotl_name', 'hotl_rent': 'hotl_rent'}
+
+    def get_all_hotels(self, after=None, limit=None, sort='hotl_id', descending=False):
+        """The full list comes from the catalogue cache; `limit`/`after` read one keyset page."""
+        if limit is None and after is None:
+            try:
+                return list(self.get_catalogue().hotels)
+            except sqlite3.Error:
+                return False
+        return self._keyset_page("SELECT hotl_id, hotl_name, hotl_type, hotl_desc, hotl_rent, hotl_manager_id FROM HOTEL",
+                                 'hotl_id', self.HOTEL_SORTS, sort, after, limit, descending)
+    def get_hotel_by_id(self, hotel_id):
+        return self._execute("SELECT * FROM HOTEL WHERE hotl_id = ?", (hotel_id,), fetch_one=True)
+    def add_hotel(self, name, type, desc, rent, manager_id):
+        query = "INSERT INTO HOTEL (hotl_name, hotl_type, hotl_desc, hotl_rent, hotl_manager_id) VALUES (?, ?, ?, ?, ?)"
+        result = self._execute(query, (name, type, desc, rent, manager_id))
+        self.invalidate_catalogue()
+        return result
+    def update_hotel(self, hotel_id, name, type, desc, rent, manager_id):
+        query = "UPDATE HOTEL SET hotl_name=?, hotl_type=?, hotl_desc=?, hotl_rent=?, hotl_manager_id=? WHERE hotl_id=?"
+        result = self._execute(query, (name, type, desc, rent, manager_id, hotel_id))
+        self.invalidate_catalogue()
+        return result
+    def delete_hotel(self, hotel_id):
+        result = self._execute("DELETE FROM HOTEL WHERE hotl_id = ?", (hotel_id,))
+        self.invalidate_catalogue()
+        return result
+
+    # --- Customer CRUD Operations ---
+    CUSTOMER_SORTS = {'cus_id': 'cus_id', 'cus_name': 'cus_name'}
+
+    def get_all_customers(self, after=None, limit=None, sort='cus_id', descending=False):
+        if limit is None and after is None:
+            return self._execute("SELECT cus_id, cus_name, cus_mobile, cus_email, cus_add FROM CUSTOMER;")
+        return self._keyset_page("SELECT cus_id, cus_name, cus_mobile, cus_email, cus_add FROM CUSTOMER",
+                                 'cus_id', self.CUSTOMER_SORTS, sort, after, limit, descending)
+    
+    def get_customer_id_by_email(self, email):
+        """Retrieves customer ID based on email address."""
+        query = "SELECT cus_id FROM CUSTOMER WHERE cus_email = ?"
+        result = self._execute(query, (email,), fetch_one=True)
+        return result['cus_id'] if result else None
+    
+    def create_customer_full(self, name, mobile, email, password, address):
+        """Inserts a new customer with all fields (Used by add_booking)."""
+        query = """
+        INSERT INTO CUSTOMER (cus_name, cus_mobile, cus_email, cus_pass, cus_add) 
+        VALUES (?, ?, ?, ?, ?);
+        """
+        default_pass = "temporary" 
+        
+        # NOTE: Using 'name' from the form, which may be None if not provided
+        return self._execute(query, (name, mobile, email, default_pass, address))
+
+    def delete_customer(self, cus_id):
+        """Deletes a customer record. (Will fail on active FKs)."""
+        query = "DELETE FROM CUSTOMER WHERE cus_id = ?"
+        return self._execute(query, (cus_id,))
+    
+    def get_customer_by_id(self, cus_id):
+        return self._execute("SELECT * FROM CUSTOMER WHERE cus_id = ?", (cus_id,), fetch_one=True)
+    
+    def update_customer(self, cus_id, name, mobile, email, address):
+        query = "UPDATE CUSTOMER SET cus_name=?, cus_mobile=?, cus_email=?, cus_add=? WHERE cus_id=?"
+        return self._execute(query, (name, mobile, email, address, cus_id))
+
+    # --- Booking CRUD Operations ---
+    BOOKING_LIST_SORTS = {'book_id': 'book_id'}
+
+    def get_bookings(self, after=None, limit=None, sort='book_id', descending=False, history=False):
+        """One keyset page of raw BOOKING rows (the JSON API's booking list).
+
+        history=True pages through archived bookings too (see history()).
+        """
+        source = "BOOKING_HISTORY" if history else "BOOKING"
+        return self._keyset_page("SELECT book_id, book_cus_id, book_hotel_id, book_type, book_desc, book_check_in, "
+                                 f"book_check_out, {'archived_year' if history else 'NULL AS archived_year'} "
+                                 f"FROM {source}", 'book_id', self.BOOKING_LIST_SORTS,
+                                 sort, after, limit, descending, history=history)
+
+    def add_booking(self, cus_id, hotl_id, book_type, desc, check_in, check_out):
+        """Inserts a booking after validating its dates; False on bad dates or no free room."""
+        query = "INSERT INTO BOOKING (book_cus_id, book_hotel_id, book_type, book_desc, book_check_in, book_check_out) VALUES (?, ?, ?, ?, ?, ?)"
+        try:
+            start, end = parse_stay(check_in, check_out)
+
+            def insert(conn):
+                conn.execute(query, (cus_id, hotl_id, book_type, desc, start.isoformat(), end.isoformat()))
+                self._assert_capacity(conn, hotl_id, book_type, start.isoformat(), end.isoformat())
+
+            self._write(insert)
+            return True
+        except (sqlite3.Error, ValueError, RoomUnavailableError):
+            return False
+    def create_booking_with_deposit(self, email, name, mobile, address, hotl_id, book_type, desc,
+                                    check_in, check_out, deposit=0, pay_date=None):
+        """Creates (or reuses) the customer, the booking and an optional deposit in one commit.
+
+        Returns a dict with cus_id, book_id, pay_id and new_customer, or None if
+        any step failed (in which case nothing is written). Raises ValueError for
+        invalid dates or an unknown hotel, and RoomUnavailableError when the
+        room type is sold out.
+        """
+        start, end = parse_stay(check_in, check_out)
+        check_in, check_out = start.isoformat(), end.isoformat()
+
+        try:
+            return self._write(lambda conn: self._book(conn, None, email, name, mobile, address, hotl_id, book_type,
+                                                       desc, check_in, check_out, deposit, pay_date))
+        except sqlite3.Error:
+            return None
+
+    def _book(self, conn, cus_id, email, name, mobile, address, hotl_id, book_type, desc, check_in, check_out,
+              deposit=0, pay_date=None):
+        """Books a stay inside the caller's transaction; see create_booking_with_deposit().
+
+        `check_in`/`check_out` must already be validated ISO dates. Without
+        `cus_id` the customer is looked up by email and created if missing.
+        Raises ValueError for an unknown customer or hotel id.
+        """
+        new_customer = False
+        self._assert_references(conn, {'book_cus_id': cus_id, 'book_hotel_id': hotl_id})
+        if cus_id is None:
+            row = conn.execute("SELECT cus_id FROM CUSTOMER WHERE cus_email = ?", (email,)).fetchone()
+            new_customer = row is None
+            if new_customer:
+                cursor = conn.execute(
+                    "INSERT INTO CUSTOMER (cus_name, cus_mobile, cus_email, cus_pass, cus_add) VALUES (?, ?, ?, ?, ?)",
+                    (name, mobile, email, "temporary", address),
+                )
+                cus_id = cursor.lastrowid
+            else:
+                cus_id = row['cus_id']
+
+        cursor = conn.execute(
+            "INSERT INTO BOOKING (book_cus_id, book_hotel_id, book_type, book_desc, book_check_in, book_check_out) VALUES (?, ?, ?, ?, ?, ?)",
+            (cus_id, hotl_id, book_type, desc, check_in, check_out),
+        )
+        book_id = cursor.lastrowid
+        self._assert_capacity(conn, hotl_id, book_type, check_in, check_out)
+
+        pay_id = None
+        if deposit and deposit > 0:
+            cursor = conn.execute(
+                "INSERT INTO PAYMENTS (pay_cus_id, pay_amt, pay_date, pay_desc, pay_book_id) VALUES (?, ?, ?, ?, ?)",
+                (cus_id, deposit, pay_date or date.today().isoformat(), f"Deposit for booking at {hotl_id}", book_id),
+            )
+            pay_id = cursor.lastrowid
+
+        return {'cus_id': cus_id, 'book_id': book_id, 'pay_id': pay_id, 'new_customer': new_customer}
+
+    def get_booking_by_id_detailed(self, book_id, history=False):
+        """One booking with customer and hotel names; history=True also looks in the archives."""
+        query = "SELECT B.*, NULL AS archived_year, C.cus_name AS Customer_Name, H.hotl_name AS Hotel_Name FROM BOOKING B JOIN CUSTOMER C ON B.book_cus_id = C.cus_id JOIN HOTEL H ON B.book_hotel_id = H.hotl_id WHERE B.book_id = ?"
+        booking = self._execute(query, (book_id,), fetch_one=True)
+        if booking is None and history:
+            query = ("SELECT B.*, C.cus_name AS Customer_Name, H.hotl_name AS Hotel_Name FROM BOOKING_HISTORY B "
+                     "LEFT JOIN CUSTOMER C ON B.book_cus_id = C.cus_id LEFT JOIN HOTEL H ON B.book_hotel_id = H.hotl_id "
+                     "WHERE B.book_id = ?")
+            booking = self._read_history(query, (book_id,), fetch_one=True)
+        return booking
+    def update_booking(self, book_id, hotl_id, book_type, desc):
+        """Updates a booking; False if it fails or the new hotel/room type is sold out for the stay."""
+        query = "UPDATE BOOKING SET book_hotel_id=?, book_type=?, book_desc=? WHERE book_id=?"
+
+        def update(conn):
+            cursor = conn.execute(query, (hotl_id, book_type, desc, book_id))
+            if cursor.rowcount == 0:
+                return False
+            stay = conn.execute("SELECT book_check_in, book_check_out FROM BOOKING WHERE book_id = ?", (book_id,)).fetchone()
+            self._assert_capacity(conn, hotl_id, book_type, stay['book_check_in'], stay['book_check_out'])
+            return True
+
+        try:
+            return self._write(update)
+        except (sqlite3.Error, RoomUnavailableError):
+            return False
+
+    # --- Availability ---
+    def _assert_capacity(self, conn, hotl_id, room_type, check_in, check_out):
+        """Raises RoomUnavailableError if any night of the stay is over inventory.
+
+        Called right after the booking write inside the same transaction, so the
+        occupancy triggers have already counted it and the check is atomic.
+        """
+        row = conn.execute(
+            "SELECT inv_rooms FROM ROOM_INVENTORY WHERE inv_hotel_id = ? AND inv_room_type = ?",
+            (hotl_id, room_type),
+        ).fetchone()
+        if row is None:
+            return
+        peak = conn.execute(
+            "SELECT MAX(occ_booked) FROM ROOM_OCCUPANCY WHERE occ_hotel_id = ? AND occ_room_type = ? AND occ_date >= ? AND occ_date < ?",
+            (hotl_id, room_type, check_in, check_out),
+        ).fetchone()[0]
+        if peak is not None and peak > row['inv_rooms']:
+            raise RoomUnavailableError(f"No {room_type} rooms are free at this hotel between {check_in} and {check_out}.")
+
+    def is_available(self, hotl_id, check_in, check_out, room_type):
+        """True if at least one `room_type` room is free at the hotel for every night of the stay."""
+        start, end = parse_stay(check_in, check_out)
+        query = """
+        SELECT (SELECT inv_rooms FROM ROOM_INVENTORY WHERE inv_hotel_id = ? AND inv_room_type = ?) AS rooms,
+               (SELECT COALESCE(MAX(occ_booked), 0) FROM ROOM_OCCUPANCY
+                WHERE occ_hotel_id = ? AND occ_room_type = ? AND occ_date >= ? AND occ_date < ?) AS peak
+        """
+        row = self._execute(query, (hotl_id, room_type, hotl_id, room_type, start.isoformat(), end.isoformat()), fetch_one=True)
+        if not row:
+            return False
+        return row['rooms'] is None or row['rooms'] > row['peak']
+
+    def find_available_hotels(self, check_in, check_out, room_type):
+        """Hotels with a free `room_type` room for the whole stay.
+
+        rooms_free is None for hotels without configured inventory (not capacity-checked).
+        """
+        start, end = parse_stay(check_in, check_out)
+        query = """
+        SELECT * FROM (
+            SELECT H.hotl_id, H.hotl_name, H.hotl_type, H.hotl_rent, I.inv_rooms AS rooms_total,
+                   I.inv_rooms - COALESCE((SELECT MAX(O.occ_booked) FROM ROOM_OCCUPANCY O
+                                           WHERE O.occ_hotel_id = H.hotl_id AND O.occ_room_type = ?
+                                             AND O.occ_date >= ? AND O.occ_date < ?), 0) AS rooms_free
+            FROM HOTEL H
+            LEFT JOIN ROOM_INVENTORY I ON I.inv_hotel_id = H.hotl_id AND I.inv_room_type = ?
+        ) WHERE rooms_free IS NULL OR rooms_free > 0
+        ORDER BY hotl_id
+        """
+        return self._execute(query, (room_type, start.isoformat(), end.isoformat(), room_type))
+
+    def get_room_inventory(self, hotl_id):
+        """Returns {room_type: rooms} for one hotel."""
+        rows = self._execute("SELECT inv_room_type, inv_rooms FROM ROOM_INVENTORY WHERE inv_hotel_id = ?", (hotl_id,))
+        return {row['inv_room_type']: row['inv_rooms'] for row in rows or []}
+
+    def set_room_inventory(self, hotl_id, room_type, rooms):
+        """Sets the number of `room_type` rooms at a hotel; rooms=None removes the limit."""
+        return self.set_room_inventories(hotl_id, {room_type: rooms})
+
+    def set_room_inventories(self, hotl_id, counts):
+        """Sets several room types' counts ({room_type: rooms}, None removes the limit) in one commit.
+
+        Returns True, or False with nothing written if any of them fails.
+        """
+        upsert = """
+        INSERT INTO ROOM_INVENTORY (inv_hotel_id, inv_room_type, inv_rooms) VALUES (?, ?, ?)
+        ON CONFLICT (inv_hotel_id, inv_room_type) DO UPDATE SET inv_rooms = excluded.inv_rooms
+        """
+
+        def write(conn):
+            for room_type, rooms in counts.items():
+                if rooms is None:
+                    conn.execute("DELETE FROM ROOM_INVENTORY WHERE inv_hotel_id = ? AND inv_room_type = ?",
+                                 (hotl_id, room_type))
+                else:
+                    conn.execute(upsert, (hotl_id, room_type, rooms))
+
+        try:
+            self._write(write)
+            return True
+        except sqlite3.Error as e:
+            logger.warning("Room inventory for hotel %s not saved: %s", hotl_id, e)
+            return False
+
+    def rebuild_room_occupancy(self):
+        """Recomputes ROOM_OCCUPANCY from every booking in one transaction."""
+        try:
+            with self.transaction() as conn:
+                conn.execute("DELETE FROM ROOM_OCCUPANCY;")
+                conn.execute("""
+                    INSERT INTO ROOM_OCCUPANCY
+                    SELECT B.book_hotel_id, B.book_type, C.cal_date, COUNT(*)
+                    FROM BOOKING B JOIN CALENDAR C
+                      ON C.cal_date >= date(B.book_check_in) AND C.cal_date < date(B.book_check_out)
+                    GROUP BY B.book_hotel_id, B.book_type, C.cal_date
+                """)
+            return True
+        except sqlite3.Error:
+            return False
+
+    # --- Rate Calendar (quotes.py) ---
+    RATE_COLUMNS = ("rate_id, rate_hotel_id, rate_room_type, rate_start, rate_end, rate_weekdays, rate_price, "
+                    "rate_priority, rate_desc")
+
+    def get_rates(self, hotl_id):
+        """One hotel's RATE rows, oldest first."""
+        return self._execute(f"SELECT {self.RATE_COLUMNS} FROM RATE WHERE rate_hotel_id = ? ORDER BY rate_id", (hotl_id,))
+
+    def add_rate(self, hotl_id, price, room_type=None, start=None, end=None, weekdays=ALL_WEEKDAYS, priority=0, desc=None):
+        """Adds a nightly rate for the nights start..end (inclusive ISO dates; None is open-ended).
+
+        room_type=None applies to every room type; `weekdays` is a WEEKDAYS bitmask.
+        Raises ValueError for invalid input; returns the new rate_id, or False on error.
+        """
+        if room_type is not None and room_type not in ROOM_TYPES:
+            raise ValueError(f"Unknown room type: {room_type}")
+        try:
+            price = float(price)
+            weekdays = int(weekdays)
+            priority = int(priority)
+        except (TypeError, ValueError):
+            raise ValueError("Price, weekdays and priority must be numbers.")
+        if price < 0:
+            raise ValueError("Price cannot be negative.")
+        if not 1 <= weekdays <= ALL_WEEKDAYS:
+            raise ValueError("A rate must apply to at least one weekday.")
+        try:
+            first = date.fromisoformat(start) if start else None
+            last = date.fromisoformat(end) if end else None
+        except ValueError:
+            raise ValueError("Dates must be in YYYY-MM-DD format.")
+        if first and last and last < first:
+            raise ValueError("A rate cannot end before it starts.")
+        query = """
+        INSERT INTO RATE (rate_hotel_id, rate_room_type, rate_start, rate_end, rate_weekdays, rate_price, rate_priority, rate_desc)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """
+        params = (hotl_id, room_type, first and first.isoformat(), last and last.isoformat(), weekdays, price, priority, desc)
+        try:
+            return self._write(lambda conn: conn.execute(query, params).lastrowid)
+        except sqlite3.Error as e:
+            logger.warning("Database error: %s\n  %s", e, ' '.join(query.split()))
+            return False
+
+    def delete_rate(self, rate_id):
+        return self._execute("DELETE FROM RATE WHERE rate_id = ?", (rate_id,))
+
+    def get_rate_calendar(self):
+        """Reads the HOTEL/RATE versions, hotel rents and every rate in one read transaction (a RateCalendar)."""
+        with self.pool.connection() as conn:
+            conn.execute("BEGIN;")
+            try:
+                versions = {row['tv_table']: row['tv_version'] for row in conn.execute(
+                    "SELECT tv_table, tv_version FROM TABLE_VERSION WHERE tv_table IN ('HOTEL', 'RATE')")}
+                hotels = conn.execute("SELECT hotl_id, hotl_rent FROM HOTEL ORDER BY hotl_id").fetchall()
+                rates = conn.execute(f"SELECT {self.RATE_COLUMNS} FROM RATE ORDER BY rate_priority, rate_id").fetchall()
+            finally:
+                conn.rollback()
+        return RateCalendar(versions, hotels, rates)
+
+    # --- Daily Rollup (analytics.py) ---
+    # Expected HOTEL_DAILY contents, computed from the base tables (see migration 8). It reads the
+    # history() views: archiving moves bookings and payments out but leaves their rollup rows.
+    HOTEL_DAILY_SOURCE = """
+        SELECT R.hd_date, R.hd_hotel_id, SUM(R.nights) AS nights_sold, SUM(R.nights) * COALESCE(H.hotl_rent, 0) AS room_revenue,
+               SUM(R.payments) AS payments, SUM(R.payment_count) AS payment_count, SUM(R.arrivals) AS arrivals,
+               SUM(R.arrival_nights) AS arrival_nights, SUM(R.arrival_nights) * COALESCE(H.hotl_rent, 0) AS billed,
+               SUM(R.billed_paid) AS billed_paid
+        FROM (
+            SELECT C.cal_date AS hd_date, B.book_hotel_id AS hd_hotel_id, COUNT(*) AS nights, 0 AS payments,
+                   0 AS payment_count, 0 AS arrivals, 0 AS arrival_nights, 0 AS billed_paid
+            FROM BOOKING_HISTORY B JOIN CALENDAR C ON C.cal_date >= date(B.book_check_in) AND C.cal_date < date(B.book_check_out)
+            GROUP BY C.cal_date, B.book_hotel_id
+            UNION ALL
+            SELECT date(B.book_check_in), B.book_hotel_id, 0, 0, 0, COUNT(*),
+                   SUM(MAX(0, CAST(julianday(date(B.book_check_out)) - julianday(date(B.book_check_in)) AS INTEGER))),
+                   COALESCE(SUM(P.paid), 0)
+            FROM BOOKING_HISTORY B
+            LEFT JOIN (SELECT pay_book_id, SUM(pay_amt) AS paid FROM PAYMENTS_HISTORY WHERE pay_book_id IS NOT NULL
+                       GROUP BY pay_book_id) P ON P.pay_book_id = B.book_id
+            WHERE date(B.book_check_in) IS NOT NULL
+            GROUP BY date(B.book_check_in), B.book_hotel_id
+            UNION ALL
+            SELECT date(P.pay_date), B.book_hotel_id, 0, SUM(P.pay_amt), COUNT(*), 0, 0, 0
+            FROM PAYMENTS_HISTORY P JOIN BOOKING_HISTORY B ON B.book_id = P.pay_book_id
+            WHERE date(P.pay_date) IS NOT NULL
+            GROUP BY date(P.pay_date), B.book_hotel_id
+        ) R
+        JOIN HOTEL H ON H.hotl_id = R.hd_hotel_id
+        GROUP BY R.hd_date, R.hd_hotel_id"""
+
+    # HOTEL_MONTHLY is HOTEL_DAILY summed per calendar month.
+    HOTEL_MONTHLY_SOURCE = """
+        SELECT substr(hd_date, 1, 7) AS hm_month, hd_hotel_id AS hm_hotel_id, SUM(hd_nights_sold) AS nights_sold,
+               SUM(hd_room_revenue) AS room_revenue, SUM(hd_payments) AS payments, SUM(hd_payment_count) AS payment_count,
+               SUM(hd_arrivals) AS arrivals, SUM(hd_arrival_nights) AS arrival_nights, SUM(hd_billed) AS billed,
+               SUM(hd_billed_paid) AS billed_paid
+        FROM HOTEL_DAILY GROUP BY substr(hd_date, 1, 7), hd_hotel_id"""
+
+    # Column order of get_hotel_totals() rows; analytics.py indexes them by position.
+    HOTEL_TOTAL_COLUMNS = ('hotel_id', 'nights_sold', 'room_revenue', 'payments', 'arrivals', 'billed', 'billed_paid')
+    # Column order of get_daily_totals() rows.
+    DAILY_TOTAL_COLUMNS = ('day', 'nights_sold', 'room_revenue', 'payments', 'inventoried_nights_sold')
+
+    def _fetch_tuples(self, query, params):
+        """Runs a SELECT and returns plain tuples, which NumPy converts far faster than sqlite3.Row."""
+        try:
+            with self.pool.connection() as conn:
+                cursor = conn.execute(query, params)
+                cursor.row_factory = None  # applied when rows are fetched
+                return cursor.fetchall()
+        except sqlite3.Error as e:
+            logger.warning("Database error: %s\n  %s", e, ' '.join(query.split()))
+            return False
+
+    def get_hotel_totals(self, start, end, hotl_id=None, monthly=False):
+        """Per-hotel rollup rows for start <= date <= end as tuples (see HOTEL_TOTAL_COLUMNS).
+
+        With monthly=True, `start`/`end` are 'YYYY-MM' months and the rows come
+        from HOTEL_MONTHLY; otherwise they are days from HOTEL_DAILY. A hotel
+        appears once per day or month with activity. False on error.
+        """
+        table, prefix, key = ('HOTEL_MONTHLY', 'hm', 'month') if monthly else ('HOTEL_DAILY', 'hd', 'date')
+        query = (f"SELECT {prefix}_hotel_id, {prefix}_nights_sold, {prefix}_room_revenue, {prefix}_payments, "
+                 f"{prefix}_arrivals, {prefix}_billed, {prefix}_billed_paid "
+                 f"FROM {table} WHERE {prefix}_{key} >= ? AND {prefix}_{key} <= ?")
+        params = [start, end]
+        if hotl_id is not None:
+            query += f" AND {prefix}_hotel_id = ?"
+            params.append(hotl_id)
+        return self._fetch_tuples(query, params)
+
+    def get_daily_totals(self, start, end, hotl_id=None):
+        """One tuple per day with activity, summed over hotels (see DAILY_TOTAL_COLUMNS).
+
+        `day` is the offset from `start`. inventoried_nights_sold counts only
+        hotels with ROOM_INVENTORY, for occupancy. False on error.
+        """
+        query = """
+        SELECT CAST(julianday(hd_date) - julianday(?) AS INTEGER), SUM(hd_nights_sold), SUM(hd_room_revenue),
+               SUM(hd_payments),
+               SUM(CASE WHEN hd_hotel_id IN (SELECT inv_hotel_id FROM ROOM_INVENTORY) THEN hd_nights_sold ELSE 0 END)
+        FROM HOTEL_DAILY WHERE hd_date >= ? AND hd_date <= ?
+        """
+        params = [start, start, end]
+        if hotl_id is not None:
+            query += " AND hd_hotel_id = ?"
+            params.append(hotl_id)
+        return self._fetch_tuples(query + " GROUP BY hd_date", params)
+
+    def get_room_counts(self):
+        """Returns {hotel_id: rooms} summed over room types, for hotels with inventory set."""
+        rows = self._execute("SELECT inv_hotel_id, SUM(inv_rooms) AS rooms FROM ROOM_INVENTORY GROUP BY inv_hotel_id")
+        return {row['inv_hotel_id']: row['rooms'] for row in rows or []}
+
+    def rebuild_hotel_daily(self):
+        """Recomputes HOTEL_DAILY and HOTEL_MONTHLY from bookings and payments (archived ones included) in one transaction.
+
+        The triggers that roll HOTEL_DAILY up into HOTEL_MONTHLY are dropped and
+        recreated inside the transaction, so the rebuild is two set-based
+        inserts rather than a trigger call per row.
+        """
+        try:
+            with self.transaction(history=True) as conn:
+                triggers = conn.execute("SELECT name, sql FROM sqlite_master "
+                                        "WHERE type = 'trigger' AND tbl_name = 'HOTEL_DAILY'").fetchall()
+                for trigger in triggers:
+                    conn.execute(f"DROP TRIGGER {trigger['name']}")
+                conn.execute("DELETE FROM HOTEL_DAILY;")
+                conn.execute("INSERT INTO HOTEL_DAILY " + self.HOTEL_DAILY_SOURCE)
+                conn.execute("DELETE FROM HOTEL_MONTHLY;")
+                conn.execute("INSERT INTO HOTEL_MONTHLY " + self.HOTEL_MONTHLY_SOURCE)
+                for trigger in triggers:
+                    conn.execute(trigger['sql'])
+            return True
+        except sqlite3.Error:
+            return False
+
+    # Rollup columns compared by check_hotel_daily(); `{p}` is the table's column prefix.
+    ROLLUP_DRIFT = """
+        OR D.{p}_nights_sold != E.nights_sold OR ROUND(D.{p}_room_revenue, 2) != ROUND(E.room_revenue, 2)
+        OR ROUND(D.{p}_payments, 2) != ROUND(E.payments, 2) OR D.{p}_payment_count != E.payment_count
+        OR D.{p}_arrivals != E.arrivals OR D.{p}_arrival_nights != E.arrival_nights
+        OR ROUND(D.{p}_billed, 2) != ROUND(E.billed, 2) OR ROUND(D.{p}_billed_paid, 2) != ROUND(E.billed_paid, 2)"""
+
+    def check_hotel_daily(self):
+        """Returns the (date or month, hotel_id) keys whose HOTEL_DAILY/HOTEL_MONTHLY row is missing, stale or orphaned."""
+        drift = []
+        for table, p, key, source in (('HOTEL_DAILY', 'hd', 'date', self.HOTEL_DAILY_SOURCE),
+                                      ('HOTEL_MONTHLY', 'hm', 'month', self.HOTEL_MONTHLY_SOURCE)):
+            query = f"""
+            WITH expected AS ({source})
+            SELECT E.{p}_{key}, E.{p}_hotel_id FROM expected E
+            LEFT JOIN {table} D ON D.{p}_{key} = E.{p}_{key} AND D.{p}_hotel_id = E.{p}_hotel_id
+            WHERE D.{p}_{key} IS NULL {self.ROLLUP_DRIFT.format(p=p)}
+            UNION
+            SELECT {p}_{key}, {p}_hotel_id FROM {table}
+            WHERE ({p}_{key}, {p}_hotel_id) NOT IN (SELECT {p}_{key}, {p}_hotel_id FROM expected)
+            ORDER BY 1, 2
+            """
+            rows = self._read_history(query)
+            if rows is False:
+                raise sqlite3.DatabaseError(f"{table} consistency check failed to run")
+            drift.extend((row[0], row[1]) for row in rows)
+        return drift
+
+    # --- Balance Ledger ---
+    # Expected BOOKING_LEDGER contents (see migrations 11 and 12), computed from the history()
+    # views: archived stays keep owing what they owed. A stay is charged its booked total,
+    # else nights x the hotel's current rent; nothing once the hotel is deleted.
+    BOOKING_LEDGER_SOURCE = """
+        SELECT B.book_id, B.book_cus_id, B.book_hotel_id, B.nights, COALESCE(H.hotl_rent, 0) AS rent,
+               CASE WHEN H.hotl_id IS NULL THEN 0
+                    ELSE ROUND(COALESCE(B.book_total, B.nights * COALESCE(H.hotl_rent, 0)), 2) END AS charged,
+               ROUND(COALESCE(P.paid, 0), 2) AS paid, B.check_in, B.book_total
+        FROM (SELECT book_id, book_cus_id, book_hotel_id,
+                     COALESCE(MAX(0, CAST(julianday(date(book_check_out)) - julianday(date(book_check_in)) AS INTEGER)), 0) AS nights,
+                     date(book_check_in) AS check_in, book_total
+              FROM BOOKING_HISTORY) B
+        LEFT JOIN HOTEL H ON H.hotl_id = B.book_hotel_id
+        LEFT JOIN (SELECT pay_book_id, SUM(pay_amt) AS paid FROM PAYMENTS_HISTORY WHERE pay_book_id IS NOT NULL
+                   GROUP BY pay_book_id) P ON P.pay_book_id = B.book_id"""
+
+    # Expected CUSTOMER_LEDGER contents: every booking charge and every payment per customer.
+    CUSTOMER_LEDGER_SOURCE = f"""
+        SELECT cus_id, ROUND(SUM(charged), 2) AS charged, ROUND(SUM(paid), 2) AS paid,
+               ROUND(SUM(charged) - SUM(paid), 2) AS balance
+        FROM (SELECT book_cus_id AS cus_id, charged, 0 AS paid FROM ({BOOKING_LEDGER_SOURCE})
+              UNION ALL
+              SELECT pay_cus_id, 0, pay_amt FROM PAYMENTS_HISTORY)
+        GROUP BY cus_id"""
+
+    OUTSTANDING_SORTS = {'cl_balance': 'L.cl_balance', 'cus_id': 'L.cl_cus_id'}
+    OUTSTANDING_SELECT = ("SELECT L.cl_cus_id AS cus_id, C.cus_name AS Customer_Name, C.cus_mobile AS Customer_Mobile, "
+                          "L.cl_charged, L.cl_paid, L.cl_balance, L.cl_updated_at "
+                          "FROM CUSTOMER_LEDGER L LEFT JOIN CUSTOMER C ON C.cus_id = L.cl_cus_id")
+
+    def get_balance(self, cus_id):
+        """What a customer owes: {'cus_id', 'charged', 'paid', 'balance'} from CUSTOMER_LEDGER (one key lookup).
+
+        Customers without bookings or payments have all zeros. False on error.
+        """
+        row = self._execute("SELECT cl_charged, cl_paid, cl_balance FROM CUSTOMER_LEDGER WHERE cl_cus_id = ?",
+                            (cus_id,), fetch_one=True)
+        if row is False:
+            return False
+        charged, paid, balance = row if row else (0.0, 0.0, 0.0)
+        return {'cus_id': cus_id, 'charged': charged, 'paid': paid, 'balance': balance}
+
+    def get_booking_balance(self, book_id):
+        """BOOKING_LEDGER row of one booking (nights, rent, booked total, charged, paid) plus its balance; None if unknown."""
+        query = ("SELECT bl_book_id AS book_id, bl_cus_id AS cus_id, bl_hotel_id AS hotl_id, bl_nights AS nights, "
+                 "bl_rent AS rent, bl_total AS total, bl_charged AS charged, bl_paid AS paid, ROUND(bl_charged - bl_paid, 2) AS balance "
+                 "FROM BOOKING_LEDGER WHERE bl_book_id = ?")
+        return self._execute(query, (book_id,), fetch_one=True)
+
+    def get_outstanding_balances(self, after=None, limit=None, sort='cl_balance', descending=True):
+        """One keyset page of customers who owe money, largest balance first by default.
+
+        Reads only the partial indexes on CUSTOMER_LEDGER (cl_balance > 0), so
+        the cost depends on the page size, not on the number of customers.
+        """
+        return self._keyset_page(self.OUTSTANDING_SELECT, 'cus_id', self.OUTSTANDING_SORTS, sort, after, limit,
+                                 descending, where="L.cl_balance > 0")
+
+    def rebuild_ledger(self):
+        """Recomputes BOOKING_LEDGER and CUSTOMER_LEDGER from bookings and payments (archived ones included) in one transaction.
+
+        The triggers that roll BOOKING_LEDGER up into CUSTOMER_LEDGER are
+        dropped and recreated inside the transaction, as in rebuild_hotel_daily().
+        """
+        try:
+            with self.transaction(history=True) as conn:
+                triggers = conn.execute("SELECT name, sql FROM sqlite_master "
+                                        "WHERE type = 'trigger' AND tbl_name = 'BOOKING_LEDGER'").fetchall()
+                for trigger in triggers:
+                    conn.execute(f"DROP TRIGGER {trigger['name']}")
+                conn.execute("DELETE FROM BOOKING_LEDGER;")
+                conn.execute("INSERT INTO BOOKING_LEDGER " + self.BOOKING_LEDGER_SOURCE)
+                conn.execute("DELETE FROM CUSTOMER_LEDGER;")
+                conn.execute("INSERT INTO CUSTOMER_LEDGER SELECT cus_id, charged, paid, balance, datetime('now') "
+                             f"FROM ({self.CUSTOMER_LEDGER_SOURCE})")
+                for trigger in triggers:
+                    conn.execute(trigger['sql'])
+            return True
+        except sqlite3.Error:
+            return False
+
+    def check_ledger(self):
+        """Reconciles the ledger with every booking and payment (archived ones included).
+
+        Returns the ('BOOKING_LEDGER', book_id) and ('CUSTOMER_LEDGER', cus_id)
+        keys whose row is missing, has drifted or is orphaned. A customer row
+        with nothing charged or paid counts as missing.
+        """
+        checks = (
+            ('BOOKING_LEDGER', f"""
+            WITH expected AS ({self.BOOKING_LEDGER_SOURCE})
+            SELECT E.book_id FROM expected E
+            LEFT JOIN BOOKING_LEDGER L ON L.bl_book_id = E.book_id
+            WHERE L.bl_book_id IS NULL
+               OR L.bl_cus_id IS NOT E.book_cus_id OR L.bl_hotel_id IS NOT E.book_hotel_id
+               OR L.bl_nights != E.nights OR ROUND(L.bl_rent, 2) != ROUND(E.rent, 2)
+               OR ROUND(L.bl_charged, 2) != E.charged OR ROUND(L.bl_paid, 2) != E.paid OR L.bl_check_in IS NOT E.check_in
+               OR L.bl_total IS NOT E.book_total
+            UNION
+            SELECT bl_book_id FROM BOOKING_LEDGER WHERE bl_book_id NOT IN (SELECT book_id FROM expected)
+            ORDER BY 1"""),
+            ('CUSTOMER_LEDGER', f"""
+            WITH expected AS ({self.CUSTOMER_LEDGER_SOURCE})
+            SELECT E.cus_id FROM expected E
+            LEFT JOIN CUSTOMER_LEDGER L ON L.cl_cus_id = E.cus_id
+            WHERE ROUND(COALESCE(L.cl_charged, 0), 2) != E.charged OR ROUND(COALESCE(L.cl_paid, 0), 2) != E.paid
+               OR ROUND(COALESCE(L.cl_balance, 0), 2) != E.balance
+            UNION
+            SELECT cl_cus_id FROM CUSTOMER_LEDGER
+            WHERE cl_cus_id NOT IN (SELECT cus_id FROM expected) AND (cl_charged != 0 OR cl_paid != 0 OR cl_balance != 0)
+            ORDER BY 1"""),
+        )
+        drift = []
+        for table, query in checks:
+            rows = self._read_history(query)
+            if rows is False:
+                raise sqlite3.DatabaseError(f"{table} consistency check failed to run")
+            drift.extend((table, row[0]) for row in rows)
+        return drift
+
+    # --- Payment CRUD Operations ---
+    def delete_payment(self, pay_id):
+        query = "DELETE FROM PAYMENTS WHERE pay_id = ?"
+        return self._execute(query, (pay_id,))
+    PAYMENT_SORTS = {'pay_id': 'P.pay_id', 'pay_date': 'P.pay_date'}
+
+    def get_all_payments_detailed(self, after=None, limit=None, sort='pay_date', descending=True, since=None,
+                                  pool=None):
+        """Payments with the customer's name; served from a read replica when there is a fresh enough one."""
+        query = "SELECT P.*, C.cus_name AS Customer_Name FROM PAYMENTS P JOIN CUSTOMER C ON P.pay_cus_id = C.cus_id"
+        pool = pool or self.read_pool(since)
+        if limit is None and after is None:
+            return self._execute(query + " ORDER BY P.pay_date DESC", pool=pool)
+        return self._keyset_page(query, 'pay_id', self.PAYMENT_SORTS, sort, after, limit, descending, pool=pool)
+    def get_payment_by_id(self, pay_id):
+        return self._execute("SELECT * FROM PAYMENTS WHERE pay_id = ?", (pay_id,), fetch_one=True)
+    PAYMENT_INSERT = """
+        INSERT INTO PAYMENTS (pay_cus_id, pay_amt, pay_date, pay_desc, pay_book_id)
+        VALUES (?, ?, ?, ?, COALESCE(?, (SELECT MAX(book_id) FROM BOOKING WHERE book_cus_id = ?)))
+        """
+
+    def add_payment(self, cus_id, amount, date, desc, book_id=None):
+        """Records a payment against `book_id`, or the customer's latest booking when omitted.
+
+        Returns the new pay_id, or False on error.
+        """
+        query = self.PAYMENT_INSERT
+        try:
+            return self._write(lambda conn: conn.execute(query, (cus_id, amount, date, desc, book_id, cus_id)).lastrowid)
+        except sqlite3.Error as e:
+            logger.warning("Database error: %s\n  %s", e, ' '.join(query.split()))
+            return False
+    def update_payment(self, pay_id, cus_id, amount, date, desc, book_id=None):
+        """Updates a payment; without `book_id` it keeps its booking unless the customer changed."""
+        query = """
+        UPDATE PAYMENTS SET pay_cus_id=?, pay_amt=?, pay_date=?, pay_desc=?,
+            pay_book_id = COALESCE(?, CASE WHEN pay_cus_id = ? THEN pay_book_id END,
+                                   (SELECT MAX(book_id) FROM BOOKING WHERE book_cus_id = ?))
+        WHERE pay_id=?
+        """
+        return self._execute(query, (cus_id, amount, date, desc, book_id, cus_id, cus_id, pay_id))
+
+    # --- Batch Writes (JSON API) ---
+    # Per table: the primary key and the columns a batch update may set.
+    BATCH_UPDATABLE = {
+        'HOTEL': ('hotl_id', ('hotl_name', 'hotl_type', 'hotl_desc', 'hotl_rent', 'hotl_manager_id')),
+        'CUSTOMER': ('cus_id', ('cus_name', 'cus_mobile', 'cus_email', 'cus_add')),
+        'BOOKING': ('book_id', ('book_hotel_id', 'book_type', 'book_desc')),
+        'PAYMENTS': ('pay_id', ('pay_cus_id', 'pay_amt', 'pay_date', 'pay_desc', 'pay_book_id')),
+    }
+
+    # Columns naming another table's row, with the query that finds it. PRAGMA foreign_keys
+    # is off (hotel deletes keep their bookings), so batch writes check these themselves.
+    REFERENCES = {
+        'book_cus_id': "SELECT 1 FROM CUSTOMER WHERE cus_id = :id",
+        'book_hotel_id': "SELECT 1 FROM HOTEL WHERE hotl_id = :id",
+        'pay_cus_id': "SELECT 1 FROM CUSTOMER WHERE cus_id = :id",
+        # Late payments may name an archived stay, which only the ledger still holds.
+        'pay_book_id': "SELECT 1 FROM BOOKING WHERE book_id = :id UNION ALL "
+                       "SELECT 1 FROM BOOKING_LEDGER WHERE bl_book_id = :id",
+        'hotl_manager_id': "SELECT 1 FROM USER_TABLE WHERE user_id = :id",
+    }
+
+    def _assert_references(self, conn, item):
+        """Raises ValueError if a REFERENCES column of `item` names a row that does not exist."""
+        for column, query in self.REFERENCES.items():
+            if item.get(column) is not None and conn.execute(query, {'id': item[column]}).fetchone() is None:
+                raise ValueError(f"{column} {item[column]} not found")
+
+    def _run_batch(self, items, apply):
+        """Runs apply(conn, item) for every item in one transaction and returns the results.
+
+        Nothing is written unless every item succeeds; the first failure is
+        raised as BatchError with the item's index (chained to the cause).
+        """
+        def run(conn):
+            results = []
+            for index, item in enumerate(items):
+                try:
+                    results.append(apply(conn, item))
+                except (sqlite3.Error, ValueError, RoomUnavailableError) as e:
+                    raise BatchError(index, str(e)) from e
+            return results
+        return self._write(run)
+
+    def create_hotels(self, items):
+        """Inserts hotels (dicts of HOTEL columns) in one transaction; returns their hotl_ids."""
+        query = "INSERT INTO HOTEL (hotl_name, hotl_type, hotl_desc, hotl_rent, hotl_manager_id) VALUES (?, ?, ?, ?, ?)"
+
+        def insert(conn, item):
+            self._assert_references(conn, item)
+            return conn.execute(query, (item['hotl_name'], item['hotl_type'], item.get('hotl_desc'),
+                                        item['hotl_rent'], item['hotl_manager_id'])).lastrowid
+        try:
+            return self._run_batch(items, insert)
+        finally:
+            self.invalidate_catalogue()
+
+    def create_customers(self, items):
+        """Inserts customers (dicts of CUSTOMER columns) in one transaction; returns their cus_ids."""
+        query = "INSERT INTO CUSTOMER (cus_name, cus_mobile, cus_email, cus_pass, cus_add) VALUES (?, ?, ?, ?, ?)"
+        return self._run_batch(items, lambda conn, item: conn.execute(query, (
+            item['cus_name'], item.get('cus_mobile'), item['cus_email'], 'temporary', item.get('cus_add'))).lastrowid)
+
+    def create_bookings(self, items):
+        """Books every item in one transaction; returns a create_booking_with_deposit() dict per item.
+
+        Items use BOOKING column names plus an optional deposit/pay_date. The
+        customer is `book_cus_id`, or else found (or created) by cus_email
+        with cus_name/cus_mobile/cus_add. A sold-out item fails the batch.
+        """
+        def book(conn, item):
+            start, end = parse_stay(item['book_check_in'], item['book_check_out'])
+            return self._book(conn, item.get('book_cus_id'), item.get('cus_email'), item.get('cus_name'),
+                              item.get('cus_mobile'), item.get('cus_add'), item['book_hotel_id'], item['book_type'],
+                              item.get('book_desc'), start.isoformat(), end.isoformat(),
+                              item.get('deposit') or 0, item.get('pay_date'))
+        return self._run_batch(items, book)
+
+    def create_payments(self, items):
+        """Inserts payments in one transaction; returns their pay_ids (see add_payment() for pay_book_id)."""
+        def insert(conn, item):
+            self._assert_references(conn, item)
+            return conn.execute(self.PAYMENT_INSERT, (item['pay_cus_id'], item['pay_amt'], item['pay_date'],
+                                                      item.get('pay_desc'), item.get('pay_book_id'),
+                                                      item['pay_cus_id'])).lastrowid
+        return self._run_batch(items, insert)
+
+    def update_batch(self, table, items):
+        """Applies partial updates to `table` (a BATCH_UPDATABLE key) in one transaction.
+
+        Each item holds the primary key plus the columns to change. Ids it
+        points at must exist and booking changes are capacity-checked.
+        Returns the number of rows updated; raises BatchError if an item fails
+        or its row does not exist.
+        """
+        key, columns = self.BATCH_UPDATABLE[table]
+
+        def update(conn, item):
+            changes = [column for column in columns if column in item]
+            self._assert_references(conn, {column: item[column] for column in changes})
+            if changes:
+                cursor = conn.execute(f"UPDATE {table} SET {', '.join(f'{c} = ?' for c in changes)} WHERE {key} = ?",
+                                      [item[c] for c in changes] + [item[key]])
+                found = cursor.rowcount > 0
+            else:
+                found = conn.execute(f"SELECT 1 FROM {table} WHERE {key} = ?", (item[key],)).fetchone() is not None
+            if not found:
+                raise ValueError(f"{key} {item[key]} not found")
+            if table == 'BOOKING' and ('book_hotel_id' in changes or 'book_type' in changes):
+                row = conn.execute("SELECT book_hotel_id, book_type, book_check_in, book_check_out FROM BOOKING "
+                                   "WHERE book_id = ?", (item[key],)).fetchone()
+                self._assert_capacity(conn, *row)
+            return 1
+
+        try:
+            return sum(self._run_batch(items, update))
+        finally:
+            if table == 'HOTEL':
+                self.invalidate_catalogue()
@@ -1,110 +1,1343 @@
-import sqlite3
-import os
-import bcrypt
-
-DB_NAME = 'hotel_booking.db'
-
-# --- Hashing Helper ---
-def hash_password(password):
-    """Hashes a password using bcrypt."""
-    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt()).decode('utf-8')
-
-# Hashed passwords for initial data
-PASS1_HASHED = hash_password('pass1')
-PASS2_HASHED = hash_password('pass2')
-
-SQL_SCHEMA = """
--- ======================================
--- Create tables
--- ======================================
-CREATE TABLE IF NOT EXISTS USER_TABLE ( user_id INTEGER PRIMARY KEY, user_name TEXT NOT NULL, user_mobile TEXT, user_email TEXT, user_address TEXT );
-CREATE TABLE IF NOT EXISTS ROLES ( role_id INTEGER PRIMARY KEY, role_name TEXT NOT NULL, role_desc TEXT );
-CREATE TABLE IF NOT EXISTS LOGIN ( login_id INTEGER PRIMARY KEY, login_role_id INTEGER NOT NULL, login_username TEXT NOT NULL UNIQUE, user_password TEXT NOT NULL, FOREIGN KEY (login_role_id) REFERENCES ROLES(role_id) );
-CREATE TABLE IF NOT EXISTS PERMISSION ( per_id INTEGER PRIMARY KEY, per_role_id INTEGER NOT NULL, per_name TEXT NOT NULL, per_module TEXT, FOREIGN KEY (per_role_id) REFERENCES ROLES(role_id) );
-CREATE TABLE IF NOT EXISTS CUSTOMER ( cus_id INTEGER PRIMARY KEY, cus_name TEXT NOT NULL, cus_mobile TEXT, cus_email TEXT, cus_pass TEXT NOT NULL, cus_add TEXT );
-CREATE TABLE IF NOT EXISTS HOTEL ( hotl_id INTEGER PRIMARY KEY, hotl_type TEXT, hotl_desc TEXT, hotl_name TEXT NOT NULL, hotl_rent REAL, hotl_manager_id INTEGER, FOREIGN KEY (hotl_manager_id) REFERENCES USER_TABLE(user_id) );
-CREATE TABLE IF NOT EXISTS BOOKING ( book_id INTEGER PRIMARY KEY, book_desc TEXT, book_type TEXT, book_cus_id INTEGER NOT NULL, book_hotel_id INTEGER NOT NULL, book_check_in TEXT, book_check_out TEXT, FOREIGN KEY (book_cus_id) REFERENCES CUSTOMER(cus_id), FOREIGN KEY (book_hotel_id) REFERENCES HOTEL(hotl_id) );
-CREATE TABLE IF NOT EXISTS PAYMENTS ( pay_id INTEGER PRIMARY KEY, pay_cus_id INTEGER NOT NULL, pay_amt REAL NOT NULL, pay_date TEXT, pay_desc TEXT, FOREIGN KEY (pay_cus_id) REFERENCES CUSTOMER(cus_id) );
-"""
-
-SQL_VIEW = """
--- ======================================
--- CORRECTED Database VIEW for reporting
--- Includes Customer Mobile and Address
--- ======================================
-CREATE VIEW IF NOT EXISTS BookingSummary AS
-SELECT 
-    B.book_id,
-    C.cus_name AS Customer_Name,
-    C.cus_mobile AS Customer_Mobile,  -- NEW FIELD
-    C.cus_add AS Customer_Address,    -- NEW FIELD
-    H.hotl_name AS Hotel_Name,
-    B.book_type AS Room_Type,
-    H.hotl_rent AS Room_Rent,
-    P.pay_amt AS Payment_Amount,
-    P.pay_date AS Payment_Date
-FROM BOOKING B
-JOIN CUSTOMER C ON B.book_cus_id = C.cus_id 
-JOIN HOTEL H ON B.book_hotel_id = H.hotl_id   
-LEFT JOIN PAYMENTS P ON B.book_cus_id = P.pay_cus_id 
-ORDER BY B.book_id;
-"""
-
-SQL_INSERT_DATA = [
-    # USER_TABLE
-    "INSERT INTO USER_TABLE VALUES (1, 'Alice', '9876543210', 'alice@email.com', 'Address 1');",
-    "INSERT INTO USER_TABLE VALUES (2, 'Bob', '9876543211', 'bob@email.com', 'Address 2');",
-    # ROLES
-    "INSERT INTO ROLES VALUES (1, 'Admin', 'Full system access');",
-    "INSERT INTO ROLES VALUES (2, 'Manager', 'Manage hotels and bookings');",
-    # LOGIN - USING HASHED PASSWORDS
-    f"INSERT INTO LOGIN VALUES (1, 1, 'alice123', '{PASS1_HASHED}');",
-    f"INSERT INTO LOGIN VALUES (2, 2, 'bob123', '{PASS2_HASHED}');",
-    # PERMISSION (Subset)
-    "INSERT INTO PERMISSION VALUES (1, 1, 'Full Access', 'All');",
-    "INSERT INTO PERMISSION VALUES (2, 2, 'Manage Bookings', 'Bookings');",
-    # CUSTOMER
-    "INSERT INTO CUSTOMER VALUES (1, 'Tom', '9988776655', 'tom@email.com', 'tom123', 'Addr1');",
-    "INSERT INTO CUSTOMER VALUES (2, 'Jerry', '9988776656', 'jerry@email.com', 'jerry123', 'Addr2');",
-    # HOTEL
-    "INSERT INTO HOTEL VALUES (1, '5-Star', 'Luxury hotel', 'Hotel A', 5000, 1);",
-    "INSERT INTO HOTEL VALUES (2, '4-Star', 'Comfortable stay', 'Hotel B', 4000, 2);",
-    # BOOKING (Added dummy dates)
-    "INSERT INTO BOOKING VALUES (1, 'Single room booking', 'Single', 1, 1, '2025-10-01', '2025-10-05');",
-    "INSERT INTO BOOKING VALUES (2, 'Double room booking', 'Double', 2, 2, '2025-10-02', '2025-10-06');",
-    # PAYMENTS
-    "INSERT INTO PAYMENTS VALUES (1, 1, 5000, '2025-10-01', 'Payment for booking 1');",
-    "INSERT INTO PAYMENTS VALUES (2, 2, 4000, '2025-10-02', 'Payment for booking 2');"
-]
-
-def setup_database():
-    """Initializes the SQLite database, creates tables, view, and inserts sample data."""
-    try:
-        if os.path.exists(DB_NAME):
-            os.remove(DB_NAME)
-            print(f"🧹 Existing database '{DB_NAME}' removed.")
-
-        conn = sqlite3.connect(DB_NAME)
-        cursor = conn.cursor()
-        cursor.execute("PRAGMA foreign_keys = ON;")
-        cursor.executescript(SQL_SCHEMA)
-        print("✅ Tables created successfully.")
-        
-        cursor.executescript(SQL_VIEW)
-        print("✅ View 'BookingSummary' created successfully.")
-
-        for statement in SQL_INSERT_DATA:
-            cursor.execute(statement)
-        
-        conn.commit()
-        print("✅ Sample data inserted successfully.")
-
-    except sqlite3.Error as e:
-        print(f"❌ Database error: {e}")
-        conn.rollback()
-    finally:
-        if conn:
-            conn.close()
-
-if __name__ == '__main__':
-    setup_database()
\ No newline at end of file
+import argparse
+import re
+import sqlite3
+import os
+import sys
+from auth import hash_password
+from db_manager import HotelDBManager
+
+DB_NAME = 'hotel_booking.db'
+
+# Sample logins (login_id, role_id, username, password). Passwords are hashed
+# only when setup_database() inserts them, so importing this module stays cheap.
+SEED_LOGINS = [
+    (1, 1, 'alice123', 'pass1'),
+    (2, 2, 'bob123', 'pass2'),
+]
+
+SQL_SCHEMA = """
+-- ======================================
+-- Create tables
+-- ======================================
+CREATE TABLE IF NOT EXISTS USER_TABLE ( user_id INTEGER PRIMARY KEY, user_name TEXT NOT NULL, user_mobile TEXT, user_email TEXT, user_address TEXT );
+CREATE TABLE IF NOT EXISTS ROLES ( role_id INTEGER PRIMARY KEY, role_name TEXT NOT NULL, role_desc TEXT );
+CREATE TABLE IF NOT EXISTS LOGIN ( login_id INTEGER PRIMARY KEY, login_role_id INTEGER NOT NULL, login_username TEXT NOT NULL UNIQUE, user_password TEXT NOT NULL, FOREIGN KEY (login_role_id) REFERENCES ROLES(role_id) );
+CREATE TABLE IF NOT EXISTS PERMISSION ( per_id INTEGER PRIMARY KEY, per_role_id INTEGER NOT NULL, per_name TEXT NOT NULL, per_module TEXT, FOREIGN KEY (per_role_id) REFERENCES ROLES(role_id) );
+CREATE TABLE IF NOT EXISTS CUSTOMER ( cus_id INTEGER PRIMARY KEY, cus_name TEXT NOT NULL, cus_mobile TEXT, cus_email TEXT, cus_pass TEXT NOT NULL, cus_add TEXT );
+CREATE TABLE IF NOT EXISTS HOTEL ( hotl_id INTEGER PRIMARY KEY, hotl_type TEXT, hotl_desc TEXT, hotl_name TEXT NOT NULL, hotl_rent REAL, hotl_manager_id INTEGER, FOREIGN KEY (hotl_manager_id) REFERENCES USER_TABLE(user_id) );
+CREATE TABLE IF NOT EXISTS BOOKING ( book_id INTEGER PRIMARY KEY, book_desc TEXT, book_type TEXT, book_cus_id INTEGER NOT NULL, book_hotel_id INTEGER NOT NULL, book_check_in TEXT, book_check_out TEXT, FOREIGN KEY (book_cus_id) REFERENCES CUSTOMER(cus_id), FOREIGN KEY (book_hotel_id) REFERENCES HOTEL(hotl_id) );
+CREATE TABLE IF NOT EXISTS PAYMENTS ( pay_id INTEGER PRIMARY KEY, pay_cus_id INTEGER NOT NULL, pay_amt REAL NOT NULL, pay_date TEXT, pay_desc TEXT, FOREIGN KEY (pay_cus_id) REFERENCES CUSTOMER(cus_id) );
+"""
+
+# ======================================
+# Versioned migrations
+# PRAGMA user_version records the last migration applied, so existing
+# databases are upgraded in place instead of being recreated. A migration's
+# SQL is a script, or a callable that builds the script from the live schema.
+# ======================================
+def _with_autoincrement(tables, sql):
+    """Migration SQL that first rebuilds `tables` with an AUTOINCREMENT INTEGER PRIMARY KEY, then runs `sql`.
+
+    Without AUTOINCREMENT SQLite hands out MAX(id) + 1, so the id of a deleted
+    newest row (e.g. an archived stay) is given to the next insert. SQLite
+    cannot add AUTOINCREMENT in place: each table is copied into a new one,
+    dropped, and the copy renamed, then its indexes and triggers are recreated
+    (the ALTER TABLE procedure from the SQLite docs; apply_migrations() turns
+    foreign keys off around it).
+    """
+    def script(conn):
+        lines = ["PRAGMA legacy_alter_table = ON;"]
+        for table in tables:
+            create = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = ?",
+                                  (table,)).fetchone()[0]
+            if 'AUTOINCREMENT' in create.upper():
+                continue
+            create = re.sub(r'INTEGER PRIMARY KEY', 'INTEGER PRIMARY KEY AUTOINCREMENT', create, count=1, flags=re.I)
+            create = re.sub(rf'^CREATE TABLE\s+"?{table}"?', f'CREATE TABLE {table}_NEW', create, flags=re.I)
+            # sqlite_master rowid order is creation order, which keeps the triggers' firing order.
+            saved = [row[0] for row in conn.execute(
+                "SELECT sql FROM sqlite_master WHERE tbl_name = ? AND type IN ('index', 'trigger') "
+                "AND sql IS NOT NULL ORDER BY rowid", (table,))]
+            lines += [f"{create};", f"INSERT INTO {table}_NEW SELECT * FROM {table};", f"DROP TABLE {table};",
+                      f"ALTER TABLE {table}_NEW RENAME TO {table};"]
+            lines += [f"{statement};" for statement in saved]
+        lines.append("PRAGMA legacy_alter_table = OFF;")
+        return '\n'.join(lines) + sql
+    return script
+
+# Price of a stay (NEW.book_*) from the rate calendar, as quotes.build_block() prices it:
+# per night the matching rate with the highest priority, then the newest, else hotl_rent;
+# NULL when a night has neither.
+STAY_TOTAL_SQL = """
+    SELECT CASE WHEN COUNT(N.price) = COUNT(*) THEN ROUND(SUM(N.price), 2) END
+    FROM (SELECT COALESCE((SELECT rate_price FROM RATE
+                           WHERE rate_hotel_id = NEW.book_hotel_id
+                             AND (rate_room_type IS NULL OR rate_room_type = NEW.book_type)
+                             AND (rate_start IS NULL OR rate_start <= cal_date)
+                             AND (rate_end IS NULL OR rate_end >= cal_date)
+                             AND rate_weekdays & (1 << ((CAST(strftime('%w', cal_date) AS INTEGER) + 6) % 7))
+                           ORDER BY rate_priority DESC, rate_id DESC LIMIT 1),
+                          (SELECT hotl_rent FROM HOTEL WHERE hotl_id = NEW.book_hotel_id)) AS price
+          FROM CALENDAR WHERE cal_date >= date(NEW.book_check_in) AND cal_date < date(NEW.book_check_out)) N"""
+
+MIGRATIONS = [
+    (1, "Indexes for email lookups, booking/payment joins and payment ordering", """
+CREATE UNIQUE INDEX IF NOT EXISTS idx_customer_email ON CUSTOMER(cus_email);
+CREATE INDEX IF NOT EXISTS idx_booking_cus_id ON BOOKING(book_cus_id);
+CREATE INDEX IF NOT EXISTS idx_booking_hotel_id ON BOOKING(book_hotel_id);
+CREATE INDEX IF NOT EXISTS idx_payments_cus_id ON PAYMENTS(pay_cus_id);
+CREATE INDEX IF NOT EXISTS idx_payments_date ON PAYMENTS(pay_date);
+"""),
+    (2, "Indexes backing the sortable columns of the paginated list pages", """
+CREATE INDEX IF NOT EXISTS idx_hotel_name ON HOTEL(hotl_name);
+CREATE INDEX IF NOT EXISTS idx_hotel_rent ON HOTEL(hotl_rent);
+CREATE INDEX IF NOT EXISTS idx_customer_name ON CUSTOMER(cus_name);
+"""),
+    (3, "Replace the BookingSummary view with a trigger-maintained BOOKING_SUMMARY table", """
+-- Payments are linked to the booking they pay for. Existing rows are attributed to the
+-- customer's latest booking that had started by the payment date (else their first booking).
+ALTER TABLE PAYMENTS ADD COLUMN pay_book_id INTEGER REFERENCES BOOKING(book_id);
+UPDATE PAYMENTS SET pay_book_id = COALESCE(
+    (SELECT B.book_id FROM BOOKING B WHERE B.book_cus_id = PAYMENTS.pay_cus_id AND B.book_check_in <= PAYMENTS.pay_date
+     ORDER BY B.book_check_in DESC, B.book_id DESC LIMIT 1),
+    (SELECT MIN(B.book_id) FROM BOOKING B WHERE B.book_cus_id = PAYMENTS.pay_cus_id));
+CREATE INDEX IF NOT EXISTS idx_payments_book_id ON PAYMENTS(pay_book_id);
+
+CREATE TRIGGER trg_payments_book_owner_insert BEFORE INSERT ON PAYMENTS
+WHEN NEW.pay_book_id IS NOT NULL
+ AND NOT EXISTS (SELECT 1 FROM BOOKING WHERE book_id = NEW.pay_book_id AND book_cus_id = NEW.pay_cus_id)
+BEGIN SELECT RAISE(ABORT, 'payment booking belongs to another customer'); END;
+CREATE TRIGGER trg_payments_book_owner_update BEFORE UPDATE OF pay_cus_id, pay_book_id ON PAYMENTS
+WHEN NEW.pay_book_id IS NOT NULL
+ AND NOT EXISTS (SELECT 1 FROM BOOKING WHERE book_id = NEW.pay_book_id AND book_cus_id = NEW.pay_cus_id)
+BEGIN SELECT RAISE(ABORT, 'payment booking belongs to another customer'); END;
+
+DROP VIEW IF EXISTS BookingSummary;
+
+-- One row per booking; customer/hotel columns are copies kept current by the triggers below.
+CREATE TABLE BOOKING_SUMMARY (
+    bs_book_id INTEGER PRIMARY KEY,
+    bs_cus_id INTEGER NOT NULL,
+    bs_hotel_id INTEGER NOT NULL,
+    bs_cus_name TEXT,
+    bs_cus_mobile TEXT,
+    bs_cus_add TEXT,
+    bs_hotel_name TEXT,
+    bs_room_type TEXT,
+    bs_room_rent REAL,
+    bs_paid_total REAL NOT NULL DEFAULT 0,
+    bs_payment_count INTEGER NOT NULL DEFAULT 0,
+    bs_last_payment_date TEXT
+);
+CREATE INDEX idx_booking_summary_cus_id ON BOOKING_SUMMARY(bs_cus_id);
+CREATE INDEX idx_booking_summary_hotel_id ON BOOKING_SUMMARY(bs_hotel_id);
+
+INSERT INTO BOOKING_SUMMARY
+SELECT B.book_id, B.book_cus_id, B.book_hotel_id, C.cus_name, C.cus_mobile, C.cus_add,
+       H.hotl_name, B.book_type, H.hotl_rent,
+       COALESCE(P.paid_total, 0), COALESCE(P.payment_count, 0), P.last_payment_date
+FROM BOOKING B
+JOIN CUSTOMER C ON B.book_cus_id = C.cus_id
+JOIN HOTEL H ON B.book_hotel_id = H.hotl_id
+LEFT JOIN (SELECT pay_book_id, SUM(pay_amt) AS paid_total, COUNT(*) AS payment_count, MAX(pay_date) AS last_payment_date
+           FROM PAYMENTS WHERE pay_book_id IS NOT NULL GROUP BY pay_book_id) P ON P.pay_book_id = B.book_id;
+
+CREATE TRIGGER trg_summary_booking_insert AFTER INSERT ON BOOKING
+BEGIN
+    INSERT INTO BOOKING_SUMMARY
+    SELECT NEW.book_id, NEW.book_cus_id, NEW.book_hotel_id, C.cus_name, C.cus_mobile, C.cus_add,
+           H.hotl_name, NEW.book_type, H.hotl_rent,
+           (SELECT COALESCE(SUM(pay_amt), 0) FROM PAYMENTS WHERE pay_book_id = NEW.book_id),
+           (SELECT COUNT(*) FROM PAYMENTS WHERE pay_book_id = NEW.book_id),
+           (SELECT MAX(pay_date) FROM PAYMENTS WHERE pay_book_id = NEW.book_id)
+    FROM CUSTOMER C JOIN HOTEL H ON H.hotl_id = NEW.book_hotel_id
+    WHERE C.cus_id = NEW.book_cus_id;
+END;
+CREATE TRIGGER trg_summary_booking_update AFTER UPDATE ON BOOKING
+BEGIN
+    DELETE FROM BOOKING_SUMMARY WHERE bs_book_id = OLD.book_id;
+    INSERT INTO BOOKING_SUMMARY
+    SELECT NEW.book_id, NEW.book_cus_id, NEW.book_hotel_id, C.cus_name, C.cus_mobile, C.cus_add,
+           H.hotl_name, NEW.book_type, H.hotl_rent,
+           (SELECT COALESCE(SUM(pay_amt), 0) FROM PAYMENTS WHERE pay_book_id = NEW.book_id),
+           (SELECT COUNT(*) FROM PAYMENTS WHERE pay_book_id = NEW.book_id),
+           (SELECT MAX(pay_date) FROM PAYMENTS WHERE pay_book_id = NEW.book_id)
+    FROM CUSTOMER C JOIN HOTEL H ON H.hotl_id = NEW.book_hotel_id
+    WHERE C.cus_id = NEW.book_cus_id;
+END;
+CREATE TRIGGER trg_summary_booking_delete AFTER DELETE ON BOOKING
+BEGIN
+    DELETE FROM BOOKING_SUMMARY WHERE bs_book_id = OLD.book_id;
+END;
+
+CREATE TRIGGER trg_summary_payment_insert AFTER INSERT ON PAYMENTS
+WHEN NEW.pay_book_id IS NOT NULL
+BEGIN
+    UPDATE BOOKING_SUMMARY SET
+        bs_paid_total = (SELECT COALESCE(SUM(pay_amt), 0) FROM PAYMENTS WHERE pay_book_id = NEW.pay_book_id),
+        bs_payment_count = (SELECT COUNT(*) FROM PAYMENTS WHERE pay_book_id = NEW.pay_book_id),
+        bs_last_payment_date = (SELECT MAX(pay_date) FROM PAYMENTS WHERE pay_book_id = NEW.pay_book_id)
+    WHERE bs_book_id = NEW.pay_book_id;
+END;
+CREATE TRIGGER trg_summary_payment_update AFTER UPDATE ON PAYMENTS
+BEGIN
+    UPDATE BOOKING_SUMMARY SET
+        bs_paid_total = (SELECT COALESCE(SUM(pay_amt), 0) FROM PAYMENTS WHERE pay_book_id = bs_book_id),
+        bs_payment_count = (SELECT COUNT(*) FROM PAYMENTS WHERE pay_book_id = bs_book_id),
+        bs_last_payment_date = (SELECT MAX(pay_date) FROM PAYMENTS WHERE pay_book_id = bs_book_id)
+    WHERE bs_book_id IN (OLD.pay_book_id, NEW.pay_book_id);
+END;
+CREATE TRIGGER trg_summary_payment_delete AFTER DELETE ON PAYMENTS
+WHEN OLD.pay_book_id IS NOT NULL
+BEGIN
+    UPDATE BOOKING_SUMMARY SET
+        bs_paid_total = (SELECT COALESCE(SUM(pay_amt), 0) FROM PAYMENTS WHERE pay_book_id = OLD.pay_book_id),
+        bs_payment_count = (SELECT COUNT(*) FROM PAYMENTS WHERE pay_book_id = OLD.pay_book_id),
+        bs_last_payment_date = (SELECT MAX(pay_date) FROM PAYMENTS WHERE pay_book_id = OLD.pay_book_id)
+    WHERE bs_book_id = OLD.pay_book_id;
+END;
+
+CREATE TRIGGER trg_summary_customer_update AFTER UPDATE OF cus_name, cus_mobile, cus_add ON CUSTOMER
+BEGIN
+    UPDATE BOOKING_SUMMARY SET bs_cus_name = NEW.cus_name, bs_cus_mobile = NEW.cus_mobile, bs_cus_add = NEW.cus_add
+    WHERE bs_cus_id = NEW.cus_id;
+END;
+CREATE TRIGGER trg_summary_customer_delete AFTER DELETE ON CUSTOMER
+BEGIN
+    DELETE FROM BOOKING_SUMMARY WHERE bs_cus_id = OLD.cus_id;
+END;
+CREATE TRIGGER trg_summary_hotel_update AFTER UPDATE OF hotl_name, hotl_rent ON HOTEL
+BEGIN
+    UPDATE BOOKING_SUMMARY SET bs_hotel_name = NEW.hotl_name, bs_room_rent = NEW.hotl_rent
+    WHERE bs_hotel_id = NEW.hotl_id;
+END;
+CREATE TRIGGER trg_summary_hotel_delete AFTER DELETE ON HOTEL
+BEGIN
+    DELETE FROM BOOKING_SUMMARY WHERE bs_hotel_id = OLD.hotl_id;
+END;
+"""),
+    (4, "Room inventory, calendar and trigger-maintained per-night occupancy", """
+-- One row per day for 2000-2099; lets triggers expand a stay into nights (CTEs are not allowed in triggers).
+CREATE TABLE CALENDAR ( cal_date TEXT PRIMARY KEY ) WITHOUT ROWID;
+WITH RECURSIVE days(d) AS (SELECT '2000-01-01' UNION ALL SELECT date(d, '+1 day') FROM days WHERE d < '2099-12-31')
+INSERT INTO CALENDAR SELECT d FROM days;
+
+-- Rooms per hotel and room type. Hotels/room types without a row are not capacity-checked.
+CREATE TABLE ROOM_INVENTORY (
+    inv_hotel_id INTEGER NOT NULL REFERENCES HOTEL(hotl_id),
+    inv_room_type TEXT NOT NULL,
+    inv_rooms INTEGER NOT NULL CHECK (inv_rooms >= 0),
+    PRIMARY KEY (inv_hotel_id, inv_room_type)
+) WITHOUT ROWID;
+
+-- Rooms booked per hotel, room type and night (check-in inclusive, check-out exclusive).
+CREATE TABLE ROOM_OCCUPANCY (
+    occ_hotel_id INTEGER NOT NULL,
+    occ_room_type TEXT NOT NULL,
+    occ_date TEXT NOT NULL,
+    occ_booked INTEGER NOT NULL,
+    PRIMARY KEY (occ_hotel_id, occ_room_type, occ_date)
+) WITHOUT ROWID;
+
+INSERT INTO ROOM_OCCUPANCY
+SELECT B.book_hotel_id, B.book_type, C.cal_date, COUNT(*)
+FROM BOOKING B JOIN CALENDAR C ON C.cal_date >= date(B.book_check_in) AND C.cal_date < date(B.book_check_out)
+GROUP BY B.book_hotel_id, B.book_type, C.cal_date;
+
+CREATE TRIGGER trg_occupancy_booking_insert AFTER INSERT ON BOOKING
+BEGIN
+    INSERT INTO ROOM_OCCUPANCY
+    SELECT NEW.book_hotel_id, NEW.book_type, cal_date, 1 FROM CALENDAR
+    WHERE cal_date >= date(NEW.book_check_in) AND cal_date < date(NEW.book_check_out)
+    ON CONFLICT (occ_hotel_id, occ_room_type, occ_date) DO UPDATE SET occ_booked = occ_booked + 1;
+END;
+CREATE TRIGGER trg_occupancy_booking_delete AFTER DELETE ON BOOKING
+BEGIN
+    UPDATE ROOM_OCCUPANCY SET occ_booked = occ_booked - 1
+    WHERE occ_hotel_id = OLD.book_hotel_id AND occ_room_type = OLD.book_type
+      AND occ_date >= date(OLD.book_check_in) AND occ_date < date(OLD.book_check_out);
+    DELETE FROM ROOM_OCCUPANCY
+    WHERE occ_hotel_id = OLD.book_hotel_id AND occ_room_type = OLD.book_type
+      AND occ_date >= date(OLD.book_check_in) AND occ_date < date(OLD.book_check_out) AND occ_booked <= 0;
+END;
+CREATE TRIGGER trg_occupancy_booking_update AFTER UPDATE OF book_hotel_id, book_type, book_check_in, book_check_out ON BOOKING
+BEGIN
+    UPDATE ROOM_OCCUPANCY SET occ_booked = occ_booked - 1
+    WHERE occ_hotel_id = OLD.book_hotel_id AND occ_room_type = OLD.book_type
+      AND occ_date >= date(OLD.book_check_in) AND occ_date < date(OLD.book_check_out);
+    DELETE FROM ROOM_OCCUPANCY
+    WHERE occ_hotel_id = OLD.book_hotel_id AND occ_room_type = OLD.book_type
+      AND occ_date >= date(OLD.book_check_in) AND occ_date < date(OLD.book_check_out) AND occ_booked <= 0;
+    INSERT INTO ROOM_OCCUPANCY
+    SELECT NEW.book_hotel_id, NEW.book_type, cal_date, 1 FROM CALENDAR
+    WHERE cal_date >= date(NEW.book_check_in) AND cal_date < date(NEW.book_check_out)
+    ON CONFLICT (occ_hotel_id, occ_room_type, occ_date) DO UPDATE SET occ_booked = occ_booked + 1;
+END;
+CREATE TRIGGER trg_occupancy_hotel_delete AFTER DELETE ON HOTEL
+BEGIN
+    DELETE FROM ROOM_INVENTORY WHERE inv_hotel_id = OLD.hotl_id;
+END;
+"""),
+    (5, "Per-table data versions (TABLE_VERSION) bumped by triggers, starting with HOTEL", """
+-- Cheap cross-process change detection: caches compare tv_version instead of re-reading tables.
+CREATE TABLE TABLE_VERSION (
+    tv_table TEXT PRIMARY KEY,
+    tv_version INTEGER NOT NULL,
+    tv_changed_at TEXT NOT NULL
+) WITHOUT ROWID;
+INSERT INTO TABLE_VERSION VALUES ('HOTEL', 1, datetime('now'));
+
+CREATE TRIGGER trg_version_hotel_insert AFTER INSERT ON HOTEL
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'HOTEL';
+END;
+CREATE TRIGGER trg_version_hotel_update AFTER UPDATE ON HOTEL
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'HOTEL';
+END;
+CREATE TRIGGER trg_version_hotel_delete AFTER DELETE ON HOTEL
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'HOTEL';
+END;
+"""),
+    (6, "Permission data version for the role/permission cache; Manager may manage hotels", """
+INSERT INTO TABLE_VERSION VALUES ('PERMISSION', 1, datetime('now'));
+
+CREATE TRIGGER trg_version_permission_insert AFTER INSERT ON PERMISSION
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PERMISSION';
+END;
+CREATE TRIGGER trg_version_permission_update AFTER UPDATE ON PERMISSION
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PERMISSION';
+END;
+CREATE TRIGGER trg_version_permission_delete AFTER DELETE ON PERMISSION
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PERMISSION';
+END;
+CREATE TRIGGER trg_version_roles_insert AFTER INSERT ON ROLES
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PERMISSION';
+END;
+CREATE TRIGGER trg_version_roles_update AFTER UPDATE ON ROLES
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PERMISSION';
+END;
+CREATE TRIGGER trg_version_roles_delete AFTER DELETE ON ROLES
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PERMISSION';
+END;
+
+-- Routes are now checked per module; the Manager role is described as managing
+-- hotels and bookings but was only granted Bookings.
+INSERT INTO PERMISSION (per_role_id, per_name, per_module)
+SELECT role_id, 'Manage Hotels', 'Hotels' FROM ROLES
+WHERE role_name = 'Manager'
+  AND NOT EXISTS (SELECT 1 FROM PERMISSION WHERE per_role_id = ROLES.role_id AND per_module = 'Hotels');
+"""),
+    (7, "FTS5 search indexes over customers, hotels and booking descriptions, kept in sync by triggers", """
+-- External-content tables: the text lives in the base tables, FTS5 stores only the index.
+-- prefix='2 3' adds prefix indexes so as-you-type queries ("ja*", "998*") stay fast.
+CREATE VIRTUAL TABLE CUSTOMER_FTS USING fts5(
+    cus_name, cus_mobile, cus_email, cus_add,
+    content='CUSTOMER', content_rowid='cus_id', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE HOTEL_FTS USING fts5(
+    hotl_name, hotl_type, hotl_desc,
+    content='HOTEL', content_rowid='hotl_id', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+);
+CREATE VIRTUAL TABLE BOOKING_FTS USING fts5(
+    book_desc,
+    content='BOOKING', content_rowid='book_id', prefix='2 3', tokenize='unicode61 remove_diacritics 2'
+);
+-- Rank name and email hits above address hits.
+INSERT INTO CUSTOMER_FTS(CUSTOMER_FTS, rank) VALUES ('rank', 'bm25(10.0, 5.0, 5.0, 1.0)');
+INSERT INTO HOTEL_FTS(HOTEL_FTS, rank) VALUES ('rank', 'bm25(10.0, 2.0, 1.0)');
+INSERT INTO CUSTOMER_FTS(CUSTOMER_FTS) VALUES ('rebuild');
+INSERT INTO HOTEL_FTS(HOTEL_FTS) VALUES ('rebuild');
+INSERT INTO BOOKING_FTS(BOOKING_FTS) VALUES ('rebuild');
+
+CREATE TRIGGER trg_search_customer_insert AFTER INSERT ON CUSTOMER
+BEGIN
+    INSERT INTO CUSTOMER_FTS(rowid, cus_name, cus_mobile, cus_email, cus_add)
+    VALUES (NEW.cus_id, NEW.cus_name, NEW.cus_mobile, NEW.cus_email, NEW.cus_add);
+END;
+CREATE TRIGGER trg_search_customer_update AFTER UPDATE OF cus_name, cus_mobile, cus_email, cus_add ON CUSTOMER
+BEGIN
+    INSERT INTO CUSTOMER_FTS(CUSTOMER_FTS, rowid, cus_name, cus_mobile, cus_email, cus_add)
+    VALUES ('delete', OLD.cus_id, OLD.cus_name, OLD.cus_mobile, OLD.cus_email, OLD.cus_add);
+    INSERT INTO CUSTOMER_FTS(rowid, cus_name, cus_mobile, cus_email, cus_add)
+    VALUES (NEW.cus_id, NEW.cus_name, NEW.cus_mobile, NEW.cus_email, NEW.cus_add);
+END;
+CREATE TRIGGER trg_search_customer_delete AFTER DELETE ON CUSTOMER
+BEGIN
+    INSERT INTO CUSTOMER_FTS(CUSTOMER_FTS, rowid, cus_name, cus_mobile, cus_email, cus_add)
+    VALUES ('delete', OLD.cus_id, OLD.cus_name, OLD.cus_mobile, OLD.cus_email, OLD.cus_add);
+END;
+
+CREATE TRIGGER trg_search_hotel_insert AFTER INSERT ON HOTEL
+BEGIN
+    INSERT INTO HOTEL_FTS(rowid, hotl_name, hotl_type, hotl_desc) VALUES (NEW.hotl_id, NEW.hotl_name, NEW.hotl_type, NEW.hotl_desc);
+END;
+CREATE TRIGGER trg_search_hotel_update AFTER UPDATE OF hotl_name, hotl_type, hotl_desc ON HOTEL
+BEGIN
+    INSERT INTO HOTEL_FTS(HOTEL_FTS, rowid, hotl_name, hotl_type, hotl_desc)
+    VALUES ('delete', OLD.hotl_id, OLD.hotl_name, OLD.hotl_type, OLD.hotl_desc);
+    INSERT INTO HOTEL_FTS(rowid, hotl_name, hotl_type, hotl_desc) VALUES (NEW.hotl_id, NEW.hotl_name, NEW.hotl_type, NEW.hotl_desc);
+END;
+CREATE TRIGGER trg_search_hotel_delete AFTER DELETE ON HOTEL
+BEGIN
+    INSERT INTO HOTEL_FTS(HOTEL_FTS, rowid, hotl_name, hotl_type, hotl_desc)
+    VALUES ('delete', OLD.hotl_id, OLD.hotl_name, OLD.hotl_type, OLD.hotl_desc);
+END;
+
+CREATE TRIGGER trg_search_booking_insert AFTER INSERT ON BOOKING
+BEGIN
+    INSERT INTO BOOKING_FTS(rowid, book_desc) VALUES (NEW.book_id, NEW.book_desc);
+END;
+CREATE TRIGGER trg_search_booking_update AFTER UPDATE OF book_desc ON BOOKING
+BEGIN
+    INSERT INTO BOOKING_FTS(BOOKING_FTS, rowid, book_desc) VALUES ('delete', OLD.book_id, OLD.book_desc);
+    INSERT INTO BOOKING_FTS(rowid, book_desc) VALUES (NEW.book_id, NEW.book_desc);
+END;
+CREATE TRIGGER trg_search_booking_delete AFTER DELETE ON BOOKING
+BEGIN
+    INSERT INTO BOOKING_FTS(BOOKING_FTS, rowid, book_desc) VALUES ('delete', OLD.book_id, OLD.book_desc);
+END;
+"""),
+    (8, "Trigger-maintained per-hotel daily and monthly rollups and the Reports permission", """
+-- One row per day and hotel. Nights and room revenue fall on each night of a stay;
+-- arrivals, billed (rent x nights) and what has been paid against them fall on the
+-- check-in day; payments received fall on the payment date. Revenue always uses the
+-- hotel's current rent, like BOOKING_SUMMARY. Payments without a booking have no hotel.
+CREATE TABLE HOTEL_DAILY (
+    hd_date TEXT NOT NULL,
+    hd_hotel_id INTEGER NOT NULL,
+    hd_nights_sold INTEGER NOT NULL DEFAULT 0,
+    hd_room_revenue REAL NOT NULL DEFAULT 0,
+    hd_payments REAL NOT NULL DEFAULT 0,
+    hd_payment_count INTEGER NOT NULL DEFAULT 0,
+    hd_arrivals INTEGER NOT NULL DEFAULT 0,
+    hd_arrival_nights INTEGER NOT NULL DEFAULT 0,
+    hd_billed REAL NOT NULL DEFAULT 0,
+    hd_billed_paid REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (hd_date, hd_hotel_id)
+) WITHOUT ROWID;
+CREATE INDEX idx_hotel_daily_hotel ON HOTEL_DAILY(hd_hotel_id, hd_date);
+
+INSERT INTO HOTEL_DAILY
+SELECT R.hd_date, R.hd_hotel_id, SUM(R.nights) AS nights_sold, SUM(R.nights) * COALESCE(H.hotl_rent, 0) AS room_revenue,
+       SUM(R.payments) AS payments, SUM(R.payment_count) AS payment_count, SUM(R.arrivals) AS arrivals,
+       SUM(R.arrival_nights) AS arrival_nights, SUM(R.arrival_nights) * COALESCE(H.hotl_rent, 0) AS billed,
+       SUM(R.billed_paid) AS billed_paid
+FROM (
+    SELECT C.cal_date AS hd_date, B.book_hotel_id AS hd_hotel_id, COUNT(*) AS nights, 0 AS payments,
+           0 AS payment_count, 0 AS arrivals, 0 AS arrival_nights, 0 AS billed_paid
+    FROM BOOKING B JOIN CALENDAR C ON C.cal_date >= date(B.book_check_in) AND C.cal_date < date(B.book_check_out)
+    GROUP BY C.cal_date, B.book_hotel_id
+    UNION ALL
+    SELECT date(B.book_check_in), B.book_hotel_id, 0, 0, 0, COUNT(*),
+           SUM(MAX(0, CAST(julianday(date(B.book_check_out)) - julianday(date(B.book_check_in)) AS INTEGER))),
+           COALESCE(SUM(P.paid), 0)
+    FROM BOOKING B
+    LEFT JOIN (SELECT pay_book_id, SUM(pay_amt) AS paid FROM PAYMENTS WHERE pay_book_id IS NOT NULL
+               GROUP BY pay_book_id) P ON P.pay_book_id = B.book_id
+    WHERE date(B.book_check_in) IS NOT NULL
+    GROUP BY date(B.book_check_in), B.book_hotel_id
+    UNION ALL
+    SELECT date(P.pay_date), B.book_hotel_id, 0, SUM(P.pay_amt), COUNT(*), 0, 0, 0
+    FROM PAYMENTS P JOIN BOOKING B ON B.book_id = P.pay_book_id
+    WHERE date(P.pay_date) IS NOT NULL
+    GROUP BY date(P.pay_date), B.book_hotel_id
+) R
+JOIN HOTEL H ON H.hotl_id = R.hd_hotel_id
+GROUP BY R.hd_date, R.hd_hotel_id;
+
+-- Month totals per hotel, rolled up from HOTEL_DAILY by the triggers below, so long
+-- reports read one row per hotel and month instead of one per day.
+CREATE TABLE HOTEL_MONTHLY (
+    hm_month TEXT NOT NULL,
+    hm_hotel_id INTEGER NOT NULL,
+    hm_nights_sold INTEGER NOT NULL DEFAULT 0,
+    hm_room_revenue REAL NOT NULL DEFAULT 0,
+    hm_payments REAL NOT NULL DEFAULT 0,
+    hm_payment_count INTEGER NOT NULL DEFAULT 0,
+    hm_arrivals INTEGER NOT NULL DEFAULT 0,
+    hm_arrival_nights INTEGER NOT NULL DEFAULT 0,
+    hm_billed REAL NOT NULL DEFAULT 0,
+    hm_billed_paid REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (hm_month, hm_hotel_id)
+) WITHOUT ROWID;
+INSERT INTO HOTEL_MONTHLY
+SELECT substr(hd_date, 1, 7), hd_hotel_id, SUM(hd_nights_sold), SUM(hd_room_revenue), SUM(hd_payments), SUM(hd_payment_count), SUM(hd_arrivals), SUM(hd_arrival_nights), SUM(hd_billed), SUM(hd_billed_paid)
+FROM HOTEL_DAILY GROUP BY substr(hd_date, 1, 7), hd_hotel_id;
+
+CREATE TRIGGER trg_rollup_monthly_insert AFTER INSERT ON HOTEL_DAILY
+BEGIN
+    INSERT INTO HOTEL_MONTHLY
+    VALUES (substr(NEW.hd_date, 1, 7), NEW.hd_hotel_id, NEW.hd_nights_sold, NEW.hd_room_revenue, NEW.hd_payments, NEW.hd_payment_count, NEW.hd_arrivals, NEW.hd_arrival_nights, NEW.hd_billed, NEW.hd_billed_paid)
+    ON CONFLICT (hm_month, hm_hotel_id) DO UPDATE SET
+        hm_nights_sold = hm_nights_sold + excluded.hm_nights_sold,
+        hm_room_revenue = hm_room_revenue + excluded.hm_room_revenue,
+        hm_payments = hm_payments + excluded.hm_payments,
+        hm_payment_count = hm_payment_count + excluded.hm_payment_count,
+        hm_arrivals = hm_arrivals + excluded.hm_arrivals,
+        hm_arrival_nights = hm_arrival_nights + excluded.hm_arrival_nights,
+        hm_billed = hm_billed + excluded.hm_billed,
+        hm_billed_paid = hm_billed_paid + excluded.hm_billed_paid;
+END;
+CREATE TRIGGER trg_rollup_monthly_update AFTER UPDATE ON HOTEL_DAILY
+BEGIN
+    UPDATE HOTEL_MONTHLY SET
+        hm_nights_sold = hm_nights_sold + NEW.hd_nights_sold - OLD.hd_nights_sold,
+        hm_room_revenue = hm_room_revenue + NEW.hd_room_revenue - OLD.hd_room_revenue,
+        hm_payments = hm_payments + NEW.hd_payments - OLD.hd_payments,
+        hm_payment_count = hm_payment_count + NEW.hd_payment_count - OLD.hd_payment_count,
+        hm_arrivals = hm_arrivals + NEW.hd_arrivals - OLD.hd_arrivals,
+        hm_arrival_nights = hm_arrival_nights + NEW.hd_arrival_nights - OLD.hd_arrival_nights,
+        hm_billed = hm_billed + NEW.hd_billed - OLD.hd_billed,
+        hm_billed_paid = hm_billed_paid + NEW.hd_billed_paid - OLD.hd_billed_paid
+    WHERE hm_month = substr(NEW.hd_date, 1, 7) AND hm_hotel_id = NEW.hd_hotel_id;
+END;
+CREATE TRIGGER trg_rollup_monthly_delete AFTER DELETE ON HOTEL_DAILY
+BEGIN
+    UPDATE HOTEL_MONTHLY SET
+        hm_nights_sold = hm_nights_sold - OLD.hd_nights_sold,
+        hm_room_revenue = hm_room_revenue - OLD.hd_room_revenue,
+        hm_payments = hm_payments - OLD.hd_payments,
+        hm_payment_count = hm_payment_count - OLD.hd_payment_count,
+        hm_arrivals = hm_arrivals - OLD.hd_arrivals,
+        hm_arrival_nights = hm_arrival_nights - OLD.hd_arrival_nights,
+        hm_billed = hm_billed - OLD.hd_billed,
+        hm_billed_paid = hm_billed_paid - OLD.hd_billed_paid
+    WHERE hm_month = substr(OLD.hd_date, 1, 7) AND hm_hotel_id = OLD.hd_hotel_id;
+    DELETE FROM HOTEL_MONTHLY
+    WHERE hm_month = substr(OLD.hd_date, 1, 7) AND hm_hotel_id = OLD.hd_hotel_id
+      AND hm_nights_sold <= 0 AND hm_arrivals <= 0 AND hm_payment_count <= 0;
+END;
+
+CREATE TRIGGER trg_rollup_booking_insert AFTER INSERT ON BOOKING
+BEGIN
+    INSERT INTO HOTEL_DAILY (hd_date, hd_hotel_id, hd_nights_sold, hd_room_revenue)
+    SELECT C.cal_date, H.hotl_id, 1, COALESCE(H.hotl_rent, 0) FROM CALENDAR C JOIN HOTEL H ON H.hotl_id = NEW.book_hotel_id
+    WHERE C.cal_date >= date(NEW.book_check_in) AND C.cal_date < date(NEW.book_check_out)
+    ON CONFLICT (hd_date, hd_hotel_id) DO UPDATE SET hd_nights_sold = hd_nights_sold + 1,
+        hd_room_revenue = hd_room_revenue + excluded.hd_room_revenue;
+    INSERT INTO HOTEL_DAILY (hd_date, hd_hotel_id, hd_arrivals, hd_arrival_nights, hd_billed)
+    SELECT date(NEW.book_check_in), H.hotl_id, 1, N.nights, N.nights * COALESCE(H.hotl_rent, 0)
+    FROM HOTEL H, (SELECT MAX(0, CAST(julianday(date(NEW.book_check_out)) - julianday(date(NEW.book_check_in)) AS INTEGER)) AS nights) N
+    WHERE H.hotl_id = NEW.book_hotel_id AND date(NEW.book_check_in) IS NOT NULL
+    ON CONFLICT (hd_date, hd_hotel_id) DO UPDATE SET hd_arrivals = hd_arrivals + 1,
+        hd_arrival_nights = hd_arrival_nights + excluded.hd_arrival_nights, hd_billed = hd_billed + excluded.hd_billed;
+END;
+CREATE TRIGGER trg_rollup_booking_delete AFTER DELETE ON BOOKING
+BEGIN
+    UPDATE HOTEL_DAILY SET hd_nights_sold = hd_nights_sold - 1,
+        hd_room_revenue = hd_room_revenue - COALESCE((SELECT hotl_rent FROM HOTEL WHERE hotl_id = OLD.book_hotel_id), 0)
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date >= date(OLD.book_check_in) AND hd_date < date(OLD.book_check_out);
+    UPDATE HOTEL_DAILY SET hd_arrivals = hd_arrivals - 1,
+        hd_arrival_nights = hd_arrival_nights - MAX(0, CAST(julianday(date(OLD.book_check_out)) - julianday(date(OLD.book_check_in)) AS INTEGER)),
+        hd_billed = hd_billed - MAX(0, CAST(julianday(date(OLD.book_check_out)) - julianday(date(OLD.book_check_in)) AS INTEGER))
+                    * COALESCE((SELECT hotl_rent FROM HOTEL WHERE hotl_id = OLD.book_hotel_id), 0),
+        hd_billed_paid = hd_billed_paid - COALESCE((SELECT SUM(pay_amt) FROM PAYMENTS WHERE pay_book_id = OLD.book_id), 0)
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date = date(OLD.book_check_in);
+    -- Payments still linked to the booking no longer count for its hotel.
+    UPDATE HOTEL_DAILY SET
+        hd_payments = hd_payments - (SELECT SUM(pay_amt) FROM PAYMENTS WHERE pay_book_id = OLD.book_id AND date(pay_date) = hd_date),
+        hd_payment_count = hd_payment_count - (SELECT COUNT(*) FROM PAYMENTS WHERE pay_book_id = OLD.book_id AND date(pay_date) = hd_date)
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date IN (SELECT date(pay_date) FROM PAYMENTS WHERE pay_book_id = OLD.book_id);
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date >= date(OLD.book_check_in) AND hd_date <= date(OLD.book_check_out)
+      AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date IN (SELECT date(pay_date) FROM PAYMENTS WHERE pay_book_id = OLD.book_id)
+      AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+END;
+CREATE TRIGGER trg_rollup_booking_update AFTER UPDATE OF book_hotel_id, book_check_in, book_check_out ON BOOKING
+BEGIN
+    -- Take the old stay (and its payments) out...
+    UPDATE HOTEL_DAILY SET hd_nights_sold = hd_nights_sold - 1,
+        hd_room_revenue = hd_room_revenue - COALESCE((SELECT hotl_rent FROM HOTEL WHERE hotl_id = OLD.book_hotel_id), 0)
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date >= date(OLD.book_check_in) AND hd_date < date(OLD.book_check_out);
+    UPDATE HOTEL_DAILY SET hd_arrivals = hd_arrivals - 1,
+        hd_arrival_nights = hd_arrival_nights - MAX(0, CAST(julianday(date(OLD.book_check_out)) - julianday(date(OLD.book_check_in)) AS INTEGER)),
+        hd_billed = hd_billed - MAX(0, CAST(julianday(date(OLD.book_check_out)) - julianday(date(OLD.book_check_in)) AS INTEGER))
+                    * COALESCE((SELECT hotl_rent FROM HOTEL WHERE hotl_id = OLD.book_hotel_id), 0),
+        hd_billed_paid = hd_billed_paid - COALESCE((SELECT SUM(pay_amt) FROM PAYMENTS WHERE pay_book_id = OLD.book_id), 0)
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date = date(OLD.book_check_in);
+    UPDATE HOTEL_DAILY SET
+        hd_payments = hd_payments - (SELECT SUM(pay_amt) FROM PAYMENTS WHERE pay_book_id = OLD.book_id AND date(pay_date) = hd_date),
+        hd_payment_count = hd_payment_count - (SELECT COUNT(*) FROM PAYMENTS WHERE pay_book_id = OLD.book_id AND date(pay_date) = hd_date)
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date IN (SELECT date(pay_date) FROM PAYMENTS WHERE pay_book_id = OLD.book_id);
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date >= date(OLD.book_check_in) AND hd_date <= date(OLD.book_check_out)
+      AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date IN (SELECT date(pay_date) FROM PAYMENTS WHERE pay_book_id = OLD.book_id)
+      AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+    -- ...and put the new one in.
+    INSERT INTO HOTEL_DAILY (hd_date, hd_hotel_id, hd_nights_sold, hd_room_revenue)
+    SELECT C.cal_date, H.hotl_id, 1, COALESCE(H.hotl_rent, 0) FROM CALENDAR C JOIN HOTEL H ON H.hotl_id = NEW.book_hotel_id
+    WHERE C.cal_date >= date(NEW.book_check_in) AND C.cal_date < date(NEW.book_check_out)
+    ON CONFLICT (hd_date, hd_hotel_id) DO UPDATE SET hd_nights_sold = hd_nights_sold + 1,
+        hd_room_revenue = hd_room_revenue + excluded.hd_room_revenue;
+    INSERT INTO HOTEL_DAILY (hd_date, hd_hotel_id, hd_arrivals, hd_arrival_nights, hd_billed, hd_billed_paid)
+    SELECT date(NEW.book_check_in), H.hotl_id, 1, N.nights, N.nights * COALESCE(H.hotl_rent, 0),
+           COALESCE((SELECT SUM(pay_amt) FROM PAYMENTS WHERE pay_book_id = NEW.book_id), 0)
+    FROM HOTEL H, (SELECT MAX(0, CAST(julianday(date(NEW.book_check_out)) - julianday(date(NEW.book_check_in)) AS INTEGER)) AS nights) N
+    WHERE H.hotl_id = NEW.book_hotel_id AND date(NEW.book_check_in) IS NOT NULL
+    ON CONFLICT (hd_date, hd_hotel_id) DO UPDATE SET hd_arrivals = hd_arrivals + 1,
+        hd_arrival_nights = hd_arrival_nights + excluded.hd_arrival_nights, hd_billed = hd_billed + excluded.hd_billed,
+        hd_billed_paid = hd_billed_paid + excluded.hd_billed_paid;
+    INSERT INTO HOTEL_DAILY (hd_date, hd_hotel_id, hd_payments, hd_payment_count)
+    SELECT date(P.pay_date), H.hotl_id, SUM(P.pay_amt), COUNT(*) FROM PAYMENTS P JOIN HOTEL H ON H.hotl_id = NEW.book_hotel_id
+    WHERE P.pay_book_id = NEW.book_id AND date(P.pay_date) IS NOT NULL
+    GROUP BY date(P.pay_date)
+    ON CONFLICT (hd_date, hd_hotel_id) DO UPDATE SET hd_payments = hd_payments + excluded.hd_payments,
+        hd_payment_count = hd_payment_count + excluded.hd_payment_count;
+END;
+
+CREATE TRIGGER trg_rollup_payment_insert AFTER INSERT ON PAYMENTS
+WHEN NEW.pay_book_id IS NOT NULL
+BEGIN
+    INSERT INTO HOTEL_DAILY (hd_date, hd_hotel_id, hd_payments, hd_payment_count)
+    SELECT date(NEW.pay_date), H.hotl_id, NEW.pay_amt, 1 FROM BOOKING B JOIN HOTEL H ON H.hotl_id = B.book_hotel_id
+    WHERE B.book_id = NEW.pay_book_id AND date(NEW.pay_date) IS NOT NULL
+    ON CONFLICT (hd_date, hd_hotel_id) DO UPDATE SET hd_payments = hd_payments + excluded.hd_payments,
+        hd_payment_count = hd_payment_count + 1;
+    UPDATE HOTEL_DAILY SET hd_billed_paid = hd_billed_paid + NEW.pay_amt
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = NEW.pay_book_id)
+      AND hd_date = (SELECT date(book_check_in) FROM BOOKING WHERE book_id = NEW.pay_book_id);
+END;
+CREATE TRIGGER trg_rollup_payment_delete AFTER DELETE ON PAYMENTS
+WHEN OLD.pay_book_id IS NOT NULL
+BEGIN
+    UPDATE HOTEL_DAILY SET hd_payments = hd_payments - OLD.pay_amt, hd_payment_count = hd_payment_count - 1
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id) AND hd_date = date(OLD.pay_date);
+    UPDATE HOTEL_DAILY SET hd_billed_paid = hd_billed_paid - OLD.pay_amt
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id)
+      AND hd_date = (SELECT date(book_check_in) FROM BOOKING WHERE book_id = OLD.pay_book_id);
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id) AND hd_date = date(OLD.pay_date)
+      AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+END;
+CREATE TRIGGER trg_rollup_payment_update AFTER UPDATE OF pay_amt, pay_date, pay_book_id ON PAYMENTS
+BEGIN
+    UPDATE HOTEL_DAILY SET hd_payments = hd_payments - OLD.pay_amt, hd_payment_count = hd_payment_count - 1
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id) AND hd_date = date(OLD.pay_date);
+    UPDATE HOTEL_DAILY SET hd_billed_paid = hd_billed_paid - OLD.pay_amt
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id)
+      AND hd_date = (SELECT date(book_check_in) FROM BOOKING WHERE book_id = OLD.pay_book_id);
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id) AND hd_date = date(OLD.pay_date)
+      AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+    INSERT INTO HOTEL_DAILY (hd_date, hd_hotel_id, hd_payments, hd_payment_count)
+    SELECT date(NEW.pay_date), H.hotl_id, NEW.pay_amt, 1 FROM BOOKING B JOIN HOTEL H ON H.hotl_id = B.book_hotel_id
+    WHERE B.book_id = NEW.pay_book_id AND date(NEW.pay_date) IS NOT NULL
+    ON CONFLICT (hd_date, hd_hotel_id) DO UPDATE SET hd_payments = hd_payments + excluded.hd_payments,
+        hd_payment_count = hd_payment_count + 1;
+    UPDATE HOTEL_DAILY SET hd_billed_paid = hd_billed_paid + NEW.pay_amt
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = NEW.pay_book_id)
+      AND hd_date = (SELECT date(book_check_in) FROM BOOKING WHERE book_id = NEW.pay_book_id);
+END;
+
+CREATE TRIGGER trg_rollup_hotel_update AFTER UPDATE OF hotl_rent ON HOTEL
+WHEN OLD.hotl_rent IS NOT NEW.hotl_rent
+BEGIN
+    UPDATE HOTEL_DAILY SET hd_room_revenue = hd_nights_sold * COALESCE(NEW.hotl_rent, 0),
+        hd_billed = hd_arrival_nights * COALESCE(NEW.hotl_rent, 0)
+    WHERE hd_hotel_id = NEW.hotl_id;
+END;
+CREATE TRIGGER trg_rollup_hotel_delete AFTER DELETE ON HOTEL
+BEGIN
+    DELETE FROM HOTEL_DAILY WHERE hd_hotel_id = OLD.hotl_id;
+END;
+
+-- 'Reports' is a new permission module (Admin has it through 'All'). Bumping the
+-- version makes logged-in sessions recompile their permission mask.
+UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PERMISSION';
+"""),
+    (9, "Data versions for customers, bookings and payments (ETags for the JSON API)", """
+INSERT INTO TABLE_VERSION VALUES ('CUSTOMER', 1, datetime('now'));
+INSERT INTO TABLE_VERSION VALUES ('BOOKING', 1, datetime('now'));
+INSERT INTO TABLE_VERSION VALUES ('PAYMENTS', 1, datetime('now'));
+
+CREATE TRIGGER trg_version_customer_insert AFTER INSERT ON CUSTOMER
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'CUSTOMER';
+END;
+CREATE TRIGGER trg_version_customer_update AFTER UPDATE ON CUSTOMER
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'CUSTOMER';
+END;
+CREATE TRIGGER trg_version_customer_delete AFTER DELETE ON CUSTOMER
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'CUSTOMER';
+END;
+CREATE TRIGGER trg_version_booking_insert AFTER INSERT ON BOOKING
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'BOOKING';
+END;
+CREATE TRIGGER trg_version_booking_update AFTER UPDATE ON BOOKING
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'BOOKING';
+END;
+CREATE TRIGGER trg_version_booking_delete AFTER DELETE ON BOOKING
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'BOOKING';
+END;
+CREATE TRIGGER trg_version_payments_insert AFTER INSERT ON PAYMENTS
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PAYMENTS';
+END;
+CREATE TRIGGER trg_version_payments_update AFTER UPDATE ON PAYMENTS
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PAYMENTS';
+END;
+CREATE TRIGGER trg_version_payments_delete AFTER DELETE ON PAYMENTS
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'PAYMENTS';
+END;
+"""),
+    (10, "Per-year archive registry, check-out index and rollups that survive archiving",
+     _with_autoincrement(('BOOKING', 'PAYMENTS'), """
+-- Archived stays and payments leave the hot tables; AUTOINCREMENT (above) keeps their ids
+-- from being handed out again, so an id names one stay or payment across hot and archive.
+
+-- The archiver (archive.py) picks the oldest checked-out stays through this index.
+CREATE INDEX IF NOT EXISTS idx_booking_check_out ON BOOKING(book_check_out);
+
+-- One row per archive file; ar_file is relative to the main database's directory.
+CREATE TABLE ARCHIVE (
+    ar_year INTEGER PRIMARY KEY,
+    ar_file TEXT NOT NULL,
+    ar_bookings INTEGER NOT NULL DEFAULT 0,
+    ar_payments INTEGER NOT NULL DEFAULT 0,
+    ar_updated_at TEXT NOT NULL
+);
+INSERT INTO TABLE_VERSION VALUES ('ARCHIVE', 1, datetime('now'));
+CREATE TRIGGER trg_version_archive_insert AFTER INSERT ON ARCHIVE
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'ARCHIVE';
+END;
+CREATE TRIGGER trg_version_archive_update AFTER UPDATE ON ARCHIVE
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'ARCHIVE';
+END;
+
+-- Bookings the current transaction is moving to an archive (empty otherwise). Their
+-- deletes leave HOTEL_DAILY/HOTEL_MONTHLY alone, so reports keep the archived history.
+CREATE TABLE ARCHIVE_MOVING ( am_book_id INTEGER PRIMARY KEY );
+
+DROP TRIGGER trg_rollup_booking_delete;
+CREATE TRIGGER trg_rollup_booking_delete AFTER DELETE ON BOOKING
+WHEN NOT EXISTS (SELECT 1 FROM ARCHIVE_MOVING WHERE am_book_id = OLD.book_id)
+BEGIN
+    UPDATE HOTEL_DAILY SET hd_nights_sold = hd_nights_sold - 1,
+        hd_room_revenue = hd_room_revenue - COALESCE((SELECT hotl_rent FROM HOTEL WHERE hotl_id = OLD.book_hotel_id), 0)
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date >= date(OLD.book_check_in) AND hd_date < date(OLD.book_check_out);
+    UPDATE HOTEL_DAILY SET hd_arrivals = hd_arrivals - 1,
+        hd_arrival_nights = hd_arrival_nights - MAX(0, CAST(julianday(date(OLD.book_check_out)) - julianday(date(OLD.book_check_in)) AS INTEGER)),
+        hd_billed = hd_billed - MAX(0, CAST(julianday(date(OLD.book_check_out)) - julianday(date(OLD.book_check_in)) AS INTEGER))
+                    * COALESCE((SELECT hotl_rent FROM HOTEL WHERE hotl_id = OLD.book_hotel_id), 0),
+        hd_billed_paid = hd_billed_paid - COALESCE((SELECT SUM(pay_amt) FROM PAYMENTS WHERE pay_book_id = OLD.book_id), 0)
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date = date(OLD.book_check_in);
+    -- Payments still linked to the booking no longer count for its hotel.
+    UPDATE HOTEL_DAILY SET
+        hd_payments = hd_payments - (SELECT SUM(pay_amt) FROM PAYMENTS WHERE pay_book_id = OLD.book_id AND date(pay_date) = hd_date),
+        hd_payment_count = hd_payment_count - (SELECT COUNT(*) FROM PAYMENTS WHERE pay_book_id = OLD.book_id AND date(pay_date) = hd_date)
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date IN (SELECT date(pay_date) FROM PAYMENTS WHERE pay_book_id = OLD.book_id);
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date >= date(OLD.book_check_in) AND hd_date <= date(OLD.book_check_out)
+      AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = OLD.book_hotel_id AND hd_date IN (SELECT date(pay_date) FROM PAYMENTS WHERE pay_book_id = OLD.book_id)
+      AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+END;
+
+DROP TRIGGER trg_rollup_payment_delete;
+CREATE TRIGGER trg_rollup_payment_delete AFTER DELETE ON PAYMENTS
+WHEN OLD.pay_book_id IS NOT NULL
+ AND NOT EXISTS (SELECT 1 FROM ARCHIVE_MOVING WHERE am_book_id = OLD.pay_book_id)
+BEGIN
+    UPDATE HOTEL_DAILY SET hd_payments = hd_payments - OLD.pay_amt, hd_payment_count = hd_payment_count - 1
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id) AND hd_date = date(OLD.pay_date);
+    UPDATE HOTEL_DAILY SET hd_billed_paid = hd_billed_paid - OLD.pay_amt
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id)
+      AND hd_date = (SELECT date(book_check_in) FROM BOOKING WHERE book_id = OLD.pay_book_id);
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = (SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id) AND hd_date = date(OLD.pay_date)
+      AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+END;
+""")),
+    (11, "Trigger-maintained balance ledger per booking and per customer", """
+-- What each booking has been charged (nights x the hotel's current rent, like
+-- BOOKING_SUMMARY and the rollups) and what has been paid against it. The check-in
+-- date is kept for the payment rollups of archived stays (see the end of this migration).
+CREATE TABLE BOOKING_LEDGER (
+    bl_book_id INTEGER PRIMARY KEY,
+    bl_cus_id INTEGER NOT NULL,
+    bl_hotel_id INTEGER NOT NULL,
+    bl_nights INTEGER NOT NULL DEFAULT 0,
+    bl_rent REAL NOT NULL DEFAULT 0,
+    bl_charged REAL NOT NULL DEFAULT 0,
+    bl_paid REAL NOT NULL DEFAULT 0,
+    bl_check_in TEXT
+);
+CREATE INDEX idx_booking_ledger_cus_id ON BOOKING_LEDGER(bl_cus_id);
+CREATE INDEX idx_booking_ledger_hotel_id ON BOOKING_LEDGER(bl_hotel_id);
+
+-- Running totals per customer: every booking charge, every payment (linked to a
+-- booking or not) and the balance owed (positive: the guest owes). Amounts are
+-- rounded to cents on every change so repeated updates do not drift.
+CREATE TABLE CUSTOMER_LEDGER (
+    cl_cus_id INTEGER PRIMARY KEY,
+    cl_charged REAL NOT NULL DEFAULT 0,
+    cl_paid REAL NOT NULL DEFAULT 0,
+    cl_balance REAL NOT NULL DEFAULT 0,
+    cl_updated_at TEXT
+);
+-- The outstanding-balances report reads only these (partial) indexes.
+CREATE INDEX idx_customer_ledger_outstanding ON CUSTOMER_LEDGER(cl_balance, cl_cus_id) WHERE cl_balance > 0;
+CREATE INDEX idx_customer_ledger_outstanding_id ON CUSTOMER_LEDGER(cl_cus_id) WHERE cl_balance > 0;
+
+INSERT INTO BOOKING_LEDGER
+SELECT B.book_id, B.book_cus_id, B.book_hotel_id, B.nights, COALESCE(H.hotl_rent, 0),
+       ROUND(B.nights * COALESCE(H.hotl_rent, 0), 2), ROUND(COALESCE(P.paid, 0), 2), B.check_in
+FROM (SELECT book_id, book_cus_id, book_hotel_id,
+             COALESCE(MAX(0, CAST(julianday(date(book_check_out)) - julianday(date(book_check_in)) AS INTEGER)), 0) AS nights,
+             date(book_check_in) AS check_in
+      FROM BOOKING) B
+LEFT JOIN HOTEL H ON H.hotl_id = B.book_hotel_id
+LEFT JOIN (SELECT pay_book_id, SUM(pay_amt) AS paid FROM PAYMENTS WHERE pay_book_id IS NOT NULL
+           GROUP BY pay_book_id) P ON P.pay_book_id = B.book_id;
+INSERT INTO CUSTOMER_LEDGER
+SELECT cus_id, ROUND(SUM(charged), 2), ROUND(SUM(paid), 2), ROUND(SUM(charged) - SUM(paid), 2), datetime('now')
+FROM (SELECT bl_cus_id AS cus_id, bl_charged AS charged, 0 AS paid FROM BOOKING_LEDGER
+      UNION ALL
+      SELECT pay_cus_id, 0, pay_amt FROM PAYMENTS)
+GROUP BY cus_id;
+
+-- Bookings. An archived booking (see ARCHIVE_MOVING) keeps its ledger row, so
+-- archiving never changes what a guest owes.
+CREATE TRIGGER trg_ledger_booking_insert AFTER INSERT ON BOOKING
+BEGIN
+    INSERT INTO BOOKING_LEDGER (bl_book_id, bl_cus_id, bl_hotel_id, bl_nights, bl_rent, bl_charged, bl_paid, bl_check_in)
+    SELECT NEW.book_id, NEW.book_cus_id, NEW.book_hotel_id, N.nights, R.rent, ROUND(N.nights * R.rent, 2),
+           ROUND((SELECT COALESCE(SUM(pay_amt), 0) FROM PAYMENTS WHERE pay_book_id = NEW.book_id), 2),
+           date(NEW.book_check_in)
+    FROM (SELECT COALESCE(MAX(0, CAST(julianday(date(NEW.book_check_out)) - julianday(date(NEW.book_check_in)) AS INTEGER)), 0) AS nights) N,
+         (SELECT COALESCE((SELECT hotl_rent FROM HOTEL WHERE hotl_id = NEW.book_hotel_id), 0) AS rent) R;
+END;
+CREATE TRIGGER trg_ledger_booking_update AFTER UPDATE OF book_cus_id, book_hotel_id, book_check_in, book_check_out ON BOOKING
+BEGIN
+    UPDATE BOOKING_LEDGER SET bl_cus_id = NEW.book_cus_id, bl_hotel_id = NEW.book_hotel_id, bl_nights = N.nights,
+        bl_rent = R.rent, bl_charged = ROUND(N.nights * R.rent, 2), bl_check_in = date(NEW.book_check_in)
+    FROM (SELECT COALESCE(MAX(0, CAST(julianday(date(NEW.book_check_out)) - julianday(date(NEW.book_check_in)) AS INTEGER)), 0) AS nights) N,
+         (SELECT COALESCE((SELECT hotl_rent FROM HOTEL WHERE hotl_id = NEW.book_hotel_id), 0) AS rent) R
+    WHERE bl_book_id = NEW.book_id;
+END;
+CREATE TRIGGER trg_ledger_booking_delete AFTER DELETE ON BOOKING
+WHEN NOT EXISTS (SELECT 1 FROM ARCHIVE_MOVING WHERE am_book_id = OLD.book_id)
+BEGIN
+    DELETE FROM BOOKING_LEDGER WHERE bl_book_id = OLD.book_id;
+END;
+
+-- Booking charges roll up into the customer's totals.
+CREATE TRIGGER trg_ledger_charge_insert AFTER INSERT ON BOOKING_LEDGER
+BEGIN
+    INSERT INTO CUSTOMER_LEDGER (cl_cus_id, cl_charged, cl_balance, cl_updated_at)
+    VALUES (NEW.bl_cus_id, NEW.bl_charged, NEW.bl_charged, datetime('now'))
+    ON CONFLICT (cl_cus_id) DO UPDATE SET cl_charged = ROUND(cl_charged + excluded.cl_charged, 2),
+        cl_balance = ROUND(cl_charged + excluded.cl_charged - cl_paid, 2), cl_updated_at = excluded.cl_updated_at;
+END;
+CREATE TRIGGER trg_ledger_charge_update AFTER UPDATE OF bl_cus_id, bl_charged ON BOOKING_LEDGER
+BEGIN
+    UPDATE CUSTOMER_LEDGER SET cl_charged = ROUND(cl_charged - OLD.bl_charged, 2),
+        cl_balance = ROUND(cl_charged - OLD.bl_charged - cl_paid, 2), cl_updated_at = datetime('now')
+    WHERE cl_cus_id = OLD.bl_cus_id;
+    INSERT INTO CUSTOMER_LEDGER (cl_cus_id, cl_charged, cl_balance, cl_updated_at)
+    VALUES (NEW.bl_cus_id, NEW.bl_charged, NEW.bl_charged, datetime('now'))
+    ON CONFLICT (cl_cus_id) DO UPDATE SET cl_charged = ROUND(cl_charged + excluded.cl_charged, 2),
+        cl_balance = ROUND(cl_charged + excluded.cl_charged - cl_paid, 2), cl_updated_at = excluded.cl_updated_at;
+END;
+CREATE TRIGGER trg_ledger_charge_delete AFTER DELETE ON BOOKING_LEDGER
+BEGIN
+    UPDATE CUSTOMER_LEDGER SET cl_charged = ROUND(cl_charged - OLD.bl_charged, 2),
+        cl_balance = ROUND(cl_charged - OLD.bl_charged - cl_paid, 2), cl_updated_at = datetime('now')
+    WHERE cl_cus_id = OLD.bl_cus_id;
+END;
+
+-- Payments count for the paying customer and, when linked, for their booking.
+CREATE TRIGGER trg_ledger_payment_insert AFTER INSERT ON PAYMENTS
+BEGIN
+    INSERT INTO CUSTOMER_LEDGER (cl_cus_id, cl_paid, cl_balance, cl_updated_at)
+    VALUES (NEW.pay_cus_id, NEW.pay_amt, -NEW.pay_amt, datetime('now'))
+    ON CONFLICT (cl_cus_id) DO UPDATE SET cl_paid = ROUND(cl_paid + excluded.cl_paid, 2),
+        cl_balance = ROUND(cl_charged - cl_paid - excluded.cl_paid, 2), cl_updated_at = excluded.cl_updated_at;
+    UPDATE BOOKING_LEDGER SET bl_paid = ROUND(bl_paid + NEW.pay_amt, 2) WHERE bl_book_id = NEW.pay_book_id;
+END;
+CREATE TRIGGER trg_ledger_payment_update AFTER UPDATE OF pay_cus_id, pay_amt, pay_book_id ON PAYMENTS
+BEGIN
+    UPDATE CUSTOMER_LEDGER SET cl_paid = ROUND(cl_paid - OLD.pay_amt, 2),
+        cl_balance = ROUND(cl_charged - cl_paid + OLD.pay_amt, 2), cl_updated_at = datetime('now')
+    WHERE cl_cus_id = OLD.pay_cus_id;
+    UPDATE BOOKING_LEDGER SET bl_paid = ROUND(bl_paid - OLD.pay_amt, 2) WHERE bl_book_id = OLD.pay_book_id;
+    INSERT INTO CUSTOMER_LEDGER (cl_cus_id, cl_paid, cl_balance, cl_updated_at)
+    VALUES (NEW.pay_cus_id, NEW.pay_amt, -NEW.pay_amt, datetime('now'))
+    ON CONFLICT (cl_cus_id) DO UPDATE SET cl_paid = ROUND(cl_paid + excluded.cl_paid, 2),
+        cl_balance = ROUND(cl_charged - cl_paid - excluded.cl_paid, 2), cl_updated_at = excluded.cl_updated_at;
+    UPDATE BOOKING_LEDGER SET bl_paid = ROUND(bl_paid + NEW.pay_amt, 2) WHERE bl_book_id = NEW.pay_book_id;
+END;
+CREATE TRIGGER trg_ledger_payment_delete AFTER DELETE ON PAYMENTS
+WHEN NOT EXISTS (SELECT 1 FROM ARCHIVE_MOVING WHERE am_book_id = OLD.pay_book_id)
+BEGIN
+    UPDATE CUSTOMER_LEDGER SET cl_paid = ROUND(cl_paid - OLD.pay_amt, 2),
+        cl_balance = ROUND(cl_charged - cl_paid + OLD.pay_amt, 2), cl_updated_at = datetime('now')
+    WHERE cl_cus_id = OLD.pay_cus_id;
+    UPDATE BOOKING_LEDGER SET bl_paid = ROUND(bl_paid - OLD.pay_amt, 2) WHERE bl_book_id = OLD.pay_book_id;
+END;
+
+-- Charges follow the hotel's current rent; a deleted hotel charges nothing.
+CREATE TRIGGER trg_ledger_hotel_update AFTER UPDATE OF hotl_rent ON HOTEL
+WHEN OLD.hotl_rent IS NOT NEW.hotl_rent
+BEGIN
+    UPDATE BOOKING_LEDGER SET bl_rent = COALESCE(NEW.hotl_rent, 0), bl_charged = ROUND(bl_nights * COALESCE(NEW.hotl_rent, 0), 2)
+    WHERE bl_hotel_id = NEW.hotl_id;
+END;
+CREATE TRIGGER trg_ledger_hotel_delete AFTER DELETE ON HOTEL
+BEGIN
+    UPDATE BOOKING_LEDGER SET bl_rent = 0, bl_charged = 0 WHERE bl_hotel_id = OLD.hotl_id;
+END;
+
+-- Late payments. An archived stay keeps its ledger row, so payments can still be
+-- made against it: a booking that is no longer in BOOKING may be paid for by the
+-- customer its ledger row belongs to.
+DROP TRIGGER trg_payments_book_owner_insert;
+CREATE TRIGGER trg_payments_book_owner_insert BEFORE INSERT ON PAYMENTS
+WHEN NEW.pay_book_id IS NOT NULL
+ AND NOT EXISTS (SELECT 1 FROM BOOKING WHERE book_id = NEW.pay_book_id AND book_cus_id = NEW.pay_cus_id)
+ AND (EXISTS (SELECT 1 FROM BOOKING WHERE book_id = NEW.pay_book_id)
+      OR NOT EXISTS (SELECT 1 FROM BOOKING_LEDGER WHERE bl_book_id = NEW.pay_book_id AND bl_cus_id = NEW.pay_cus_id))
+BEGIN SELECT RAISE(ABORT, 'payment booking belongs to another customer'); END;
+DROP TRIGGER trg_payments_book_owner_update;
+CREATE TRIGGER trg_payments_book_owner_update BEFORE UPDATE OF pay_cus_id, pay_book_id ON PAYMENTS
+WHEN NEW.pay_book_id IS NOT NULL
+ AND NOT EXISTS (SELECT 1 FROM BOOKING WHERE book_id = NEW.pay_book_id AND book_cus_id = NEW.pay_cus_id)
+ AND (EXISTS (SELECT 1 FROM BOOKING WHERE book_id = NEW.pay_book_id)
+      OR NOT EXISTS (SELECT 1 FROM BOOKING_LEDGER WHERE bl_book_id = NEW.pay_book_id AND bl_cus_id = NEW.pay_cus_id))
+BEGIN SELECT RAISE(ABORT, 'payment booking belongs to another customer'); END;
+
+-- Payment rollups take an archived stay's hotel and check-in date from its ledger row.
+DROP TRIGGER trg_rollup_payment_insert;
+CREATE TRIGGER trg_rollup_payment_insert AFTER INSERT ON PAYMENTS
+WHEN NEW.pay_book_id IS NOT NULL
+BEGIN
+    INSERT INTO HOTEL_DAILY (hd_date, hd_hotel_id, hd_payments, hd_payment_count)
+    SELECT date(NEW.pay_date), H.hotl_id, NEW.pay_amt, 1 FROM HOTEL H
+    WHERE H.hotl_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = NEW.pay_book_id),
+                               (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = NEW.pay_book_id))
+      AND date(NEW.pay_date) IS NOT NULL
+    ON CONFLICT (hd_date, hd_hotel_id) DO UPDATE SET hd_payments = hd_payments + excluded.hd_payments,
+        hd_payment_count = hd_payment_count + 1;
+    UPDATE HOTEL_DAILY SET hd_billed_paid = hd_billed_paid + NEW.pay_amt
+    WHERE hd_hotel_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = NEW.pay_book_id),
+                                 (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = NEW.pay_book_id))
+      AND hd_date = COALESCE((SELECT date(book_check_in) FROM BOOKING WHERE book_id = NEW.pay_book_id),
+                             (SELECT bl_check_in FROM BOOKING_LEDGER WHERE bl_book_id = NEW.pay_book_id));
+END;
+DROP TRIGGER trg_rollup_payment_delete;
+CREATE TRIGGER trg_rollup_payment_delete AFTER DELETE ON PAYMENTS
+WHEN OLD.pay_book_id IS NOT NULL
+ AND NOT EXISTS (SELECT 1 FROM ARCHIVE_MOVING WHERE am_book_id = OLD.pay_book_id)
+BEGIN
+    UPDATE HOTEL_DAILY SET hd_payments = hd_payments - OLD.pay_amt, hd_payment_count = hd_payment_count - 1
+    WHERE hd_hotel_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id),
+                                 (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = OLD.pay_book_id))
+      AND hd_date = date(OLD.pay_date);
+    UPDATE HOTEL_DAILY SET hd_billed_paid = hd_billed_paid - OLD.pay_amt
+    WHERE hd_hotel_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id),
+                                 (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = OLD.pay_book_id))
+      AND hd_date = COALESCE((SELECT date(book_check_in) FROM BOOKING WHERE book_id = OLD.pay_book_id),
+                             (SELECT bl_check_in FROM BOOKING_LEDGER WHERE bl_book_id = OLD.pay_book_id));
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id),
+                                 (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = OLD.pay_book_id))
+      AND hd_date = date(OLD.pay_date) AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+END;
+DROP TRIGGER trg_rollup_payment_update;
+CREATE TRIGGER trg_rollup_payment_update AFTER UPDATE OF pay_amt, pay_date, pay_book_id ON PAYMENTS
+BEGIN
+    UPDATE HOTEL_DAILY SET hd_payments = hd_payments - OLD.pay_amt, hd_payment_count = hd_payment_count - 1
+    WHERE hd_hotel_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id),
+                                 (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = OLD.pay_book_id))
+      AND hd_date = date(OLD.pay_date);
+    UPDATE HOTEL_DAILY SET hd_billed_paid = hd_billed_paid - OLD.pay_amt
+    WHERE hd_hotel_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id),
+                                 (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = OLD.pay_book_id))
+      AND hd_date = COALESCE((SELECT date(book_check_in) FROM BOOKING WHERE book_id = OLD.pay_book_id),
+                             (SELECT bl_check_in FROM BOOKING_LEDGER WHERE bl_book_id = OLD.pay_book_id));
+    DELETE FROM HOTEL_DAILY
+    WHERE hd_hotel_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = OLD.pay_book_id),
+                                 (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = OLD.pay_book_id))
+      AND hd_date = date(OLD.pay_date) AND hd_nights_sold <= 0 AND hd_arrivals <= 0 AND hd_payment_count <= 0;
+    INSERT INTO HOTEL_DAILY (hd_date, hd_hotel_id, hd_payments, hd_payment_count)
+    SELECT date(NEW.pay_date), H.hotl_id, NEW.pay_amt, 1 FROM HOTEL H
+    WHERE H.hotl_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = NEW.pay_book_id),
+                               (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = NEW.pay_book_id))
+      AND date(NEW.pay_date) IS NOT NULL
+    ON CONFLICT (hd_date, hd_hotel_id) DO UPDATE SET hd_payments = hd_payments + excluded.hd_payments,
+        hd_payment_count = hd_payment_count + 1;
+    UPDATE HOTEL_DAILY SET hd_billed_paid = hd_billed_paid + NEW.pay_amt
+    WHERE hd_hotel_id = COALESCE((SELECT book_hotel_id FROM BOOKING WHERE book_id = NEW.pay_book_id),
+                                 (SELECT bl_hotel_id FROM BOOKING_LEDGER WHERE bl_book_id = NEW.pay_book_id))
+      AND hd_date = COALESCE((SELECT date(book_check_in) FROM BOOKING WHERE book_id = NEW.pay_book_id),
+                             (SELECT bl_check_in FROM BOOKING_LEDGER WHERE bl_book_id = NEW.pay_book_id));
+END;
+"""),
+    (12, "Rate calendar and booked stay totals charged by the ledger", """
+-- Nightly prices that override HOTEL.hotl_rent (see quotes.py). A rate applies to the
+-- nights from rate_start to rate_end (inclusive; NULL is open-ended) whose weekday bit
+-- is set in rate_weekdays (bit 0 = Monday ... bit 6 = Sunday; 96 = weekends), for one
+-- room type or, with NULL, all of them. Where rates overlap, the highest priority wins,
+-- then the newest rate.
+CREATE TABLE RATE (
+    rate_id INTEGER PRIMARY KEY,
+    rate_hotel_id INTEGER NOT NULL REFERENCES HOTEL(hotl_id),
+    rate_room_type TEXT,
+    rate_start TEXT,
+    rate_end TEXT,
+    rate_weekdays INTEGER NOT NULL DEFAULT 127 CHECK (rate_weekdays BETWEEN 1 AND 127),
+    rate_price REAL NOT NULL CHECK (rate_price >= 0),
+    rate_priority INTEGER NOT NULL DEFAULT 0,
+    rate_desc TEXT
+);
+CREATE INDEX idx_rate_hotel_id ON RATE(rate_hotel_id);
+
+-- Cached price arrays (quotes.py) are keyed on the HOTEL and RATE versions.
+INSERT INTO TABLE_VERSION VALUES ('RATE', 1, datetime('now'));
+CREATE TRIGGER trg_version_rate_insert AFTER INSERT ON RATE
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'RATE';
+END;
+CREATE TRIGGER trg_version_rate_update AFTER UPDATE ON RATE
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'RATE';
+END;
+CREATE TRIGGER trg_version_rate_delete AFTER DELETE ON RATE
+BEGIN
+    UPDATE TABLE_VERSION SET tv_version = tv_version + 1, tv_changed_at = datetime('now') WHERE tv_table = 'RATE';
+END;
+CREATE TRIGGER trg_rate_hotel_delete AFTER DELETE ON HOTEL
+BEGIN
+    DELETE FROM RATE WHERE rate_hotel_id = OLD.hotl_id;
+END;
+
+-- book_total is the stay's price when it was booked: the rate calendar (or hotl_rent)
+-- summed over its nights, NULL when some night has no price. It is fixed at booking time
+-- and repriced only when the stay itself changes; the ledger charges it, so later rent or
+-- rate edits leave booked stays alone. Bookings made before this migration keep a NULL
+-- total and go on being charged nights x hotl_rent.
+ALTER TABLE BOOKING ADD COLUMN book_total REAL;
+ALTER TABLE BOOKING_LEDGER ADD COLUMN bl_total REAL;
+-- Setting book_total from the insert trigger must not rewrite the summary row that
+-- trg_summary_booking_insert is about to add; the summary holds no other BOOKING columns.
+DROP TRIGGER trg_summary_booking_update;
+CREATE TRIGGER trg_summary_booking_update AFTER UPDATE OF book_id, book_cus_id, book_hotel_id, book_type ON BOOKING
+BEGIN
+    DELETE FROM BOOKING_SUMMARY WHERE bs_book_id = OLD.book_id;
+    INSERT INTO BOOKING_SUMMARY
+    SELECT NEW.book_id, NEW.book_cus_id, NEW.book_hotel_id, C.cus_name, C.cus_mobile, C.cus_add,
+           H.hotl_name, NEW.book_type, H.hotl_rent,
+           (SELECT COALESCE(SUM(pay_amt), 0) FROM PAYMENTS WHERE pay_book_id = NEW.book_id),
+           (SELECT COUNT(*) FROM PAYMENTS WHERE pay_book_id = NEW.book_id),
+           (SELECT MAX(pay_date) FROM PAYMENTS WHERE pay_book_id = NEW.book_id)
+    FROM CUSTOMER C JOIN HOTEL H ON H.hotl_id = NEW.book_hotel_id
+    WHERE C.cus_id = NEW.book_cus_id;
+END;
+CREATE TRIGGER trg_booking_total_insert AFTER INSERT ON BOOKING
+WHEN NEW.book_total IS NULL
+BEGIN
+    UPDATE BOOKING SET book_total = (""" + STAY_TOTAL_SQL + """) WHERE book_id = NEW.book_id;
+END;
+CREATE TRIGGER trg_booking_total_update AFTER UPDATE OF book_hotel_id, book_type, book_check_in, book_check_out ON BOOKING
+BEGIN
+    UPDATE BOOKING SET book_total = (""" + STAY_TOTAL_SQL + """) WHERE book_id = NEW.book_id;
+END;
+
+DROP TRIGGER trg_ledger_booking_insert;
+DROP TRIGGER trg_ledger_booking_update;
+DROP TRIGGER trg_ledger_hotel_update;
+CREATE TRIGGER trg_ledger_booking_insert AFTER INSERT ON BOOKING
+BEGIN
+    INSERT INTO BOOKING_LEDGER (bl_book_id, bl_cus_id, bl_hotel_id, bl_nights, bl_rent, bl_charged, bl_paid, bl_check_in, bl_total)
+    SELECT NEW.book_id, NEW.book_cus_id, NEW.book_hotel_id, N.nights, R.rent,
+           CASE WHEN R.found THEN ROUND(COALESCE(T.total, N.nights * R.rent), 2) ELSE 0 END,
+           ROUND((SELECT COALESCE(SUM(pay_amt), 0) FROM PAYMENTS WHERE pay_book_id = NEW.book_id), 2),
+           date(NEW.book_check_in), T.total
+    FROM (SELECT COALESCE(MAX(0, CAST(julianday(date(NEW.book_check_out)) - julianday(date(NEW.book_check_in)) AS INTEGER)), 0) AS nights) N,
+         (SELECT COALESCE(MAX(hotl_rent), 0) AS rent, COUNT(*) AS found FROM HOTEL WHERE hotl_id = NEW.book_hotel_id) R,
+         (SELECT book_total AS total FROM BOOKING WHERE book_id = NEW.book_id) T;
+END;
+CREATE TRIGGER trg_ledger_booking_update AFTER UPDATE OF book_cus_id, book_hotel_id, book_check_in, book_check_out, book_total ON BOOKING
+BEGIN
+    UPDATE BOOKING_LEDGER SET bl_cus_id = NEW.book_cus_id, bl_hotel_id = NEW.book_hotel_id, bl_nights = N.nights,
+        bl_rent = R.rent, bl_charged = CASE WHEN R.found THEN ROUND(COALESCE(T.total, N.nights * R.rent), 2) ELSE 0 END,
+        bl_check_in = date(NEW.book_check_in), bl_total = T.total
+    FROM (SELECT COALESCE(MAX(0, CAST(julianday(date(NEW.book_check_out)) - julianday(date(NEW.book_check_in)) AS INTEGER)), 0) AS nights) N,
+         (SELECT COALESCE(MAX(hotl_rent), 0) AS rent, COUNT(*) AS found FROM HOTEL WHERE hotl_id = NEW.book_hotel_id) R,
+         (SELECT book_total AS total FROM BOOKING WHERE book_id = NEW.book_id) T
+    WHERE bl_book_id = NEW.book_id;
+END;
+CREATE TRIGGER trg_ledger_hotel_update AFTER UPDATE OF hotl_rent ON HOTEL
+WHEN OLD.hotl_rent IS NOT NEW.hotl_rent
+BEGIN
+    UPDATE BOOKING_LEDGER SET bl_rent = COALESCE(NEW.hotl_rent, 0),
+        bl_charged = COALESCE(bl_total, ROUND(bl_nights * COALESCE(NEW.hotl_rent, 0), 2))
+    WHERE bl_hotel_id = NEW.hotl_id;
+END;
+"""),
+]
+
+SCHEMA_VERSION = MIGRATIONS[-1][0]
+LEDGER_MIGRATION = 11
+STAY_TOTAL_MIGRATION = 12
+
+SQL_INSERT_DATA = [
+    # USER_TABLE
+    "INSERT INTO USER_TABLE VALUES (1, 'Alice', '9876543210', 'alice@email.com', 'Address 1');",
+    "INSERT INTO USER_TABLE VALUES (2, 'Bob', '9876543211', 'bob@email.com', 'Address 2');",
+    # ROLES
+    "INSERT INTO ROLES VALUES (1, 'Admin', 'Full system access');",
+    "INSERT INTO ROLES VALUES (2, 'Manager', 'Manage hotels and bookings');",
+    # LOGIN rows come from SEED_LOGINS (hashed at insert time)
+    # PERMISSION (Subset)
+    "INSERT INTO PERMISSION VALUES (1, 1, 'Full Access', 'All');",
+    "INSERT INTO PERMISSION VALUES (2, 2, 'Manage Bookings', 'Bookings');",
+    # CUSTOMER
+    "INSERT INTO CUSTOMER VALUES (1, 'Tom', '9988776655', 'tom@email.com', 'tom123', 'Addr1');",
+    "INSERT INTO CUSTOMER VALUES (2, 'Jerry', '9988776656', 'jerry@email.com', 'jerry123', 'Addr2');",
+    # HOTEL
+    "INSERT INTO HOTEL VALUES (1, '5-Star', 'Luxury hotel', 'Hotel A', 5000, 1);",
+    "INSERT INTO HOTEL VALUES (2, '4-Star', 'Comfortable stay', 'Hotel B', 4000, 2);",
+    # BOOKING (Added dummy dates)
+    "INSERT INTO BOOKING VALUES (1, 'Single room booking', 'Single', 1, 1, '2025-10-01', '2025-10-05');",
+    "INSERT INTO BOOKING VALUES (2, 'Double room booking', 'Double', 2, 2, '2025-10-02', '2025-10-06');",
+    # PAYMENTS
+    "INSERT INTO PAYMENTS VALUES (1, 1, 5000, '2025-10-01', 'Payment for booking 1');",
+    "INSERT INTO PAYMENTS VALUES (2, 2, 4000, '2025-10-02', 'Payment for booking 2');"
+]
+
+def find_duplicate_emails(conn):
+    """(cus_email, [cus_id, ...]) for each email shared by several customers, which migration 1's unique index rejects."""
+    rows = conn.execute("SELECT cus_email, GROUP_CONCAT(cus_id) FROM CUSTOMER WHERE cus_email IS NOT NULL "
+                        "GROUP BY cus_email HAVING COUNT(*) > 1 ORDER BY cus_email").fetchall()
+    return [(email, sorted(int(cus_id) for cus_id in ids.split(','))) for email, ids in rows]
+
+def dedupe_emails(db_name=DB_NAME):
+    """Merges customers sharing an email into the one with the lowest cus_id, so migration 1 can run.
+
+    The other customers' bookings and payments are moved to that customer and
+    their CUSTOMER rows deleted, in one transaction. Returns the number of
+    customers merged away, or None on error.
+    """
+    conn = None
+    try:
+        conn = sqlite3.connect(db_name)
+        with conn:
+            duplicates = find_duplicate_emails(conn)
+            merges = [(ids[0], cus_id) for _, ids in duplicates for cus_id in ids[1:]]
+            conn.executemany("UPDATE BOOKING SET book_cus_id = ? WHERE book_cus_id = ?", merges)
+            conn.executemany("UPDATE PAYMENTS SET pay_cus_id = ? WHERE pay_cus_id = ?", merges)
+            conn.executemany("DELETE FROM CUSTOMER WHERE cus_id = ?", [(cus_id,) for _, cus_id in merges])
+        for email, ids in duplicates:
+            print(f"🔗 {email}: customers {ids[1:]} merged into {ids[0]}")
+        return len(merges)
+    except sqlite3.Error as e:
+        print(f"❌ Email dedupe failed: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+
+def apply_migrations(conn):
+    """Applies every migration newer than the database's user_version.
+
+    Each migration runs in its own transaction together with the version bump,
+    so a failure leaves the database at the last good version.
+    Returns the resulting schema version. Raises sqlite3.IntegrityError, listing
+    them, when customers share an email before migration 1 (see dedupe_emails).
+    """
+    current = conn.execute("PRAGMA user_version;").fetchone()[0]
+    for version, description, sql in MIGRATIONS:
+        if version <= current:
+            continue
+        rebuild = callable(sql)
+        if rebuild:
+            # Table rebuilds must not run the implicit deletes of DROP TABLE through foreign keys.
+            foreign_keys = conn.execute("PRAGMA foreign_keys;").fetchone()[0]
+            conn.execute("PRAGMA foreign_keys = OFF;")
+            sql = sql(conn)
+        if version == 1:
+            duplicates = find_duplicate_emails(conn)
+            if duplicates:
+                listed = '; '.join(f"{email} (cus_id {', '.join(map(str, ids))})" for email, ids in duplicates[:20])
+                raise sqlite3.IntegrityError(
+                    f"migration 1 makes cus_email unique, but {len(duplicates)} emails belong to several customers: "
+                    f"{listed}{' ...' if len(duplicates) > 20 else ''}. Give those customers distinct emails, "
+                    "or merge them with 'python db_setup.py dedupe-emails', then migrate again.")
+        try:
+            conn.executescript(f"BEGIN IMMEDIATE;\n{sql}\nPRAGMA user_version = {version};\nCOMMIT;")
+        except sqlite3.Error:
+            if conn.in_transaction:
+                conn.rollback()
+            raise
+        finally:
+            if rebuild:
+                conn.execute(f"PRAGMA foreign_keys = {foreign_keys};")
+        print(f"✅ Migration {version} applied: {description}")
+        current = version
+    return current
+
+def migrate_database(db_name=DB_NAME):
+    """Upgrades an existing database file to SCHEMA_VERSION."""
+    if not os.path.exists(db_name):
+        print(f"❌ Database '{db_name}' not found. Run setup first.")
+        return None
+    conn = None
+    try:
+        conn = sqlite3.connect(db_name)
+        before = conn.execute("PRAGMA user_version;").fetchone()[0]
+        version = apply_migrations(conn)
+        archived = before >= 10 and conn.execute("SELECT COUNT(*) FROM ARCHIVE").fetchone()[0]
+    except sqlite3.Error as e:
+        print(f"❌ Migration failed: {e}")
+        return None
+    finally:
+        if conn:
+            conn.close()
+    if not archived:
+        return version
+    db = HotelDBManager(db_name)
+    try:
+        # Archive files written before migration 12 lack book_total, which history() reads;
+        # checked on every run (it is cheap) so a failed upgrade is retried.
+        if version >= STAY_TOTAL_MIGRATION and not db.upgrade_archives():
+            print("❌ Archive upgrade failed; run 'python db_setup.py migrate' again.")
+            return None
+        # Migration 11 can only see the hot tables; archived stays are added from history().
+        if before < LEDGER_MIGRATION <= version:
+            if db.rebuild_ledger():
+                print("✅ Ledger rebuilt including archived stays.")
+            else:
+                print("❌ Ledger rebuild failed; run 'python db_setup.py rebuild-ledger'.")
+    finally:
+        db.close()
+    return version
+
+def setup_database(db_name=DB_NAME):
+    """Initializes the SQLite database, creates tables, view, and inserts sample data."""
+    conn = None
+    try:
+        if os.path.exists(db_name):
+            os.remove(db_name)
+            print(f"🧹 Existing database '{db_name}' removed.")
+
+        conn = sqlite3.connect(db_name)
+        cursor = conn.cursor()
+        cursor.execute("PRAGMA foreign_keys = ON;")
+        cursor.executescript(SQL_SCHEMA)
+        print("✅ Tables created successfully.")
+        
+        for statement in SQL_INSERT_DATA:
+            cursor.execute(statement)
+        cursor.executemany("INSERT INTO LOGIN VALUES (?, ?, ?, ?);",
+                           [(login_id, role_id, username, hash_password(password))
+                            for login_id, role_id, username, password in SEED_LOGINS])
+        
+        conn.commit()
+        print("✅ Sample data inserted successfully.")
+
+        apply_migrations(conn)
+
+    except sqlite3.Error as e:
+        print(f"❌ Database error: {e}")
+        if conn:
+            conn.rollback()
+    finally:
+        if conn:
+            conn.close()
+
+def init_database(db_name=DB_NAME):
+    """Creates the database with sample data if it is missing, otherwise migrates it.
+
+    Safe to run on every deploy; app.create_app() and `python db_setup.py init` use it.
+    """
+    if not os.path.exists(db_name):
+        print(f"Database '{db_name}' not found. Running setup...")
+        setup_database(db_name)
+        return SCHEMA_VERSION if os.path.exists(db_name) else None
+    return migrate_database(db_name)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Hotel booking database setup and maintenance.")
+    parser.add_argument('command', nargs='?', default='setup',
+                        choices=['setup', 'init', 'migrate', 'check-summary', 'rebuild-summary',
+                                 'check-rollup', 'rebuild-rollup', 'check-ledger', 'rebuild-ledger', 'dedupe-emails'],
+                        help="'setup' recreates the database with sample data; 'init' creates it only if missing, "
+                             "else migrates; 'migrate' upgrades it in place; "
+                             "'check-summary'/'rebuild-summary' verify or rebuild BOOKING_SUMMARY; "
+                             "'check-rollup'/'rebuild-rollup' do the same for HOTEL_DAILY/HOTEL_MONTHLY; "
+                             "'check-ledger'/'rebuild-ledger' reconcile BOOKING_LEDGER/CUSTOMER_LEDGER; "
+                             "'dedupe-emails' merges customers sharing an email (needed before migration 1).")
+    parser.add_argument('--db', default=DB_NAME, help="Database file (default: %(default)s)")
+    args = parser.parse_args()
+
+    if args.command == 'init':
+        if init_database(args.db) is None:
+            sys.exit(1)
+    elif args.command == 'migrate':
+        migrate_database(args.db)
+    elif args.command == 'dedupe-emails':
+        merged = dedupe_emails(args.db)
+        if merged is None:
+            sys.exit(1)
+        print(f"✅ {merged} duplicate customers merged.")
+    elif args.command == 'check-summary':
+        drift = HotelDBManager(args.db).check_booking_summary()
+        if drift:
+            print(f"❌ BOOKING_SUMMARY out of date for booking IDs: {drift}")
+            sys.exit(1)
+        print("✅ BOOKING_SUMMARY is consistent.")
+    elif args.command == 'rebuild-summary':
+        if HotelDBManager(args.db).rebuild_booking_summary():
+            print("✅ BOOKING_SUMMARY rebuilt.")
+        else:
+            print("❌ Rebuild failed.")
+            sys.exit(1)
+    elif args.command == 'check-rollup':
+        drift = HotelDBManager(args.db).check_hotel_daily()
+        if drift:
+            print(f"❌ Rollups out of date for {len(drift)} (date or month, hotel ID) keys: {drift[:20]}")
+            sys.exit(1)
+        print("✅ HOTEL_DAILY and HOTEL_MONTHLY are consistent.")
+    elif args.command == 'rebuild-rollup':
+        if HotelDBManager(args.db).rebuild_hotel_daily():
+            print("✅ HOTEL_DAILY and HOTEL_MONTHLY rebuilt.")
+        else:
+            print("❌ Rebuild failed.")
+            sys.exit(1)
+    elif args.command == 'check-ledger':
+        drift = HotelDBManager(args.db).check_ledger()
+        if drift:
+            print(f"❌ Ledger out of date for {len(drift)} (table, ID) keys: {drift[:20]}")
+            sys.exit(1)
+        print("✅ BOOKING_LEDGER and CUSTOMER_LEDGER are consistent.")
+    elif args.command == 'rebuild-ledger':
+        if HotelDBManager(args.db).rebuild_ledger():
+            print("✅ BOOKING_LEDGER and CUSTOMER_LEDGER rebuilt.")
+        else:
+            print("❌ Rebuild failed.")
+            sys.exit(1)
+    else:
+        setup_database(args.db)
@@ -0,0 +1,77 @@
+"""Rendered-fragment cache for the table rows of the list pages.
+
+The hotels, customers, payments and bookings pages render every row of the
+page through Jinja on each request, even when nothing changed. app.py
+renders the rows (<tr> blocks from *_rows.html) once and keeps the HTML
+here, together with the page's paging state. The key is the page request
+(after/limit/sort/order) plus the TABLE_VERSION counters of the tables the
+rows come from. Any write, from any process, bumps a counter, so a changed
+table gets new keys and its old entries are never served again; they age
+out through LRU eviction. A hit skips both the page query and the row
+rendering; only the page shell (nav bar, flash messages, pager) is rendered.
+
+Settings (environment variables):
+    HOTEL_FRAGMENT_CACHE_MB   memory cap for cached fragments, per process (default 32; 0 disables)
+"""
+import os
+import threading
+from collections import OrderedDict
+
+FRAGMENT_CACHE_MB = float(os.environ.get('HOTEL_FRAGMENT_CACHE_MB', 32))
+
+
+class FragmentCache:
+    """LRU map of key -> (html, extra) capped at `max_bytes` of HTML. Thread-safe."""
+
+    def __init__(self, max_bytes=None):
+        self.max_bytes = int(FRAGMENT_CACHE_MB * 2 ** 20) if max_bytes is None else max_bytes
+        self._entries = OrderedDict()  # key -> (html, extra, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'evictions': 0, 'too_large': 0}
+
+    def get(self, key):
+        """(html, extra) for `key`, or None on a miss."""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self._stats['misses'] += 1
+                return None
+            self._entries.move_to_end(key)
+            self._stats['hits'] += 1
+            return entry[0], entry[1]
+
+    def put(self, key, html, extra=None):
+        """Stores a fragment, evicting the least recently used ones to stay under max_bytes."""
+        if not self.max_bytes:
+            return
+        size = len(html.encode('utf-8'))
+        with self._lock:
+            if size > self.max_bytes:
+                self._stats['too_large'] += 1
+                return
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._bytes -= old[2]
+            self._entries[key] = (html, extra, size)
+            self._bytes += size
+            while self._bytes > self.max_bytes:
+                _, (_, _, evicted) = self._entries.popitem(last=False)
+                self._bytes -= evicted
+                self._stats['evictions'] += 1
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters plus entries, bytes held and the hit rate so far."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['entries'] = len(self._entries)
+            stats['bytes'] = self._bytes
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_rate'] = round(stats['hits'] / lookups, 4) if lookups else 0.0
+        stats['max_bytes'] = self.max_bytes
+        return stats
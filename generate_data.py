@@ -0,0 +1,149 @@
+"""Deterministic synthetic dataset generator.
+
+Builds a fresh database (schema + sample data from db_setup) and fills it with
+generated hotels, customers, bookings and payments. The same --seed and sizes
+always produce the same database, so benchmark runs are comparable.
+
+    python generate_data.py --db bench.db --hotels 1000 --customers 1000000 \\
+        --bookings 5000000 --payments 5000000
+"""
+import argparse
+import random
+import sys
+import time
+from datetime import date, timedelta
+
+from bulk_load import deferred_maintenance
+from db_manager import HotelDBManager, ROOM_TYPES
+from db_setup import setup_database
+
+FIRST_NAMES = ('Aarav', 'Diya', 'Ishaan', 'Meera', 'Kabir', 'Ananya', 'Rohan', 'Saanvi', 'Vihaan', 'Priya',
+               'Arjun', 'Kavya', 'Aditya', 'Nisha', 'Rahul', 'Pooja', 'Sanjay', 'Lakshmi', 'Tom', 'Jerry')
+LAST_NAMES = ('Sharma', 'Iyer', 'Reddy', 'Nair', 'Patel', 'Gupta', 'Menon', 'Rao', 'Das', 'Singh',
+              'Kumar', 'Joshi', 'Pillai', 'Verma', 'Bose', 'Khan')
+CITIES = ('Chennai', 'Mumbai', 'Delhi', 'Bengaluru', 'Hyderabad', 'Kochi', 'Pune', 'Jaipur', 'Goa', 'Kolkata')
+HOTEL_TYPES = ('3-Star', '4-Star', '5-Star', 'Resort', 'Boutique')
+
+FIRST_STAY = date(2023, 1, 1)
+STAY_WINDOW_DAYS = 4 * 365
+MAX_NIGHTS = 7
+
+
+def _batches(rows, size):
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def _insert(db, sql, rows, batch_size, label, total):
+    started = time.perf_counter()
+    done = 0
+    for batch in _batches(rows, batch_size):
+        with db.transaction() as conn:
+            conn.executemany(sql, batch)
+        done += len(batch)
+        if done % (batch_size * 20) == 0 or done == total:
+            rate = done / max(time.perf_counter() - started, 1e-9)
+            print(f"  {label}: {done:,}/{total:,} ({rate:,.0f} rows/s)", file=sys.stderr)
+
+
+def generate(db_name, hotels=100, customers=10000, bookings=50000, payments=50000, seed=42, batch_size=20000):
+    """Creates `db_name` from scratch and fills it. Returns the row counts generated."""
+    setup_database(db_name)
+    db = HotelDBManager(db_name)
+    rng = random.Random(seed)
+
+    # IDs continue after the sample rows inserted by setup_database().
+    base = {table: db._execute(f"SELECT COALESCE(MAX({pk}), 0) AS n FROM {table}", fetch_one=True)['n']
+            for table, pk in (('HOTEL', 'hotl_id'), ('CUSTOMER', 'cus_id'), ('BOOKING', 'book_id'))}
+
+    rents = [float(rng.randrange(1500, 15000, 250)) for _ in range(hotels)]
+
+    def hotel_rows():
+        for i in range(hotels):
+            city = CITIES[i % len(CITIES)]
+            yield (base['HOTEL'] + i + 1, rng.choice(HOTEL_TYPES), f"Stay in {city}",
+                   f"{city} {rng.choice(LAST_NAMES)} Hotel {i + 1}", rents[i], rng.choice((1, 2)))
+
+    def customer_rows():
+        for i in range(customers):
+            name = f"{rng.choice(FIRST_NAMES)} {rng.choice(LAST_NAMES)}"
+            yield (base['CUSTOMER'] + i + 1, name, f"9{rng.randrange(10**9):09d}", f"guest{i + 1}@example.com",
+                   'temporary', f"{rng.randrange(1, 500)} Main Road, {rng.choice(CITIES)}")
+
+    # Payments are emitted alongside their booking (about payments/bookings per booking)
+    # so each one can reference a real booking without holding bookings in memory.
+    payment_rows = []
+    per_booking = payments / bookings if bookings else 0
+
+    def booking_rows():
+        owed = 0.0
+        for i in range(bookings):
+            book_id = base['BOOKING'] + i + 1
+            cus_id = base['CUSTOMER'] + rng.randrange(customers) + 1
+            hotel = rng.randrange(hotels)
+            check_in = FIRST_STAY + timedelta(days=rng.randrange(STAY_WINDOW_DAYS))
+            nights = rng.randint(1, MAX_NIGHTS)
+            check_out = check_in + timedelta(days=nights)
+            yield (book_id, f"{nights}-night stay", rng.choice(ROOM_TYPES), cus_id, base['HOTEL'] + hotel + 1,
+                   check_in.isoformat(), check_out.isoformat())
+
+            owed += per_booking
+            total = rents[hotel] * nights
+            while owed >= 1:
+                owed -= 1
+                amount = round(total * rng.choice((0.25, 0.5, 1.0)), 2)
+                paid_on = check_in - timedelta(days=rng.randrange(0, 30))
+                payment_rows.append((cus_id, amount, paid_on.isoformat(), f"Payment for booking {book_id}", book_id))
+
+    def drain_payments():
+        with db.transaction() as conn:
+            conn.executemany("INSERT INTO PAYMENTS (pay_cus_id, pay_amt, pay_date, pay_desc, pay_book_id) "
+                             "VALUES (?, ?, ?, ?, ?)", payment_rows)
+        payment_rows.clear()
+
+    print(f"Generating {hotels:,} hotels, {customers:,} customers, {bookings:,} bookings, "
+          f"~{payments:,} payments (seed {seed})", file=sys.stderr)
+    started = time.perf_counter()
+
+    with deferred_maintenance(db, 'HOTEL', 'CUSTOMER', 'BOOKING', 'PAYMENTS'):
+        _insert(db, "INSERT INTO HOTEL (hotl_id, hotl_type, hotl_desc, hotl_name, hotl_rent, hotl_manager_id) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", hotel_rows(), batch_size, 'hotels', hotels)
+        _insert(db, "INSERT INTO CUSTOMER (cus_id, cus_name, cus_mobile, cus_email, cus_pass, cus_add) "
+                    "VALUES (?, ?, ?, ?, ?, ?)", customer_rows(), batch_size, 'customers', customers)
+
+        done = 0
+        for batch in _batches(booking_rows(), batch_size):
+            with db.transaction() as conn:
+                conn.executemany("INSERT INTO BOOKING (book_id, book_desc, book_type, book_cus_id, book_hotel_id, "
+                                 "book_check_in, book_check_out) VALUES (?, ?, ?, ?, ?, ?, ?)", batch)
+            drain_payments()
+            done += len(batch)
+            if done % (batch_size * 20) == 0 or done == bookings:
+                print(f"  bookings/payments: {done:,}/{bookings:,}", file=sys.stderr)
+        print("  rebuilding indexes and derived tables...", file=sys.stderr)
+
+    counts = {table.lower(): db._execute(f"SELECT COUNT(*) AS n FROM {table}", fetch_one=True)['n']
+              for table in ('HOTEL', 'CUSTOMER', 'BOOKING', 'PAYMENTS')}
+    db._execute("ANALYZE;")
+    db.close()
+    print(f"✅ Generated {db_name} in {time.perf_counter() - started:.1f}s: {counts}")
+    return counts
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description="Generate a deterministic synthetic hotel booking database.")
+    parser.add_argument('--db', default='bench.db', help="Output database file (recreated; default: %(default)s)")
+    parser.add_argument('--hotels', type=int, default=100)
+    parser.add_argument('--customers', type=int, default=10000)
+    parser.add_argument('--bookings', type=int, default=50000)
+    parser.add_argument('--payments', type=int, default=50000)
+    parser.add_argument('--seed', type=int, default=42)
+    parser.add_argument('--batch-size', type=int, default=20000)
+    args = parser.parse_args()
+    generate(args.db, args.hotels, args.customers, args.bookings, args.payments, args.seed, args.batch_size)
@@ -0,0 +1,155 @@
+"""Group commit: one writer thread that commits queued writes together.
+
+SQLite has a single writer. During a burst of bookings every request thread
+otherwise waits for the write lock, commits on its own, and after the busy
+timeout fails with "database is locked". GroupCommitWriter runs the writes
+on one dedicated thread instead: it takes every operation queued while the
+previous batch was committing (up to `max_batch`, optionally waiting
+`max_delay` seconds for more) and runs them all in one BEGIN IMMEDIATE ...
+COMMIT. Each operation runs inside its own SAVEPOINT, so one that raises is
+rolled back alone and only its caller sees the error. Callers wait on a Future that resolves once the batch has
+committed, with their own result (e.g. the new row id) or exception.
+
+HotelDBManager sends its writes through a writer when created with
+group_commit=True (app.py does so when HOTEL_GROUP_COMMIT=1); otherwise
+each write commits on the calling thread.
+
+Settings (environment variables):
+    HOTEL_GROUP_COMMIT       1 turns group commit on in app.py (default 0)
+    HOTEL_COMMIT_BATCH       most operations per transaction (default 64)
+    HOTEL_COMMIT_DELAY_MS    how long a batch waits for more operations (default 0: take what is queued)
+    HOTEL_WRITE_QUEUE        operations allowed to wait; further submits block (default 1024)
+"""
+import os
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+
+from instrumentation import detached_context
+
+GROUP_COMMIT = os.environ.get('HOTEL_GROUP_COMMIT', '0') == '1'
+
+
+class GroupCommitWriter:
+    """Runs submitted write operations in shared transactions on one thread. See the module docstring."""
+
+    def __init__(self, pool, max_batch=None, max_delay=None, max_queue=None, timeout=None):
+        self.pool = pool
+        self.max_batch = max_batch or int(os.environ.get('HOTEL_COMMIT_BATCH', 64))
+        self.max_delay = max_delay if max_delay is not None \
+            else float(os.environ.get('HOTEL_COMMIT_DELAY_MS', 0)) / 1000
+        self.max_queue = max_queue or int(os.environ.get('HOTEL_WRITE_QUEUE', 1024))
+        self.timeout = pool.timeout if timeout is None else timeout
+        self._lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._queue = None
+        self._stats = {'operations': 0, 'failed': 0, 'batches': 0, 'failed_batches': 0, 'largest_batch': 0}
+
+    def _started(self):
+        """The operation queue, starting the writer thread on first use and again after a fork or close()."""
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._queue = queue.Queue(maxsize=self.max_queue)
+                self._thread = threading.Thread(target=self._run, args=(self._queue,), name='group-commit',
+                                                daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+            return self._queue
+
+    def submit(self, work, method=None):
+        """Queues work(conn) and returns a Future for its result.
+
+        `work` runs inside the shared transaction and must not commit or roll
+        back. `method` names it in the query metrics. Raises
+        sqlite3.OperationalError if the queue stays full for `timeout` seconds.
+        """
+        pending = self._started()
+        future = Future()
+        try:
+            pending.put((work, detached_context(method), future), timeout=self.timeout)
+        except queue.Full:
+            raise sqlite3.OperationalError("group-commit write queue is full")
+        return future
+
+    def close(self):
+        """Stops the writer thread after the operations already queued have been committed."""
+        with self._lock:
+            thread, pending, self._thread = self._thread, self._queue, None
+        if thread is not None and self._pid == os.getpid():
+            pending.put(None)
+            thread.join()
+
+    def stats(self):
+        """Counters plus the number of operations waiting right now."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['queued'] = self._queue.qsize() if self._queue is not None else 0
+        stats['max_batch'] = self.max_batch
+        return stats
+
+    # --- Writer Thread ---
+    def _collect(self, pending):
+        """Blocks for one operation, then gathers more for up to max_delay. None marks close()."""
+        batch = [pending.get()]
+        deadline = time.monotonic() + self.max_delay
+        while batch[-1] is not None and len(batch) < self.max_batch:
+            try:
+                batch.append(pending.get(timeout=max(0.0, deadline - time.monotonic())))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self, pending):
+        while True:
+            batch = self._collect(pending)
+            operations = [op for op in batch if op is not None and op[2].set_running_or_notify_cancel()]
+            if operations:
+                self._commit(operations)
+            if batch[-1] is None:
+                return
+
+    def _commit(self, operations):
+        """Runs one batch in a single transaction, then resolves every caller's Future."""
+        outcomes = []
+        try:
+            with self.pool.connection() as conn:
+                conn.execute("BEGIN IMMEDIATE;")
+                try:
+                    for work, context, future in operations:
+                        conn.execute("SAVEPOINT group_commit_op;")
+                        try:
+                            result = context.run(work, conn)
+                        except Exception as e:
+                            conn.execute("ROLLBACK TO group_commit_op;")
+                            outcomes.append((future, None, e))
+                        else:
+                            outcomes.append((future, result, None))
+                        conn.execute("RELEASE group_commit_op;")
+                except BaseException:
+                    conn.rollback()
+                    raise
+                else:
+                    conn.commit()
+        except Exception as e:
+            # The transaction itself failed (busy timeout, disk full...): nothing was written.
+            with self._lock:
+                self._stats['failed_batches'] += 1
+                self._stats['failed'] += len(operations)
+            for _, _, future in operations:
+                future.set_exception(e)
+            return
+
+        failed = sum(1 for _, _, error in outcomes if error is not None)
+        with self._lock:
+            self._stats['batches'] += 1
+            self._stats['operations'] += len(outcomes)
+            self._stats['failed'] += failed
+            self._stats['largest_batch'] = max(self._stats['largest_batch'], len(outcomes))
+        for future, result, error in outcomes:
+            if error is None:
+                future.set_result(result)
+            else:
+                future.set_exception(error)
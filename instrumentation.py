@@ -0,0 +1,361 @@
+"""Query and request instrumentation with Prometheus-format metrics.
+
+Every SQL statement run through an InstrumentedConnection is timed, up to
+the last row fetched from it, and attributed to the HotelDBManager method
+that issued it. Flask requests are
+timed per route, together with the number of queries they ran, so N+1 loops
+show up as a high query count for one route. Slow statements are logged to
+the 'hotel_booking.sql' logger together with their EXPLAIN QUERY PLAN.
+
+Settings (environment variables, read at import):
+    HOTEL_SLOW_QUERY_MS      slow-query log threshold in ms (default 100, 0 disables)
+    HOTEL_REQUEST_QUERY_BUDGET  warn when one request runs more queries (default 25; per item
+                                for batch requests, see set_batch_items())
+"""
+import bisect
+import contextvars
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+
+logger = logging.getLogger('hotel_booking.sql')
+
+MANAGER_MODULE = 'db_manager'
+EXPLAINABLE = ('SELECT', 'WITH', 'INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+WRITE_STATEMENTS = ('INSERT', 'UPDATE', 'DELETE', 'REPLACE')
+
+QUERY_BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+REQUEST_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 25, 50, 100)
+
+
+# --- Metric Types ---
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs += [f'{name}="{value}"' for name, value in extra]
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name, self.help, self.label_names = name, help_text, labels
+        self._values = {}
+
+    def inc(self, labels=(), amount=1):
+        self._values[labels] = self._values.get(labels, 0) + amount
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} counter"
+        for labels, value in sorted(self._values.items()):
+            yield f"{self.name}{_labels(self.label_names, labels)} {value}"
+
+
+class Histogram:
+    def __init__(self, name, help_text, labels=(), buckets=QUERY_BUCKETS):
+        self.name, self.help, self.label_names, self.buckets = name, help_text, labels, buckets
+        self._values = {}  # labels -> [bucket counts..., +Inf count, sum]
+
+    def observe(self, labels, value):
+        series = self._values.get(labels)
+        if series is None:
+            series = self._values[labels] = [0] * (len(self.buckets) + 2)
+        series[bisect.bisect_left(self.buckets, value)] += 1
+        series[-1] += value
+
+    def render(self):
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+        for labels, series in sorted(self._values.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + ('+Inf',), series):
+                cumulative += count
+                yield f"{self.name}_bucket{_labels(self.label_names, labels, [('le', bound)])} {cumulative}"
+            yield f"{self.name}_sum{_labels(self.label_names, labels)} {series[-1]:.6f}"
+            yield f"{self.name}_count{_labels(self.label_names, labels)} {cumulative}"
+
+
+# --- Registry ---
+class RequestStats:
+    """Per-request query tally, carried in a context variable."""
+    __slots__ = ('queries', 'writes', 'query_seconds', 'batch_items', 'started')
+
+    def __init__(self):
+        self.queries = 0
+        self.writes = 0  # INSERT/UPDATE/DELETE statements (read-your-writes routing in app.py)
+        self.query_seconds = 0.0
+        self.batch_items = 1
+        self.started = time.perf_counter()
+
+
+_current_request = contextvars.ContextVar('hotel_request_stats', default=None)
+# Set on work handed to another thread, where the issuing method is not on the stack.
+_method_override = contextvars.ContextVar('hotel_query_method', default=None)
+
+
+class Metrics:
+    """Process-wide metric registry. All updates happen under one short lock."""
+
+    def __init__(self, slow_query_seconds=0.1, request_query_budget=25):
+        self.slow_query_seconds = slow_query_seconds
+        self.request_query_budget = request_query_budget
+        self._lock = threading.Lock()
+        self.query_seconds = Histogram('hotel_db_query_duration_seconds',
+                                       "SQL statement latency by manager method.", ('method', 'statement'))
+        self.query_rows = Counter('hotel_db_query_rows_total',
+                                  "Rows returned or changed by manager method.", ('method',))
+        self.query_errors = Counter('hotel_db_query_errors_total', "Failed SQL statements.", ('method',))
+        self.slow_queries = Counter('hotel_db_slow_queries_total', "Statements over the slow-query threshold.",
+                                    ('method',))
+        self.request_seconds = Histogram('hotel_http_request_duration_seconds', "Request latency by route.",
+                                         ('route', 'http_method'), REQUEST_BUCKETS)
+        self.requests = Counter('hotel_http_requests_total', "Requests by route and status.",
+                                ('route', 'http_method', 'status'))
+        self.request_queries = Histogram('hotel_http_request_queries', "SQL statements run per request.",
+                                         ('route',), QUERY_COUNT_BUCKETS)
+        self._collectors = []
+
+    def add_collector(self, name, help_text, collect):
+        """Registers a gauge family; `collect()` returns {label_value: number} or a number."""
+        self._collectors.append((name, help_text, collect))
+
+    # --- Recording ---
+    def record_query(self, method, statement, seconds, rows, error=False):
+        with self._lock:
+            self.query_seconds.observe((method, statement), seconds)
+            if rows:
+                self.query_rows.inc((method,), rows)
+            if error:
+                self.query_errors.inc((method,))
+        stats = _current_request.get()
+        if stats is not None:
+            stats.queries += 1
+            stats.query_seconds += seconds
+            if statement in WRITE_STATEMENTS and not error:
+                stats.writes += 1
+
+    def record_slow(self, method):
+        with self._lock:
+            self.slow_queries.inc((method,))
+
+    def start_request(self):
+        """Begins tallying queries for the current request; returns the token for finish_request()."""
+        return _current_request.set(RequestStats())
+
+    def set_batch_items(self, count):
+        """Marks the current request as a batch of `count` items; its query budget scales with them."""
+        stats = _current_request.get()
+        if stats is not None:
+            stats.batch_items = max(count, 1)
+
+    def finish_request(self, token, route, http_method, status):
+        """Records the request started with `token` and returns its RequestStats."""
+        stats = _current_request.get()
+        _current_request.reset(token)
+        if stats is None:
+            return None
+        elapsed = time.perf_counter() - stats.started
+        with self._lock:
+            self.request_seconds.observe((route, http_method), elapsed)
+            self.requests.inc((route, http_method, str(status)))
+            self.request_queries.observe((route,), stats.queries)
+        budget = self.request_query_budget * stats.batch_items
+        if budget and stats.queries > budget:
+            logger.warning("%s %s ran %d queries (budget %d) in %.1f ms",
+                           http_method, route, stats.queries, budget, elapsed * 1000)
+        return stats
+
+    # --- Exposition ---
+    def render(self):
+        """Returns every metric in the Prometheus text exposition format."""
+        with self._lock:
+            lines = []
+            for metric in (self.query_seconds, self.query_rows, self.query_errors, self.slow_queries,
+                           self.request_seconds, self.requests, self.request_queries):
+                lines.extend(metric.render())
+        for name, help_text, collect in self._collectors:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} gauge")
+            values = collect()
+            if isinstance(values, dict):
+                lines.extend(f'{name}{{key="{_escape(key)}"}} {value}' for key, value in sorted(values.items())
+                             if isinstance(value, (int, float)))
+            else:
+                lines.append(f"{name} {values}")
+        return '\n'.join(lines) + '\n'
+
+
+def _env_number(name, default):
+    try:
+        return float(os.environ.get(name, default))
+    except ValueError:
+        return default
+
+
+metrics = Metrics(slow_query_seconds=_env_number('HOTEL_SLOW_QUERY_MS', 100) / 1000,
+                  request_query_budget=int(_env_number('HOTEL_REQUEST_QUERY_BUDGET', 25)))
+
+
+# --- Connection Hook ---
+def caller_method(depth=3):
+    """Names the HotelDBManager method on the stack that issued a statement.
+
+    The outermost manager frame wins (get_all_hotels rather than the
+    _load_catalogue it calls). Statements issued from other modules, e.g.
+    through db.transaction() in bulk_load, are tagged module.function.
+    `depth` is the frame to start from (3: caller_method <- _traced <- execute <- caller).
+    """
+    override = _method_override.get()
+    if override is not None:
+        return override
+    frame = sys._getframe(depth)
+    name = frame.f_globals.get('__name__')
+    if name != MANAGER_MODULE:
+        return f"{name}.{frame.f_code.co_name}"
+    method = frame.f_code.co_name
+    frame = frame.f_back
+    while frame is not None:
+        name = frame.f_globals.get('__name__')
+        if name == MANAGER_MODULE:
+            method = frame.f_code.co_name
+        elif name != 'contextlib':  # `with self.transaction()` enters through contextlib
+            break
+        frame = frame.f_back
+    return method
+
+
+def detached_context(method):
+    """A copy of the current context whose statements are tagged as issued by `method`.
+
+    Work run in it on another thread (the group-commit writer) still counts
+    towards the submitting request and is attributed to its manager method.
+    """
+    context = contextvars.copy_context()
+    context.run(_method_override.set, method)
+    return context
+
+
+def _statement_kind(sql):
+    words = sql.lstrip()[:10].split(None, 1)
+    return words[0].rstrip(';').upper() if words else ''
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    """Cursor that keeps timing a statement's result set while its rows are fetched.
+
+    SQLite does most of a SELECT's work in the fetches (execute() returns after
+    the first row), so the statement is recorded, and checked against the
+    slow-query threshold, only once its rows are exhausted or the cursor is
+    closed or discarded.
+    """
+
+    _pending = None  # [method, kind, sql, parameters, seconds, rows] until recorded
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(started, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self._fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(started, 0, True)
+            raise
+        self._fetched(started, 1, False)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        self._finish()
+
+    def _fetched(self, started, rows, exhausted):
+        pending = self._pending
+        if pending is not None:
+            pending[4] += time.perf_counter() - started
+            pending[5] += rows
+            if exhausted:
+                self._finish()
+
+    def _finish(self):
+        pending, self._pending = self._pending, None
+        if pending is not None:
+            self.connection._record(*pending)
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    """sqlite3 connection that records every execute()/executemany() in `metrics`.
+
+    Statements that return rows are timed through their fetches (see
+    InstrumentedCursor); `last_method` is the tag of the latest statement.
+    """
+
+    last_method = None
+
+    def execute(self, sql, parameters=()):
+        return self._traced(sql, parameters, False)
+
+    def executemany(self, sql, seq_of_parameters):
+        return self._traced(sql, seq_of_parameters, True)
+
+    def _traced(self, sql, parameters, many):
+        method = self.last_method = caller_method()
+        kind = _statement_kind(sql)
+        cursor = self.cursor(InstrumentedCursor)
+        started = time.perf_counter()
+        try:
+            if many:
+                cursor.executemany(sql, parameters)
+            else:
+                cursor.execute(sql, parameters)
+        except sqlite3.Error:
+            metrics.record_query(method, kind, time.perf_counter() - started, 0, error=True)
+            raise
+        elapsed = time.perf_counter() - started
+        if cursor.description is None:
+            self._record(method, kind, sql, parameters, elapsed, max(cursor.rowcount, 0), many)
+        else:
+            cursor._pending = [method, kind, sql, parameters, elapsed, 0]
+        return cursor
+
+    def _record(self, method, kind, sql, parameters, elapsed, rows, many=False):
+        """Records one finished statement; slow ones are logged with their plan."""
+        metrics.record_query(method, kind, elapsed, rows)
+        if metrics.slow_query_seconds and elapsed >= metrics.slow_query_seconds:
+            metrics.record_slow(method)
+            # executemany() has no single parameter set to explain the statement with.
+            plan = self._plan(sql, parameters) if kind in EXPLAINABLE and not many else ''
+            logger.warning("Slow query in %s: %.1f ms\n  %s\n  plan:\n    %s",
+                           method, elapsed * 1000, ' '.join(sql.split()), plan or '(not available)')
+
+    def _plan(self, sql, parameters):
+        try:
+            rows = super().execute(f"EXPLAIN QUERY PLAN {sql}", parameters).fetchall()
+        except sqlite3.Error as e:
+            return f"(plan failed: {e})"
+        return '\n    '.join(row[3] for row in rows)
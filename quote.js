@@ -0,0 +1,83 @@
+// static/js/quote.js
+
+// Instant stay quotes for the booking form. Once both dates are set, one
+// GET /api/v1/quotes call prices the stay at every hotel for the chosen room
+// type; each hotel option then shows its total and the selected hotel's total
+// is shown under the dates. Changing the hotel reuses the last answer.
+document.addEventListener('DOMContentLoaded', function() {
+    const quote = document.getElementById('quote');
+    if (!quote) {
+        return;
+    }
+
+    const quoteUrl = quote.dataset.quoteUrl;
+    const hotel = document.getElementById('hotel');
+    const roomType = document.getElementById('book_type');
+    const checkIn = document.getElementById('check_in');
+    const checkOut = document.getElementById('check_out');
+    const formatter = new Intl.NumberFormat('en-IN', {maximumFractionDigits: 2});
+    let totals = {};
+    let nights = 0;
+    let latest = 0;
+    const labels = {};
+    Array.from(hotel.options).forEach(function(option) { labels[option.value] = option.textContent; });
+
+    function label(option) {
+        const total = totals[option.value];
+        if (!nights || total === undefined) {
+            return labels[option.value];
+        }
+        const price = total === null ? 'no price set' : `₹${formatter.format(total)}`;
+        return `${option.dataset.name} (${price} for ${nights} night${nights === 1 ? '' : 's'})`;
+    }
+
+    function show() {
+        Array.from(hotel.options).forEach(function(option) {
+            if (option.value) {
+                option.textContent = label(option);
+            }
+        });
+        const total = totals[hotel.value];
+        if (!nights || total === undefined) {
+            quote.style.display = 'none';
+            return;
+        }
+        quote.textContent = total === null
+            ? 'This hotel has no price for some of these nights.'
+            : `Stay total: ₹${formatter.format(total)} for ${nights} night${nights === 1 ? '' : 's'}`
+              + ` (avg ₹${formatter.format(total / nights)}/night)`;
+        quote.style.display = 'block';
+    }
+
+    function refresh() {
+        if (!checkIn.value || !checkOut.value || checkOut.value <= checkIn.value) {
+            latest++;
+            nights = 0;
+            show();
+            return;
+        }
+        // Only the newest request may update the form; slower earlier ones are dropped.
+        const requestId = ++latest;
+        const params = new URLSearchParams({check_in: checkIn.value, check_out: checkOut.value, room_type: roomType.value});
+        fetch(`${quoteUrl}?${params}`, {credentials: 'same-origin'})
+            .then(function(response) { return response.ok ? response.json() : {nights: 0, data: []}; })
+            .then(function(data) {
+                if (requestId !== latest) {
+                    return;
+                }
+                totals = {};
+                data.data.forEach(function(item) { totals[item.hotl_id] = item.total; });
+                nights = data.nights;
+                show();
+            })
+            .catch(function() {
+                nights = 0;
+                show();
+            });
+    }
+
+    [roomType, checkIn, checkOut].forEach(function(input) {
+        input.addEventListener('change', refresh);
+    });
+    hotel.addEventListener('change', show);
+});
@@ -0,0 +1,196 @@
+"""Stay quotes from the rate calendar (RATE, db_setup migration 12).
+
+A night's price at a hotel is the RATE row covering that date, weekday and
+room type with the highest priority (the newest one on a tie), or the
+hotel's hotl_rent when no rate applies. A hotel without a rent and without
+a matching rate has unpriced nights, and its stays quote as None.
+
+QuoteEngine precomputes, per room type and calendar year, one NumPy block
+holding every hotel's nightly prices as a running sum (cumsum over the
+nights of the year). A stay total is then cum[:, check_out] - cum[:, check_in]
+for all hotels at once, plus the same for the second year when the stay
+crosses New Year. Blocks are built from one RateCalendar snapshot and keyed
+by its HOTEL and RATE TABLE_VERSION counters: a rate or rent change, from
+any process, makes the next quote reload the calendar and rebuild the
+blocks it needs.
+
+Settings (environment variables):
+    HOTEL_QUOTE_CACHE_MB   memory cap for cached price blocks, per process (default 64; 0 disables)
+"""
+import os
+import threading
+from collections import OrderedDict, namedtuple
+from datetime import date
+
+import numpy as np
+
+from db_manager import ALL_WEEKDAYS, ROOM_TYPES, parse_stay
+
+QUOTE_CACHE_MB = float(os.environ.get('HOTEL_QUOTE_CACHE_MB', 64))
+QUOTE_TABLES = ('HOTEL', 'RATE')
+
+# One room type's prices for one year: `cum[i, d]` is the sum of hotel_ids[i]'s prices
+# for the year's first d nights and `gaps[i, d]` the number of unpriced nights among
+# them (None when every night is priced).
+PriceBlock = namedtuple('PriceBlock', 'cum gaps nbytes')
+# The calendar the blocks are built from, its hotel ids in block row order and {hotl_id: row}.
+PriceSnapshot = namedtuple('PriceSnapshot', 'calendar hotel_ids index')
+
+
+def _year_offset(day, year):
+    """Nights from 1 January of `year` to `day`."""
+    return (day - date(year, 1, 1)).days
+
+
+def build_block(calendar, index, room_type, year):
+    """Prices every hotel of `calendar` for each night of `year` and returns the PriceBlock."""
+    days = _year_offset(date(year + 1, 1, 1), year)
+    rents = np.array([np.nan if hotel['hotl_rent'] is None else hotel['hotl_rent'] for hotel in calendar.hotels],
+                     dtype=np.float64)
+    prices = np.repeat(rents[:, None], days, axis=1)
+    day_bits = 1 << (np.arange(days) + date(year, 1, 1).weekday()) % 7
+
+    # Rates come lowest priority first, so later ones overwrite earlier ones.
+    for rate in calendar.rates:
+        row = index.get(rate['rate_hotel_id'])
+        if row is None or rate['rate_room_type'] not in (None, room_type):
+            continue
+        start = 0 if rate['rate_start'] is None else max(0, _year_offset(date.fromisoformat(rate['rate_start']), year))
+        end = days if rate['rate_end'] is None else min(days, _year_offset(date.fromisoformat(rate['rate_end']), year) + 1)
+        if start >= end:
+            continue
+        nights = prices[row, start:end]
+        if rate['rate_weekdays'] == ALL_WEEKDAYS:
+            nights[:] = rate['rate_price']
+        else:
+            nights[(day_bits[start:end] & rate['rate_weekdays']) != 0] = rate['rate_price']
+
+    missing = np.isnan(prices)
+    cum = np.zeros((len(rents), days + 1), dtype=np.float64)
+    np.cumsum(np.where(missing, 0.0, prices), axis=1, out=cum[:, 1:])
+    gaps = None
+    if missing.any():
+        gaps = np.zeros((len(rents), days + 1), dtype=np.int32)
+        np.cumsum(missing, axis=1, out=gaps[:, 1:])
+    return PriceBlock(cum, gaps, cum.nbytes + (gaps.nbytes if gaps is not None else 0))
+
+
+class QuoteEngine:
+    """Prices stays at every hotel from cached per-year price blocks. Thread-safe."""
+
+    def __init__(self, db, max_bytes=None):
+        self.db = db
+        self.max_bytes = int(QUOTE_CACHE_MB * 2 ** 20) if max_bytes is None else max_bytes
+        self._snapshot = None  # PriceSnapshot the cached blocks were built from
+        self._blocks = OrderedDict()  # (room_type, year) -> PriceBlock
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self._stats = {'quotes': 0, 'hotels_priced': 0, 'block_hits': 0, 'block_builds': 0, 'evictions': 0,
+                       'reloads': 0}
+
+    def _current(self):
+        """The PriceSnapshot for the current HOTEL/RATE versions, reloading the calendar when they moved."""
+        versions = self.db.get_table_versions(QUOTE_TABLES)
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.calendar.versions == versions:
+            return snapshot
+        calendar = self.db.get_rate_calendar()
+        hotel_ids = np.array([hotel['hotl_id'] for hotel in calendar.hotels], dtype=np.int64)
+        fresh = PriceSnapshot(calendar, hotel_ids, {hotl_id: row for row, hotl_id in enumerate(hotel_ids.tolist())})
+        with self._lock:
+            if self._snapshot is None or self._snapshot.calendar.versions != calendar.versions:
+                self._snapshot = fresh
+                self._blocks.clear()
+                self._bytes = 0
+                self._stats['reloads'] += 1
+            return self._snapshot
+
+    def _block(self, snapshot, room_type, year):
+        """The PriceBlock for (room_type, year), built on a miss and kept under max_bytes (LRU)."""
+        key = (room_type, year)
+        with self._lock:
+            block = self._blocks.get(key) if self._snapshot is snapshot else None
+            if block is not None:
+                self._blocks.move_to_end(key)
+                self._stats['block_hits'] += 1
+                return block
+        block = build_block(snapshot.calendar, snapshot.index, room_type, year)
+        with self._lock:
+            self._stats['block_builds'] += 1
+            if self._snapshot is snapshot and block.nbytes <= self.max_bytes and key not in self._blocks:
+                self._blocks[key] = block
+                self._bytes += block.nbytes
+                while self._bytes > self.max_bytes:
+                    _, evicted = self._blocks.popitem(last=False)
+                    self._bytes -= evicted.nbytes
+                    self._stats['evictions'] += 1
+        return block
+
+    def _totals(self, snapshot, room_type, start, end, rows):
+        """(totals, unpriced night counts) of the stay start..end for the block rows `rows`."""
+        totals = np.zeros(len(rows), dtype=np.float64)
+        gaps = np.zeros(len(rows), dtype=np.int64)
+        for year in range(start.year, end.year + 1):
+            first = max(0, _year_offset(start, year))
+            last = min(_year_offset(date(year + 1, 1, 1), year), _year_offset(end, year))
+            if first >= last:
+                continue
+            block = self._block(snapshot, room_type, year)
+            totals += block.cum[rows, last] - block.cum[rows, first]
+            if block.gaps is not None:
+                gaps += block.gaps[rows, last] - block.gaps[rows, first]
+        return totals, gaps
+
+    def quote_all(self, room_type, check_in, check_out, hotl_ids=None):
+        """Prices one stay at every hotel (or just `hotl_ids`, unknown ids skipped).
+
+        Returns {'nights', 'versions', 'quotes': [{'hotl_id', 'total', 'average'}, ...]}
+        in hotl_id order; total and average are None for hotels with unpriced nights.
+        Raises ValueError for an unknown room type or an invalid stay (see parse_stay).
+        """
+        if room_type not in ROOM_TYPES:
+            raise ValueError(f"Room type must be one of {', '.join(ROOM_TYPES)}.")
+        start, end = parse_stay(check_in, check_out)
+        nights = (end - start).days
+        snapshot = self._current()
+        if hotl_ids is None:
+            rows = np.arange(len(snapshot.hotel_ids))
+        else:
+            rows = np.array(sorted({snapshot.index[hotl_id] for hotl_id in hotl_ids if hotl_id in snapshot.index}),
+                            dtype=np.int64)
+        totals, gaps = self._totals(snapshot, room_type, start, end, rows)
+        totals = np.round(totals, 2)
+        averages = np.round(totals / nights, 2)
+        quotes = [{'hotl_id': hotl_id, 'total': None, 'average': None} if gap else
+                  {'hotl_id': hotl_id, 'total': total, 'average': average}
+                  for hotl_id, total, average, gap in zip(snapshot.hotel_ids[rows].tolist(), totals.tolist(),
+                                                          averages.tolist(), gaps.tolist())]
+        with self._lock:
+            self._stats['quotes'] += 1
+            self._stats['hotels_priced'] += len(quotes)
+        return {'nights': nights, 'versions': snapshot.calendar.versions, 'quotes': quotes}
+
+    def quote(self, hotl_id, room_type, check_in, check_out):
+        """Prices one stay at one hotel: {'hotl_id', 'total', 'average'}, or None for an unknown hotel."""
+        quotes = self.quote_all(room_type, check_in, check_out, hotl_ids=(hotl_id,))['quotes']
+        return quotes[0] if quotes else None
+
+    def clear(self):
+        with self._lock:
+            self._snapshot = None
+            self._blocks.clear()
+            self._bytes = 0
+
+    def stats(self):
+        """Counters plus blocks and bytes held and the HOTEL/RATE versions they were built from."""
+        with self._lock:
+            stats = dict(self._stats)
+            stats['blocks'] = len(self._blocks)
+            stats['bytes'] = self._bytes
+            versions = self._snapshot.calendar.versions if self._snapshot is not None else {}
+        lookups = stats['block_hits'] + stats['block_builds']
+        stats['block_hit_rate'] = round(stats['block_hits'] / lookups, 4) if lookups else 0.0
+        stats['max_bytes'] = self.max_bytes
+        stats['hotel_version'] = versions.get('HOTEL')
+        stats['rate_version'] = versions.get('RATE')
+        return stats
@@ -0,0 +1,258 @@
+"""Read replicas: snapshot copies of the database that serve the heavy report reads.
+
+Long report reads (the booking summary, the payments list, CSV exports) keep
+a read transaction open on hotel_booking.db for as long as they run. In WAL
+mode that does not block writers, but it stops checkpoints from resetting the
+WAL. The WAL then grows while reports run, and every booking write pays for
+it. A ReplicaSet keeps one or more copies of the database
+(<db>_replica_<n>.db next to it) and HotelDBManager sends those reads there.
+Writes and all other reads stay on the primary.
+
+Each copy is refreshed with the sqlite3 online backup API. The backup reads
+the primary in one read transaction, so it is a consistent snapshot and
+writers are not blocked. The copy is in WAL mode, so readers keep their old
+snapshot until the refresh commits. A REPLICA_SNAPSHOT row in the copy
+records when the snapshot was taken.
+
+A routed read accepts a copy when:
+  - its snapshot is at most `max_staleness` seconds old;
+  - its snapshot was taken after the caller's `since`. app.py passes the
+    session's last write time here, so users always see their own changes
+    (read-your-writes).
+When no copy qualifies, the read goes to the primary.
+
+HotelDBManager uses replicas when created with replicas=<count> (app.py does
+so when HOTEL_REPLICAS is set). A background thread in each process
+refreshes the stalest copy every `refresh_interval` seconds. A process first
+claims the copy in its REPLICA_SNAPSHOT row, so a copy that another process
+refreshed or is refreshing is skipped. Refreshing can also be left to cron:
+
+    python replica.py refresh --db hotel_booking.db --replicas 2
+    python replica.py status --db hotel_booking.db --replicas 2
+
+Settings (environment variables):
+    HOTEL_REPLICAS                 number of snapshot copies (default 0: every read goes to the primary)
+    HOTEL_REPLICA_REFRESH_S        seconds between refreshes; 0 leaves refreshing to cron (default 30)
+    HOTEL_REPLICA_MAX_STALENESS_S  oldest snapshot a routed read accepts (default 120)
+"""
+import argparse
+import itertools
+import os
+import sqlite3
+import threading
+import time
+
+REPLICAS = int(os.environ.get('HOTEL_REPLICAS', 0))
+
+# rs_claimed_at: when a process started refreshing this copy, so other processes leave it alone.
+SNAPSHOT_SCHEMA = ("CREATE TABLE IF NOT EXISTS REPLICA_SNAPSHOT ( rs_id INTEGER PRIMARY KEY CHECK (rs_id = 1), "
+                   "rs_taken_at REAL NOT NULL, rs_seconds REAL NOT NULL, rs_claimed_at REAL )")
+
+
+def replica_file_name(db_name, number):
+    """Path of snapshot copy `number` (1-based), next to the main database."""
+    stem, ext = os.path.splitext(db_name)
+    return f"{stem}_replica_{number}{ext or '.db'}"
+
+
+class Replica:
+    """One snapshot copy and the pool that reads it."""
+
+    def __init__(self, path, pool):
+        self.path = path
+        self.pool = pool
+        self.taken_at = None   # time.time() when the snapshot's read began; None until known
+        self.checked_at = 0.0  # time.monotonic() of the last REPLICA_SNAPSHOT read
+
+
+class ReplicaSet:
+    """Snapshot copies of `db_name` plus the routing and refresh policy. See the module docstring.
+
+    pool_factory(path) opens the (query-only) ConnectionPool for one copy.
+    """
+
+    def __init__(self, db_name, pool_factory, count=None, refresh_interval=None, max_staleness=None,
+                 check_interval=1.0, timeout=10.0):
+        self.db_name = db_name
+        count = count or REPLICAS or 1
+        self.refresh_interval = refresh_interval if refresh_interval is not None \
+            else float(os.environ.get('HOTEL_REPLICA_REFRESH_S', 30))
+        self.max_staleness = max_staleness if max_staleness is not None \
+            else float(os.environ.get('HOTEL_REPLICA_MAX_STALENESS_S', 120))
+        # Seconds a copy's snapshot time is trusted before REPLICA_SNAPSHOT is re-read,
+        # which is how refreshes by other processes are picked up.
+        self.check_interval = check_interval
+        self.timeout = timeout
+        self.replicas = [Replica(path, pool_factory(path))
+                         for path in (replica_file_name(db_name, n) for n in range(1, count + 1))]
+        self._turn = itertools.count()
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._pid = None
+        self._thread = None
+        self._stop = None
+        self._stats = {'replica_reads': 0, 'primary_reads': 0, 'refreshes': 0, 'refresh_failures': 0,
+                       'last_refresh_seconds': 0.0}
+
+    # --- Routing ---
+    def pool_for(self, since=None):
+        """The pool of a copy fresh enough for a read that must reflect writes up to `since`, else None."""
+        self._started()
+        now = time.time()
+        fresh = [replica for replica in self.replicas
+                 if (taken_at := self._taken_at(replica)) is not None
+                 and now - taken_at <= self.max_staleness and (since is None or taken_at >= since)]
+        with self._lock:
+            self._stats['replica_reads' if fresh else 'primary_reads'] += 1
+        if not fresh:
+            return None
+        return fresh[next(self._turn) % len(fresh)].pool
+
+    def _taken_at(self, replica):
+        if time.monotonic() - replica.checked_at >= self.check_interval:
+            replica.taken_at = self._read_snapshot_time(replica)
+            replica.checked_at = time.monotonic()
+        return replica.taken_at
+
+    def _read_snapshot_time(self, replica):
+        if not os.path.exists(replica.path):
+            return None
+        try:
+            with replica.pool.connection() as conn:
+                row = conn.execute("SELECT rs_taken_at FROM REPLICA_SNAPSHOT").fetchone()
+        except sqlite3.Error:  # no copy yet, or a refresh is replacing it
+            return None
+        return row[0] if row else None
+
+    # --- Refresh ---
+    def refresh(self, replica=None):
+        """Copies the primary into `replica` (default: the stalest copy). Returns the seconds it took."""
+        with self._refresh_lock:
+            if replica is None:
+                replica = min(self.replicas, key=lambda r: self._read_snapshot_time(r) or 0.0)
+            started = time.perf_counter()
+            taken_at = time.time()
+            source = sqlite3.connect(self.db_name, timeout=self.timeout)
+            target = sqlite3.connect(replica.path, timeout=self.timeout, isolation_level=None)
+            try:
+                target.execute("PRAGMA journal_mode = WAL;")
+                # A copy lost in a crash is simply made again, so it is written without fsyncs.
+                target.execute("PRAGMA synchronous = OFF;")
+                # pages=-1: the whole copy in one step, i.e. one read transaction on the primary.
+                source.backup(target, pages=-1)
+                seconds = time.perf_counter() - started
+                target.execute(SNAPSHOT_SCHEMA)
+                target.execute("INSERT OR REPLACE INTO REPLICA_SNAPSHOT (rs_id, rs_taken_at, rs_seconds) VALUES (1, ?, ?)", (taken_at, seconds))
+                target.execute("PRAGMA wal_checkpoint(PASSIVE);")
+            except sqlite3.Error:
+                with self._lock:
+                    self._stats['refresh_failures'] += 1
+                raise
+            finally:
+                source.close()
+                target.close()
+            replica.taken_at, replica.checked_at = taken_at, time.monotonic()
+            with self._lock:
+                self._stats['refreshes'] += 1
+                self._stats['last_refresh_seconds'] = round(seconds, 3)
+            return seconds
+
+    def refresh_due(self):
+        """Refreshes the stalest copy if it is older than refresh_interval. Returns whether it did."""
+        replica = min(self.replicas, key=lambda r: self._read_snapshot_time(r) or 0.0)
+        if not self._claim(replica):
+            return False
+        self.refresh(replica)
+        return True
+
+    def _claim(self, replica):
+        """Marks a stale copy as being refreshed by this process; False if it is fresh or claimed.
+
+        A claim older than `timeout` (a process that died mid-refresh) is taken over.
+        """
+        if not os.path.exists(replica.path):
+            return True
+        now = time.time()
+        conn = sqlite3.connect(replica.path, timeout=self.timeout, isolation_level=None)
+        try:
+            claimed = conn.execute(
+                "UPDATE REPLICA_SNAPSHOT SET rs_claimed_at = ? WHERE rs_taken_at <= ? AND COALESCE(rs_claimed_at, 0) <= ?",
+                (now, now - self.refresh_interval, now - self.timeout)).rowcount
+            return claimed == 1
+        except sqlite3.OperationalError:  # no snapshot yet
+            return True
+        finally:
+            conn.close()
+
+    def _started(self):
+        """Starts the refresh thread on first use and again after a fork (never when refresh_interval is 0)."""
+        if not self.refresh_interval:
+            return
+        with self._lock:
+            if self._thread is None or self._pid != os.getpid():
+                self._stop = threading.Event()
+                self._thread = threading.Thread(target=self._run, args=(self._stop,), name='replica-refresh',
+                                                daemon=True)
+                self._thread.start()
+                self._pid = os.getpid()
+
+    def _run(self, stop):
+        while not stop.is_set():
+            try:
+                self.refresh_due()
+            except sqlite3.Error:
+                pass  # counted in refresh_failures; retried on the next tick
+            # Wake up often enough that copies never get much older than refresh_interval.
+            stop.wait(max(1.0, self.refresh_interval / (2 * len(self.replicas))))
+
+    def close(self):
+        """Stops the refresh thread and closes the idle replica connections."""
+        with self._lock:
+            thread, stop, self._thread = self._thread, self._stop, None
+        if thread is not None and self._pid == os.getpid():
+            stop.set()
+            thread.join()
+        for replica in self.replicas:
+            replica.pool.close()
+
+    def stats(self):
+        """Routing and refresh counters plus the age of the freshest and stalest copy."""
+        with self._lock:
+            stats = dict(self._stats)
+        now = time.time()
+        ages = [now - replica.taken_at for replica in self.replicas if replica.taken_at is not None]
+        stats['replicas'] = len(self.replicas)
+        stats['newest_age_seconds'] = round(min(ages), 3) if ages else -1
+        stats['oldest_age_seconds'] = round(max(ages), 3) if len(ages) == len(self.replicas) else -1
+        return stats
+
+
+def main():
+    from db_manager import ReplicaPool
+    from db_setup import DB_NAME
+
+    parser = argparse.ArgumentParser(description="Refresh or inspect the read-replica snapshot copies.")
+    parser.add_argument('command', choices=['refresh', 'status'],
+                        help="'refresh' copies the primary into every replica; 'status' shows their age")
+    parser.add_argument('--db', default=DB_NAME, help="Primary database file (default: %(default)s)")
+    parser.add_argument('--replicas', type=int, default=REPLICAS or 1, help="Number of copies (default: HOTEL_REPLICAS or 1)")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.db):
+        parser.error(f"database '{args.db}' not found")
+    replicas = ReplicaSet(args.db, ReplicaPool, count=args.replicas, refresh_interval=0)
+    try:
+        for replica in replicas.replicas:
+            if args.command == 'refresh':
+                seconds = replicas.refresh(replica)
+                print(f"✅ Refreshed {replica.path} in {seconds:.2f}s")
+            else:
+                taken_at = replicas._read_snapshot_time(replica)
+                age = f"{time.time() - taken_at:.0f}s old" if taken_at is not None else "❌ no snapshot yet"
+                print(f"  {replica.path}: {age}")
+    finally:
+        replicas.close()
+
+
+if __name__ == '__main__':
+    main()